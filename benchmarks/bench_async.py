@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+ROW = ("S", "B", "25/01/2020", 12.0, 333.5, "27/01/2020", "KPLUS", "TEST", "AAPL", "USD", "DEFAULT")
+
+
+async def run(rv, template, count: int, inflight: int) -> float:
+    window = asyncio.Semaphore(inflight)
+
+    async def request():
+        async with window:
+            reply = await rv.send_and_wait(template.build(ROW))
+            reply.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request() for i in range(count)))
+    return time.perf_counter() - start
+
+
+async def bench(args):
+    from tibrvlib import AsyncRVClient
+    from fakekis import FakeKIS
+    from kisimport import equities_deal_template
+
+    kis = FakeKIS(args.service, args.network, args.daemon, args.host, args.serv)
+    kis.start()
+
+    rv = AsyncRVClient(args.service, args.network, args.daemon)
+    await rv.connect(args.host, args.serv, "BENCH")
+    template = equities_deal_template(rv.receiver, rv.inbox)
+
+    try:
+        for inflight in args.inflight:
+            elapsed = await run(rv, template, args.count, inflight)
+            print("{:5d} in flight: {} requests in {:.3f}s ({:.0f} req/s)".format(
+                inflight, args.count, elapsed, args.count / elapsed))
+    finally:
+        template.destroy()
+        await rv.close()
+        kis.stop()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="AsyncRVClient.send_and_wait rate against a local fake KIS")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--inflight", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    parser.add_argument("--host", default="kondor")
+    parser.add_argument("--serv", default="kis_port")
+    args = parser.parse_args(argv[1:])
+
+    tibrvbackend.use(args.backend)
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
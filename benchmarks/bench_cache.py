@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+def rows(count: int) -> list:
+    return [("S", "B", "25/01/2020", float(i), 333.5, "27/01/2020", "KPLUS", "TEST", "EQ{}".format(i), "USD", "DEFAULT")
+            for i in range(count)]
+
+
+def measure(build, deals: list) -> float:
+    start = time.perf_counter()
+    for row in deals:
+        build(row).close()
+    return (time.perf_counter() - start) / len(deals)
+
+
+def native_calls(lib, build, deals: list) -> float:
+    # library calls per deal, independent of the backend speed
+    from tibrvmsglib import _rv, RVMessage
+
+    count = [0]
+    saved = {}
+    bound = {}
+    for name in dir(lib):
+        if name.startswith("tibrv"):
+            function = saved[name] = getattr(lib, name)
+
+            def counted(*args, function = function):
+                count[0] += 1
+                return function(*args)
+            setattr(lib, name, counted)
+            # functions already bound through the lazy library
+            if callable(_rv.__dict__.get(name)):
+                bound[name] = _rv.__dict__[name]
+                _rv.__dict__[name] = counted
+    # field layouts hold the functions they were prepared with
+    RVMessage._layouts.clear()
+    try:
+        measure(build(), deals)
+    finally:
+        for name, function in saved.items():
+            setattr(lib, name, function)
+        for name, function in bound.items():
+            _rv.__dict__[name] = function
+        RVMessage._layouts.clear()
+    return count[0] / len(deals)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Deal build cost, MessageTemplate vs kept MessageCache messages and replay")
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--path", default=None, help="cache file, default a temporary file")
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    args = parser.parse_args(argv[1:])
+
+    lib = tibrvbackend.use(args.backend)
+    from tibrvmsglib import MessageCache
+    from kisimport import equities_deal_template
+
+    path = args.path or os.path.join(tempfile.mkdtemp(), "deals.rvcache")
+    deals = rows(args.count)
+
+    # first session fills the cache
+    template = equities_deal_template("_INBOX.KIS.1", "_INBOX.CLIENT.1")
+    with MessageCache(path) as cache:
+        templated = measure(template.build, deals)
+        cold = measure(lambda row: cache.build(template, row), deals)
+    template.destroy()
+
+    # restart: new KIS and client inboxes, same deals
+    template = equities_deal_template("_INBOX.KIS.2", "_INBOX.CLIENT.2")
+    start = time.perf_counter()
+    with MessageCache(path) as cache:
+        load = time.perf_counter() - start
+
+        # values built again while their filled message is kept in memory
+        hot = deals[:cache.keep]
+        restarted = measure(lambda row: cache.build(template, row), hot)
+        repeated = measure(lambda row: cache.build(template, row), hot)
+
+        start = time.perf_counter()
+        replayed = 0
+        for msg in cache.replay(template):
+            msg.close()
+            replayed += 1
+        replay = (time.perf_counter() - start) / max(replayed, 1)
+
+        sample = deals[:100]
+        templateCalls = native_calls(lib, lambda: equities_deal_template("_INBOX.KIS.2", "_INBOX.CLIENT.2").build, sample)
+        hotCalls = native_calls(lib, lambda: lambda row: cache.build(template, row), sample)
+    template.destroy()
+
+    print("backend {}, {} deals, cache {} ({} KB)".format(args.backend, args.count, path, os.path.getsize(path) // 1024))
+    print("MessageTemplate.build      {:8.2f} us/deal  {:5.1f} library calls/deal".format(templated * 1e6, templateCalls))
+    print("MessageCache.build, cold   {:8.2f} us/deal".format(cold * 1e6))
+    print("MessageCache load          {:8.2f} ms".format(load * 1e3))
+    print("MessageCache.build, first  {:8.2f} us/deal  (after the restart, built and kept)".format(restarted * 1e6))
+    print("MessageCache.build, kept   {:8.2f} us/deal  {:5.1f} library calls/deal".format(repeated * 1e6, hotCalls))
+    print("MessageCache.replay        {:8.2f} us/deal".format(replay * 1e6))
+    if not args.path:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+def legacy_callback(rv, event, message, closure):
+    # subject parsing of RVClient.callback before the router, for comparison
+    from tibrvmsglib import RVMessage
+
+    msg = RVMessage.view(message)
+    subj_send = msg.GetSendSubject()
+    subject = subj_send.split(".")
+
+    if subject[0] == "_RV":
+        if subject[1] in ("INFO"):
+            if subject[3] == 'HOST' and subject[4] == 'STATUS':
+                rv.sendPingMessage()
+            return
+        if subject[1] in ("WARN"):
+            return
+    elif subject[0] == "_INBOX":
+        message_type = msg.GetInt("Type")
+        if message_type == msg.DATA_MSG:
+            rv.requests.resolveNext(message)
+            return
+
+
+def messages(rv, hosts: int) -> list:
+    # RVMessage objects own their handles, keep them alive while the handles are used
+    from tibrvmsglib import RVMessage
+
+    msgs = []
+    for i in range(hosts):
+        msg = RVMessage()
+        msg.SetSendSubject("_RV.INFO.SYSTEM.HOST.STATUS.10.0.{}.{}".format(i // 256, i % 256))
+        msg.AddString("hostaddr", "10.0.{}.{}".format(i // 256, i % 256))
+        msgs.append(msg)
+
+    msg = RVMessage()
+    msg.SetSendSubject(rv.inbox)
+    msg.AddInt("Type", msg.DATA_MSG)
+    msg.AddInt("Data Type", msg.ICC_DATA_MSG_INFO)
+    msgs.append(msg)
+    return msgs
+
+
+def rate(callback, handles: list, count: int) -> float:
+    start = time.perf_counter()
+    n = 0
+    while n < count:
+        for handle in handles:
+            callback(0, handle, None)
+        n += len(handles)
+    return n / (time.perf_counter() - start)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="RVClient.callback rate under an advisory storm")
+    parser.add_argument("--count", type=int, default=200000)
+    parser.add_argument("--hosts", type=int, default=300)
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    args = parser.parse_args(argv[1:])
+
+    tibrvbackend.use(args.backend)
+    from tibrvlib import RVClient
+
+    # no KIS answers, receiver stays empty and HOST.STATUS does not ping
+    rv = RVClient(args.service, args.network, args.daemon, trace = False)
+    rv.connect("kondor", "kis_port", "BENCH")
+    msgs = messages(rv, args.hosts)
+    handles = [msg.message for msg in msgs]
+
+    try:
+        legacy = rate(lambda event, message, closure: legacy_callback(rv, event, message, closure),
+                    handles, args.count)
+        routed = rate(rv.callback, handles, args.count)
+    finally:
+        rv.destroy()
+
+    print("{} hosts, {} callbacks".format(args.hosts, args.count))
+    print("split subject   {:10.0f} callbacks/s".format(legacy))
+    print("SubjectRouter   {:10.0f} callbacks/s".format(routed))
+    print("speedup         {:10.2f}x".format(routed / legacy))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
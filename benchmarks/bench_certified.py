@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import concurrent.futures
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+ROW = ("S", "B", "25/01/2020", 12.0, 333.5, "27/01/2020", "KPLUS", "TEST", "AAPL", "USD", "DEFAULT")
+
+
+def connect(args, ledger = None, sync = False):
+    from tibrvlib import RVClient
+
+    rv = RVClient(args.service, args.network, args.daemon, trace = False)
+    if ledger is not False:
+        rv.certify("BENCH.CLIENT", ledger, sync, timeLimit = 60.0)
+    rv.connect(args.host, args.serv, "BENCH")
+    rv.waitReady()
+    return rv
+
+
+def certified(rv, count: int) -> float:
+    # fire-and-forget, then wait for the delivery confirmations
+    from kisimport import equities_deal_template
+
+    template = equities_deal_template(rv.receiver, rv.inbox)
+    rv.startDispatcher()
+    start = time.perf_counter()
+    futures = []
+    for i in range(count):
+        msg = template.build(ROW)
+        futures.append(rv.deliver(msg))
+        msg.close()
+    sent = time.perf_counter() - start
+    concurrent.futures.wait(futures, timeout = 60.0)
+    elapsed = time.perf_counter() - start
+    template.destroy()
+    return sent, elapsed
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Deal rate, reliable import_deals vs certified delivery")
+    parser.add_argument("--deals", type=int, default=5000)
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    parser.add_argument("--host", default="kondor")
+    parser.add_argument("--serv", default="kis_port")
+    args = parser.parse_args(argv[1:])
+
+    tibrvbackend.use(args.backend)
+    from fakekis import FakeKIS
+    from kisimport import import_deals
+
+    path = tempfile.mkdtemp()
+    kis = FakeKIS(args.service, args.network, args.daemon, args.host, args.serv, certified = "BENCH.KIS")
+    kis.start()
+    results = []
+    try:
+        rv = connect(args, ledger = False)
+        report = import_deals(rv, (ROW for i in range(args.deals)), batch_size=1, window=1)
+        results.append(("reliable, one round trip", None, report.elapsed))
+        report = import_deals(rv, (ROW for i in range(args.deals)), batch_size=500, window=2)
+        results.append(("reliable, batch 500 window 2", None, report.elapsed))
+        rv.destroy()
+
+        for name, ledger, sync in (("certified, process ledger", None, False),
+                                   ("certified, file ledger", os.path.join(path, "bench.ledger"), False),
+                                   ("certified, synced file ledger", os.path.join(path, "sync.ledger"), True)):
+            rv = connect(args, ledger, sync)
+            sent, elapsed = certified(rv, args.deals)
+            results.append((name, sent, elapsed))
+            rv.destroy()
+    finally:
+        kis.stop()
+        shutil.rmtree(path)
+
+    print("backend {}, {} deals".format(args.backend, args.deals))
+    for name, sent, elapsed in results:
+        send = "" if sent is None else ", sent in {:.3f}s".format(sent)
+        print("{:32} {:8.0f} deals/s{}".format(name, args.deals / elapsed, send))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
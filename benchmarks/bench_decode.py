@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+ROW = [("DealStatus", "string", "S"), ("DealType", "string", "B"), ("TradeDate", "date", "25/01/2020"),
+        ("Quantity", "float", 12.0), ("Price", "float", 333.5), ("SettlementDate", "date", "27/01/2020"),
+        ("Users_Id", "int", 7), ("Equities_ShortName", "string", "AAPL")]
+
+DEAL = ("S", "B", "25/01/2020", 12.0, 333.5, "27/01/2020", "KPLUS", "TEST", "AAPL", "USD", "DEFAULT")
+
+
+def table_send(RVMessage, rows: int):
+    # ICC_DATA_MSG_TABLE_SEND like answer, KPLUSFEED with one flat "Table" section per row
+    fields = []
+    for i in range(rows):
+        fields += [("Table", "string", "EquitiesDeals")] + ROW[:6] + [("Users_Id", "int", i)] + ROW[7:]
+    body = RVMessage.FromFields(fields)
+
+    msg = RVMessage.FromFields([("Type", "int", RVMessage.DATA_MSG),
+                                ("Data Type", "int", RVMessage.ICC_DATA_MSG_TABLE_SEND),
+                                ("Key", "string", "EquitiesDeals")])
+    msg.AddMsg("KPLUSFEED", body)
+    body.close()
+    return msg
+
+
+def check(decoder, build_deal):
+    # sections of a real build_deal message, fields stay with their section
+    import datetime
+
+    msg = build_deal("_INBOX.BENCH", "_INBOX.BENCH.REPLY", DEAL)
+    tree = decoder.decode(msg.message)
+    sections = tree["KPLUSFEED"]["Table"]
+    names = [section["Table"] for section in sections]
+    assert names == ["ImportTable", "EquitiesDeals", "Users", "Folders", "Equities", "Currencies",
+                     "ClearingModes"], names
+    assert sections[0] == {"Table": "ImportTable", "Action": "I", "DateFormat": "DD/MM/YYYY",
+                           "TableName": "EquitiesDeals"}, sections[0]
+    assert sections[1]["Price"] == 333.5 and sections[1]["TradeDate"] == datetime.date(2020, 1, 25), sections[1]
+    assert sections[3] == {"Table": "Folders", "Folders_ShortName": "TEST"}, sections[3]
+    assert decoder.rows(msg.message, "EquitiesDeals") == [sections[1]]
+    columns = decoder.columns(msg.message, arrays=False)
+    assert columns["Table"] == names and columns["Users_ShortName"][2] == "KPLUS", columns
+    msg.close()
+
+
+def measure(decode, count: int) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        decode()
+    return (time.perf_counter() - start) / count
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Table answer decode rate, text vs MessageDecoder")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--count", type=int, default=5)
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    args = parser.parse_args(argv[1:])
+
+    tibrvbackend.use(args.backend)
+    from tibrvmsglib import RVMessage, MessageDecoder, _numpy
+    from kisimport import build_deal
+
+    decoder = MessageDecoder(dates=("TradeDate", "SettlementDate"))
+    check(decoder, build_deal)
+
+    msg = table_send(RVMessage, args.rows)
+    text = measure(lambda: msg.text, args.count)
+    tree = measure(lambda: decoder.decode(msg.message), args.count)
+    columns = measure(lambda: decoder.columns(msg.message, arrays=False, table="EquitiesDeals"), args.count)
+    results = [("msg.text (no parsing)", text), ("decode() dict tree", tree), ("columns() lists", columns)]
+    if _numpy() is not None:
+        arrays = measure(lambda: decoder.columns(msg.message, arrays=True, table="EquitiesDeals"), args.count)
+        results.append(("columns() NumPy", arrays))
+    msg.close()
+
+    print("backend {}, table answer of {} rows of {} fields".format(args.backend, args.rows, len(ROW)))
+    for name, elapsed in results:
+        print("{:24} {:10.0f} rows/s".format(name, args.rows / elapsed))
+
+    # build_deal messages, 7 sections each
+    deals = [build_deal("_INBOX.BENCH", "_INBOX.BENCH.REPLY", DEAL) for i in range(args.rows // 10)]
+    results = [("msg.text (no parsing)", lambda msg: msg.text),
+               ("decode() dict tree", lambda msg: decoder.decode(msg.message)),
+               ("rows(EquitiesDeals)", lambda msg: decoder.rows(msg.message, "EquitiesDeals"))]
+    print("{} build_deal messages".format(len(deals)))
+    for name, decode in results:
+        elapsed = measure(lambda: [decode(msg) for msg in deals], args.count)
+        print("{:24} {:10.0f} deals/s".format(name, len(deals) / elapsed))
+    for msg in deals:
+        msg.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+NAMES = ("Table", "TableName", "Type", "Data Type", "Key", "Quantity", "Price", "Folders_ShortName")
+
+
+def per_call(RVMessage, fast: bool, method: str, value, count: int) -> float:
+    # ns per field call, count calls on messages of len(NAMES) fields, Add
+    # includes the create and close of the message
+    from tibrvmsglib import FastRVMessage
+
+    msgs = count // len(NAMES)
+    get = method.startswith("Get")
+    source = RVMessage()
+    for name in NAMES:
+        source.AddInt(name, 1) if method == "GetInt" else source.AddString(name, "EQUITY")
+    start = time.perf_counter()
+    for i in range(msgs):
+        if get:
+            msg = (FastRVMessage if fast else RVMessage).view(source.message)
+        else:
+            msg = RVMessage(fast = fast)
+        call = getattr(msg, method)
+        if get:
+            for name in NAMES:
+                call(name)
+        else:
+            for name in NAMES:
+                call(name, value)
+            msg.close()
+    elapsed = time.perf_counter() - start
+    source.close()
+    return elapsed * 1e9 / (msgs * len(NAMES))
+
+
+def deals(build_deal, fast: bool, count: int) -> float:
+    row = ("S", "B", "25/01/2020", 100.0, 333.5, "27/01/2020", "KPLUS", "TEST", "AAPL", "USD", "DEFAULT")
+    start = time.perf_counter()
+    for i in range(count):
+        build_deal("_INBOX.BENCH", "_INBOX.BENCH.REPLY", row, fast = fast).close()
+    return count / (time.perf_counter() - start)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="RVMessage field calls, default path vs fast=True")
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--deals", type=int, default=20000)
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    args = parser.parse_args(argv[1:])
+
+    tibrvbackend.use(args.backend)
+    from tibrvmsglib import RVMessage
+    from kisimport import build_deal
+
+    print("backend {}, {} calls per method".format(args.backend, args.calls))
+    for method, value in (("AddString", "EQUITY"), ("AddInt", 42), ("AddFloat", 333.5), ("GetString", None),
+                          ("GetInt", None)):
+        slow = per_call(RVMessage, False, method, value, args.calls)
+        fast = per_call(RVMessage, True, method, value, args.calls)
+        print("{:12} {:8.0f} ns  fast {:8.0f} ns  {:5.1f}% less".format(method, slow, fast, (1 - fast / slow) * 100))
+
+    slow = deals(build_deal, False, args.deals)
+    fast = deals(build_deal, True, args.deals)
+    print("build_deal   {:8.0f} deals/s  fast {:8.0f} deals/s  x{:.2f}".format(slow, fast, fast / slow))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
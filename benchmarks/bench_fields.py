@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+def table(count: int) -> list:
+    # KPLUSFEED-like table of strings, dates, ints and floats
+    kinds = ("string", "date", "int", "float")
+    values = {"string": "EQUITY", "date": "25/01/2020", "int": 42, "float": 333.5}
+    return [("Field{}".format(i), kinds[i % 4], values[kinds[i % 4]]) for i in range(count)]
+
+
+def per_field(RVMessage, fields: list):
+    add = {"string": RVMessage.AddString, "date": RVMessage.AddDateFromString,
+            "int": RVMessage.AddInt, "float": RVMessage.AddFloat}
+
+    def build():
+        msg = RVMessage()
+        for fieldName, kind, value in fields:
+            add[kind](msg, fieldName, value)
+        return msg
+    return build
+
+
+def per_field_update(RVMessage, msg, fields: list):
+    update = {"string": RVMessage.UpdateString, "date": RVMessage.UpdateString,
+            "int": RVMessage.UpdateInt, "float": RVMessage.UpdateFloat}
+
+    def build():
+        for fieldName, kind, value in fields:
+            update[kind](msg, fieldName, value)
+    return build
+
+
+def raw_per_field(RVMessage, fields: list):
+    # library calls of both paths with prepared arguments
+    from tibrvmsglib import _rv, _c_tibrvMsg
+    add = {"string": _rv.tibrvMsg_AddStringEx, "date": _rv.tibrvMsg_AddStringEx,
+            "int": _rv.tibrvMsg_AddI32Ex, "float": _rv.tibrvMsg_AddF64Ex}
+    calls = [(add[kind], fieldName.encode(), value.encode() if type(value) is str else value)
+            for fieldName, kind, value in fields]
+
+    def build():
+        msg = RVMessage()
+        handle = _c_tibrvMsg(msg.message)
+        for add, name, value in calls:
+            add(handle, name, value, 0)
+        return msg
+    return build
+
+
+def measure(build, count: int, repeat: int = 1) -> float:
+    # best seconds per message of repeat rounds
+    best = None
+    for r in range(repeat):
+        start = time.perf_counter()
+        for i in range(count):
+            msg = build()
+            if msg is not None:
+                msg.close()
+        elapsed = (time.perf_counter() - start) / count
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Message build cost, per-field AddX calls vs bulk AddFields")
+    parser.add_argument("--count", type=int, default=5000, help="messages per round")
+    parser.add_argument("--repeat", type=int, default=7, help="rounds per case, the best one counts")
+    parser.add_argument("--fields", type=int, default=20)
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    args = parser.parse_args(argv[1:])
+
+    tibrvbackend.use(args.backend)
+    from tibrvmsglib import RVMessage
+
+    fields = table(args.fields)
+    encoded = [(fieldName.encode(), kind, value) for fieldName, kind, value in fields]
+
+    add = measure(per_field(RVMessage, fields), args.count, args.repeat)
+    bulk = measure(lambda: RVMessage.FromFields(fields), args.count, args.repeat)
+    bulkEncoded = measure(lambda: RVMessage.FromFields(encoded), args.count, args.repeat)
+
+    floor = measure(raw_per_field(RVMessage, fields), args.count, args.repeat)
+
+    msg = RVMessage.FromFields(fields)
+    update = measure(per_field_update(RVMessage, msg, fields), args.count, args.repeat)
+    bulkUpdate = measure(lambda: msg.UpdateFields(fields), args.count, args.repeat)
+    msg.close()
+
+    print("backend {}, best of {} rounds of {} messages of {} fields".format(args.backend, args.repeat,
+        args.count, args.fields))
+    print("per-field AddX              {:8.2f} us/msg".format(add * 1e6))
+    print("FromFields                  {:8.2f} us/msg  {:5.2f}x".format(bulk * 1e6, add / bulk))
+    print("FromFields, encoded names   {:8.2f} us/msg  {:5.2f}x".format(bulkEncoded * 1e6, add / bulkEncoded))
+    print("Python overhead above the library calls:")
+    print("  per-field AddX            {:8.2f} us/msg".format((add - floor) * 1e6))
+    if bulkEncoded > floor:
+        print("  FromFields, encoded names {:8.2f} us/msg  {:5.2f}x".format((bulkEncoded - floor) * 1e6,
+            (add - floor) / (bulkEncoded - floor)))
+    else:
+        # within the noise of the floor
+        print("  FromFields, encoded names {:8.2f} us/msg".format(0.0))
+    print("per-field UpdateX           {:8.2f} us/msg".format(update * 1e6))
+    print("UpdateFields                {:8.2f} us/msg  {:5.2f}x".format(bulkUpdate * 1e6, update / bulkUpdate))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+def deals(count: int):
+    for i in range(count):
+        yield ("S", "B", "25/01/2020", float(i % 1000 + 1), 333.5, "27/01/2020",
+            "KPLUS", "TEST", "AAPL", "USD", "DEFAULT")
+
+
+class DepthSampler(threading.Thread):
+
+    # peak event count of memory bus queues, sampled every millisecond
+
+    def __init__(self, queues: dict):
+        super().__init__(daemon = True)
+        self.queues = queues
+        self.peaks = dict.fromkeys(queues, 0)
+        self.running = True
+
+    def run(self):
+        while self.running:
+            for name, queue in self.queues.items():
+                self.peaks[name] = max(self.peaks[name], len(queue.events))
+            time.sleep(0.001)
+
+    def stop(self) -> dict:
+        self.running = False
+        self.join()
+        return self.peaks
+
+
+def run(args, lib, kis, allowance: int):
+    from tibrvlib import RVClient
+    from kisimport import import_deals
+
+    rv = RVClient(args.service, args.network, args.daemon, trace = False)
+    if allowance:
+        rv.flowControl(allowance)
+    rv.connect(args.host, args.serv, "BENCH")
+    rv.waitReady()
+
+    # one batch: without a window every deal is sent before the first answer is read
+    sampler = DepthSampler({"kis": lib.queues[kis.listenerQueue], "client": lib.queues[rv.listenerQueue]})
+    sampler.start()
+    report = import_deals(rv, deals(args.deals), args.deals, 1, timeout = 60.0)
+    peaks = sampler.stop()
+    stats = rv.window.stats() if rv.window is not None else {}
+    rv.destroy()
+    return report, peaks, stats
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="import_deals against a slow fake KIS, with and without an ack window")
+    parser.add_argument("--deals", type=int, default=5000)
+    parser.add_argument("--allowances", default="0,1,8,32,128", help="ack allowances, 0 sends without flow control")
+    parser.add_argument("--fake-delay", type=float, default=0.0002, help="fake KIS seconds per message")
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    parser.add_argument("--host", default="kondor")
+    parser.add_argument("--serv", default="kis_port")
+    args = parser.parse_args(argv[1:])
+
+    # queue depths are read from the memory bus
+    lib = tibrvbackend.use(tibrvbackend.MEMORY)
+    from fakekis import FakeKIS
+
+    kis = FakeKIS(args.service, args.network, args.daemon, args.host, args.serv, args.fake_delay)
+    kis.start()
+    results = []
+    try:
+        for allowance in [int(a) for a in args.allowances.split(",")]:
+            results.append((allowance,) + run(args, lib, kis, allowance))
+    finally:
+        kis.stop()
+
+    print("{} deals, fake KIS {:g}ms per deal".format(args.deals, args.fake_delay * 1e3))
+    for allowance, report, peaks, stats in results:
+        name = "ack allowance {}".format(allowance) if allowance else "no flow control"
+        print("{:20} {:7.0f} deals/s  {} acks {} missing  peak queue KIS {:5} client {:5}  waits {}".format(
+            name, report.rate, report.acks, report.missing, peaks["kis"], peaks["client"], stats.get("waits", "-")))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
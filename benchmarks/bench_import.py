@@ -0,0 +1,120 @@
+import os
+import sys
+import json
+import ctypes
+import argparse
+import tempfile
+import compileall
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# run in a fresh interpreter per sample, prints the seconds of each step as JSON.
+# ctypes is imported before the clock in both probes, the baseline one needs it
+# for the stand-in.
+PROBE = """
+import sys, time, json, ctypes
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import tibrvlib
+imported = time.perf_counter()
+from tibrvmsglib import RVMessage
+RVMessage().close()
+first = time.perf_counter()
+print(json.dumps({{"import": imported - start, "first": first - imported}}))
+"""
+
+# the baseline loads the library at import; without a TIBCO install a stand-in
+# takes its place, so the baseline is measured without the library load
+BASELINE_PROBE = """
+import sys, time, json, ctypes
+sys.path.insert(0, {root!r})
+
+class StandIn():
+    def __init__(self, name, *args, **kwargs):
+        pass
+    def __getattr__(self, name):
+        function = type("Function", (), {{}})()
+        setattr(self, name, function)
+        return function
+
+if not {loaded!r}:
+    ctypes.CDLL = StandIn
+
+start = time.perf_counter()
+import tibrvlib
+imported = time.perf_counter()
+print(json.dumps({{"import": imported - start}}))
+"""
+
+
+def baseline_tree(revision: str, directory: str) -> str:
+    # tibrvlib and tibrvmsglib of revision, compiled like an installed tree
+    for name in ("tibrvlib.py", "tibrvmsglib.py"):
+        data = subprocess.run(["git", "show", revision + ":" + name], cwd = ROOT, check = True,
+                              stdout = subprocess.PIPE).stdout
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(data)
+    compileall.compile_dir(directory, quiet = 1)
+    return directory
+
+
+def sample(probe: str, root: str, backend: str, loaded: bool = True) -> dict:
+    env = dict(os.environ, TIBRV_BACKEND = backend)
+    output = subprocess.run([sys.executable, "-c", probe.format(root = root, loaded = loaded)], env = env, check = True,
+                            stdout = subprocess.PIPE).stdout
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def median(values: list) -> float:
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Cold import of tibrvlib against the baseline commit, "
+                                                 "fails when it is not faster")
+    parser.add_argument("--count", type=int, default=20, help="interpreters per tree")
+    parser.add_argument("--baseline", default=None, help="revision to compare with, default the root commit")
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    args = parser.parse_args(argv[1:])
+
+    revision = args.baseline or subprocess.run(["git", "rev-list", "--max-parents=0", "HEAD"], cwd = ROOT,
+                                               check = True, stdout = subprocess.PIPE).stdout.decode().split()[0]
+    # both trees from bytecode, not from source
+    compileall.compile_dir(ROOT, maxlevels = 0, quiet = 1)
+
+    try:
+        ctypes.CDLL(tibrvbackend.lib_name("tibrv"))
+        loaded = True
+    except OSError:
+        loaded = False
+
+    with tempfile.TemporaryDirectory() as directory:
+        baseline_tree(revision, directory)
+        before = [sample(BASELINE_PROBE, directory, tibrvbackend.CTYPES, loaded) for i in range(args.count)]
+        after = [sample(PROBE, ROOT, args.backend) for i in range(args.count)]
+
+    baseline = median([s["import"] for s in before])
+    imported = median([s["import"] for s in after])
+    first = median([s["first"] for s in after])
+
+    print("median of {} interpreters, bytecode compiled".format(args.count))
+    print("baseline {:12} import {:7.2f}ms{}".format(revision[:12], baseline * 1e3,
+        "" if loaded else "  (library stand-in, its load not counted)"))
+    print("current               import {:7.2f}ms  {:5.2f}x  first message {:7.2f}ms ({} backend)".format(
+        imported * 1e3, baseline / imported, first * 1e3, args.backend))
+    if imported >= baseline:
+        print("no import time improvement over the baseline")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,63 @@
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+def deals(count: int):
+    for i in range(count):
+        yield ("S", "B", "25/01/2020", float(i % 1000 + 1), 333.5, "27/01/2020",
+            "KPLUS", "TEST", "AAPL", "USD", "DEFAULT")
+
+
+def connect(args):
+    from tibrvlib import RVClient
+
+    rv = RVClient(args.service, args.network, args.daemon, trace = False)
+    rv.connect(args.host, args.serv, "BENCH")
+    rv.waitReady()
+    return rv
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="import_deals throughput against a local fake KIS")
+    parser.add_argument("--deals", type=int, default=10000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--window", type=int, default=2)
+    parser.add_argument("--baseline", type=int, default=1000, help="deals sent one round trip at a time")
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    parser.add_argument("--host", default="kondor")
+    parser.add_argument("--serv", default="kis_port")
+    args = parser.parse_args(argv[1:])
+
+    tibrvbackend.use(args.backend)
+    from fakekis import FakeKIS
+    from kisimport import import_deals
+
+    kis = FakeKIS(args.service, args.network, args.daemon, args.host, args.serv)
+    kis.start()
+
+    rv = connect(args)
+    try:
+        if args.baseline > 0:
+            report = import_deals(rv, deals(args.baseline), batch_size=1, window=1)
+            print("one deal per round trip:", report)
+
+        report = import_deals(rv, deals(args.deals), batch_size=args.batch, window=args.window)
+        for batch in report.batches[:3]:
+            print(" ", batch)
+        print("batch {} window {}:".format(args.batch, args.window), report)
+    finally:
+        rv.destroy()
+        kis.stop()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,113 @@
+import os
+import sys
+import csv
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+HEADER = ("status", "type", "trade_date", "qty", "price", "settle", "trader", "folder", "equity", "currency")
+
+# K+ field -> CSV column, ClearingModes_ShortName from the defaults
+COLUMNS = {"DealStatus": "status", "DealType": "type", "TradeDate": "trade_date", "Quantity": "qty",
+           "Price": "price", "SettlementDate": "settle", "Users_ShortName": "trader",
+           "Folders_ShortName": "folder", "Equities_ShortName": "equity", "Currencies_ShortName": "currency"}
+DEFAULTS = {"ClearingModes_ShortName": "DEFAULT"}
+
+
+def write_deals(path: str, count: int):
+    with open(path, "w", newline = "") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(count):
+            writer.writerow(("S", "B", "25/01/2020", i % 1000 + 1, 333.5, "27/01/2020", "KPLUS",
+                             "TEST", "AAPL", "USD"))
+
+
+def peak_read(path: str, mapping, chunk: int, stream: bool) -> (int, int):
+    # (rows, peak bytes) of reading every deal, streamed in chunks or loaded at once
+    from kisingest import read_csv
+
+    tracemalloc.start()
+    rows = 0
+    if stream:
+        for deals in read_csv(path, mapping, chunk):
+            rows += len(deals)
+    else:
+        deals = [deal for deals in read_csv(path, mapping, 1 << 62) for deal in deals]
+        rows = len(deals)
+        del deals
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rows, peak
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Streaming CSV/NumPy deal ingestion, memory and per-chunk rate")
+    parser.add_argument("--deals", type=int, default=50000)
+    parser.add_argument("--chunk", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--window", type=int, default=2)
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    parser.add_argument("--host", default="kondor")
+    parser.add_argument("--serv", default="kis_port")
+    args = parser.parse_args(argv[1:])
+
+    tibrvbackend.use(args.backend)
+    from fakekis import FakeKIS
+    from tibrvlib import RVClient
+    import kisingest
+
+    mapping = kisingest.equities_deal_mapping(COLUMNS, DEFAULTS)
+    with tempfile.TemporaryDirectory() as directory:
+        small, large = os.path.join(directory, "small.csv"), os.path.join(directory, "deals.csv")
+        write_deals(small, args.deals // 10)
+        write_deals(large, args.deals)
+
+        print("read peak memory, chunk {}".format(args.chunk))
+        for path in (small, large):
+            for stream in (True, False):
+                rows, peak = peak_read(path, mapping, args.chunk, stream)
+                print("{:8} rows  {:12} {:10.1f} KB".format(rows, "streamed" if stream else "loaded", peak / 1024))
+
+        sources = [("csv module", large)]
+        if kisingest.numpy is not None:
+            numpy = kisingest.numpy
+            frame = {"status": ["S"] * args.deals, "type": ["B"] * args.deals,
+                     "trade_date": numpy.full(args.deals, "2020-01-25", dtype="datetime64[D]"),
+                     "qty": numpy.arange(args.deals, dtype=numpy.float64) % 1000 + 1,
+                     "price": numpy.full(args.deals, 333.5),
+                     "settle": numpy.full(args.deals, "2020-01-27", dtype="datetime64[D]"),
+                     "trader": ["KPLUS"] * args.deals, "folder": ["TEST"] * args.deals,
+                     "equity": ["AAPL"] * args.deals, "currency": ["USD"] * args.deals}
+            sources.append(("NumPy columns", frame))
+        if kisingest.pyarrow is not None:
+            sources.append(("pyarrow csv", large))
+
+        kis = FakeKIS(args.service, args.network, args.daemon, args.host, args.serv)
+        kis.start()
+        rv = RVClient(args.service, args.network, args.daemon, trace = False)
+        rv.connect(args.host, args.serv, "BENCH")
+        rv.waitReady()
+        try:
+            for name, source in sources:
+                engine = "arrow" if name.startswith("pyarrow") else None
+                print(name)
+                report = kisingest.ingest(rv, source, mapping, args.chunk, args.batch, args.window,
+                                          engine = engine, on_chunk = lambda chunk: print("  " + str(chunk)))
+                print("  " + str(report))
+        finally:
+            rv.destroy()
+            kis.stop()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+ROW = ("S", "B", "25/01/2020", 12.0, 333.5, "27/01/2020", "KPLUS", "TEST", "AAPL", "USD", "DEFAULT")
+
+
+def send_rate(rv, msg, count: int) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        rv.send(msg)
+    return count / (time.perf_counter() - start)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Journal append and RVClient.send rate with and without a journal")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--path", default=None, help="journal directory, default a temporary directory")
+    parser.add_argument("--fsync", type=float, default=1.0, help="fsync interval in seconds")
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    args = parser.parse_args(argv[1:])
+
+    tibrvbackend.use(args.backend)
+    from tibrvlib import RVClient, OutboundBuffer
+    from tibrvjournal import Journal
+    from kisimport import equities_deal_template
+
+    path = args.path or tempfile.mkdtemp()
+    template = equities_deal_template("BENCH.KIS.NOBODY", "_INBOX.CLIENT.1")
+    msg = template.build(ROW)
+    data = msg.AsBytes()
+
+    # wire format of the message, the part of the journaled send done by the library
+    start = time.perf_counter()
+    for i in range(args.count):
+        msg.AsBytes()
+    encode = time.perf_counter() - start
+
+    journal = Journal(path, fsyncInterval=args.fsync)
+    start = time.perf_counter()
+    for i in range(args.count):
+        journal.append(Journal.OUT, msg.subject, data, i)
+    append = time.perf_counter() - start
+    journal.close()
+
+    start = time.perf_counter()
+    journal = Journal(path, readonly=True)
+    load = time.perf_counter() - start
+    start = time.perf_counter()
+    read = sum(1 for record in journal)
+    scan = time.perf_counter() - start
+    journal.close()
+
+    # sends to a subject nobody listens to
+    rv = RVClient(args.service, args.network, args.daemon, trace = False)
+    rv.create()
+    try:
+        plain = send_rate(rv, msg, args.count)
+        rv.journal = Journal(os.path.join(path, "send"), fsyncInterval=args.fsync)
+        journaled = send_rate(rv, msg, args.count)
+        rv.journal.close()
+
+        # KIS sends kept by the outbox, the journal takes the outbox bytes.
+        # Nobody answers, the buffer holds every message.
+        rv.journal = None
+        rv.receiver = msg.subject
+        rv.state = RVClient.READY
+        rv.outbox = OutboundBuffer(args.count * 2, args.count * 2 * len(data))
+        buffered = send_rate(rv, msg, args.count)
+        rv.outbox = OutboundBuffer(args.count * 2, args.count * 2 * len(data))
+        rv.journal = Journal(os.path.join(path, "outbox"), fsyncInterval=args.fsync)
+        bufferedJournaled = send_rate(rv, msg, args.count)
+        rv.journal.close()
+    finally:
+        rv.destroy()
+    msg.close()
+    template.destroy()
+
+    size = args.count * (Journal._HEADER.size + len(msg.subject) + len(data))
+    print("backend {}, {} deal messages of {} bytes".format(args.backend, args.count, len(data)))
+    print("Journal.append       {:10.0f} records/s  {:8.1f} MB/s".format(args.count / append, size / append / 1e6))
+    print("Journal open + index {:10.1f} ms".format(load * 1e3))
+    print("Journal read         {:10.0f} records/s".format(read / scan))
+    print("RVClient.send        {:10.0f} msgs/s".format(plain))
+    print("send + journal       {:10.0f} msgs/s".format(journaled))
+    # where the journal time of a send goes
+    print("journal per send     {:10.2f} us".format((1 / journaled - 1 / plain) * 1e6))
+    print("  tibrvMsg_GetAsBytes{:10.2f} us".format(encode / args.count * 1e6))
+    print("  Journal.append     {:10.2f} us".format(append / args.count * 1e6))
+    print("send, outbox         {:10.0f} msgs/s".format(buffered))
+    print("send, outbox+journal {:10.0f} msgs/s".format(bufferedJournaled))
+    print("journal per send     {:10.2f} us  (outbox bytes reused)".format(
+        (1 / bufferedJournaled - 1 / buffered) * 1e6))
+    if not args.path:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+def rss() -> int:
+    # resident set size in KB
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="RSS over send/receive cycles to the client's own inbox")
+    parser.add_argument("--cycles", type=int, default=1000000)
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--pool", type=int, default=0, help="MessagePool size, 0 = no pool")
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    args = parser.parse_args(argv[1:])
+
+    lib = tibrvbackend.use(args.backend)
+    from tibrvlib import RVClient
+    from tibrvmsglib import RVMessage, MessagePool
+
+    if args.pool > 0:
+        RVMessage.pool = MessagePool(args.pool)
+
+    rv = RVClient(args.service, args.network, args.daemon, trace = False)
+    rv.connect("kondor", "kis_port", "BENCH")
+
+    step = max(args.cycles // args.samples, 1)
+    start = time.perf_counter()
+    print("{:>10} {:>10} {:>10}".format("cycles", "rss KB", "live msgs"))
+    try:
+        for i in range(args.cycles):
+            with RVMessage() as msg:
+                msg.SetSendSubject(rv.inbox)
+                msg.AddInt("Type", msg.DATA_MSG)
+                msg.AddInt("Data Type", msg.ICC_DATA_MSG_INFO)
+                msg.AddString("Key", "EquitiesDeals")
+                rv.send(msg)
+            rv.status(0)
+
+            if i % step == 0 or i == args.cycles - 1:
+                print("{:>10} {:>10} {:>10}".format(i + 1, rss(), getattr(lib, "live_messages", "-")))
+    finally:
+        rv.destroy()
+
+    elapsed = time.perf_counter() - start
+    print("{} cycles in {:.1f}s ({:.0f} cycles/s)".format(args.cycles, elapsed, args.cycles / elapsed))
+    if RVMessage.pool is not None:
+        print("pool: {} created, {} reused".format(RVMessage.pool.created, RVMessage.pool.reused))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+def deals(count: int):
+    for i in range(count):
+        yield ("S", "B", "25/01/2020", float(i % 1000 + 1), 333.5, "27/01/2020",
+            "KPLUS", "TEST", "AAPL", "USD", "DEFAULT")
+
+
+def run(args, enabled: bool):
+    from tibrvlib import RVClient
+    from kisimport import import_deals
+
+    rv = RVClient(args.service, args.network, args.daemon, trace = False)
+    if enabled:
+        rv.enableMetrics()
+    rv.connect(args.host, args.serv, "BENCH")
+    rv.waitReady()
+
+    report = import_deals(rv, deals(args.deals), args.batch, args.window)
+
+    # send cost without answers: a subject nobody listens to
+    from tibrvmsglib import RVMessage
+    msg = RVMessage()
+    msg.SetSendSubject("BENCH.METRICS.NOBODY")
+    msg.AddInt("Type", RVMessage.DATA_MSG)
+    start = time.perf_counter()
+    for i in range(args.sends):
+        rv.send(msg)
+    sends = args.sends / (time.perf_counter() - start)
+    msg.close()
+
+    metrics = rv.metrics
+    rv.destroy()
+    return report, sends, metrics
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Cost of RVClient metrics, import_deals and send rate with and without")
+    parser.add_argument("--deals", type=int, default=10000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--window", type=int, default=2)
+    parser.add_argument("--sends", type=int, default=100000)
+    parser.add_argument("--output", default=None, help="write the metrics snapshot, *.json or Prometheus text")
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    parser.add_argument("--host", default="kondor")
+    parser.add_argument("--serv", default="kis_port")
+    args = parser.parse_args(argv[1:])
+
+    tibrvbackend.use(args.backend)
+    from fakekis import FakeKIS
+
+    kis = FakeKIS(args.service, args.network, args.daemon, args.host, args.serv)
+    kis.start()
+    try:
+        results = [("metrics off",) + run(args, False), ("metrics on",) + run(args, True)]
+    finally:
+        kis.stop()
+
+    print("backend {}, {} deals, {} sends".format(args.backend, args.deals, args.sends))
+    for name, report, sends, metrics in results:
+        print("{:12} {:8.0f} deals/s {:9.0f} sends/s".format(name, report.rate, sends))
+
+    metrics = results[1][3]
+    for name, histogram in metrics.histograms.items():
+        stats = histogram.stats()
+        print("{:9} {:7} samples  p50 {:8.1f}us  p99 {:8.1f}us  max {:8.1f}us".format(
+            name, stats["count"], stats["p50"] / 1e3, stats["p99"] / 1e3, stats["max"] / 1e3))
+    print("received", metrics.types[metrics.IN])
+    print("queues", metrics.queues)
+    if args.output:
+        metrics.dump(args.output)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,66 @@
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+def deals(count: int, folders: int):
+    for i in range(count):
+        yield ("S", "B", "25/01/2020", float(i % 1000 + 1), 333.5, "27/01/2020",
+            "KPLUS", "FOLDER" + str(i % folders), "AAPL", "USD", "DEFAULT")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="ParallelImporter scaling from 1 to N workers against a local fake KIS")
+    parser.add_argument("--deals", type=int, default=20000)
+    parser.add_argument("--workers", default="1,2,4,8", help="worker counts of the scaling curve")
+    parser.add_argument("--folders", type=int, default=64, help="distinct Folders, the partition key")
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--window", type=int, default=2)
+    parser.add_argument("--fake-delay", type=float, default=0.0, help="fake KIS seconds per message")
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    parser.add_argument("--host", default="kondor")
+    parser.add_argument("--serv", default="kis_port")
+    args = parser.parse_args(argv[1:])
+
+    tibrvbackend.use(args.backend)
+    from fakekis import FakeKIS
+    from kisimport import ParallelImporter
+
+    kis = FakeKIS(args.service, args.network, args.daemon, args.host, args.serv, args.fake_delay)
+    kis.start()
+
+    results = []
+    try:
+        for workers in [int(w) for w in args.workers.split(",")]:
+            importer = ParallelImporter(workers, args.service, args.network, args.daemon, args.host, args.serv,
+                                        "BENCH", "Folders", args.batch, args.window)
+            results.append((workers, importer.import_deals(deals(args.deals, args.folders))))
+    finally:
+        kis.stop()
+
+    # worker startup (create, IDENTIFY) is part of the elapsed time
+    scaling = args.backend == tibrvbackend.CTYPES
+    kind = "processes" if scaling else "threads"
+    print("backend {}, {} deals over {} folders, workers are {}".format(args.backend, args.deals, args.folders, kind))
+    if not scaling:
+        # one interpreter: the worker threads share the GIL, the bus and the
+        # fake KIS thread, more workers only add overhead
+        print("the memory backend checks the partitioning and the reports, it cannot show scaling")
+    base = results[0][1].rate
+    for workers, report in results:
+        shares = " ".join(str(worker.deals) for worker in report.workers)
+        speedup = "  x{:.2f}".format(report.rate / base if base else 0.0) if scaling else ""
+        print("{:2} workers {:8.0f} deals/s{}  {} acks {} errors {} missing  per worker: {}".format(
+            workers, report.rate, speedup, report.acks, report.errors, report.missing, shares))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
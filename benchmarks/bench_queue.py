@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+SUBJECT = "BENCH.QUEUE.DEALS"
+WORK = float(os.environ.get("BENCH_QUEUE_WORK", "0.0005"))
+
+# sequence numbers seen by thread workers, one seen twice is a duplicate delivery
+seen = set()
+duplicates = []
+lock = threading.Lock()
+
+
+def handle(msg):
+    # module level, spawned worker processes import it by name. Duplicates are
+    # only seen with thread workers, processes report their counts to the pool
+    status, seq = msg.tibrvMsg_GetI32(msg.message, "Seq")
+    if WORK:
+        time.sleep(WORK)
+    with lock:
+        if seq in seen:
+            duplicates.append(seq)
+        seen.add(seq)
+
+
+def run(args, workers: int):
+    from tibrvlib import RVClient, QueueWorkerPool
+    from tibrvmsglib import RVMessage
+
+    seen.clear()
+    del duplicates[:]
+    pool = QueueWorkerPool(workers, "BENCH.QUEUE", SUBJECT, handle, args.service, args.network, args.daemon,
+                           args.tasks)
+    pool.start()
+
+    rv = RVClient(args.service, args.network, args.daemon, trace = False)
+    rv.create()
+    start = time.perf_counter()
+    for i in range(args.messages):
+        msg = RVMessage()
+        msg.SetSendSubject(SUBJECT)
+        msg.AddInt("Seq", i)
+        rv.send(msg)
+        msg.close()
+
+    # the queue drains when the workers handled every message
+    deadline = time.perf_counter() + 60.0
+    while pool.handled < args.messages and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+
+    counts = pool.stop()
+    rv.destroy()
+    return elapsed, counts
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Distributed queue (tibrvcmq) throughput and per-worker counts")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--workers", default="1,2,4,8", help="worker counts of the scaling curve")
+    parser.add_argument("--tasks", type=int, default=1, help="messages a worker accepts at a time")
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    args = parser.parse_args(argv[1:])
+
+    tibrvbackend.use(args.backend)
+
+    kind = "threads" if args.backend == tibrvbackend.MEMORY else "processes"
+    print("backend {}, {} messages, {:g}ms work per message, workers are {}".format(args.backend, args.messages,
+                                                                            WORK * 1e3, kind))
+    for workers in [int(w) for w in args.workers.split(",")]:
+        elapsed, counts = run(args, workers)
+        handled = sum(messages for messages, errors in counts.values())
+        per_worker = " ".join(str(counts[i][0]) for i in sorted(counts))
+        print("{:2} workers {:8.0f} messages/s  handled {} duplicates {}  per worker: {}".format(
+            workers, handled / elapsed, handled, len(duplicates), per_worker))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+def deals(count: int):
+    for i in range(count):
+        yield ("S", "B", "25/01/2020", float(i % 1000 + 1), 333.5, "27/01/2020",
+            "KPLUS", "TEST", "AAPL", "USD", "DEFAULT")
+
+
+def blip(args, lib, buffered: bool, drop: bool):
+    # daemon blip in the middle of an import, the transport survives unless drop
+    from tibrvlib import RVClient, OutboundBuffer
+    from kisimport import import_deals
+
+    rv = RVClient(args.service, args.network, args.daemon, trace = False)
+    if buffered:
+        rv.outbox = OutboundBuffer()
+    rv.connect(args.host, args.serv, "BENCH")
+    rv.waitReady()
+
+    times = {}
+
+    def on_batch(batch):
+        if batch.index == args.at:
+            times["down"] = time.perf_counter()
+            lib.disconnect(rv.transport, drop)
+            threading.Timer(args.outage, restore).start()
+
+    def restore():
+        times["up"] = time.perf_counter()
+        rv.ready.add_done_callback(lambda future: times.setdefault("ready", time.perf_counter()))
+        lib.restore()
+
+    report = import_deals(rv, deals(args.deals), args.batch, args.window, timeout = args.timeout,
+                          on_batch = on_batch)
+    stats = rv.outbox.stats() if buffered else {}
+    recoveries = rv.recoveries
+    rv.destroy()
+    return report, times["ready"] - times["up"], recoveries, stats
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="import_deals through a daemon blip, with and without OutboundBuffer")
+    parser.add_argument("--deals", type=int, default=10000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--window", type=int, default=4)
+    parser.add_argument("--at", type=int, default=20, help="batch after which the daemon goes away")
+    parser.add_argument("--outage", type=float, default=0.2, help="seconds without daemon")
+    parser.add_argument("--timeout", type=float, default=2.0, help="max wait for the acks of one batch")
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    parser.add_argument("--host", default="kondor")
+    parser.add_argument("--serv", default="kis_port")
+    args = parser.parse_args(argv[1:])
+
+    # daemon blips are injected through the memory bus
+    lib = tibrvbackend.use(tibrvbackend.MEMORY)
+    from fakekis import FakeKIS
+
+    kis = FakeKIS(args.service, args.network, args.daemon, args.host, args.serv)
+    kis.start()
+    results = []
+    try:
+        for name, buffered, drop in (("re-identify, no buffer", False, False),
+                                     ("re-identify, OutboundBuffer", True, False),
+                                     ("new transport, OutboundBuffer", True, True)):
+            results.append((name,) + blip(args, lib, buffered, drop))
+    finally:
+        kis.stop()
+
+    print("{} deals, {:g}s outage after batch {}".format(args.deals, args.outage, args.at))
+    for name, report, recovered, recoveries, stats in results:
+        print("{:30} {:5} acks {:5} missing  READY {:6.1f}ms after the daemon, {} attempts, {} replayed".format(
+            name, report.acks, report.missing, recovered * 1e3, recoveries, stats.get("replayed", 0)))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
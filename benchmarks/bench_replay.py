@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+def record(path: str, count: int, interval: float):
+    # journal of count deal messages, interval seconds apart
+    from tibrvjournal import Journal
+    from kisimport import equities_deal_template
+
+    template = equities_deal_template("_INBOX.KIS.1", "_INBOX.CLIENT.1")
+    start = time.time()
+    with Journal(path) as journal:
+        for i in range(count):
+            msg = template.build(("S", "B", "25/01/2020", float(i % 1000 + 1), 333.5, "27/01/2020",
+                                "KPLUS", "TEST", "AAPL", "USD", "DEFAULT"))
+            journal.append(Journal.OUT, msg.subject, msg.AsBytes(), i + 1, start + i * interval)
+            msg.close()
+    template.destroy()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="pykis replay rate and latency against a local fake KIS")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--interval", type=float, default=0.001, help="recorded seconds between messages")
+    parser.add_argument("--rates", default="10x,max")
+    parser.add_argument("--windows", default="1,10,100")
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    parser.add_argument("--host", default="kondor")
+    parser.add_argument("--serv", default="kis_port")
+    args = parser.parse_args(argv[1:])
+
+    tibrvbackend.use(args.backend)
+    from fakekis import FakeKIS
+    from tibrvjournal import Journal
+    from kisreplay import connect, replay, parse_rate
+
+    path = tempfile.mkdtemp()
+    record(path, args.count, args.interval)
+
+    kis = FakeKIS(args.service, args.network, args.daemon, args.host, args.serv)
+    kis.start()
+
+    args.codifier = "BENCH"
+    args.timeout = 30.0
+    rv = connect(args)
+    journal = Journal(path, readonly=True)
+    try:
+        print("backend {}, {} deals recorded {:g}ms apart".format(args.backend, args.count, args.interval * 1e3))
+        for rate in args.rates.split(","):
+            for window in [int(w) for w in args.windows.split(",")]:
+                report = replay(rv, journal.records(), parse_rate(rate), window)
+                print("rate {} window {}: {}".format(rate, window, report))
+    finally:
+        journal.close()
+        rv.destroy()
+        kis.stop()
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
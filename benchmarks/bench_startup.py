@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+def percentiles(samples: list) -> str:
+    samples = sorted(samples)
+    return "  ".join("p{} {:8.2f}ms".format(p, samples[min(len(samples) - 1, len(samples) * p // 100)] * 1e3)
+                     for p in (50, 90, 100))
+
+
+def startup(args, legacy: bool) -> (float, float):
+    # seconds from RVClient() to READY, and of the reconnect that follows
+    from tibrvlib import RVClient
+
+    start = time.perf_counter()
+    rv = RVClient(args.service, args.network, args.daemon, trace = False)
+    rv.connect(args.host, args.serv, "BENCH")
+    if legacy:
+        # create() used to end with time.sleep(1), pykis then polled for the receiver
+        time.sleep(1)
+        while rv.status(1) in (rv.TIBRV_OK, rv.TIBRV_TIMEOUT):
+            if rv.receiver != "":
+                break
+    else:
+        rv.waitReady()
+    connected = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rv.reconnect()
+    rv.waitReady()
+    reconnected = time.perf_counter() - start
+
+    assert rv.state == rv.READY
+    rv.destroy()
+    return connected, reconnected
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Connect to READY latency against a local fake KIS")
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--legacy", type=int, default=2, help="connects with the old 1s sleep and polling")
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    parser.add_argument("--host", default="kondor")
+    parser.add_argument("--serv", default="kis_port")
+    args = parser.parse_args(argv[1:])
+
+    tibrvbackend.use(args.backend)
+    from fakekis import FakeKIS
+
+    kis = FakeKIS(args.service, args.network, args.daemon, args.host, args.serv)
+    kis.start()
+    try:
+        legacy = [startup(args, True) for i in range(args.legacy)]
+        current = [startup(args, False) for i in range(args.count)]
+    finally:
+        kis.stop()
+
+    print("backend {}, {} connects".format(args.backend, args.count))
+    if legacy:
+        print("sleep + poll connect  ", percentiles([connected for connected, reconnected in legacy]))
+    print("connect to READY      ", percentiles([connected for connected, reconnected in current]))
+    print("reconnect to READY    ", percentiles([reconnected for connected, reconnected in current]))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
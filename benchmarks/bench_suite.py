@@ -0,0 +1,264 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+# cost of one operation of every case in ns, lower is better. A case is a
+# function (args) -> (run, operations per run, cleanup), registered by name.
+CASES = {}
+
+FIELDS = 16
+
+
+def case(name: str):
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+
+@case("message.create")
+def message_create(args):
+    from tibrvmsglib import RVMessage
+
+    def run():
+        RVMessage().close()
+    return run, 1, None
+
+
+def add_fields(method: str, value):
+    # FIELDS adds on a fresh message, the create and close are taken off in main()
+    from tibrvmsglib import RVMessage
+
+    names = ["Field{}".format(i) for i in range(FIELDS)]
+    add = getattr(RVMessage, method)
+
+    def run():
+        msg = RVMessage()
+        for name in names:
+            add(msg, name, value)
+        msg.close()
+    return run, FIELDS, None
+
+
+@case("field.add_string")
+def field_add_string(args):
+    return add_fields("AddString", "EQUITY")
+
+
+@case("field.add_i32")
+def field_add_i32(args):
+    return add_fields("AddInt", 42)
+
+
+@case("field.add_f64")
+def field_add_f64(args):
+    return add_fields("AddFloat", 333.5)
+
+
+@case("string.cstr")
+def string_cstr(args):
+    from tibrvmsglib import _cstr
+
+    def run():
+        _cstr("TableName")
+    return run, 1, None
+
+
+@case("string.pystr")
+def string_pystr(args):
+    import ctypes
+    from tibrvmsglib import _pystr
+
+    sz = ctypes.c_char_p(b"EquitiesDeals")
+
+    def run():
+        _pystr(sz)
+    return run, 1, None
+
+
+@case("template.build")
+def template_build(args):
+    from kisimport import equities_deal_template
+
+    template = equities_deal_template("_INBOX.BENCH", "_INBOX.BENCH.REPLY")
+    values = ("S", "B", "25/01/2020", 100.0, 333.5, "27/01/2020", "KPLUS", "TEST", "AAPL", "USD", "DEFAULT")
+
+    def run():
+        template.build(values).close()
+    return run, 1, template.destroy
+
+
+@case("callback.dispatch")
+def callback_dispatch(args):
+    # send to a routed subject of the client and dispatch the callback
+    from tibrvlib import RVClient
+    from tibrvmsglib import RVMessage
+
+    rv = RVClient(args.service, args.network, args.daemon, trace = False)
+    rv.create()
+    handled = []
+    rv.router.add("BENCH.SUITE.>", lambda subject, message: handled.append(1))
+    status, listener = rv.tibrvEvent_CreateListener(rv.listenerQueue, rv.callback, rv.transport, "BENCH.SUITE.>", {})
+    msg = RVMessage()
+    msg.SetSendSubject("BENCH.SUITE.CALLBACK")
+    msg.AddInt("Type", RVMessage.DATA_MSG)
+    batch = 100
+
+    def run():
+        for i in range(batch):
+            rv.send(msg)
+        while len(handled) < batch:
+            rv.status(1.0)
+        del handled[:]
+
+    def cleanup():
+        msg.close()
+        rv.destroy()
+    return run, batch, cleanup
+
+
+@case("import.deals")
+def import_deals_case(args):
+    from fakekis import FakeKIS
+    from tibrvlib import RVClient
+    from kisimport import import_deals
+
+    kis = FakeKIS(args.service, args.network, args.daemon, args.host, args.serv)
+    kis.start()
+    rv = RVClient(args.service, args.network, args.daemon, trace = False)
+    rv.connect(args.host, args.serv, "BENCH")
+    rv.waitReady()
+    deals = [("S", "B", "25/01/2020", float(i % 1000 + 1), 333.5, "27/01/2020",
+              "KPLUS", "TEST", "AAPL", "USD", "DEFAULT") for i in range(1000)]
+
+    def run():
+        report = import_deals(rv, deals, 250, 2)
+        if report.acks != len(deals):
+            raise RuntimeError("import: " + str(report))
+
+    def cleanup():
+        rv.destroy()
+        kis.stop()
+    return run, len(deals), cleanup
+
+
+def measure(run, operations: int, minTime: float, repeat: int) -> float:
+    # best ns per operation of repeat rounds of at least minTime seconds
+    run()
+    best = None
+    for i in range(repeat):
+        loops = 0
+        start = time.perf_counter()
+        while True:
+            run()
+            loops += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= minTime:
+                break
+        cost = elapsed * 1e9 / (loops * operations)
+        if best is None or cost < best:
+            best = cost
+    return best
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    # [(name, baseline ns, current ns, ratio)] of the cases slower than baseline by more than threshold
+    regressions = []
+    for name, result in sorted(results.items()):
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        ratio = result["ns"] / before["ns"]
+        print("{:20} {:10.1f} ns  baseline {:10.1f} ns  {:+6.1f}%{}".format(
+            name, result["ns"], before["ns"], (ratio - 1) * 100, "  REGRESSION" if ratio > 1 + threshold else ""))
+        if ratio > 1 + threshold:
+            regressions.append((name, before["ns"], result["ns"], ratio))
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Binding layer and import path benchmark suite, JSON results and baseline check")
+    parser.add_argument("--cases", default=None, help="comma separated case names or prefixes, default all")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per round")
+    parser.add_argument("--repeat", type=int, default=5, help="rounds per case, the best one counts")
+    parser.add_argument("--output", default=None, help="write the results as JSON")
+    parser.add_argument("--baseline", default=None, help="JSON results to compare with, "
+                        "default benchmarks/baseline-<backend>.json when it exists")
+    parser.add_argument("--threshold", type=float, default=0.25, help="slowdown reported as regression")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    parser.add_argument("--host", default="kondor")
+    parser.add_argument("--serv", default="kis_port")
+    args = parser.parse_args(argv[1:])
+
+    tibrvbackend.use(args.backend)
+
+    names = list(CASES)
+    if args.cases:
+        prefixes = args.cases.split(",")
+        names = [name for name in names if any(name.startswith(prefix) for prefix in prefixes)]
+        if any(name.startswith("field.") for name in names) and "message.create" not in names:
+            # the field cases are corrected by the create cost
+            names.insert(0, "message.create")
+
+    results = {}
+    for name in names:
+        run, operations, cleanup = CASES[name](args)
+        try:
+            ns = measure(run, operations, args.min_time, args.repeat)
+        finally:
+            if cleanup is not None:
+                cleanup()
+        results[name] = {"ns": ns, "ops": 1e9 / ns}
+
+    # per-field cases without the create and close of their message
+    if "message.create" in results:
+        create = results["message.create"]["ns"] / FIELDS
+        for name in names:
+            if name.startswith("field."):
+                ns = max(results[name]["ns"] - create, 0.0)
+                results[name] = {"ns": ns, "ops": 1e9 / ns if ns else 0.0}
+
+    for name, result in results.items():
+        print("{:20} {:10.1f} ns/op {:12.0f} ops/s".format(name, result["ns"], result["ops"]))
+
+    document = {
+        "backend": args.backend,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    baseline = args.baseline
+    if baseline is None:
+        baseline = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline-{}.json".format(args.backend))
+
+    for path in (args.output, baseline if args.save_baseline else None):
+        if path:
+            with open(path, "w") as f:
+                json.dump(document, f, indent = 1, sort_keys = True)
+
+    if args.save_baseline or not os.path.exists(baseline):
+        return 0
+    with open(baseline) as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    if regressions:
+        print("{} regressions against {}".format(len(regressions), baseline))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
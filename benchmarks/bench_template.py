@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tibrvbackend
+
+
+def rows(count: int) -> list:
+    # an import: quantity and price change on every deal, equity and folder
+    # often, the other columns rarely
+    return [("S", "B", "25/01/2020", float(i % 1000 + 1), 300.0 + i % 97, "27/01/2020",
+             "KPLUS", "FOLDER{}".format(i % 8), "EQ{}".format(i % 50), "USD", "DEFAULT") for i in range(count)]
+
+
+def measure(build, deals: list, repeat: int = 1) -> float:
+    # best seconds per deal of repeat rounds
+    best = None
+    for r in range(repeat):
+        start = time.perf_counter()
+        for row in deals:
+            msg = build(row)
+            msg.close()
+        elapsed = (time.perf_counter() - start) / len(deals)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def native_calls(lib, build, deals: list) -> float:
+    # library calls per deal, build() is called with every function counted
+    from tibrvmsglib import _rv
+
+    count = [0]
+    saved = {}
+    bound = {}
+    for name in dir(lib):
+        if name.startswith("tibrv"):
+            function = saved[name] = getattr(lib, name)
+
+            def counted(*args, function = function):
+                count[0] += 1
+                return function(*args)
+            setattr(lib, name, counted)
+            if callable(_rv.__dict__.get(name)):
+                bound[name] = _rv.__dict__[name]
+                _rv.__dict__[name] = counted
+    try:
+        measure(build(), deals)
+    finally:
+        for name, function in saved.items():
+            setattr(lib, name, function)
+        for name, function in bound.items():
+            _rv.__dict__[name] = function
+    return count[0] / len(deals)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="EquitiesDeals build cost, per-field calls vs MessageTemplate")
+    parser.add_argument("--count", type=int, default=5000, help="deals per round")
+    parser.add_argument("--repeat", type=int, default=7, help="rounds per case, the best one counts")
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    args = parser.parse_args(argv[1:])
+
+    lib = tibrvbackend.use(args.backend)
+    from kisimport import build_deal, equities_deal_template
+
+    receiver = "_INBOX.KIS.1"
+    inbox = "_INBOX.CLIENT.1"
+    template = equities_deal_template(receiver, inbox)
+    deals = rows(args.count)
+
+    fields = measure(lambda row: build_deal(receiver, inbox, row), deals, args.repeat)
+    templated = measure(template.build, deals, args.repeat)
+
+    # functions bound at template creation are counted on a new template
+    sample = deals[:500]
+    fieldCalls = native_calls(lib, lambda: lambda row: build_deal(receiver, inbox, row), sample)
+    templateCalls = native_calls(lib, lambda: equities_deal_template(receiver, inbox).build, sample)
+    template.destroy()
+
+    print("backend {}, best of {} rounds of {} deals".format(args.backend, args.repeat, args.count))
+    print("per-field build_deal   {:8.2f} us/deal  {:5.1f} library calls/deal".format(fields * 1e6, fieldCalls))
+    print("MessageTemplate.build  {:8.2f} us/deal  {:5.1f} library calls/deal".format(templated * 1e6, templateCalls))
+    print("speedup                {:8.2f}x".format(fields / templated))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
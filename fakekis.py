@@ -0,0 +1,133 @@
+import time
+import threading
+from collections import deque
+from tibrvlib import RVClient, TibrvTransportError, tibrvcmEvent, tibrvMsg
+from tibrvmsglib import RVMessage
+
+
+##-----------------------------------------------------------------------------
+# Fake KondorImport server, answers OKAPI requests on the RV bus
+#
+# Default answers: IDENTIFY_MSG -> ErrorType 0, DATA_MSG -> ICC_DATA_MSG_TABLE_ACK,
+# PING_MSG -> PING_MSG. Tests script other answers with push(), e.g.
+#   kis.push(RVMessage.IDENTIFY_MSG, ErrorType=1001, Reason="Unknown client")
+#   kis.push(RVMessage.DATA_MSG, **{"Data Type": RVMessage.ICC_DATA_MSG_ERROR})
+# Scripted answers are used in order by the next requests of that type.
+# With certified = <name> the KIS inbox is a certified (tibrvcm) listener that
+# confirms every message it answers.
+##-----------------------------------------------------------------------------
+
+class FakeKIS(RVClient):
+
+    def __init__(self, service, network, daemon, host = "kondor", serv = "kis_port", delay: float = 0.0,
+                certified: str = None):
+        super().__init__(service, network, daemon, trace = False)
+        self.host = host
+        self.serv = serv
+        self.delay = delay      # seconds spent on every DATA_MSG
+        self.certifiedName = certified
+        self.cmListenerTransport = None
+        self.clients = {}       # client inbox -> client name
+        self.allowances = {}    # client inbox -> "Ack Allowance" of its IDENTIFY_MSG
+        self.script = {}        # message type -> deque of answer fields
+        self.received = {}      # message type -> count
+        self.tables = 0
+        self.running = False
+        self.thread = None
+
+    def create(self):
+        super().create()
+
+        subject = "OKAPI.INBOX_REQUEST." + self.serv + "." + self.host
+        status, self.requestListener = self.tibrvEvent_CreateListener(self.listenerQueue, self.callback,
+                                                                    self.transport, subject, {})
+        if status != self.TIBRV_OK:
+            raise TibrvTransportError('tibrvEvent_CreateListener', status)
+
+        if self.certifiedName is not None:
+            # the certified listener replaces the reliable one on the KIS inbox
+            status, self.cmListenerTransport = self.tibrvcmTransport_Create(self.transport, self.certifiedName)
+            if status != self.TIBRV_OK:
+                raise TibrvTransportError('tibrvcmTransport_Create', status)
+            self.tibrvEvent_Destroy(self.listener)
+            status, self.listener = self.tibrvcmEvent_CreateListener(self.listenerQueue, self.callback,
+                                                                    self.cmListenerTransport, self.inbox, {})
+            if status != self.TIBRV_OK:
+                raise TibrvTransportError('tibrvcmEvent_CreateListener', status)
+
+    def destroy(self):
+        if self.cmListenerTransport is not None:
+            self.tibrvcmTransport_Destroy(self.cmListenerTransport)
+            self.cmListenerTransport = None
+        super().destroy()
+
+    def start(self):
+        self.create()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="FakeKIS", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while self.running:
+            self.status(0.1)
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.destroy()
+
+    def push(self, message_type: int, **fields):
+        self.script.setdefault(message_type, deque()).append(fields)
+
+    def answer(self, message_type: int, inbox: str, defaults: dict) -> RVMessage:
+        fields = dict(defaults)
+        scripted = self.script.get(message_type)
+        if scripted:
+            fields.update(scripted.popleft())
+
+        msg = RVMessage()
+        msg.SetSendSubject(inbox)
+        msg.AddInt("Type", message_type)
+        msg.AddString("Inbox", self.inbox)
+        for name, value in fields.items():
+            if isinstance(value, int):
+                msg.AddInt(name, value)
+            elif isinstance(value, float):
+                msg.AddFloat(name, value)
+            else:
+                msg.AddString(name, value)
+        return msg
+
+    def callback(self, event: tibrvcmEvent, message: tibrvMsg, closure):
+        msg = RVMessage.view(message)
+
+        status, message_type = RVMessage.tibrvMsg_GetI32(message, "Type")
+        if status != RVMessage.TIBRV_OK:
+            # advisories and foreign messages
+            return
+
+        status, inbox = RVMessage.tibrvMsg_GetString(message, "Inbox")
+        if status != RVMessage.TIBRV_OK:
+            return
+
+        self.received[message_type] = self.received.get(message_type, 0) + 1
+
+        if message_type == RVMessage.IDENTIFY_MSG:
+            self.clients[inbox] = msg.GetString("Client name")
+            status, self.allowances[inbox] = RVMessage.tibrvMsg_GetI32(message, "Ack Allowance")
+            answer = self.answer(message_type, inbox, {"ErrorType": 0, "Reason": "Connected"})
+        elif message_type == RVMessage.DATA_MSG:
+            self.tables += 1
+            if self.delay > 0:
+                time.sleep(self.delay)
+            status, key = RVMessage.tibrvMsg_GetString(message, "Key")
+            answer = self.answer(message_type, inbox, {"Data Type": RVMessage.ICC_DATA_MSG_TABLE_ACK,
+                                                    "Key": key or ""})
+        elif message_type == RVMessage.PING_MSG:
+            answer = self.answer(message_type, inbox, {})
+        else:
+            return
+
+        self.send(answer)
@@ -0,0 +1,485 @@
+import time
+import zlib
+import queue
+import threading
+import multiprocessing
+from collections import deque
+from typing import Iterable, Callable, List, Any
+from tibrvmsglib import RVMessage, MessageTemplate, TibrvError
+
+
+##-----------------------------------------------------------------------------
+# EquitiesDeals layout
+##-----------------------------------------------------------------------------
+
+# deal fields, (name, kind) in tuple order
+EQUITIES_DEAL_FIELDS = (
+    ("DealStatus", "string"),
+    ("DealType", "string"),
+    ("TradeDate", "date"),
+    ("Quantity", "float"),
+    ("Price", "float"),
+    ("SettlementDate", "date"),
+)
+
+# referenced tables, each one is sent as <Table>_ShortName
+EQUITIES_DEAL_REFERENCES = ("Users", "Folders", "Equities", "Currencies", "ClearingModes")
+
+EQUITIES_DEAL_COLUMNS = tuple(name for name, kind in EQUITIES_DEAL_FIELDS) + EQUITIES_DEAL_REFERENCES
+
+
+def _deal_dict(row) -> dict:
+    if isinstance(row, dict):
+        return row
+
+    if len(row) != len(EQUITIES_DEAL_COLUMNS):
+        raise ValueError("deal tuple must have {} values, got {}".format(len(EQUITIES_DEAL_COLUMNS), len(row)))
+
+    return dict(zip(EQUITIES_DEAL_COLUMNS, row))
+
+
+def _deal_values(row):
+    # values in EQUITIES_DEAL_COLUMNS order, the order of the template fields
+    if isinstance(row, dict):
+        return [row[name] for name in EQUITIES_DEAL_COLUMNS]
+    return row
+
+
+def equities_deal_template(receiver: str, inbox: str, dateformat: str = "DD/MM/YYYY") -> MessageTemplate:
+    header = [
+        ("Type", "int", RVMessage.DATA_MSG),
+        ("Inbox", "string", inbox),
+        ("Data Type", "int", RVMessage.ICC_DATA_MSG_TABLE),
+        ("Key", "string", "EquitiesDeals"),
+    ]
+
+    body = [
+        ("Table", "string", "ImportTable"),
+        ("Action", "string", "I"),
+        ("DateFormat", "string", dateformat),
+        ("TableName", "string", "EquitiesDeals"),
+        ("Table", "string", "EquitiesDeals"),
+    ]
+    body += [(name, kind, None) for name, kind in EQUITIES_DEAL_FIELDS]
+    for table in EQUITIES_DEAL_REFERENCES:
+        body += [("Table", "string", table), (table + "_ShortName", "string", None)]
+
+    return MessageTemplate(header, body, "KPLUSFEED", receiver, dateformat)
+
+
+def build_deal(receiver: str, inbox: str, row, dateformat: str = "DD/MM/YYYY", fast: bool = False) -> RVMessage:
+    deal = _deal_dict(row)
+
+    msg = RVMessage(dateformat, fast = fast)
+    kis = RVMessage(dateformat, fast = fast)
+    msg.SetSendSubject(receiver)
+
+    # initialize the Rendezvous message
+    msg.AddInt("Type", msg.DATA_MSG)
+    msg.AddString("Inbox", inbox)
+    msg.AddInt("Data Type", msg.ICC_DATA_MSG_TABLE)
+    msg.AddString("Key", "EquitiesDeals")
+
+    # insert ImportTable section (essential)
+    kis.AddString("Table", "ImportTable")
+    kis.AddString("Action", "I")
+    kis.AddString("DateFormat", dateformat)
+    kis.AddString("TableName", "EquitiesDeals")
+
+    # insert Deal section
+    kis.AddString("Table", "EquitiesDeals")
+    for name, kind in EQUITIES_DEAL_FIELDS:
+        if kind == "float":
+            kis.AddFloat(name, float(deal[name]))
+        elif kind == "date":
+            kis.AddDateFromString(name, deal[name])
+        else:
+            kis.AddString(name, deal[name])
+
+    # insert references
+    for table in EQUITIES_DEAL_REFERENCES:
+        kis.AddString("Table", table)
+        kis.AddString(table + "_ShortName", deal[table])
+
+    # assemble message
+    msg.AddMsg("KPLUSFEED", kis)
+
+    return msg
+
+
+##-----------------------------------------------------------------------------
+# Batch import
+##-----------------------------------------------------------------------------
+
+class BatchAck():
+
+    def __init__(self, index: int, size: int):
+        self.index = index
+        self.size = size
+        self.acks = 0
+        self.errors = 0
+        self.sent = time.perf_counter()
+        self.elapsed = None
+
+    @property
+    def done(self) -> bool:
+        return self.acks + self.errors >= self.size
+
+    def __str__(self):
+        return "batch {}: {} deals, {} acks, {} errors, {:.3f}s".format(
+            self.index, self.size, self.acks, self.errors, self.elapsed or 0.0)
+
+
+class ImportReport():
+
+    def __init__(self):
+        self.batches = []
+        self.deals = 0
+        self.acks = 0
+        self.errors = 0
+        self.rejected = 0
+        self.rejections = []        # (row index, error) of the deals that could not be built
+        self.elapsed = 0.0
+
+    @property
+    def rate(self) -> float:
+        if self.elapsed == 0:
+            return 0.0
+        return self.deals / self.elapsed
+
+    @property
+    def missing(self) -> int:
+        return self.deals - self.acks - self.errors
+
+    def __str__(self):
+        return "{} deals in {} batches, {} acks, {} errors, {} missing, {} rejected, {:.3f}s ({:.0f} deals/s)".format(
+            self.deals, len(self.batches), self.acks, self.errors, self.missing, self.rejected, self.elapsed, self.rate)
+
+
+class DealImporter():
+
+    def __init__(self, rv, batch_size: int = 500, window: int = 2, timeout: float = 30.0,
+                dateformat: str = "DD/MM/YYYY"):
+        self.rv = rv
+        self.batch_size = batch_size
+        self.window = window            # batches in flight before waiting for acks
+        self.timeout = timeout          # max wait for the acks of one batch
+        self.dateformat = dateformat
+        self.inflight = deque()
+        self.template = None
+        self.report = ImportReport()    # of the running or last import, partial after an error
+
+    def onData(self, msg: RVMessage):
+        # replies come back in send order, charge them to the oldest open batch
+        status, data_type = RVMessage.tibrvMsg_GetI32(msg.message, "Data Type")
+        if status != RVMessage.TIBRV_OK or not self.inflight:
+            return
+
+        batch = self.inflight[0]
+        if data_type == RVMessage.ICC_DATA_MSG_TABLE_ACK:
+            batch.acks += 1
+        elif data_type == RVMessage.ICC_DATA_MSG_ERROR:
+            batch.errors += 1
+        else:
+            return
+
+        if batch.done:
+            batch.elapsed = time.perf_counter() - batch.sent
+            self.inflight.popleft()
+
+    def wait(self, count: int, on_batch: Callable[[BatchAck], Any] = None):
+        # dispatch until no more than count batches are in flight
+        while len(self.inflight) > count:
+            batch = self.inflight[0]
+            deadline = batch.sent + self.timeout
+            while self.inflight and self.inflight[0] is batch:
+                left = deadline - time.perf_counter()
+                if left <= 0:
+                    # give up on this batch, remaining deals are reported as missing
+                    batch.elapsed = time.perf_counter() - batch.sent
+                    self.inflight.popleft()
+                    break
+                status = self.rv.status(min(left, 1.0))
+                if status not in (self.rv.TIBRV_OK, self.rv.TIBRV_TIMEOUT):
+                    return
+            if on_batch is not None:
+                on_batch(batch)
+
+    def build(self, rows: List, report: ImportReport) -> List[RVMessage]:
+        # a deal that does not build is rejected, the rest of the batch goes out
+        messages = []
+        for row in rows:
+            try:
+                messages.append(self.template.build(_deal_values(row)))
+            except (TibrvError, ValueError, TypeError, KeyError) as exc:
+                report.rejected += 1
+                report.rejections.append((report.deals + len(messages) + report.rejected - 1, exc))
+        return messages
+
+    def send(self, messages: List[RVMessage]) -> int:
+        for msg in messages:
+            self.rv.send(msg)
+        return len(messages)
+
+    def import_deals(self, rows: Iterable, on_batch: Callable[[BatchAck], Any] = None) -> ImportReport:
+        report = self.report = ImportReport()
+
+        handler = self.rv.dataHandler
+        self.rv.dataHandler = self.onData
+        self.template = equities_deal_template(self.rv.receiver, self.rv.inbox, self.dateformat)
+        start = time.perf_counter()
+
+        try:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, report, on_batch)
+                    batch = []
+            if batch:
+                self._flush(batch, report, on_batch)
+
+            self.wait(0, on_batch)
+        finally:
+            self.rv.dataHandler = handler
+            self.template.destroy()
+            self.template = None
+
+            report.elapsed = time.perf_counter() - start
+            for batch in report.batches:
+                report.acks += batch.acks
+                report.errors += batch.errors
+
+        return report
+
+    def _flush(self, rows: List, report: ImportReport, on_batch):
+        messages = self.build(rows, report)
+        if not messages:
+            return
+
+        ack = BatchAck(len(report.batches), len(messages))
+        report.batches.append(ack)
+        self.inflight.append(ack)
+        # counted before the send, deals of a send that fails half way are missing
+        report.deals += len(messages)
+        self.send(messages)
+
+        self.wait(self.window - 1, on_batch)
+
+
+def import_deals(rv, rows: Iterable, batch_size: int = 500, window: int = 2, timeout: float = 30.0,
+                dateformat: str = "DD/MM/YYYY", on_batch: Callable[[BatchAck], Any] = None) -> ImportReport:
+    importer = DealImporter(rv, batch_size, window, timeout, dateformat)
+    return importer.import_deals(rows, on_batch)
+
+
+##-----------------------------------------------------------------------------
+# Parallel import
+##-----------------------------------------------------------------------------
+
+class ParallelImportReport(ImportReport):
+
+    def __init__(self):
+        super().__init__()
+        self.workers = []           # ImportReport per worker
+        self.failures = {}          # worker index -> error text
+
+    def __str__(self):
+        lines = [super().__str__()]
+        for index, report in enumerate(self.workers):
+            error = self.failures.get(index)
+            lines.append("  worker {}: {}{}".format(index, report, "" if error is None else ", " + error))
+        return "\n".join(lines)
+
+
+def _chunks(rows, done: list):
+    # (source row index, row) of the chunks a worker gets until the None sentinel
+    for chunk in iter(rows.get, None):
+        yield from chunk
+    done.append(True)
+
+
+class _IndexedDealImporter(DealImporter):
+
+    # rows are (source row index, row), rejections keep the source row index
+
+    def build(self, rows: List, report: ImportReport) -> List[RVMessage]:
+        base = report.deals + report.rejected
+        first = len(report.rejections)
+        messages = super().build([row for index, row in rows], report)
+        report.rejections[first:] = [(rows[position - base][0], exc)
+                                     for position, exc in report.rejections[first:]]
+        return messages
+
+
+def _importWorker(index: int, session: tuple, options: tuple, rows, results):
+    # worker body: own transport, inbox and KIS session named codifier_<index>
+    from tibrvlib import RVClient
+
+    service, network, daemon, host, serv, codifier, connectTimeout = session
+    batch_size, window, timeout, dateformat = options
+    rv = RVClient(service, network, daemon, trace = False)
+    # created first, a failed import still reports what it sent and got acked
+    importer = _IndexedDealImporter(rv, batch_size, window, timeout, dateformat)
+    error = None
+    done = []
+    try:
+        rv.connect(host, serv, "{}_{}".format(codifier, index))
+        if rv.waitReady(connectTimeout) == "":
+            error = "no IDENTIFY_MSG answer from KIS " + serv + "." + host
+        else:
+            importer.import_deals(_chunks(rows, done))
+    except Exception as exc:
+        error = "{}: {}".format(type(exc).__name__, exc)
+    finally:
+        report = importer.report
+        # the parent blocks on a full queue, the rest of the deals are missing
+        if not done:
+            report.deals += sum(1 for row in _chunks(rows, done))
+        try:
+            rv.destroy()
+        except Exception as exc:
+            # the report still goes out, the parent waits for it
+            if error is None:
+                error = "{}: {}".format(type(exc).__name__, exc)
+        results.put((index, report, error))
+
+
+class ParallelImporter():
+
+    # Spreads a deal stream over workers, each with its own RVClient transport,
+    # inbox and KIS session ("Client name" codifier_<index>). Deals with the same
+    # key column (a Folder, an Equity) go to the same worker and keep their
+    # order. Workers are spawned processes, on the memory backend threads.
+
+    def __init__(self, workers: int, service, network, daemon, host: str, serv: str, codifier: str,
+                key = "Folders", batch_size: int = 500, window: int = 2, timeout: float = 30.0,
+                dateformat: str = "DD/MM/YYYY", processes: bool = None, connectTimeout: float = 30.0):
+        import tibrvbackend
+
+        if processes is None:
+            processes = tibrvbackend.name() != tibrvbackend.MEMORY
+
+        self.count = workers
+        self.session = (service, network, daemon, host, serv, codifier, connectTimeout)
+        self.options = (batch_size, window, timeout, dateformat)
+        self.key = key              # column name or row -> key callable
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.processes = processes
+        if processes:
+            # spawn, a forked child would share the parent TIBRV library state
+            self.context = multiprocessing.get_context("spawn")
+
+    def partition(self, row) -> int:
+        # worker of a deal, stable across runs and processes
+        try:
+            if callable(self.key):
+                value = self.key(row)
+            elif isinstance(row, dict):
+                value = row[self.key]
+            else:
+                value = row[EQUITIES_DEAL_COLUMNS.index(self.key)]
+        except (IndexError, KeyError, TypeError):
+            # malformed deal, worker 0 rejects it
+            return 0
+        return zlib.crc32(str(value).encode()) % self.count
+
+    def import_deals(self, rows: Iterable) -> ParallelImportReport:
+        if self.processes:
+            results = self.context.Queue()
+            queues = [self.context.Queue(4) for i in range(self.count)]
+            workers = [self.context.Process(target=_importWorker, args=(i, self.session, self.options, queues[i], results),
+                                            name="DealImporter-" + str(i), daemon=True) for i in range(self.count)]
+        else:
+            results = queue.Queue()
+            queues = [queue.Queue(4) for i in range(self.count)]
+            workers = [threading.Thread(target=_importWorker, args=(i, self.session, self.options, queues[i], results),
+                                        name="DealImporter-" + str(i), daemon=True) for i in range(self.count)]
+
+        report = ParallelImportReport()
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+
+        # bounded queues of batch_size chunks, memory stays at a few batches per worker
+        chunks = [[] for i in range(self.count)]
+        lost = [0] * self.count     # deals of the chunks a dead worker did not take
+        for position, row in enumerate(rows):
+            index = self.partition(row)
+            chunk = chunks[index]
+            chunk.append((position, row))
+            if len(chunk) >= self.batch_size:
+                if not self._put(queues[index], workers[index], chunk):
+                    lost[index] += len(chunk)
+                chunks[index] = []
+        for index in range(self.count):
+            if chunks[index] and not self._put(queues[index], workers[index], chunks[index]):
+                lost[index] += len(chunks[index])
+            self._put(queues[index], workers[index], None)
+
+        reports = {}
+        while len(reports) < self.count:
+            try:
+                self._collect(results.get(timeout = 1.0), reports, report)
+            except queue.Empty:
+                for index, worker in enumerate(workers):
+                    if index in reports or worker.is_alive():
+                        continue
+                    # the report may have come in just after the timeout
+                    self._drain(results, reports, report)
+                    if index not in reports:
+                        # died without a report
+                        reports[index] = ImportReport()
+                        report.failures[index] = "worker exited without a report"
+        for worker in workers:
+            worker.join(self.timeout)
+
+        report.elapsed = time.perf_counter() - start
+        report.workers = [reports[index] for index in range(self.count)]
+        for index, worker in enumerate(report.workers):
+            # never sent, missing
+            worker.deals += lost[index]
+        for worker in report.workers:
+            report.batches += worker.batches
+            report.deals += worker.deals
+            report.acks += worker.acks
+            report.errors += worker.errors
+            report.rejected += worker.rejected
+            report.rejections += worker.rejections
+        report.rejections.sort(key = lambda rejection: rejection[0])
+
+        return report
+
+    def _collect(self, result: tuple, reports: dict, report: ParallelImportReport):
+        index, worker, error = result
+        reports[index] = worker
+        if error is not None:
+            report.failures[index] = error
+
+    def _drain(self, results, reports: dict, report: ParallelImportReport):
+        # reports already queued, without waiting
+        while True:
+            try:
+                self._collect(results.get_nowait(), reports, report)
+            except queue.Empty:
+                return
+
+    def _put(self, rows, worker, chunk) -> bool:
+        # False when the worker is gone, a put on its full queue would block forever
+        while True:
+            if not worker.is_alive():
+                return False
+            try:
+                rows.put(chunk, timeout = 1.0)
+                return True
+            except queue.Full:
+                continue
+
+
+def import_parallel(rows: Iterable, workers: int, service, network, daemon, host: str, serv: str, codifier: str,
+                    key = "Folders", batch_size: int = 500, window: int = 2, timeout: float = 30.0,
+                    dateformat: str = "DD/MM/YYYY") -> ParallelImportReport:
+    importer = ParallelImporter(workers, service, network, daemon, host, serv, codifier, key, batch_size,
+                                window, timeout, dateformat)
+    return importer.import_deals(rows)
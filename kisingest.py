@@ -0,0 +1,468 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import itertools
+from typing import Iterable, Callable, Any
+import tibrvbackend
+from kisimport import EQUITIES_DEAL_FIELDS, EQUITIES_DEAL_REFERENCES, DealImporter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.csv
+except ImportError:
+    pyarrow = None
+
+
+##-----------------------------------------------------------------------------
+# Column mapping
+#
+# Declares where each K+ field of a deal comes from: a source column, or a
+# default used when the column is absent or the cell is empty (None, "" or
+# NaN). Fields are in template order, EquitiesDeals fields first, then the
+# <Table>_ShortName of every referenced table. A reference field also takes
+# a column named after its table ("Users" for Users_ShortName), the keys of
+# the deal dicts of kisimport.
+##-----------------------------------------------------------------------------
+
+EQUITIES_DEAL_MAPPING_FIELDS = EQUITIES_DEAL_FIELDS + tuple(
+    (table + "_ShortName", "string") for table in EQUITIES_DEAL_REFERENCES)
+
+
+class ColumnMapping():
+
+    def __init__(self, fields: tuple = EQUITIES_DEAL_MAPPING_FIELDS, columns: dict = None, defaults: dict = None):
+        self.fields = fields                    # (K+ field, kind) in template order
+        self.columns = dict(columns or {})      # K+ field -> source column, default the field name
+        self.defaults = dict(defaults or {})    # K+ field -> value of a missing column or empty cell
+        names = set(name for name, kind in fields)
+        for field in itertools.chain(self.columns, self.defaults):
+            if field not in names:
+                raise ValueError("unknown K+ field {} in column mapping".format(field))
+
+    @staticmethod
+    def load(path: str, fields: tuple = EQUITIES_DEAL_MAPPING_FIELDS) -> "ColumnMapping":
+        # JSON {"columns": {field: column}, "defaults": {field: value}}
+        with open(path) as f:
+            spec = json.load(f)
+        return ColumnMapping(fields, spec.get("columns"), spec.get("defaults"))
+
+    def sources(self, field: str) -> list:
+        # source column names accepted for field, in order of preference
+        if field in self.columns:
+            return [self.columns[field]]
+        if field.endswith("_ShortName"):
+            return [field, field[:-len("_ShortName")]]
+        return [field]
+
+    def resolve(self, header: list) -> list:
+        # index in header of the column of every field, None for a default
+        positions = {name: index for index, name in enumerate(header)}
+        indices = []
+        missing = []
+        for field, kind in self.fields:
+            index = next((positions[name] for name in self.sources(field) if name in positions), None)
+            if index is None and field not in self.defaults:
+                missing.append("{} ({})".format(field, " or ".join(self.sources(field))))
+            indices.append(index)
+        if missing:
+            raise ValueError("no column for " + ", ".join(missing))
+        return indices
+
+    def rows(self, columns: list, count: int, dateformat: str = "DD/MM/YYYY") -> list:
+        # columns in field order, None for a defaulted field -> count deal tuples
+        strftime = _strftime(dateformat)
+        values = []
+        for (field, kind), column in zip(self.fields, columns):
+            default = self.defaults.get(field)
+            if column is None:
+                values.append(itertools.repeat(default, count))
+                continue
+            if kind == "float":
+                column = [None if value is None or value == "" or value != value else value for value in column]
+            elif kind == "date":
+                # date and datetime values formatted once per distinct value
+                dates = {}
+                column = [value if value is None or isinstance(value, str) else
+                          dates.get(value) or dates.setdefault(value, value.strftime(strftime))
+                          for value in column]
+            if default is not None:
+                column = [default if value is None or value == "" else value for value in column]
+            values.append(column)
+        return list(zip(*values))
+
+
+def equities_deal_mapping(columns: dict = None, defaults: dict = None) -> ColumnMapping:
+    return ColumnMapping(EQUITIES_DEAL_MAPPING_FIELDS, columns, defaults)
+
+
+def _strftime(dateformat: str) -> str:
+    # K+ DateFormat (DD/MM/YYYY) -> strftime format of date and datetime values
+    for token, directive in (("YYYY", "%Y"), ("YY", "%y"), ("MM", "%m"), ("DD", "%d")):
+        dateformat = dateformat.replace(token, directive)
+    return dateformat
+
+
+##-----------------------------------------------------------------------------
+# Chunk readers
+#
+# Generators of lists of at most chunkSize deal tuples, read one chunk at a
+# time so memory does not grow with the source. Values are taken column by
+# column: the csv module splits the lines, pyarrow and NumPy hand out whole
+# columns converted with one to_pylist()/tolist() per chunk.
+##-----------------------------------------------------------------------------
+
+def read_csv(path: str, mapping: ColumnMapping = None, chunkSize: int = 10000, delimiter: str = ",",
+             encoding: str = "utf-8", dateformat: str = "DD/MM/YYYY"):
+    # csv module, the first line is the header
+    mapping = mapping or equities_deal_mapping()
+    with open(path, newline = "", encoding = encoding) as f:
+        reader = csv.reader(f, delimiter = delimiter)
+        indices = mapping.resolve(next(reader, []))
+        width = max(index for index in indices if index is not None) + 1 if any(
+            index is not None for index in indices) else 0
+        while True:
+            chunk = list(itertools.islice(reader, chunkSize))
+            if not chunk:
+                return
+            for row in chunk:
+                if len(row) < width:
+                    # short line, the deal is rejected by the importer
+                    row.extend([None] * (width - len(row)))
+            columns = [None if index is None else [row[index] for row in chunk] for index in indices]
+            deals = mapping.rows(columns, len(chunk), dateformat)
+            # only the deals stay alive while the consumer sends them
+            del chunk, columns
+            yield deals
+
+
+def read_arrow(path: str, mapping: ColumnMapping = None, chunkSize: int = 10000, delimiter: str = ",",
+               dateformat: str = "DD/MM/YYYY"):
+    # pyarrow CSV or Parquet (*.parquet) reader, only the mapped columns are read
+    if pyarrow is None:
+        raise ImportError("pyarrow is required for read_arrow()")
+    mapping = mapping or equities_deal_mapping()
+
+    if path.endswith(".parquet"):
+        import pyarrow.parquet
+        source = pyarrow.parquet.ParquetFile(path)
+        header = source.schema_arrow.names
+        indices = mapping.resolve(header)
+        names = sorted(set(header[index] for index in indices if index is not None))
+        batches = source.iter_batches(batch_size = chunkSize, columns = names)
+    else:
+        # the mapped string and date columns stay text, K+ parses the dates
+        header = pyarrow.csv.open_csv(path, parse_options = pyarrow.csv.ParseOptions(delimiter = delimiter)).schema.names
+        indices = mapping.resolve(header)
+        names = sorted(set(header[index] for index in indices if index is not None))
+        text = {header[index]: pyarrow.string() for (field, kind), index in zip(mapping.fields, indices)
+                if index is not None and kind != "float"}
+        batches = pyarrow.csv.open_csv(path, parse_options = pyarrow.csv.ParseOptions(delimiter = delimiter),
+                                       convert_options = pyarrow.csv.ConvertOptions(
+                                           include_columns = names, column_types = text))
+
+    pending = []
+    count = 0
+    for batch in batches:
+        # record batches are cut to chunkSize rows
+        offset = 0
+        while offset < batch.num_rows:
+            piece = batch.slice(offset, chunkSize - count)
+            pending.append(piece)
+            count += piece.num_rows
+            offset += piece.num_rows
+            if count == chunkSize:
+                yield _arrow_rows(pending, header, indices, mapping, count, dateformat)
+                pending = []
+                count = 0
+    if count:
+        yield _arrow_rows(pending, header, indices, mapping, count, dateformat)
+
+
+def _arrow_rows(batches: list, header: list, indices: list, mapping: ColumnMapping, count: int,
+                dateformat: str) -> list:
+    table = pyarrow.Table.from_batches(batches)
+    columns = [None if index is None else table.column(header[index]).to_pylist() for index in indices]
+    return mapping.rows(columns, count, dateformat)
+
+
+def read_frame(frame, mapping: ColumnMapping = None, chunkSize: int = 10000, dateformat: str = "DD/MM/YYYY"):
+    # pandas DataFrame, NumPy structured array or dict of columns (lists or arrays)
+    mapping = mapping or equities_deal_mapping()
+    if hasattr(frame, "columns") and hasattr(frame, "iloc"):
+        header = list(frame.columns)
+        source = {name: frame[name].to_numpy() for name in header}
+    elif numpy is not None and isinstance(frame, numpy.ndarray) and frame.dtype.names:
+        header = list(frame.dtype.names)
+        source = {name: frame[name] for name in header}
+    else:
+        header = list(frame)
+        source = frame
+
+    indices = mapping.resolve(header)
+    columns = []
+    for (field, kind), index in zip(mapping.fields, indices):
+        column = None if index is None else source[header[index]]
+        if numpy is not None and isinstance(column, numpy.ndarray) and column.dtype.kind == "M":
+            # datetime64 of any unit -> datetime.date values
+            column = column.astype("datetime64[D]")
+        columns.append(column)
+
+    total = min((len(column) for column in columns if column is not None), default = 0)
+    for start in range(0, total, chunkSize):
+        stop = min(start + chunkSize, total)
+        chunk = [None if column is None else _slice(column, start, stop) for column in columns]
+        yield mapping.rows(chunk, stop - start, dateformat)
+
+
+def _slice(column, start: int, stop: int) -> list:
+    column = column[start:stop]
+    if numpy is not None and isinstance(column, numpy.ndarray) and column.dtype.kind == "O":
+        # pandas object columns hold NaN for missing values
+        return [None if value != value else value for value in column.tolist()]
+    return column.tolist() if hasattr(column, "tolist") else list(column)
+
+
+def read_deals(source, mapping: ColumnMapping = None, chunkSize: int = 10000, engine: str = None,
+               delimiter: str = ",", dateformat: str = "DD/MM/YYYY"):
+    # chunks of a file path (csv module, or pyarrow with engine="arrow" and for
+    # *.parquet) or of an in-memory frame
+    if not isinstance(source, str):
+        return read_frame(source, mapping, chunkSize, dateformat)
+    if engine is None:
+        engine = "arrow" if source.endswith(".parquet") else "csv"
+    if engine == "arrow":
+        return read_arrow(source, mapping, chunkSize, delimiter, dateformat)
+    if engine == "csv":
+        return read_csv(source, mapping, chunkSize, delimiter, dateformat = dateformat)
+    raise ValueError("unknown ingestion engine " + str(engine))
+
+
+##-----------------------------------------------------------------------------
+# Ingestion
+#
+# Chunks are read, built and sent one after the other: a chunk goes through
+# DealImporter in pipelined batches and is fully answered before the next
+# one is read, so at most one chunk of tuples and window batches of messages
+# are alive. The report keeps totals and the first maxRejections rejections,
+# per-chunk figures go to on_chunk.
+##-----------------------------------------------------------------------------
+
+class ChunkReport():
+
+    def __init__(self, index: int, start: int, rows: int, read: float, report):
+        self.index = index
+        self.start = start          # source row index of the first row
+        self.rows = rows
+        self.read = read            # seconds reading and mapping the chunk
+        self.report = report        # ImportReport of the chunk
+
+    @property
+    def elapsed(self) -> float:
+        return self.read + self.report.elapsed
+
+    @property
+    def rate(self) -> float:
+        if self.elapsed == 0:
+            return 0.0
+        return self.rows / self.elapsed
+
+    def __str__(self):
+        report = self.report
+        return "chunk {}: rows {}-{}, {} acks, {} errors, {} missing, {} rejected, read {:.3f}s, sent {:.3f}s ({:.0f} rows/s)".format(
+            self.index, self.start, self.start + self.rows - 1, report.acks, report.errors, report.missing,
+            report.rejected, self.read, report.elapsed, self.rate)
+
+
+class IngestReport():
+
+    def __init__(self, maxRejections: int = 1000):
+        self.chunks = 0
+        self.rows = 0
+        self.deals = 0
+        self.acks = 0
+        self.errors = 0
+        self.rejected = 0
+        self.rejections = []        # (source row index, error), the first maxRejections
+        self.maxRejections = maxRejections
+        self.read = 0.0
+        self.elapsed = 0.0
+
+    def add(self, chunk: ChunkReport):
+        report = chunk.report
+        self.chunks += 1
+        self.rows += chunk.rows
+        self.deals += report.deals
+        self.acks += report.acks
+        self.errors += report.errors
+        self.rejected += report.rejected
+        room = self.maxRejections - len(self.rejections)
+        self.rejections += [(chunk.start + index, error) for index, error in report.rejections[:max(room, 0)]]
+        self.read += chunk.read
+
+    @property
+    def rate(self) -> float:
+        if self.elapsed == 0:
+            return 0.0
+        return self.rows / self.elapsed
+
+    @property
+    def missing(self) -> int:
+        return self.deals - self.acks - self.errors
+
+    def __str__(self):
+        return "{} rows in {} chunks, {} acks, {} errors, {} missing, {} rejected, read {:.3f}s, {:.3f}s ({:.0f} rows/s)".format(
+            self.rows, self.chunks, self.acks, self.errors, self.missing, self.rejected, self.read, self.elapsed,
+            self.rate)
+
+
+class Ingestor():
+
+    def __init__(self, rv, batch_size: int = 500, window: int = 2, timeout: float = 30.0,
+                dateformat: str = "DD/MM/YYYY", fields: tuple = EQUITIES_DEAL_MAPPING_FIELDS):
+        self.importer = DealImporter(rv, batch_size, window, timeout, dateformat)
+        self.dateformat = dateformat
+        self.fields = fields        # names of the tuple values, for rejections
+
+    def send(self, rows: list):
+        # ImportReport of the complete rows, a row with a missing value is rejected
+        # here, the template would send None as text
+        complete = [index for index, row in enumerate(rows) if None not in row]
+        if len(complete) == len(rows):
+            return self.importer.import_deals(rows)
+
+        report = self.importer.import_deals([rows[index] for index in complete])
+        rejections = [(complete[index], error) for index, error in report.rejections]
+        for index, row in enumerate(rows):
+            if None in row:
+                field = self.fields[row.index(None)][0]
+                rejections.append((index, ValueError("no value for " + field)))
+        report.rejections = sorted(rejections, key = lambda rejection: rejection[0])
+        report.rejected = len(rejections)
+        return report
+
+    def ingest(self, chunks: Iterable, on_chunk: Callable[[ChunkReport], Any] = None) -> IngestReport:
+        report = IngestReport()
+        start = time.perf_counter()
+        chunks = iter(chunks)
+
+        while True:
+            read = time.perf_counter()
+            rows = next(chunks, None)
+            if rows is None:
+                break
+            read = time.perf_counter() - read
+
+            chunk = ChunkReport(report.chunks, report.rows, len(rows), read, self.send(rows))
+            del rows
+            report.add(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+
+        report.elapsed = time.perf_counter() - start
+        return report
+
+
+def ingest(rv, source, mapping: ColumnMapping = None, chunkSize: int = 10000, batch_size: int = 500,
+           window: int = 2, timeout: float = 30.0, dateformat: str = "DD/MM/YYYY", engine: str = None,
+           on_chunk: Callable[[ChunkReport], Any] = None) -> IngestReport:
+    chunks = read_deals(source, mapping, chunkSize, engine, dateformat = dateformat)
+    return Ingestor(rv, batch_size, window, timeout, dateformat).ingest(chunks, on_chunk)
+
+
+##-----------------------------------------------------------------------------
+# pykis ingest
+##-----------------------------------------------------------------------------
+
+def _pairs(values: list, option: str) -> dict:
+    # ["Field=value", ...] -> {field: value}
+    pairs = {}
+    for value in values or ():
+        field, sep, text = value.partition("=")
+        if not sep:
+            raise ValueError("{} expects Field=value, got {}".format(option, value))
+        pairs[field] = text
+    return pairs
+
+
+def connect(args):
+    from tibrvlib import RVClient
+
+    rv = RVClient(args.service, args.network, args.daemon, trace = False)
+    rv.connect(args.host, args.serv, args.codifier)
+    rv.waitReady(args.timeout)
+    return rv
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="pykis ingest", description="Stream EquitiesDeals from CSV or Parquet into KIS")
+    parser.add_argument("source", help="CSV file with a header line, or *.parquet")
+    parser.add_argument("--mapping", default=None, help='JSON {"columns": {field: column}, "defaults": {field: value}}')
+    parser.add_argument("--column", action="append", help="Field=column, repeatable")
+    parser.add_argument("--default", action="append", help="Field=value, repeatable")
+    parser.add_argument("--engine", default=None, choices=("csv", "arrow"), help="default csv, arrow for *.parquet")
+    parser.add_argument("--delimiter", default=",")
+    parser.add_argument("--chunk", type=int, default=10000, help="rows read, built and sent at a time")
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--window", type=int, default=2, help="batches waiting for acks")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--fake", action="store_true", help="ingest into a local fake KIS")
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    parser.add_argument("--host", default="kondor")
+    parser.add_argument("--serv", default="kis_port")
+    parser.add_argument("--codifier", default="RV_INGEST")
+    parser.add_argument("--dateformat", default="DD/MM/YYYY")
+    args = parser.parse_args(argv[1:])
+
+    try:
+        if args.mapping:
+            mapping = ColumnMapping.load(args.mapping)
+        else:
+            mapping = equities_deal_mapping()
+        mapping = ColumnMapping(mapping.fields, dict(mapping.columns, **_pairs(args.column, "--column")),
+                                dict(mapping.defaults, **_pairs(args.default, "--default")))
+        chunks = read_deals(args.source, mapping, args.chunk, args.engine, args.delimiter, args.dateformat)
+        # header checked before connecting
+        first = next(chunks, None)
+    except (ValueError, ImportError, OSError) as error:
+        parser.error(str(error))
+
+    tibrvbackend.use(args.backend)
+
+    kis = None
+    if args.fake:
+        from fakekis import FakeKIS
+        kis = FakeKIS(args.service, args.network, args.daemon, args.host, args.serv)
+        kis.start()
+
+    rv = connect(args)
+    try:
+        if rv.receiver == "":
+            print("No IDENTIFY_MSG answer from KIS", args.serv + "." + args.host)
+            return 1
+        chunks = itertools.chain([first] if first is not None else [], chunks)
+        report = Ingestor(rv, args.batch, args.window, args.timeout, args.dateformat).ingest(chunks, print)
+        for index, error in report.rejections:
+            print("  row {}: {}".format(index, error))
+        print(report)
+    finally:
+        rv.destroy()
+        if kis is not None:
+            kis.stop()
+
+    return 0 if report.errors == 0 and report.missing == 0 and report.rejected == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,247 @@
+import os
+import sys
+import time
+import argparse
+import concurrent.futures
+from typing import Iterable
+import tibrvbackend
+
+
+##-----------------------------------------------------------------------------
+# Replay of journaled KIS traffic
+#
+# Re-drives the DATA_MSG requests of a tibrvjournal.Journal into a KIS
+# session, at the recorded pace (1x), faster (10x) or as fast as the window
+# allows (max). Messages of one table ("Key") are sent in journal order with
+# at most window of them waiting for an answer. Every message is a request()
+# on its own reply subject, its answer gives the ack/error and the latency.
+##-----------------------------------------------------------------------------
+
+def parse_rate(text: str) -> float:
+    # "1x", "10", "0.5x" -> speed factor, "max" -> None
+    text = str(text).strip().lower()
+    if text == "max":
+        return None
+    speed = float(text[:-1] if text.endswith("x") else text)
+    if speed <= 0:
+        raise ValueError("replay rate must be positive or max, got " + text)
+    return speed
+
+
+class ReplayReport():
+
+    def __init__(self):
+        self.sent = 0
+        self.acks = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.skipped = 0            # journal records that are not DATA_MSG requests
+        self.tables = {}            # table -> messages sent
+        self.latencies = []         # seconds from send to answer
+        self.elapsed = 0.0
+
+    @property
+    def rate(self) -> float:
+        if self.elapsed == 0:
+            return 0.0
+        return self.sent / self.elapsed
+
+    @property
+    def missing(self) -> int:
+        return self.sent - self.acks - self.errors - self.timeouts
+
+    def percentiles(self, ps: Iterable = (50, 90, 99, 99.9, 100)) -> dict:
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {p: 0.0 for p in ps}
+        return {p: latencies[min(len(latencies) - 1, int(len(latencies) * p / 100.0))] for p in ps}
+
+    def __str__(self):
+        text = "{} messages in {} tables, {} acks, {} errors, {} timeouts, {} missing, {:.3f}s ({:.0f} msgs/s)".format(
+            self.sent, len(self.tables), self.acks, self.errors, self.timeouts, self.missing, self.elapsed, self.rate)
+        latency = ", ".join("p{:g} {:.3f}ms".format(p, value * 1e3) for p, value in self.percentiles().items())
+        return text + "\nlatency " + latency
+
+
+class Replayer():
+
+    def __init__(self, rv, rate: float = 1.0, window: int = 100, timeout: float = 30.0,
+                dateformat: str = "DD/MM/YYYY"):
+        self.rv = rv                # connected RVClient, correlation "subject"
+        self.rate = rate            # speed factor, None = max
+        self.window = window        # unanswered messages per table
+        self.timeout = timeout
+        self.dateformat = dateformat
+        self.inflight = {}          # table -> unanswered messages
+        self.report = None
+
+    def _answer(self, table: str, sent: float, future: concurrent.futures.Future):
+        # runs in the dispatch callback or in RequestTable.expire
+        report = self.report
+        self.inflight[table] -= 1
+        try:
+            msg = future.result()
+        except TimeoutError:
+            report.timeouts += 1
+            return
+        except Exception:
+            report.errors += 1
+            return
+
+        report.latencies.append(time.perf_counter() - sent)
+        status, data_type = msg.tibrvMsg_GetI32(msg.message, "Data Type")
+        if status == msg.TIBRV_OK and data_type == msg.ICC_DATA_MSG_TABLE_ACK:
+            report.acks += 1
+        else:
+            report.errors += 1
+        msg.close()
+
+    def _wait(self, until: float = None, table: str = None):
+        # dispatch answers until the deadline passes or table has room in its window
+        while True:
+            now = time.perf_counter()
+            if table is not None and self.inflight.get(table, 0) < self.window:
+                return True
+            if until is not None and now >= until:
+                return True
+            left = 0.1 if until is None else min(until - now, 0.1)
+            status = self.rv.status(left)
+            if status not in (self.rv.TIBRV_OK, self.rv.TIBRV_TIMEOUT):
+                return False
+
+    def send(self, msg, table: str):
+        report = self.report
+        msg.SetSendSubject(self.rv.receiver)
+        self.inflight[table] = self.inflight.get(table, 0) + 1
+        report.tables[table] = report.tables.get(table, 0) + 1
+        report.sent += 1
+
+        sent = time.perf_counter()
+        future = self.rv.request(msg, self.timeout)
+        future.add_done_callback(lambda future: self._answer(table, sent, future))
+
+    def replay(self, records: Iterable) -> ReplayReport:
+        # records of a Journal, only the DATA_MSG requests are sent
+        from tibrvmsglib import RVMessage
+        from tibrvjournal import Journal
+
+        self.report = report = ReplayReport()
+        self.inflight = {}
+        first = None
+        start = time.perf_counter()
+
+        for record in records:
+            msg = record.message(self.dateformat)
+            status, message_type = msg.tibrvMsg_GetI32(msg.message, "Type")
+            if record.direction != Journal.OUT or status != msg.TIBRV_OK or message_type != RVMessage.DATA_MSG:
+                report.skipped += 1
+                msg.close()
+                continue
+
+            status, table = msg.tibrvMsg_GetString(msg.message, "Key")
+            if status != msg.TIBRV_OK:
+                table = ""
+
+            if self.rate is not None:
+                # keep the recorded spacing, scaled by rate
+                if first is None:
+                    first = record.timestamp
+                if not self._wait(start + (record.timestamp - first) / self.rate):
+                    msg.close()
+                    break
+
+            if not self._wait(table=table):
+                msg.close()
+                break
+
+            self.send(msg, table)
+            msg.close()
+
+            # one dispatch per send keeps the answers flowing at max rate
+            self.rv.status(0)
+
+        # answers of the last messages
+        deadline = time.perf_counter() + self.timeout
+        while sum(self.inflight.values()) > 0 and time.perf_counter() < deadline:
+            if not self._wait(min(deadline, time.perf_counter() + 0.1)):
+                break
+
+        report.elapsed = time.perf_counter() - start
+        return report
+
+
+def replay(rv, records: Iterable, rate: float = 1.0, window: int = 100, timeout: float = 30.0,
+            dateformat: str = "DD/MM/YYYY") -> ReplayReport:
+    return Replayer(rv, rate, window, timeout, dateformat).replay(records)
+
+
+##-----------------------------------------------------------------------------
+# pykis replay
+##-----------------------------------------------------------------------------
+
+def connect(args):
+    from tibrvlib import RVClient, RequestTable
+
+    rv = RVClient(args.service, args.network, args.daemon, trace = False, correlation = RequestTable.SUBJECT)
+    rv.connect(args.host, args.serv, args.codifier)
+    rv.waitReady(args.timeout)
+    return rv
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="pykis replay", description="Replay journaled KIS traffic")
+    parser.add_argument("journal", help="tibrvjournal directory")
+    parser.add_argument("--rate", default="1x", help="1x, 10x, ... or max")
+    parser.add_argument("--window", type=int, default=100, help="unanswered messages per table")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--start", type=float, default=None, help="first record timestamp")
+    parser.add_argument("--end", type=float, default=None, help="last record timestamp")
+    parser.add_argument("--fake", action="store_true", help="replay against a local fake KIS")
+    parser.add_argument("--fake-delay", type=float, default=0.0, help="fake KIS seconds per message")
+    parser.add_argument("--backend", default=os.environ.get("TIBRV_BACKEND", tibrvbackend.CTYPES),
+                        choices=(tibrvbackend.CTYPES, tibrvbackend.MEMORY))
+    parser.add_argument("--service", default="8888")
+    parser.add_argument("--network", default="")
+    parser.add_argument("--daemon", default="tcp:localhost:7500")
+    parser.add_argument("--host", default="kondor")
+    parser.add_argument("--serv", default="kis_port")
+    parser.add_argument("--codifier", default="RV_REPLAY")
+    parser.add_argument("--dateformat", default="DD/MM/YYYY")
+    args = parser.parse_args(argv[1:])
+
+    try:
+        rate = parse_rate(args.rate)
+    except ValueError as error:
+        parser.error(str(error))
+
+    tibrvbackend.use(args.backend)
+    from tibrvjournal import Journal
+
+    kis = None
+    if args.fake:
+        from fakekis import FakeKIS
+        kis = FakeKIS(args.service, args.network, args.daemon, args.host, args.serv, args.fake_delay)
+        kis.start()
+
+    journal = Journal(args.journal, readonly=True)
+    rv = connect(args)
+    try:
+        if rv.receiver == "":
+            print("No IDENTIFY_MSG answer from KIS", args.serv + "." + args.host)
+            return 1
+        report = replay(rv, journal.records(args.start, args.end, Journal.OUT), rate, args.window,
+                        args.timeout, args.dateformat)
+        for table, count in sorted(report.tables.items()):
+            print("  {}: {}".format(table, count))
+        print("rate {}:".format(args.rate), report)
+    finally:
+        rv.destroy()
+        journal.close()
+        if kis is not None:
+            kis.stop()
+
+    return 0 if report.errors == 0 and report.timeouts == 0 and report.missing == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,221 @@
+import os
+import sys
+import ctypes
+from platform import architecture
+
+
+##-----------------------------------------------------------------------------
+# TIBRV backend
+#
+# tibrvmsglib and tibrvlib call the TIBRV C API through one library object:
+#   ctypes  - the TIBCO shared library (libtibrv64.so / tibrv.dll)
+#   memory  - tibrvmem.MemoryLibrary, a pure Python in-process bus
+#
+# The backend is chosen with the TIBRV_BACKEND environment variable or with
+# use() before tibrvmsglib/tibrvlib are imported. Importing them loads
+# nothing: library() is a LazyLibrary that records the prototypes set at
+# import and loads the library and binds each function on its first call.
+# The TIBCO library is searched in TIBRV_LIBRARY_PATH (directories or the
+# library file, os.pathsep separated), then by the system loader, or loaded
+# from an explicit path with load(path).
+##-----------------------------------------------------------------------------
+
+CTYPES = "ctypes"
+MEMORY = "memory"
+
+# module variables
+_func = None                # ctype func cast, OS dependent
+_lib = None                 # library shared by tibrvmsglib and tibrvlib
+_cmlib = None               # certified messaging library, see cm_library()
+_cmqlib = None              # distributed queue library, see cmq_library()
+_path = None                # directory or file of load(path)
+
+__lib_bit = lambda: '64' if architecture()[0] == '64bit' else ''
+if sys.platform[:5] == "linux" or sys.platform[:3] == "aix":
+    # Unix/Linux
+    _func = ctypes.CFUNCTYPE
+    __lib_name = lambda name: 'lib' + name + __lib_bit() + '.so'
+elif sys.platform == 'win32':
+    # Windows
+    _func = ctypes.WINFUNCTYPE
+    __lib_name = lambda name: name
+else:
+    raise SystemError(sys.platform + ' is not supported')
+
+
+def lib_name(name: str) -> str:
+    return __lib_name(name)
+
+
+def functype():
+    return _func
+
+
+def _candidates(name: str) -> list:
+    # library files to try in order, the bare name last for the system loader
+    paths = [_path] if _path is not None else []
+    paths += [path for path in os.environ.get("TIBRV_LIBRARY_PATH", "").split(os.pathsep) if path]
+    files = []
+    for path in paths:
+        if not os.path.isfile(path):
+            files.append(os.path.join(path, lib_name(name)))
+        elif name == "tibrv":
+            files.append(path)
+        else:
+            # library file given, tibrvcm/tibrvcmq live next to it
+            files.append(os.path.join(os.path.dirname(path), lib_name(name)))
+    files.append(lib_name(name))
+    return files
+
+
+def _open(name: str) -> ctypes.CDLL:
+    errors = []
+    for file in _candidates(name):
+        try:
+            return ctypes.CDLL(file)
+        except OSError as e:
+            errors.append(str(e))
+    raise ImportError("cannot load {} ({}), set TIBRV_LIBRARY_PATH or TIBRV_BACKEND={} to run on the in-memory bus"
+                    .format(lib_name(name), "; ".join(errors), MEMORY))
+
+
+def load(path: str = None):
+    # TIBCO library from path, a directory or the library file
+    global _path
+
+    if path is not None:
+        _path = path
+    return use(CTYPES)
+
+
+def use(backend = None):
+    # backend is CTYPES, MEMORY or an already created library object
+    global _lib, _cmlib, _cmqlib
+
+    if backend is None:
+        backend = os.environ.get("TIBRV_BACKEND", CTYPES)
+
+    if _lib is not None:
+        if backend is _lib or backend == name():
+            return _lib
+        if _proxy.bound():
+            raise RuntimeError("TIBRV backend must be selected before tibrvmsglib/tibrvlib call the library")
+
+    if backend == CTYPES:
+        lib = _open("tibrv")
+    elif backend == MEMORY:
+        from tibrvmem import MemoryLibrary
+        lib = MemoryLibrary()
+    elif isinstance(backend, str):
+        raise ValueError("unknown TIBRV backend " + backend)
+    else:
+        lib = backend
+
+    _lib = lib
+    _cmlib = None
+    _cmqlib = None
+    return _lib
+
+
+def loaded():
+    # the library, loaded now when no backend was used yet
+    if _lib is None:
+        use()
+    return _lib
+
+
+def library():
+    return _proxy
+
+
+def cm_library():
+    # tibrvcm library, loaded on the first certified transport. The memory
+    # backend implements the tibrvcm functions on its own bus.
+    global _cmlib
+
+    if _cmlib is None:
+        lib = loaded()
+        if isinstance(lib, ctypes.CDLL):
+            _cmlib = _open("tibrvcm")
+        else:
+            _cmlib = lib
+    return _cmlib
+
+
+def cmq_library():
+    # tibrvcmq library, loaded on the first distributed queue. Only it exports
+    # the tibrvcmTransport_*DistributedQueue* and worker functions.
+    global _cmqlib
+
+    if _cmqlib is None:
+        lib = loaded()
+        if isinstance(lib, ctypes.CDLL):
+            _cmqlib = _open("tibrvcmq")
+        else:
+            _cmqlib = lib
+    return _cmqlib
+
+
+def name() -> str:
+    # backend in use, or the one TIBRV_BACKEND selects before the first call
+    if _lib is None:
+        return os.environ.get("TIBRV_BACKEND", CTYPES)
+    return getattr(_lib, "backend", CTYPES)
+
+
+##-----------------------------------------------------------------------------
+# LazyLibrary
+#
+# Stand-in for the library at import time. An attribute is a _Prototype that
+# keeps the argtypes/restype assigned to it; its first call loads the library,
+# applies them to the real function and stores that function on the
+# LazyLibrary, so later lookups get the library function itself.
+##-----------------------------------------------------------------------------
+
+_UNSET = object()
+
+class _Prototype():
+
+    __slots__ = ("name", "argtypes", "restype", "function")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.argtypes = _UNSET
+        self.restype = _UNSET
+        self.function = None
+
+    def __call__(self, *args):
+        function = self.function
+        if function is None:
+            function = _proxy.bind(self.name)
+        return function(*args)
+
+
+class LazyLibrary():
+
+    def __getattr__(self, name: str):
+        # only called for names not bound yet
+        if name.startswith("__"):
+            raise AttributeError(name)
+        prototype = _Prototype(name)
+        self.__dict__[name] = prototype
+        return prototype
+
+    def bind(self, name: str):
+        # library function name with its prototype
+        function = getattr(loaded(), name)
+        prototype = self.__dict__.get(name)
+        if isinstance(prototype, _Prototype):
+            if prototype.argtypes is not _UNSET:
+                function.argtypes = prototype.argtypes
+            if prototype.restype is not _UNSET:
+                function.restype = prototype.restype
+            prototype.function = function
+        self.__dict__[name] = function
+        return function
+
+    def bound(self) -> bool:
+        return any(not isinstance(value, _Prototype) for value in self.__dict__.values())
+
+
+_proxy = LazyLibrary()
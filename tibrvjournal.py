@@ -0,0 +1,213 @@
+import os
+import mmap
+import time
+import bisect
+import struct
+import threading
+from collections import namedtuple
+from tibrvmsglib import RVMessage, tibrvMsg
+
+
+##-----------------------------------------------------------------------------
+# Journal
+#
+# Append-only record of sent and received messages in memory-mapped segment
+# files <path>/journal.NNNNNN.seg. Every record holds the wire bytes of the
+# message (tibrvMsg_GetAsBytes), subject, direction, timestamp and request
+# id. Segments are pre-sized and zero filled, a zero length ends the data of
+# a segment. The mapped pages are flushed to disk every fsyncInterval seconds
+# and on close(). The index by time and request id is kept in memory and
+# rebuilt from the record headers on open.
+##-----------------------------------------------------------------------------
+
+class JournalRecord(namedtuple("JournalRecord", "index timestamp direction subject requestId data")):
+    __slots__ = ()
+
+    def message(self, dateformat = 'DD/MM/YYYY') -> RVMessage:
+        # owned copy of the journaled message, with its send subject
+        msg = RVMessage.FromBytes(self.data, dateformat)
+        if self.subject:
+            msg.SetSendSubject(self.subject)
+        return msg
+
+
+class Journal():
+
+    OUT = 0
+    IN = 1
+
+    # length, direction, timestamp, request id, subject length
+    _HEADER = struct.Struct("<IBdQH")
+
+    def __init__(self, path: str, segmentSize: int = 64 * 1024 * 1024, fsyncInterval: float = 1.0,
+                readonly: bool = False):
+        self.path = path
+        self.segmentSize = segmentSize
+        self.fsyncInterval = fsyncInterval
+        self.readonly = readonly
+        self.lock = threading.Lock()
+        self.segments = []          # [(file, mmap)]
+        self.offset = 0             # write offset in the last segment
+        self.synced = time.monotonic()
+        self.dirty = False
+
+        # index
+        self.times = []             # non decreasing timestamp per record, for bisect
+        self.positions = []         # (segment, offset) per record
+        self.requestIds = {}        # request id -> [record index]
+
+        if not readonly:
+            os.makedirs(path, exist_ok=True)
+        names = sorted(name for name in os.listdir(path)
+                        if name.startswith("journal.") and name.endswith(".seg"))
+        for name in names:
+            self._open(os.path.join(path, name))
+            self._scan(len(self.segments) - 1)
+
+        if not readonly and not self.segments:
+            self._roll(0)
+
+    def _file(self, segment: int) -> str:
+        return os.path.join(self.path, "journal.{:06d}.seg".format(segment))
+
+    def _open(self, filename: str):
+        if self.readonly:
+            f = open(filename, "rb")
+            view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            f = open(filename, "r+b")
+            view = mmap.mmap(f.fileno(), 0)
+        self.segments.append((f, view))
+
+    def _scan(self, segment: int):
+        view = self.segments[segment][1]
+        offset = 0
+        size = len(view)
+        while offset + self._HEADER.size <= size:
+            length, direction, timestamp, requestId, subjectLength = self._HEADER.unpack_from(view, offset)
+            if length == 0 or offset + length > size:
+                break
+            self._index(timestamp, requestId, segment, offset)
+            offset += length
+        self.offset = offset
+
+    def _index(self, timestamp: float, requestId: int, segment: int, offset: int):
+        if self.times and timestamp < self.times[-1]:
+            timestamp = self.times[-1]
+        self.times.append(timestamp)
+        self.positions.append((segment, offset))
+        if requestId:
+            self.requestIds.setdefault(requestId, []).append(len(self.positions) - 1)
+
+    def _roll(self, size: int):
+        # new segment of at least size bytes
+        if self.segments and self.dirty:
+            self.segments[-1][1].flush()
+            self.dirty = False
+        filename = self._file(len(self.segments))
+        with open(filename, "wb") as f:
+            f.truncate(max(self.segmentSize, size + self._HEADER.size))
+        self._open(filename)
+        self.offset = 0
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def append(self, direction: int, subject: str, data: bytes, requestId: int = 0,
+                timestamp: float = None) -> int:
+        # returns the record index
+        if self.readonly:
+            raise IOError("journal {} is read-only".format(self.path))
+
+        if timestamp is None:
+            timestamp = time.time()
+        subjectBytes = (subject or "").encode()
+        length = self._HEADER.size + len(subjectBytes) + len(data)
+
+        with self.lock:
+            view = self.segments[-1][1]
+            # keep room for the zero length that ends the segment data
+            if self.offset + length + 4 > len(view):
+                self._roll(length + 4)
+                view = self.segments[-1][1]
+
+            offset = self.offset
+            self._HEADER.pack_into(view, offset, length, direction, timestamp, requestId, len(subjectBytes))
+            start = offset + self._HEADER.size
+            view[start:start + len(subjectBytes)] = subjectBytes
+            start += len(subjectBytes)
+            view[start:start + len(data)] = data
+            self.offset = offset + length
+            self.dirty = True
+
+            self._index(timestamp, requestId, len(self.segments) - 1, offset)
+            index = len(self.positions) - 1
+
+            if self.fsyncInterval is not None and time.monotonic() - self.synced >= self.fsyncInterval:
+                self._sync()
+
+        return index
+
+    def record(self, direction: int, message: tibrvMsg, subject: str = None, requestId: int = 0) -> int:
+        # append a native message, subject None = its send subject
+        if subject is None:
+            status, subject = RVMessage.tibrvMsg_GetSendSubject(message)
+        status, data = RVMessage.tibrvMsg_GetAsBytes(message)
+        if status != RVMessage.TIBRV_OK:
+            print('ERROR tibrvMsg_GetAsBytes', status, RVMessage.tibrvStatus_GetText(status))
+            return -1
+        return self.append(direction, subject, data, requestId)
+
+    def read(self, index: int) -> JournalRecord:
+        segment, offset = self.positions[index]
+        view = self.segments[segment][1]
+        length, direction, timestamp, requestId, subjectLength = self._HEADER.unpack_from(view, offset)
+        start = offset + self._HEADER.size
+        subject = view[start:start + subjectLength].decode()
+        data = view[start + subjectLength:offset + length]
+        return JournalRecord(index, timestamp, direction, subject, requestId, data)
+
+    def seek(self, timestamp: float) -> int:
+        # index of the first record at or after timestamp
+        return bisect.bisect_left(self.times, timestamp)
+
+    def records(self, start: float = None, end: float = None, direction: int = None):
+        # records from start to end timestamp, optionally of one direction
+        index = 0 if start is None else self.seek(start)
+        last = len(self.positions) if end is None else bisect.bisect_right(self.times, end)
+        for i in range(index, last):
+            record = self.read(i)
+            if direction is None or record.direction == direction:
+                yield record
+
+    def __iter__(self):
+        return self.records()
+
+    def find(self, requestId: int) -> list:
+        # records of one request, the request and its answers
+        return [self.read(i) for i in self.requestIds.get(requestId, ())]
+
+    def _sync(self):
+        if self.dirty:
+            self.segments[-1][1].flush()
+            self.dirty = False
+        self.synced = time.monotonic()
+
+    def flush(self):
+        with self.lock:
+            if self.segments and not self.readonly:
+                self._sync()
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            segments, self.segments = self.segments, []
+        for f, view in segments:
+            view.close()
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
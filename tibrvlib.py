@@ -1,934 +1,2475 @@
-import sys
-import ctypes
-from platform import architecture
-from typing import NewType, Callable, List, Any
-import time
-from tibrvmsglib import RVMessage
-
-# module variables
-_func = None                # ctype func cast, OS dependent
-
-__lib_bit = lambda: '64' if architecture()[0] == '64bit' else ''
-if sys.platform[:5] == "linux" or sys.platform[:3] == "aix":
-    # Unix/Linux
-    _func = ctypes.CFUNCTYPE
-    __lib_name = lambda name: 'lib' + name + __lib_bit() + '.so'
-    _rv = ctypes.CDLL(__lib_name("tibrv"))
-elif sys.platform == 'win32':
-    # Windows
-    _func = ctypes.WINFUNCTYPE
-    __lib_name = lambda name: name
-    _rv = ctypes.CDLL(__lib_name("tibrv"))
-else:
-    raise SystemError(sys.platform + ' is not supported')
-
-
-##-----------------------------------------------------------------------------
-# CTYPES
-# tibrv/types.h
-##-----------------------------------------------------------------------------
-
-_c_tibrv_status         = ctypes.c_int32
-
-_c_tibrv_i8                  = ctypes.c_int8
-_c_tibrv_u8                  = ctypes.c_uint8
-_c_tibrv_i16                 = ctypes.c_int16
-_c_tibrv_u16                 = ctypes.c_uint16
-_c_tibrv_i32                 = ctypes.c_int32
-_c_tibrv_u32                 = ctypes.c_uint32
-_c_tibrv_i64                 = ctypes.c_int64
-_c_tibrv_u64                 = ctypes.c_uint64
-_c_tibrv_f32                 = ctypes.c_float
-_c_tibrv_f64                 = ctypes.c_double
-_c_tibrv_bool                = ctypes.c_int
-_c_tibrv_ipport16            = ctypes.c_uint16
-_c_tibrv_ipaddr32            = ctypes.c_uint32
-_c_tibrv_str                 = ctypes.c_char_p
-
-_c_tibrv_status              = ctypes.c_int32
-_c_tibrvId                   = ctypes.c_uint32
-_c_tibrvMsg                  = ctypes.c_void_p
-_c_tibrvEvent                = _c_tibrvId
-_c_tibrvDispatchable         = _c_tibrvId
-_c_tibrvQueue                = _c_tibrvDispatchable
-_c_tibrvQueueGroup           = _c_tibrvDispatchable
-_c_tibrvTransport            = _c_tibrvId
-_c_tibrvDispatcher           = _c_tibrvId
-_c_tibrvEventType            = ctypes.c_uint32
-_c_tibrvQueueLimitPolicy     = ctypes.c_int32
-_c_tibrvIOType               = ctypes.c_int32
-
-
-##-----------------------------------------------------------------------------
-# TIBRV Data Types for Python
-##-----------------------------------------------------------------------------
-tibrv_status            = NewType('tibrv_status', int)              # int
-tibrvId                 = NewType('tibrvId', int)                   # int
-tibrvMsg                = NewType('tibrvMsg', int)                  # c_void_p
-tibrvEvent              = NewType('tibrvEvent', int)                # tibrvId
-tibrvDispatchable       = NewType('tibrvDispatchable', int)         # tibrvId
-tibrvQueue              = NewType('tibrvQueue', int)                # tibrvId
-tibrvQueueGroup         = NewType('tibrvQueueGroup', int)           # tibrvId
-tibrvTransport          = NewType('tibrvTransport', int)            # tibrvId
-tibrvDispatcher         = NewType('tibrvDispatcher', int)           # tibrvId
-tibrvEventType          = NewType('tibrvEventType', int)            # enum(int)
-tibrvQueueLimitPolicy   = NewType('tibrvQueueLimitPolicy', int)     # enum(int)
-tibrvIOType             = NewType('tibrvIOType', int)               # enum(int)
-tibrvcmTransport        = NewType('tibrvcmTransport', int)          # tibrvId
-tibrvcmEvent            = NewType('tibrvcmEvent', int)              # tibrvId
-
-
-##-----------------------------------------------------------------------------
-# CALLBACK
-##-----------------------------------------------------------------------------
-tibrvEventCallback          = Callable[[tibrvEvent, tibrvMsg, object], None]
-tibrvEventVectorCallback    = Callable[[List[tibrvMsg], int], None]
-tibrvEventOnComplete        = Callable[[tibrvEvent, object], None]
-tibrvQueueOnComplete        = Callable[[tibrvQueue, object], None]
-tibrvQueueHook              = Callable[[tibrvQueue, object], None]
-_c_tibrvEventCallback       = _func(ctypes.c_void_p, _c_tibrvEvent, _c_tibrvMsg, ctypes.c_void_p)
-
-# keep callback/closure object from GC
-# key = tibrvEvent
-__callback = {}
-__closure  = {}
-
-def _reg(event, func, closure):
-    __callback[event] = func
-    if closure is not None:
-        __closure[event] = closure
-
-    return
-
-def _unreg(event):
-    if event in __callback:
-        del __callback[event]
-
-    if event in __closure:
-        del __closure[event]
-
-    return
-
-def _cstr(sz: str, codepage = None) -> str:
-    if sz is None:
-        return None
-
-    if codepage is None:
-        return _c_tibrv_str(str(sz).encode())
-    else:
-        return _c_tibrv_str(str(sz).encode(codepage))
-
-def _ret(param: list, val: object = None, size: int = 1) -> None:
-    while len(param) < size:
-        param.append(None)
-
-    if val is None:
-        param[0] = None
-        return
-
-    # assign val -> param[0]
-    if val is not list:
-        param[0] = val
-        return
-
-    # assign val[] -> param[]
-    for i in range(len(param)):
-        if i < len(val):
-            param[i] = val[i]
-        else:
-            param[i] = None
-
-    return
-
-def _pystr(sz: ctypes.c_char_p, codepage = None) -> str:
-    if sz is None:
-        return None
-
-    if type(sz) is bytes:
-        ss = sz
-    elif sz.value is None:
-        return None
-    else:
-        ss = sz.value
-
-    if codepage is None:
-        return ss.decode()
-    else:
-        return ss.decode(codepage)
-
-
-##-----------------------------------------------------------------------------
-# RVClient class
-##-----------------------------------------------------------------------------
-
-
-class RVClient():
-
-    TIBRV_OK                        = 0
-    TIBRV_INIT_FAILURE              = 1
-    TIBRV_INVALID_TRANSPORT         = 2
-    TIBRV_INVALID_ARG               = 3
-    TIBRV_NOT_INITIALIZED           = 4
-    TIBRV_ARG_CONFLICT              = 5
-
-    TIBRV_SERVICE_NOT_FOUND         = 16
-    TIBRV_NETWORK_NOT_FOUND         = 17
-    TIBRV_DAEMON_NOT_FOUND          = 18
-    TIBRV_NO_MEMORY                 = 19
-    TIBRV_INVALID_SUBJECT           = 20
-    TIBRV_DAEMON_NOT_CONNECTED      = 21
-    TIBRV_VERSION_MISMATCH          = 22
-    TIBRV_SUBJECT_COLLISION         = 23
-    TIBRV_VC_NOT_CONNECTED          = 24
-
-    TIBRV_NOT_PERMITTED             = 27
-
-    TIBRV_INVALID_NAME              = 30
-    TIBRV_INVALID_TYPE              = 31
-    TIBRV_INVALID_SIZE              = 32
-    TIBRV_INVALID_COUNT             = 33
-
-    TIBRV_NOT_FOUND                 = 35
-    TIBRV_ID_IN_USE                 = 36
-    TIBRV_ID_CONFLICT               = 37
-    TIBRV_CONVERSION_FAILED         = 38
-    TIBRV_RESERVED_HANDLER          = 39
-    TIBRV_ENCODER_FAILED            = 40
-    TIBRV_DECODER_FAILED            = 41
-    TIBRV_INVALID_MSG               = 42
-    TIBRV_INVALID_FIELD             = 43
-    TIBRV_INVALID_INSTANCE          = 44
-    TIBRV_CORRUPT_MSG               = 45
-    TIBRV_ENCODING_MISMATCH         = 46
-
-    TIBRV_TIMEOUT                   = 50
-    TIBRV_INTR                      = 51
-
-    TIBRV_INVALID_DISPATCHABLE      = 52
-    TIBRV_INVALID_DISPATCHER        = 53
-
-    TIBRV_INVALID_EVENT             = 60
-    TIBRV_INVALID_CALLBACK          = 61
-    TIBRV_INVALID_QUEUE             = 62
-    TIBRV_INVALID_QUEUE_GROUP       = 63
-
-    TIBRV_INVALID_TIME_INTERVAL     = 64
-
-    TIBRV_INVALID_IO_SOURCE         = 65
-    TIBRV_INVALID_IO_CONDITION      = 66
-    TIBRV_SOCKET_LIMIT              = 67
-
-    TIBRV_OS_ERROR                  = 68
-
-    TIBRV_INSUFFICIENT_BUFFER       = 70
-    TIBRV_EOF                       = 71
-    TIBRV_INVALID_FILE              = 72
-    TIBRV_FILE_NOT_FOUND            = 73
-    TIBRV_IO_FAILED                 = 74
-
-    TIBRV_NOT_FILE_OWNER            = 80
-    TIBRV_USERPASS_MISMATCH         = 81
-
-    TIBRV_TOO_MANY_NEIGHBORS        = 90
-    TIBRV_ALREADY_EXISTS            = 91
-
-    TIBRV_PORT_BUSY                 = 100
-    TIBRV_DELIVERY_FAILED           = 101
-    TIBRV_QUEUE_LIMIT               = 102
-
-    TIBRV_INVALID_CONTENT_DESC      = 110
-    TIBRV_INVALID_SERIALIZED_BUFFER = 111
-    TIBRV_DESCRIPTOR_NOT_FOUND      = 115
-    TIBRV_CORRUPT_SERIALIZED_BUFFER = 116
-
-    TIBRV_IPM_ONLY                  = 117
-
-
-    ##-----------------------------------------------------------------------------
-    # TIBRV API : tibrv/status.h
-    ##-----------------------------------------------------------------------------
-
-    _rv.tibrvStatus_GetText.argtypes = [_c_tibrv_status]
-    _rv.tibrvStatus_GetText.restype = ctypes.c_char_p
-
-    @staticmethod
-    def tibrvStatus_GetText(code: tibrv_status) -> str:
-
-        if code is None:
-            return None
-
-        c = _c_tibrv_status(code)
-        sz = _rv.tibrvStatus_GetText(c)
-        return _pystr(sz)
-
-
-    ##-----------------------------------------------------------------------------
-    # TIBRV API : tibrv/tibrv.h
-    ##-----------------------------------------------------------------------------
-
-
-    _rv.tibrv_Open.argtypes = None
-    _rv.tibrv_Open.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrv_Open() -> tibrv_status:
-        status = _rv.tibrv_Open()
-        return status
-
-
-    _rv.tibrv_Close.argtypes = None
-    _rv.tibrv_Close.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrv_Close() -> tibrv_status:
-        status = _rv.tibrv_Close()
-        return status
-
-
-    _rv.tibrv_Version.argtypes = []
-    _rv.tibrv_Version.restype = ctypes.c_char_p
-
-    @staticmethod
-    def tibrv_Version() -> str:
-        sz = _rv.tibrv_Version()
-        return sz.decode()
-
-    _rv.tibrvStatus_GetText.argtypes = [_c_tibrv_status]
-    _rv.tibrvStatus_GetText.restype = ctypes.c_char_p
-
-    ##-----------------------------------------------------------------------------
-    # TIBRV API : tibrv/tport.h
-    ##-----------------------------------------------------------------------------
-
-    _rv.tibrvTransport_Create.argtypes = [ctypes.POINTER(_c_tibrvTransport),
-                                        ctypes.c_char_p,
-                                        ctypes.c_char_p,
-                                        ctypes.c_char_p]
-    _rv.tibrvTransport_Create.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvTransport_Create(service: str, network: str, daemon: str) -> (tibrv_status, tibrvTransport):
-
-        tx = _c_tibrvTransport(0)
-
-        status = _rv.tibrvTransport_Create(ctypes.byref(tx), _cstr(service), _cstr(network), _cstr(daemon))
-
-        return status, tx.value
-
-
-    _rv.tibrvTransport_SetDescription.argtypes = [_c_tibrvTransport, ctypes.c_char_p]
-    _rv.tibrvTransport_SetDescription.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvTransport_SetDescription(transport: tibrvTransport, description: str) -> tibrv_status:
-
-        if transport is None or transport == 0:
-            return RVClient.TIBRV_INVALID_TRANSPORT
-
-        if description is None:
-            return RVClient.TIBRV_INVALID_ARG
-
-        try:
-            tx = _c_tibrvTransport(transport)
-        except:
-            return RVClient.TIBRV_INVALID_TRANSPORT
-
-        try:
-            sz = _cstr(description)
-        except:
-            return RVClient.TIBRV_INVALID_ARG
-
-        status = _rv.tibrvTransport_SetDescription(tx, sz)
-
-        return status
-
-
-    _rv.tibrvTransport_CreateInbox.argtypes = [_c_tibrvTransport, ctypes.c_char_p, _c_tibrv_u32]
-    _rv.tibrvTransport_CreateInbox.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvTransport_CreateInbox(transport: tibrvTransport) -> (tibrv_status, str):
-
-        if transport is None or transport == 0:
-            return self.TIBRV_INVALID_TRANSPORT, None
-
-        try:
-            tx = _c_tibrvTransport(transport)
-        except:
-            return self.TIBRV_INVALID_TRANSPORT, None
-
-        subj = ctypes.create_string_buffer(255) # TIBRV_SUBJECT_MAX
-
-        status = _rv.tibrvTransport_CreateInbox(tx, subj, ctypes.sizeof(subj))
-
-        return status, _pystr(subj)
-
-
-    _rv.tibrvTransport_Destroy.argtypes = [_c_tibrvTransport]
-    _rv.tibrvTransport_Destroy.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvTransport_Destroy(transport: tibrvTransport) -> tibrv_status:
-
-        if transport is None or transport == 0:
-            return RVClient.TIBRV_INVALID_TRANSPORT
-
-        try:
-            tx = _c_tibrvTransport(transport)
-        except:
-            return RVClient.TIBRV_INVALID_TRANSPORT
-
-        status = _rv.tibrvTransport_Destroy(tx)
-
-        return status
-
-    _rv.tibrvTransport_Send.argtypes = [_c_tibrvTransport, _c_tibrvMsg]
-    _rv.tibrvTransport_Send.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvTransport_Send(transport: tibrvTransport, message: tibrvMsg) -> tibrv_status:
-
-        if transport is None or transport == 0:
-            return RVClient.TIBRV_INVALID_TRANSPORT
-
-        if message is None or message == 0:
-            return RVClient.TIBRV_INVALID_MSG
-
-        try:
-            tx = _c_tibrvTransport(transport)
-        except:
-            return RVClient.TIBRV_INVALID_TRANSPORT
-
-        try:
-            msg = _c_tibrvMsg(message)
-        except:
-            return RVClient.TIBRV_INVALID_MSG
-
-        status = _rv.tibrvTransport_Send(tx, msg)
-
-        return status
-
-
-    ##-----------------------------------------------------------------------------
-    # TIBRV API : tibrv/queue.h
-    ##-----------------------------------------------------------------------------
-
-    _rv.tibrvQueue_Create.argtypes = [ctypes.POINTER(_c_tibrvQueue)]
-    _rv.tibrvQueue_Create.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvQueue_Create() -> (tibrv_status, tibrvQueue):
-
-        que = _c_tibrvQueue(0)
-
-        status = _rv.tibrvQueue_Create(ctypes.byref(que))
-
-        return status, que.value
-
-    _rv.tibrvQueue_SetPriority.argtypes = [_c_tibrvQueue, _c_tibrv_u32]
-    _rv.tibrvQueue_SetPriority.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvQueue_SetPriority(eventQueue: tibrvQueue, priority: int) -> tibrv_status:
-
-        if eventQueue is None or eventQueue == 0:
-            return RVClient.TIBRV_INVALID_QUEUE
-
-        if priority is None:
-            return RVClient.TIBRV_INVALID_ARG
-
-        try:
-            que = _c_tibrvQueue(eventQueue)
-        except:
-            return RVClient.TIBRV_INVALID_QUEUE
-
-        try:
-            p = _c_tibrv_u32(priority)
-        except:
-            return RVClient.TIBRV_INVALID_ARG
-
-        status = _rv.tibrvQueue_SetPriority(que, p)
-
-        return status
-
-
-    _rv.tibrvQueue_DestroyEx.argtypes = [_c_tibrvQueue, ctypes.c_void_p, ctypes.c_void_p]
-    _rv.tibrvQueue_DestroyEx.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvQueue_Destroy(eventQueue: tibrvQueue, callback : tibrvQueueOnComplete = None,
-                        closure = None) -> tibrv_status:
-
-        if eventQueue is None or eventQueue == 0:
-            return RVClient.TIBRV_INVALID_QUEUE
-
-        try:
-            que = _c_tibrvQueue(eventQueue)
-        except:
-            return RVClient.TIBRV_INVALID_QUEUE
-
-        if callback is None:
-            cb = None
-            cz = None
-        else:
-            try:
-                cb = _c_tibrvQueueOnComplete(callback)
-            except:
-                return RVClient.TIBRV_INVALID_CALLBACK
-
-            cz = ctypes.py_object(closure)
-
-        status = _rv.tibrvQueue_DestroyEx(que, cb, cz)
-
-        # THIS MAY CAUSE MEMORY LEAK
-        # if status == TIBRV_OK and callback is not None:
-        #     __reg(eventQueue, cb, closure)
-
-        return status
-
-
-    ##-----------------------------------------------------------------------------
-    # TIBRV API : tibrv/ggroup.h
-    ##-----------------------------------------------------------------------------
-
-
-    _rv.tibrvQueueGroup_Create.argtypes = [ctypes.POINTER(_c_tibrvQueueGroup)]
-    _rv.tibrvQueueGroup_Create.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvQueueGroup_Create() -> (tibrv_status, tibrvQueueGroup):
-
-        grp = _c_tibrvQueue(0)
-
-        status = _rv.tibrvQueueGroup_Create(ctypes.byref(grp))
-
-        return status, grp.value
-
-    # extern tibrv_status
-    # tibrvQueueGroup_Add(
-    #     tibrvQueueGroup             eventQueueGroup,
-    #     tibrvQueue                  eventQueue);
-
-    _rv.tibrvQueueGroup_Add.argtypes = [_c_tibrvQueueGroup, _c_tibrvQueue]
-    _rv.tibrvQueueGroup_Add.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvQueueGroup_Add(grp: tibrvQueueGroup, queue: tibrvQueue) -> (tibrv_status):
-
-        status = _rv.tibrvQueueGroup_Add(grp, queue)
-
-        return status
-
-
-    _rv.tibrvQueueGroup_Destroy.argtypes = [_c_tibrvQueueGroup]
-    _rv.tibrvQueueGroup_Destroy.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvQueueGroup_Destroy(queue: tibrvQueueGroup) -> tibrv_status:
-
-        if queue is None or queue == 0:
-            return RVClient.TIBRV_INVALID_QUEUE_GROUP
-
-        status = _rv.tibrvQueueGroup_Destroy(queue)
-
-        return status
-
-
-    _rv.tibrvQueueGroup_TimedDispatch.argtypes = [_c_tibrvQueueGroup, _c_tibrv_f64]
-    _rv.tibrvQueueGroup_TimedDispatch.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvQueueGroup_TimedDispatch(eventGroup: tibrvQueue, timeout: float) -> tibrv_status:
-
-        if eventGroup is None or eventGroup == 0:
-            return RVClient.TIBRV_INVALID_QUEUE_GROUP
-
-        if timeout is None:
-            return RVClient.TIBRV_INVALID_ARG
-
-        try:
-            que = _c_tibrvQueue(eventGroup)
-        except:
-            return RVClient.TIBRV_INVALID_QUEUE_GROUP
-
-        try:
-            t = _c_tibrv_f64(timeout)
-        except:
-            return RVClient.TIBRV_INVALID_ARG
-
-        status = _rv.tibrvQueueGroup_TimedDispatch(que, t)
-
-        return status
-
-
-    ##-----------------------------------------------------------------------------
-    # TIBRV API : tibrv/events.h
-    ##-----------------------------------------------------------------------------
-
-    _rv.tibrvEvent_CreateListener.argtypes = [ctypes.POINTER(_c_tibrvEvent),
-                                            _c_tibrvQueue,
-                                            _c_tibrvEventCallback,
-                                            _c_tibrvTransport,
-                                            _c_tibrv_str,
-                                            ctypes.py_object]
-    _rv.tibrvEvent_CreateListener.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvEvent_CreateListener(queue: tibrvQueue, callback: tibrvEventCallback, transport: tibrvTransport,
-                                subject: str, closure = None) -> (tibrv_status, tibrvEvent):
-
-        if queue is None or queue == 0:
-            return RVClient.TIBRV_INVALID_QUEUE, None
-
-        if callback is None:
-            return RVClient.TIBRV_INVALID_CALLBACK, None
-
-        if transport is None or transport == 0:
-            return RVClient.TIBRV_INVALID_TRANSPORT, None
-
-        if str is None:
-            return RVClient.TIBRV_INVALID_ARG, None
-
-        ev = _c_tibrvEvent(0)
-
-        try:
-            que = _c_tibrvQueue(queue)
-        except:
-            return RVClient.TIBRV_INVALID_QUEUE, None
-
-        try:
-            cb = _c_tibrvEventCallback(callback)
-        except:
-            return RVClient.TIBRV_INVALID_CALLBACK, None
-
-        try:
-            tx = _c_tibrvTransport(transport)
-        except:
-            return RVClient.TIBRV_INVALID_TRANSPORT, None
-
-        try:
-            subj = _cstr(subject)
-            cz = ctypes.py_object(closure)
-        except:
-            return RVClient.TIBRV_INVALID_ARG, None
-
-        status = _rv.tibrvEvent_CreateListener(ctypes.byref(ev), que, cb, tx, subj, cz)
-
-        # save cb to prevent GC
-        if status == RVClient.TIBRV_OK:
-            _reg(ev.value, cb, cz)
-
-        return status, ev.value
-
-
-    ##########################################################
-
-    def __init__(self, service, network, daemon):
-        self.service = service
-        self.network = network
-        self.daemon = daemon
-        self.transport = None
-        self.inbox = None
-        self.connected = False
-
-    def create(self):
-        # Open connection
-        print("Connect...")
-
-        # Open TIB/RV
-        status = self.tibrv_Open()
-        if status != self.TIBRV_OK:
-            print('ERROR tibrv_Open', status, self.tibrvStatus_GetText(status))
-            sys.exit(-1)
-
-        self.version = self.tibrv_Version()
-        print("Version is {}".format(self.version))
-
-
-        # Create network transport
-
-        print("Connect to daemon {}".format(self.daemon))
-        status, self.transport = self.tibrvTransport_Create(self.service, self.network, self.daemon)
-        if status != self.TIBRV_OK:
-            print('ERROR tibrvTransport_Create', status, self.tibrvStatus_GetText(status))
-            self.tibrv_Close()
-            sys.exit(-1)
-
-        # set desctiption
-        self.tibrvTransport_SetDescription(self.transport, "python_transport")
-
-
-        # Create two queues
-        status, self.listenerQueue =  self.tibrvQueue_Create()
-        if status != self.TIBRV_OK:
-            print('ERROR tibrvQueue_Create', status, self.tibrvStatus_GetText(status))
-            sys.exit(-1)
-        status, self.timerQueue =  self.tibrvQueue_Create()
-        if status != self.TIBRV_OK:
-            print('ERROR tibrvQueue_Create', status, self.tibrvStatus_GetText(status))
-            sys.exit(-1)
-
-        # Set queues priority
-        status = self.tibrvQueue_SetPriority(self.listenerQueue, 1)
-        if status != self.TIBRV_OK:
-            print('ERROR tibrvQueue_SetPriority', status, self.tibrvStatus_GetText(status))
-            sys.exit(-1)
-
-        status = self.tibrvQueue_SetPriority(self.timerQueue, 2)
-        if status != self.TIBRV_OK:
-            print('ERROR tibrvQueue_SetPriority', status, self.tibrvStatus_GetText(status))
-            sys.exit(-1)
-
-        # Create queue group
-        status, self.queueGroup =  self.tibrvQueueGroup_Create()
-        if status != self.TIBRV_OK:
-            print('ERROR tibrvQueueGroup_Create', status, self.tibrvStatus_GetText(status))
-            sys.exit(-1)
-
-        # Add queues
-        status = self.tibrvQueueGroup_Add(self.queueGroup, self.listenerQueue)
-        if status != self.TIBRV_OK:
-            print('ERROR tibrvQueueGroup_Add', status, self.tibrvStatus_GetText(status))
-            sys.exit(-1)
-        status = self.tibrvQueueGroup_Add(self.queueGroup, self.timerQueue)
-        if status != self.TIBRV_OK:
-            print('ERROR tibrvQueueGroup_Add', status, self.tibrvStatus_GetText(status))
-            sys.exit(-1)
-
-        # Create client inbox
-        status, self.inbox = self.tibrvTransport_CreateInbox(self.transport)
-        if status != self.TIBRV_OK:
-            print('ERROR tibrvTransport_CreateInbox', status, tibrvStatus_GetText(status))
-            sys.exit(-1)
-
-        closure={}
-        # Listen
-        status, self.listener = self.tibrvEvent_CreateListener(self.timerQueue , self.callback, self.transport, "_RV.>", closure) 
-        if status != self.TIBRV_OK:
-            print('ERROR tibrvcmEvent_CreateListener', status, tibrvStatus_GetText(status))
-            sys.exit(-1)
-
-        status, self.listener = self.tibrvEvent_CreateListener(self.listenerQueue , self.callback, self.transport, self.inbox, closure) 
-        if status != self.TIBRV_OK:
-            print('ERROR tibrvcmEvent_CreateListener', status, tibrvStatus_GetText(status))
-            sys.exit(-1)
-
-
-        print("Listening on: {}".format(self.inbox))
-
-        time.sleep(1)
-
-
-    def destroy(self):
-        # Close all
-
-        if self.transport is None:
-            return
-        
-        print("Disconnect...")
-
-        # Destroy queue group
-        status =  self.tibrvQueueGroup_Destroy(self.queueGroup)
-        if status != self.TIBRV_OK:
-            print('ERROR tibrvQueueGroup_Destroy', status, self.tibrvStatus_GetText(status))
-            sys.exit(-1)
-
-        # Destroy two queues
-        status =  self.tibrvQueue_Destroy(self.listenerQueue)
-        if status != self.TIBRV_OK:
-            print('ERROR tibrvQueue_Destroy', status, self.tibrvStatus_GetText(status))
-            sys.exit(-1)
-        status =  self.tibrvQueue_Destroy(self.timerQueue)
-        if status != self.TIBRV_OK:
-            print('ERROR tibrvQueue_Destroy', status, self.tibrvStatus_GetText(status))
-            sys.exit(-1)
-
-
-        if self.transport is not None:
-            status = self.tibrvTransport_Destroy(self.transport)
-            if status != self.TIBRV_OK:
-                print('ERROR tibrvTransport_Destroy', status, self.tibrvStatus_GetText(status))
-                sys.exit(-1)
-
-        self.transport = None
-
-        status = self.tibrv_Close()
-        if status != self.TIBRV_OK:
-            print('ERROR tibrv_Close', status, self.tibrvStatus_GetText(status))
-            sys.exit(-1)
-
-    def send(self, msgobj) -> bool:
-        if self.transport is None:
-            return False
-        
-        message = msgobj.message
-        if message is None:
-            return False
-
-        print("Send to:", msgobj.subject)
-
-        status = self.tibrvTransport_Send(self.transport, message)
-
-        if status != self.TIBRV_OK:
-            print('ERROR tibrvTransport_Send', status, self.tibrvStatus_GetText(status))
-            sys.exit(-1)
-
-        return True
-
-    def connect(self, host, serv, codifier):
-        self.codifier = codifier
-        self.host = host
-        self.serv = serv
-
-        self.reconnect()
-
-    def reconnect(self):
-
-        self.destroy()
-        self.inbox = ""
-        self.receiver = ""
-        self.create()
-        self.requestConnection()
-
-    def requestConnection(self):
-
-        self.receiver = ""
-
-        # Create Connection message
-        msg = RVMessage()
-
-        # Set subject into message
-        msg.SetSendSubject("OKAPI.INBOX_REQUEST." + self.serv  + "." + self.host)
-
-        # Fill the message
-        msg.AddInt("Type", msg.IDENTIFY_MSG)
-        msg.AddString("Inbox", self.inbox)
-        msg.AddInt("Crypting", 0) # not used
-        msg.AddString("Client name", self.codifier) # use codifier as name
-        msg.AddString("Identity", "") # not used
-        msg.AddInt("Identity type", 1) # unknown
-        msg.AddInt("Okapi version", 0) # not used
-        msg.AddString("Kondor+ version", "2.6.3.L2") # Must be defined !!!
-        msg.AddString("Description", "") # not used
-        msg.AddInt("Timeout", 60) # 1MIN ?
-        msg.AddInt("Messages mode", 2) # RENDEZVOUS
-        msg.AddString("Transport name", "okapi_python_transport")
-        msg.AddInt("Synchronous mode", 1) # Synchronous
-        msg.AddInt("Ack Allowance", 0)
-
-        self.send(msg)
-
-        return self.receiver
-
-    def sendPingMessage(self):
-
-        if self.receiver == "":
-            return
-
-        print("Ping...")
-
-        # Create Connection message
-        msg = RVMessage()
-
-        # Set subject into message
-        msg.SetSendSubject(self.receiver)
-        # Fill the message
-        msg.AddInt("Type", msg.PING_MSG)
-        msg.AddString("Inbox", self.inbox)
-
-        self.send(msg)
-
-        return True
-
-    def status(self, timeout: int):
-        status = self.tibrvQueueGroup_TimedDispatch(self.queueGroup, timeout)
-        return status
-
-    def callback(self, event: tibrvcmEvent, message: tibrvMsg, closure):
-        msg = RVMessage()
-        msg.message = message
-        subj_send = msg.GetSendSubject()
-        subject = subj_send.split(".")
-        # print(subject) #debug
-
-        if subject[0] == "_RV":
-            # System message
-            if subject[1] in ("INFO"):
-                if subject[3] == 'HOST' and subject[4] == 'STATUS':
-                    #send ping after system ping
-                    self.sendPingMessage()
-                # skip info meggage
-                return 
-            if subject[1] in ("WARN"):
-                # skip warn meggage
-                return 
-            elif subject[1] in ("ERROR"):
-                self.connected = False
-                self.reconnect()
-            else:
-                # print other message
-                print("Recieve unknown:", subj_send)
-                return 
-        elif subject[0] == "_INBOX":
-            # User message
-            message_type = msg.GetInt("Type")
-
-            if message_type == msg.IDENTIFY_MSG:
-                error_type = msg.GetInt("ErrorType")
-                error_message = msg.GetString("Reason")
-                if error_type == 0:
-                    print(error_message)
-                    self.receiver = msg.GetString("Inbox")
-                    return
-                elif error_type == 1000:
-                    print("Warning " + str(error_type), error_message)
-                    self.receiver = msg.GetString("Inbox")
-                    return
-                elif error_type == 1001:
-                    print("Error " + str(error_type), error_message + " , check import server client " + self.codifier + " in K+")
-                    return
-                else:
-                    print("Error " + str(error_type), error_message)
-                    return
-            elif message_type == msg.DATA_MSG:
-                print(msg.text)
-            elif message_type == msg.PING_MSG:
-                print("Ping answer")
-                return
-            else:
-                print("Unknown message type", message_type)
-
-            # if MessageType == IDENTIFY_MSG:
-            #     status, error_code = tibrvMsg_GetI32(message, "ErrorType")
-            #     status, error_message = tibrvMsg_GetString(message, "Reason")
-            #     if status == TIBRV_OK:
-            #         if error_code == ICC_ERR_SUCCESSFUL:
-            #             status, self.address = tibrvMsg_GetString(message, "Inbox")
-            #             self.connected = True
-            #         elif error_code == ICC_ERR_ALREADY_CONNECTED:
-            #             status, self.address = tibrvMsg_GetString(message, "Inbox")
-            #             self.connected = True
-            #         else:                
-            #             print("Error {} {}".format(error_code, error_message))
-            # elif MessageType == DATA_MSG:
-            #     status, data_type = tibrvMsg_GetI32(message, "Data Type")
-            #     if status == TIBRV_OK:
-            #         if data_type == ICC_DATA_MSG_TABLE_ACK:
-            #             status, self.address = tibrvMsg_GetString(message, "Inbox")
-            #             self.connected = True
-            #             print("Connection_Acknowledgement")
-            #         elif data_type == ICC_DATA_MSG_ERROR:
-            #             print("Error in message")
-            #         else:
-            #             pass
-            #         status, NumFields = tibrvMsg_GetNumFields(message)
-            #         for i in range(NumFields):
-            #             status, field = tibrvMsg_GetFieldByIndex(message, i)
-            #             print(field)
-            #     else:
-            #         print("Unknown Data Type")
-
-
-
-        print("Recieve:", msg.GetSendSubject(), subject[0], subject[1])
-
+import ctypes
+from typing import NewType, Callable, List, Any, TYPE_CHECKING
+import time
+import heapq
+import itertools
+import threading
+from collections import deque, OrderedDict
+import tibrvbackend
+from tibrvmsglib import RVMessage, TibrvError, TibrvMessageError, TibrvFieldError, TibrvTransportError, TibrvQueueError
+
+if TYPE_CHECKING:
+    # annotations only, imported where they are used
+    import asyncio
+    import concurrent.futures
+
+
+# module variables
+_func = tibrvbackend.functype()     # ctype func cast, OS dependent
+_rv = tibrvbackend.library()        # TIBRV library or in-memory bus, see tibrvbackend
+
+# public API, RVMessage and the errors of tibrvmsglib are re-exported
+__all__ = [
+    "tibrv_status", "tibrvId", "tibrvMsg", "tibrvEvent", "tibrvDispatchable", "tibrvQueue", "tibrvQueueGroup",
+    "tibrvTransport", "tibrvDispatcher", "tibrvEventType", "tibrvQueueLimitPolicy", "tibrvIOType",
+    "tibrvcmTransport", "tibrvcmEvent", "tibrvEventCallback", "tibrvEventVectorCallback", "tibrvEventOnComplete",
+    "tibrvQueueOnComplete", "tibrvQueueHook", "tibrvcmEventCallback",
+    "RequestTable", "DeliveryError", "DeliveryTable", "OutboundBuffer", "AckWindow", "SubjectRouter",
+    "RVClient", "AsyncRVClient", "QueueWorkerPool",
+    "RVMessage", "TibrvError", "TibrvMessageError", "TibrvFieldError", "TibrvTransportError", "TibrvQueueError",
+]
+
+
+##-----------------------------------------------------------------------------
+# CTYPES
+# tibrv/types.h
+##-----------------------------------------------------------------------------
+
+_c_tibrv_status         = ctypes.c_int32
+
+_c_tibrv_i8                  = ctypes.c_int8
+_c_tibrv_u8                  = ctypes.c_uint8
+_c_tibrv_i16                 = ctypes.c_int16
+_c_tibrv_u16                 = ctypes.c_uint16
+_c_tibrv_i32                 = ctypes.c_int32
+_c_tibrv_u32                 = ctypes.c_uint32
+_c_tibrv_i64                 = ctypes.c_int64
+_c_tibrv_u64                 = ctypes.c_uint64
+_c_tibrv_f32                 = ctypes.c_float
+_c_tibrv_f64                 = ctypes.c_double
+_c_tibrv_bool                = ctypes.c_int
+_c_tibrv_ipport16            = ctypes.c_uint16
+_c_tibrv_ipaddr32            = ctypes.c_uint32
+_c_tibrv_str                 = ctypes.c_char_p
+
+_c_tibrv_status              = ctypes.c_int32
+_c_tibrvId                   = ctypes.c_uint32
+_c_tibrvMsg                  = ctypes.c_void_p
+_c_tibrvEvent                = _c_tibrvId
+_c_tibrvDispatchable         = _c_tibrvId
+_c_tibrvQueue                = _c_tibrvDispatchable
+_c_tibrvQueueGroup           = _c_tibrvDispatchable
+_c_tibrvTransport            = _c_tibrvId
+_c_tibrvDispatcher           = _c_tibrvId
+_c_tibrvEventType            = ctypes.c_uint32
+_c_tibrvQueueLimitPolicy     = ctypes.c_int32
+_c_tibrvIOType               = ctypes.c_int32
+_c_tibrvcmTransport          = _c_tibrvId
+_c_tibrvcmEvent              = _c_tibrvId
+
+
+##-----------------------------------------------------------------------------
+# TIBRV Data Types for Python
+##-----------------------------------------------------------------------------
+tibrv_status            = NewType('tibrv_status', int)              # int
+tibrvId                 = NewType('tibrvId', int)                   # int
+tibrvMsg                = NewType('tibrvMsg', int)                  # c_void_p
+tibrvEvent              = NewType('tibrvEvent', int)                # tibrvId
+tibrvDispatchable       = NewType('tibrvDispatchable', int)         # tibrvId
+tibrvQueue              = NewType('tibrvQueue', int)                # tibrvId
+tibrvQueueGroup         = NewType('tibrvQueueGroup', int)           # tibrvId
+tibrvTransport          = NewType('tibrvTransport', int)            # tibrvId
+tibrvDispatcher         = NewType('tibrvDispatcher', int)           # tibrvId
+tibrvEventType          = NewType('tibrvEventType', int)            # enum(int)
+tibrvQueueLimitPolicy   = NewType('tibrvQueueLimitPolicy', int)     # enum(int)
+tibrvIOType             = NewType('tibrvIOType', int)               # enum(int)
+tibrvcmTransport        = NewType('tibrvcmTransport', int)          # tibrvId
+tibrvcmEvent            = NewType('tibrvcmEvent', int)              # tibrvId
+
+
+##-----------------------------------------------------------------------------
+# CALLBACK
+##-----------------------------------------------------------------------------
+tibrvEventCallback          = Callable[[tibrvEvent, tibrvMsg, object], None]
+tibrvEventVectorCallback    = Callable[[List[tibrvMsg], int], None]
+tibrvEventOnComplete        = Callable[[tibrvEvent, object], None]
+tibrvQueueOnComplete        = Callable[[tibrvQueue, object], None]
+tibrvQueueHook              = Callable[[tibrvQueue, object], None]
+tibrvcmEventCallback        = Callable[[tibrvcmEvent, tibrvMsg, object], None]
+_c_tibrvEventCallback       = _func(ctypes.c_void_p, _c_tibrvEvent, _c_tibrvMsg, ctypes.c_void_p)
+_c_tibrvcmEventCallback     = _func(ctypes.c_void_p, _c_tibrvcmEvent, _c_tibrvMsg, ctypes.c_void_p)
+_c_tibrvQueueOnComplete     = _func(None, _c_tibrvQueue, ctypes.c_void_p)
+
+# keep callback/closure object from GC
+# key = tibrvEvent
+__callback = {}
+__closure  = {}
+
+def _reg(event, func, closure):
+    __callback[event] = func
+    if closure is not None:
+        __closure[event] = closure
+
+    return
+
+def _unreg(event):
+    if event in __callback:
+        del __callback[event]
+
+    if event in __closure:
+        del __closure[event]
+
+    return
+
+# tibrvcm library, prototypes are bound on the first certified transport
+_cm = None
+
+def _cmlib():
+    global _cm
+
+    if _cm is not None:
+        return _cm
+
+    lib = tibrvbackend.cm_library()
+
+    lib.tibrvcmTransport_Create.argtypes = [ctypes.POINTER(_c_tibrvcmTransport), _c_tibrvTransport,
+                                            _c_tibrv_str, _c_tibrv_bool, _c_tibrv_str, _c_tibrv_bool, _c_tibrv_str]
+    lib.tibrvcmTransport_Create.restype = _c_tibrv_status
+    lib.tibrvcmTransport_Destroy.argtypes = [_c_tibrvcmTransport]
+    lib.tibrvcmTransport_Destroy.restype = _c_tibrv_status
+    lib.tibrvcmTransport_SetDefaultCMTimeLimit.argtypes = [_c_tibrvcmTransport, _c_tibrv_f64]
+    lib.tibrvcmTransport_SetDefaultCMTimeLimit.restype = _c_tibrv_status
+    lib.tibrvcmTransport_AddListener.argtypes = [_c_tibrvcmTransport, _c_tibrv_str, _c_tibrv_str]
+    lib.tibrvcmTransport_AddListener.restype = _c_tibrv_status
+    lib.tibrvcmTransport_SyncLedger.argtypes = [_c_tibrvcmTransport]
+    lib.tibrvcmTransport_SyncLedger.restype = _c_tibrv_status
+    lib.tibrvcmTransport_Send.argtypes = [_c_tibrvcmTransport, _c_tibrvMsg]
+    lib.tibrvcmTransport_Send.restype = _c_tibrv_status
+    lib.tibrvcmEvent_CreateListener.argtypes = [ctypes.POINTER(_c_tibrvcmEvent), _c_tibrvQueue,
+                                                _c_tibrvcmEventCallback, _c_tibrvcmTransport, _c_tibrv_str,
+                                                ctypes.py_object]
+    lib.tibrvcmEvent_CreateListener.restype = _c_tibrv_status
+    lib.tibrvcmEvent_SetExplicitConfirm.argtypes = [_c_tibrvcmEvent]
+    lib.tibrvcmEvent_SetExplicitConfirm.restype = _c_tibrv_status
+    lib.tibrvcmEvent_ConfirmMsg.argtypes = [_c_tibrvcmEvent, _c_tibrvMsg]
+    lib.tibrvcmEvent_ConfirmMsg.restype = _c_tibrv_status
+    lib.tibrvcmEvent_Destroy.argtypes = [_c_tibrvcmEvent, _c_tibrv_bool]
+    lib.tibrvcmEvent_Destroy.restype = _c_tibrv_status
+    lib.tibrvMsg_GetCMSequence.argtypes = [_c_tibrvMsg, ctypes.POINTER(_c_tibrv_u64)]
+    lib.tibrvMsg_GetCMSequence.restype = _c_tibrv_status
+
+    _cm = lib
+    return _cm
+
+# tibrvcmq library, prototypes are bound on the first distributed queue
+_cmq = None
+
+def _cmqlib():
+    global _cmq
+
+    if _cmq is not None:
+        return _cmq
+
+    lib = tibrvbackend.cmq_library()
+
+    lib.tibrvcmTransport_CreateDistributedQueueEx.argtypes = [ctypes.POINTER(_c_tibrvcmTransport), _c_tibrvTransport,
+                                                            _c_tibrv_str, _c_tibrv_u32, _c_tibrv_u32, _c_tibrv_u32,
+                                                            _c_tibrv_f64, _c_tibrv_f64]
+    lib.tibrvcmTransport_CreateDistributedQueueEx.restype = _c_tibrv_status
+    lib.tibrvcmTransport_SetWorkerTasks.argtypes = [_c_tibrvcmTransport, _c_tibrv_u32]
+    lib.tibrvcmTransport_SetWorkerTasks.restype = _c_tibrv_status
+    lib.tibrvcmTransport_SetWorkerWeight.argtypes = [_c_tibrvcmTransport, _c_tibrv_u32]
+    lib.tibrvcmTransport_SetWorkerWeight.restype = _c_tibrv_status
+
+    _cmq = lib
+    return _cmq
+
+def _cstr(sz: str, codepage = None) -> str:
+    if sz is None:
+        return None
+
+    if codepage is None:
+        return _c_tibrv_str(str(sz).encode())
+    else:
+        return _c_tibrv_str(str(sz).encode(codepage))
+
+def _ret(param: list, val: object = None, size: int = 1) -> None:
+    while len(param) < size:
+        param.append(None)
+
+    if val is None:
+        param[0] = None
+        return
+
+    # assign val -> param[0]
+    if val is not list:
+        param[0] = val
+        return
+
+    # assign val[] -> param[]
+    for i in range(len(param)):
+        if i < len(val):
+            param[i] = val[i]
+        else:
+            param[i] = None
+
+    return
+
+def _pystr(sz: ctypes.c_char_p, codepage = None) -> str:
+    if sz is None:
+        return None
+
+    if type(sz) is bytes:
+        ss = sz
+    elif sz.value is None:
+        return None
+    else:
+        ss = sz.value
+
+    if codepage is None:
+        return ss.decode()
+    else:
+        return ss.decode(codepage)
+
+def _future():
+    # concurrent.futures, asyncio and multiprocessing are imported where they
+    # are used, most of a cold tibrvlib import went to them
+    import concurrent.futures
+    return concurrent.futures.Future()
+
+
+##-----------------------------------------------------------------------------
+# RequestTable class
+##-----------------------------------------------------------------------------
+
+
+class RequestTable():
+
+    # Pending requests with deadlines. In "subject" mode every request gets its
+    # own reply subject <prefix>.<id>, in "fifo" mode answers arriving on the
+    # session inbox resolve requests in send order. Answers for expired
+    # requests are counted as late, answers nobody waits for as orphans.
+
+    SUBJECT = "subject"
+    FIFO = "fifo"
+
+    def __init__(self, mode: str = "fifo", prefix: str = None, keep: int = 10000):
+        if mode not in (self.SUBJECT, self.FIFO):
+            raise ValueError("unknown correlation mode " + str(mode))
+
+        self.mode = mode
+        if prefix is None:
+            import uuid
+            prefix = "PYKIS.REPLY." + uuid.uuid4().hex.upper()
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.pending = {}               # id -> (future, deadline)
+        self.order = deque()            # ids in send order, fifo mode
+        self.deadlines = []             # heap of (deadline, id)
+        self.expiredIds = deque()       # last expired ids, to tell late from orphan answers
+        self.expiredSet = set()
+        self.keep = keep
+
+        self.completed = 0
+        self.expired = 0
+        self.late = 0
+        self.orphans = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def subject(self, id: int) -> str:
+        return self.prefix + "." + str(id)
+
+    def add(self, timeout: float) -> (int, "concurrent.futures.Future"):
+        import concurrent.futures
+        future = concurrent.futures.Future()
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            id = next(self.ids)
+            self.pending[id] = (future, deadline)
+            heapq.heappush(self.deadlines, (deadline, id))
+            if self.mode == self.FIFO:
+                self.order.append(id)
+        return id, future
+
+    def _pop(self, id: int):
+        # with self.lock
+        entry = self.pending.pop(id, None)
+        if entry is None:
+            if id in self.expiredSet:
+                self.late += 1
+            else:
+                self.orphans += 1
+        return entry
+
+    def resolve(self, id: int, message: tibrvMsg) -> bool:
+        with self.lock:
+            entry = self._pop(id)
+        if entry is None:
+            return False
+        return self._complete(entry[0], message)
+
+    def resolveNext(self, message: tibrvMsg) -> bool:
+        with self.lock:
+            if not self.order:
+                self.orphans += 1
+                return False
+            entry = self._pop(self.order.popleft())
+        if entry is None:
+            return False
+        return self._complete(entry[0], message)
+
+    def _complete(self, future: "concurrent.futures.Future", message: tibrvMsg) -> bool:
+        # callback messages are destroyed when the callback returns, keep a copy
+        status, copy = RVMessage.tibrvMsg_CreateCopy(message)
+        if status != RVClient.TIBRV_OK:
+            future.set_exception(RuntimeError('tibrvMsg_CreateCopy {} {}'.format(status, RVClient.tibrvStatus_GetText(status))))
+            return False
+        if not future.set_running_or_notify_cancel():
+            RVMessage.tibrvMsg_Destroy(copy)
+            return False
+        self.completed += 1
+        future.set_result(RVMessage(message=copy))
+        return True
+
+    def fail(self, id: int, error: Exception):
+        with self.lock:
+            entry = self.pending.pop(id, None)
+            if entry is not None and self.mode == self.FIFO:
+                self.order.remove(id)
+        if entry is not None and entry[0].set_running_or_notify_cancel():
+            entry[0].set_exception(error)
+
+    def expire(self, now: float = None) -> int:
+        if not self.deadlines:
+            return 0
+        if now is None:
+            now = time.monotonic()
+        if self.deadlines[0][0] > now:
+            return 0
+
+        expired = []
+        with self.lock:
+            while self.deadlines and self.deadlines[0][0] <= now:
+                deadline, id = heapq.heappop(self.deadlines)
+                entry = self.pending.pop(id, None)
+                if entry is None:
+                    continue
+                # fifo keeps the id in order, its answer is still on the way
+                self.expiredIds.append(id)
+                self.expiredSet.add(id)
+                if len(self.expiredIds) > self.keep:
+                    self.expiredSet.discard(self.expiredIds.popleft())
+                expired.append((id, entry[0]))
+            self.expired += len(expired)
+
+        for id, future in expired:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(TimeoutError("no answer to request {}".format(id)))
+        return len(expired)
+
+    def cancel(self):
+        with self.lock:
+            pending = list(self.pending.values())
+            self.pending.clear()
+            self.order.clear()
+            self.deadlines = []
+        for future, deadline in pending:
+            future.cancel()
+
+    def stats(self) -> dict:
+        return {"pending": len(self.pending), "completed": self.completed, "expired": self.expired,
+                "late": self.late, "orphans": self.orphans}
+
+
+##-----------------------------------------------------------------------------
+# DeliveryTable class
+##-----------------------------------------------------------------------------
+
+
+class DeliveryError(Exception):
+
+    def __init__(self, subject: str, seqno: int, listener: str):
+        super().__init__("certified delivery of {} #{} to {} failed".format(subject, seqno, listener))
+        self.subject = subject
+        self.seqno = seqno
+        self.listener = listener
+
+
+class DeliveryTable():
+
+    # Certified sends waiting for delivery advisories, by (subject, seqno).
+    # A send completes when every registered listener confirmed it
+    # (DELIVERY.COMPLETE), it fails when its time limit expires before
+    # (DELIVERY.FAILED). Advisories may be dispatched before deliver()
+    # registers its future, they are kept until then.
+
+    def __init__(self, keep: int = 10000):
+        self.lock = threading.Lock()
+        self.pending = {}               # (subject, seqno) -> Future
+        self.early = {}                 # (subject, seqno) -> result or DeliveryError
+        self.keep = keep
+
+        self.sent = 0
+        self.confirmed = 0
+        self.completed = 0
+        self.failed = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, subject: str, seqno: int) -> "concurrent.futures.Future":
+        import concurrent.futures
+        future = concurrent.futures.Future()
+        key = (subject, seqno)
+        with self.lock:
+            self.sent += 1
+            if key in self.early:
+                result = self.early.pop(key)
+            else:
+                self.pending[key] = future
+                return future
+        self._set(future, result)
+        return future
+
+    def _set(self, future: "concurrent.futures.Future", result):
+        if not future.set_running_or_notify_cancel():
+            return
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+    def _done(self, key: tuple, result):
+        with self.lock:
+            future = self.pending.pop(key, None)
+            if future is None:
+                if len(self.early) >= self.keep:
+                    self.early.clear()
+                self.early[key] = result
+                return
+        self._set(future, result)
+
+    def confirm(self, subject: str, seqno: int, listener: str):
+        self.confirmed += 1
+
+    def complete(self, subject: str, seqno: int):
+        self.completed += 1
+        self._done((subject, seqno), seqno)
+
+    def fail(self, subject: str, seqno: int, listener: str):
+        self.failed += 1
+        self._done((subject, seqno), DeliveryError(subject, seqno, listener))
+
+    def cancel(self):
+        with self.lock:
+            pending = list(self.pending.values())
+            self.pending.clear()
+        for future in pending:
+            future.cancel()
+
+    def stats(self) -> dict:
+        return {"pending": len(self.pending), "sent": self.sent, "confirmed": self.confirmed,
+                "completed": self.completed, "failed": self.failed}
+
+
+##-----------------------------------------------------------------------------
+# OutboundBuffer class
+##-----------------------------------------------------------------------------
+
+class OutboundBuffer():
+
+    # KIS messages sent and not answered yet, in send order, bounded by count
+    # and bytes. RVClient sends them again after a re-identify. Answers on the
+    # session inbox acknowledge the oldest inbox entry, answers on a reply
+    # subject (correlation "subject") the entry of their request id.
+
+    def __init__(self, limit: int = 10000, maxBytes: int = 64 << 20):
+        self.lock = threading.Lock()
+        self.keys = itertools.count(1)
+        self.fifo = OrderedDict()       # key -> (data, 0), answered on the inbox
+        self.byId = {}                  # request id -> (key, data)
+        self.limit = limit
+        self.maxBytes = maxBytes
+        self.bytes = 0
+
+        self.added = 0
+        self.acked = 0
+        self.refused = 0                # buffer full
+        self.replayed = 0
+
+    def __len__(self):
+        return len(self.fifo) + len(self.byId)
+
+    def add(self, data: bytes, requestId: int = 0) -> bool:
+        # False when the buffer is full, the message must not be sent
+        with self.lock:
+            if len(self) >= self.limit or self.bytes + len(data) > self.maxBytes:
+                self.refused += 1
+                return False
+            key = next(self.keys)
+            if requestId:
+                self.byId[requestId] = (key, data)
+            else:
+                self.fifo[key] = (data, 0)
+            self.bytes += len(data)
+            self.added += 1
+        return True
+
+    def ackNext(self) -> bool:
+        with self.lock:
+            if not self.fifo:
+                return False
+            key, (data, requestId) = self.fifo.popitem(last = False)
+            self.bytes -= len(data)
+            self.acked += 1
+        return True
+
+    def ack(self, requestId: int) -> bool:
+        with self.lock:
+            entry = self.byId.pop(requestId, None)
+            if entry is None:
+                return False
+            self.bytes -= len(entry[1])
+            self.acked += 1
+        return True
+
+    def pending(self) -> list:
+        # (data, request id) in send order
+        with self.lock:
+            entries = [(key, data, 0) for key, (data, requestId) in self.fifo.items()]
+            entries += [(key, data, requestId) for requestId, (key, data) in self.byId.items()]
+        entries.sort(key = lambda entry: entry[0])
+        return [(data, requestId) for key, data, requestId in entries]
+
+    def clear(self):
+        with self.lock:
+            self.fifo.clear()
+            self.byId.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        return {"pending": len(self), "bytes": self.bytes, "added": self.added, "acked": self.acked,
+                "refused": self.refused, "replayed": self.replayed}
+
+
+##-----------------------------------------------------------------------------
+# AckWindow class
+##-----------------------------------------------------------------------------
+
+class AckWindow():
+
+    # Flow control of KIS DATA_MSG: at most allowance messages without an answer
+    # (TABLE_ACK, ERROR or table answer). RVClient announces the allowance in the
+    # IDENTIFY_MSG "Ack Allowance" and dispatches in send() while the window is
+    # full, the sender runs at the pace of the import server.
+
+    def __init__(self, allowance: int = 100, timeout: float = 30.0):
+        self.lock = threading.Lock()
+        self.allowance = allowance
+        self.timeout = timeout          # seconds without an answer before a slot is given up
+        self.outstanding = 0
+
+        self.sent = 0
+        self.acked = 0
+        self.expired = 0
+        self.peak = 0
+        self.waits = 0                  # sends that found the window full
+        self.waited = 0.0               # seconds spent in them
+
+    @property
+    def full(self) -> bool:
+        return self.outstanding >= self.allowance
+
+    def acquire(self):
+        with self.lock:
+            self.outstanding += 1
+            self.sent += 1
+            if self.outstanding > self.peak:
+                self.peak = self.outstanding
+
+    def release(self) -> bool:
+        # an answer, False when nothing was outstanding (answer to a replayed or older message)
+        with self.lock:
+            if self.outstanding == 0:
+                return False
+            self.outstanding -= 1
+            self.acked += 1
+        return True
+
+    def expire(self):
+        with self.lock:
+            if self.outstanding > 0:
+                self.outstanding -= 1
+                self.expired += 1
+
+    def reset(self):
+        # session lost, its answers will not come
+        with self.lock:
+            self.outstanding = 0
+
+    def stats(self) -> dict:
+        return {"allowance": self.allowance, "outstanding": self.outstanding, "sent": self.sent,
+                "acked": self.acked, "expired": self.expired, "peak": self.peak, "waits": self.waits,
+                "waited": self.waited}
+
+
+##-----------------------------------------------------------------------------
+# SubjectRouter class
+##-----------------------------------------------------------------------------
+
+_NOROUTE = object()
+
+class SubjectRouter():
+
+    # Subject pattern -> handler trie. "*" matches one subject element and ">"
+    # the rest of the subject; exact elements win over "*", "*" over ">".
+    # Routed subjects are cached, advisory storms repeat the same subjects.
+
+    def __init__(self, cacheSize: int = 4096):
+        self.root = {}
+        self.cache = {}
+        self.cacheSize = cacheSize
+
+    def add(self, pattern: str, handler):
+        node = self.root
+        for element in pattern.split("."):
+            node = node.setdefault(element, {})
+        node[None] = handler        # None key holds the handler of the node
+        self.cache.clear()
+
+    def route(self, subject: str):
+        handler = self.cache.get(subject, _NOROUTE)
+        if handler is not _NOROUTE:
+            return handler
+
+        handler = self._match(self.root, subject.split("."), 0)
+        if len(self.cache) >= self.cacheSize:
+            self.cache.clear()
+        self.cache[subject] = handler
+        return handler
+
+    def _match(self, node: dict, elements: list, i: int):
+        if i == len(elements):
+            return node.get(None)
+
+        child = node.get(elements[i])
+        if child is not None:
+            handler = self._match(child, elements, i + 1)
+            if handler is not None:
+                return handler
+
+        child = node.get("*")
+        if child is not None:
+            handler = self._match(child, elements, i + 1)
+            if handler is not None:
+                return handler
+
+        child = node.get(">")
+        if child is not None:
+            return child.get(None)
+
+        return None
+
+
+##-----------------------------------------------------------------------------
+# RVClient class
+##-----------------------------------------------------------------------------
+
+
+class RVClient():
+
+    TIBRV_OK                        = 0
+    TIBRV_INIT_FAILURE              = 1
+    TIBRV_INVALID_TRANSPORT         = 2
+    TIBRV_INVALID_ARG               = 3
+    TIBRV_NOT_INITIALIZED           = 4
+    TIBRV_ARG_CONFLICT              = 5
+
+    TIBRV_SERVICE_NOT_FOUND         = 16
+    TIBRV_NETWORK_NOT_FOUND         = 17
+    TIBRV_DAEMON_NOT_FOUND          = 18
+    TIBRV_NO_MEMORY                 = 19
+    TIBRV_INVALID_SUBJECT           = 20
+    TIBRV_DAEMON_NOT_CONNECTED      = 21
+    TIBRV_VERSION_MISMATCH          = 22
+    TIBRV_SUBJECT_COLLISION         = 23
+    TIBRV_VC_NOT_CONNECTED          = 24
+
+    TIBRV_NOT_PERMITTED             = 27
+
+    TIBRV_INVALID_NAME              = 30
+    TIBRV_INVALID_TYPE              = 31
+    TIBRV_INVALID_SIZE              = 32
+    TIBRV_INVALID_COUNT             = 33
+
+    TIBRV_NOT_FOUND                 = 35
+    TIBRV_ID_IN_USE                 = 36
+    TIBRV_ID_CONFLICT               = 37
+    TIBRV_CONVERSION_FAILED         = 38
+    TIBRV_RESERVED_HANDLER          = 39
+    TIBRV_ENCODER_FAILED            = 40
+    TIBRV_DECODER_FAILED            = 41
+    TIBRV_INVALID_MSG               = 42
+    TIBRV_INVALID_FIELD             = 43
+    TIBRV_INVALID_INSTANCE          = 44
+    TIBRV_CORRUPT_MSG               = 45
+    TIBRV_ENCODING_MISMATCH         = 46
+
+    TIBRV_TIMEOUT                   = 50
+    TIBRV_INTR                      = 51
+
+    TIBRV_INVALID_DISPATCHABLE      = 52
+    TIBRV_INVALID_DISPATCHER        = 53
+
+    TIBRV_INVALID_EVENT             = 60
+    TIBRV_INVALID_CALLBACK          = 61
+    TIBRV_INVALID_QUEUE             = 62
+    TIBRV_INVALID_QUEUE_GROUP       = 63
+
+    TIBRV_INVALID_TIME_INTERVAL     = 64
+
+    TIBRV_INVALID_IO_SOURCE         = 65
+    TIBRV_INVALID_IO_CONDITION      = 66
+    TIBRV_SOCKET_LIMIT              = 67
+
+    TIBRV_OS_ERROR                  = 68
+
+    TIBRV_INSUFFICIENT_BUFFER       = 70
+    TIBRV_EOF                       = 71
+    TIBRV_INVALID_FILE              = 72
+    TIBRV_FILE_NOT_FOUND            = 73
+    TIBRV_IO_FAILED                 = 74
+
+    TIBRV_NOT_FILE_OWNER            = 80
+    TIBRV_USERPASS_MISMATCH         = 81
+
+    TIBRV_TOO_MANY_NEIGHBORS        = 90
+    TIBRV_ALREADY_EXISTS            = 91
+
+    TIBRV_PORT_BUSY                 = 100
+    TIBRV_DELIVERY_FAILED           = 101
+    TIBRV_QUEUE_LIMIT               = 102
+
+    TIBRV_INVALID_CONTENT_DESC      = 110
+    TIBRV_INVALID_SERIALIZED_BUFFER = 111
+    TIBRV_DESCRIPTOR_NOT_FOUND      = 115
+    TIBRV_CORRUPT_SERIALIZED_BUFFER = 116
+
+    TIBRV_IPM_ONLY                  = 117
+
+
+    ##-----------------------------------------------------------------------------
+    # TIBRV API : tibrv/status.h
+    ##-----------------------------------------------------------------------------
+
+    _rv.tibrvStatus_GetText.argtypes = [_c_tibrv_status]
+    _rv.tibrvStatus_GetText.restype = ctypes.c_char_p
+
+    @staticmethod
+    def tibrvStatus_GetText(code: tibrv_status) -> str:
+
+        if code is None:
+            return None
+
+        c = _c_tibrv_status(code)
+        sz = _rv.tibrvStatus_GetText(c)
+        return _pystr(sz)
+
+
+    ##-----------------------------------------------------------------------------
+    # TIBRV API : tibrv/tibrv.h
+    ##-----------------------------------------------------------------------------
+
+
+    _rv.tibrv_Open.argtypes = None
+    _rv.tibrv_Open.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrv_Open() -> tibrv_status:
+        status = _rv.tibrv_Open()
+        return status
+
+
+    _rv.tibrv_Close.argtypes = None
+    _rv.tibrv_Close.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrv_Close() -> tibrv_status:
+        status = _rv.tibrv_Close()
+        return status
+
+
+    _rv.tibrv_Version.argtypes = []
+    _rv.tibrv_Version.restype = ctypes.c_char_p
+
+    @staticmethod
+    def tibrv_Version() -> str:
+        sz = _rv.tibrv_Version()
+        return sz.decode()
+
+    _rv.tibrvStatus_GetText.argtypes = [_c_tibrv_status]
+    _rv.tibrvStatus_GetText.restype = ctypes.c_char_p
+
+    ##-----------------------------------------------------------------------------
+    # TIBRV API : tibrv/tport.h
+    ##-----------------------------------------------------------------------------
+
+    _rv.tibrvTransport_Create.argtypes = [ctypes.POINTER(_c_tibrvTransport),
+                                        ctypes.c_char_p,
+                                        ctypes.c_char_p,
+                                        ctypes.c_char_p]
+    _rv.tibrvTransport_Create.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvTransport_Create(service: str, network: str, daemon: str) -> (tibrv_status, tibrvTransport):
+
+        tx = _c_tibrvTransport(0)
+
+        status = _rv.tibrvTransport_Create(ctypes.byref(tx), _cstr(service), _cstr(network), _cstr(daemon))
+
+        return status, tx.value
+
+
+    _rv.tibrvTransport_SetDescription.argtypes = [_c_tibrvTransport, ctypes.c_char_p]
+    _rv.tibrvTransport_SetDescription.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvTransport_SetDescription(transport: tibrvTransport, description: str) -> tibrv_status:
+
+        if transport is None or transport == 0:
+            return RVClient.TIBRV_INVALID_TRANSPORT
+
+        if description is None:
+            return RVClient.TIBRV_INVALID_ARG
+
+        try:
+            tx = _c_tibrvTransport(transport)
+        except:
+            return RVClient.TIBRV_INVALID_TRANSPORT
+
+        try:
+            sz = _cstr(description)
+        except:
+            return RVClient.TIBRV_INVALID_ARG
+
+        status = _rv.tibrvTransport_SetDescription(tx, sz)
+
+        return status
+
+
+    _rv.tibrvTransport_CreateInbox.argtypes = [_c_tibrvTransport, ctypes.c_char_p, _c_tibrv_u32]
+    _rv.tibrvTransport_CreateInbox.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvTransport_CreateInbox(transport: tibrvTransport) -> (tibrv_status, str):
+
+        if transport is None or transport == 0:
+            return RVClient.TIBRV_INVALID_TRANSPORT, None
+
+        try:
+            tx = _c_tibrvTransport(transport)
+        except:
+            return RVClient.TIBRV_INVALID_TRANSPORT, None
+
+        subj = ctypes.create_string_buffer(255) # TIBRV_SUBJECT_MAX
+
+        status = _rv.tibrvTransport_CreateInbox(tx, subj, ctypes.sizeof(subj))
+
+        return status, _pystr(subj)
+
+
+    _rv.tibrvTransport_Destroy.argtypes = [_c_tibrvTransport]
+    _rv.tibrvTransport_Destroy.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvTransport_Destroy(transport: tibrvTransport) -> tibrv_status:
+
+        if transport is None or transport == 0:
+            return RVClient.TIBRV_INVALID_TRANSPORT
+
+        try:
+            tx = _c_tibrvTransport(transport)
+        except:
+            return RVClient.TIBRV_INVALID_TRANSPORT
+
+        status = _rv.tibrvTransport_Destroy(tx)
+
+        return status
+
+    _rv.tibrvTransport_Send.argtypes = [_c_tibrvTransport, _c_tibrvMsg]
+    _rv.tibrvTransport_Send.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvTransport_Send(transport: tibrvTransport, message: tibrvMsg) -> tibrv_status:
+
+        if transport is None or transport == 0:
+            return RVClient.TIBRV_INVALID_TRANSPORT
+
+        if message is None or message == 0:
+            return RVClient.TIBRV_INVALID_MSG
+
+        try:
+            tx = _c_tibrvTransport(transport)
+        except:
+            return RVClient.TIBRV_INVALID_TRANSPORT
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVClient.TIBRV_INVALID_MSG
+
+        status = _rv.tibrvTransport_Send(tx, msg)
+
+        return status
+
+
+    ##-----------------------------------------------------------------------------
+    # TIBRV API : tibrv/queue.h
+    ##-----------------------------------------------------------------------------
+
+    _rv.tibrvQueue_Create.argtypes = [ctypes.POINTER(_c_tibrvQueue)]
+    _rv.tibrvQueue_Create.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvQueue_Create() -> (tibrv_status, tibrvQueue):
+
+        que = _c_tibrvQueue(0)
+
+        status = _rv.tibrvQueue_Create(ctypes.byref(que))
+
+        return status, que.value
+
+    _rv.tibrvQueue_SetPriority.argtypes = [_c_tibrvQueue, _c_tibrv_u32]
+    _rv.tibrvQueue_SetPriority.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvQueue_SetPriority(eventQueue: tibrvQueue, priority: int) -> tibrv_status:
+
+        if eventQueue is None or eventQueue == 0:
+            return RVClient.TIBRV_INVALID_QUEUE
+
+        if priority is None:
+            return RVClient.TIBRV_INVALID_ARG
+
+        try:
+            que = _c_tibrvQueue(eventQueue)
+        except:
+            return RVClient.TIBRV_INVALID_QUEUE
+
+        try:
+            p = _c_tibrv_u32(priority)
+        except:
+            return RVClient.TIBRV_INVALID_ARG
+
+        status = _rv.tibrvQueue_SetPriority(que, p)
+
+        return status
+
+    # tibrvQueueLimitPolicy
+    TIBRVQUEUE_DISCARD_NONE     = 0
+    TIBRVQUEUE_DISCARD_NEW      = 1
+    TIBRVQUEUE_DISCARD_FIRST    = 2
+    TIBRVQUEUE_DISCARD_LAST     = 3
+
+    _rv.tibrvQueue_SetLimitPolicy.argtypes = [_c_tibrvQueue, ctypes.c_int, _c_tibrv_u32, _c_tibrv_u32]
+    _rv.tibrvQueue_SetLimitPolicy.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvQueue_SetLimitPolicy(eventQueue: tibrvQueue, policy: int, maxEvents: int,
+                                  discardAmount: int) -> tibrv_status:
+
+        if eventQueue is None or eventQueue == 0:
+            return RVClient.TIBRV_INVALID_QUEUE
+
+        if policy is None or maxEvents is None or discardAmount is None:
+            return RVClient.TIBRV_INVALID_ARG
+
+        try:
+            que = _c_tibrvQueue(eventQueue)
+        except:
+            return RVClient.TIBRV_INVALID_QUEUE
+
+        try:
+            p = ctypes.c_int(policy)
+            n = _c_tibrv_u32(maxEvents)
+            d = _c_tibrv_u32(discardAmount)
+        except:
+            return RVClient.TIBRV_INVALID_ARG
+
+        status = _rv.tibrvQueue_SetLimitPolicy(que, p, n, d)
+
+        return status
+
+    _rv.tibrvQueue_GetCount.argtypes = [_c_tibrvQueue, ctypes.POINTER(_c_tibrv_u32)]
+    _rv.tibrvQueue_GetCount.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvQueue_GetCount(eventQueue: tibrvQueue) -> (tibrv_status, int):
+
+        if eventQueue is None or eventQueue == 0:
+            return RVClient.TIBRV_INVALID_QUEUE, None
+
+        try:
+            que = _c_tibrvQueue(eventQueue)
+        except:
+            return RVClient.TIBRV_INVALID_QUEUE, None
+
+        n = _c_tibrv_u32(0)
+
+        status = _rv.tibrvQueue_GetCount(que, ctypes.byref(n))
+
+        return status, n.value
+
+
+    _rv.tibrvQueue_DestroyEx.argtypes = [_c_tibrvQueue, ctypes.c_void_p, ctypes.c_void_p]
+    _rv.tibrvQueue_DestroyEx.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvQueue_Destroy(eventQueue: tibrvQueue, callback : tibrvQueueOnComplete = None,
+                        closure = None) -> tibrv_status:
+
+        if eventQueue is None or eventQueue == 0:
+            return RVClient.TIBRV_INVALID_QUEUE
+
+        try:
+            que = _c_tibrvQueue(eventQueue)
+        except:
+            return RVClient.TIBRV_INVALID_QUEUE
+
+        if callback is None:
+            cb = None
+            cz = None
+        else:
+            try:
+                cb = _c_tibrvQueueOnComplete(callback)
+            except:
+                return RVClient.TIBRV_INVALID_CALLBACK
+
+            cz = ctypes.py_object(closure)
+
+        status = _rv.tibrvQueue_DestroyEx(que, cb, cz)
+
+        # THIS MAY CAUSE MEMORY LEAK
+        # if status == TIBRV_OK and callback is not None:
+        #     __reg(eventQueue, cb, closure)
+
+        return status
+
+
+    ##-----------------------------------------------------------------------------
+    # TIBRV API : tibrv/ggroup.h
+    ##-----------------------------------------------------------------------------
+
+
+    _rv.tibrvQueueGroup_Create.argtypes = [ctypes.POINTER(_c_tibrvQueueGroup)]
+    _rv.tibrvQueueGroup_Create.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvQueueGroup_Create() -> (tibrv_status, tibrvQueueGroup):
+
+        grp = _c_tibrvQueue(0)
+
+        status = _rv.tibrvQueueGroup_Create(ctypes.byref(grp))
+
+        return status, grp.value
+
+    # extern tibrv_status
+    # tibrvQueueGroup_Add(
+    #     tibrvQueueGroup             eventQueueGroup,
+    #     tibrvQueue                  eventQueue);
+
+    _rv.tibrvQueueGroup_Add.argtypes = [_c_tibrvQueueGroup, _c_tibrvQueue]
+    _rv.tibrvQueueGroup_Add.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvQueueGroup_Add(grp: tibrvQueueGroup, queue: tibrvQueue) -> (tibrv_status):
+
+        status = _rv.tibrvQueueGroup_Add(grp, queue)
+
+        return status
+
+
+    _rv.tibrvQueueGroup_Destroy.argtypes = [_c_tibrvQueueGroup]
+    _rv.tibrvQueueGroup_Destroy.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvQueueGroup_Destroy(queue: tibrvQueueGroup) -> tibrv_status:
+
+        if queue is None or queue == 0:
+            return RVClient.TIBRV_INVALID_QUEUE_GROUP
+
+        status = _rv.tibrvQueueGroup_Destroy(queue)
+
+        return status
+
+
+    _rv.tibrvQueueGroup_TimedDispatch.argtypes = [_c_tibrvQueueGroup, _c_tibrv_f64]
+    _rv.tibrvQueueGroup_TimedDispatch.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvQueueGroup_TimedDispatch(eventGroup: tibrvQueue, timeout: float) -> tibrv_status:
+
+        if eventGroup is None or eventGroup == 0:
+            return RVClient.TIBRV_INVALID_QUEUE_GROUP
+
+        if timeout is None:
+            return RVClient.TIBRV_INVALID_ARG
+
+        try:
+            que = _c_tibrvQueue(eventGroup)
+        except:
+            return RVClient.TIBRV_INVALID_QUEUE_GROUP
+
+        try:
+            t = _c_tibrv_f64(timeout)
+        except:
+            return RVClient.TIBRV_INVALID_ARG
+
+        status = _rv.tibrvQueueGroup_TimedDispatch(que, t)
+
+        return status
+
+
+    ##-----------------------------------------------------------------------------
+    # TIBRV API : tibrv/events.h
+    ##-----------------------------------------------------------------------------
+
+    _rv.tibrvEvent_CreateListener.argtypes = [ctypes.POINTER(_c_tibrvEvent),
+                                            _c_tibrvQueue,
+                                            _c_tibrvEventCallback,
+                                            _c_tibrvTransport,
+                                            _c_tibrv_str,
+                                            ctypes.py_object]
+    _rv.tibrvEvent_CreateListener.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvEvent_CreateListener(queue: tibrvQueue, callback: tibrvEventCallback, transport: tibrvTransport,
+                                subject: str, closure = None) -> (tibrv_status, tibrvEvent):
+
+        if queue is None or queue == 0:
+            return RVClient.TIBRV_INVALID_QUEUE, None
+
+        if callback is None:
+            return RVClient.TIBRV_INVALID_CALLBACK, None
+
+        if transport is None or transport == 0:
+            return RVClient.TIBRV_INVALID_TRANSPORT, None
+
+        if str is None:
+            return RVClient.TIBRV_INVALID_ARG, None
+
+        ev = _c_tibrvEvent(0)
+
+        try:
+            que = _c_tibrvQueue(queue)
+        except:
+            return RVClient.TIBRV_INVALID_QUEUE, None
+
+        try:
+            cb = _c_tibrvEventCallback(callback)
+        except:
+            return RVClient.TIBRV_INVALID_CALLBACK, None
+
+        try:
+            tx = _c_tibrvTransport(transport)
+        except:
+            return RVClient.TIBRV_INVALID_TRANSPORT, None
+
+        try:
+            subj = _cstr(subject)
+            cz = ctypes.py_object(closure)
+        except:
+            return RVClient.TIBRV_INVALID_ARG, None
+
+        status = _rv.tibrvEvent_CreateListener(ctypes.byref(ev), que, cb, tx, subj, cz)
+
+        # save cb to prevent GC
+        if status == RVClient.TIBRV_OK:
+            _reg(ev.value, cb, cz)
+
+        return status, ev.value
+
+
+    _rv.tibrvEvent_Destroy.argtypes = [_c_tibrvEvent]
+    _rv.tibrvEvent_Destroy.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvEvent_Destroy(event: tibrvEvent) -> tibrv_status:
+
+        if event is None or event == 0:
+            return RVClient.TIBRV_INVALID_EVENT
+
+        try:
+            ev = _c_tibrvEvent(event)
+        except:
+            return RVClient.TIBRV_INVALID_EVENT
+
+        status = _rv.tibrvEvent_Destroy(ev)
+
+        if status == RVClient.TIBRV_OK:
+            _unreg(event)
+
+        return status
+
+
+    ##-----------------------------------------------------------------------------
+    # TIBRV API : tibrv/cm.h, tibrvcm library loaded on first use
+    ##-----------------------------------------------------------------------------
+
+    @staticmethod
+    def tibrvcmTransport_Create(transport: tibrvTransport, cmName: str = None, requestOld: bool = True,
+                                ledgerName: str = None, syncLedger: bool = False,
+                                relayAgent: str = None) -> (tibrv_status, tibrvcmTransport):
+
+        if transport is None or transport == 0:
+            return RVClient.TIBRV_INVALID_TRANSPORT, None
+
+        if ledgerName is not None and cmName is None:
+            # a ledger file needs a persistent correspondent name
+            return RVClient.TIBRV_INVALID_ARG, None
+
+        cm = _c_tibrvcmTransport(0)
+
+        try:
+            tx = _c_tibrvTransport(transport)
+        except:
+            return RVClient.TIBRV_INVALID_TRANSPORT, None
+
+        status = _cmlib().tibrvcmTransport_Create(ctypes.byref(cm), tx, _cstr(cmName), int(bool(requestOld)),
+                                                _cstr(ledgerName), int(bool(syncLedger)), _cstr(relayAgent))
+
+        return status, cm.value
+
+    @staticmethod
+    def tibrvcmTransport_CreateDistributedQueue(transport: tibrvTransport, cmName: str, workerWeight: int = 1,
+                                                workerTasks: int = 1, schedulerWeight: int = 1,
+                                                schedulerHeartbeat: float = 1.0,
+                                                schedulerActivation: float = 3.5) -> (tibrv_status, tibrvcmTransport):
+
+        if transport is None or transport == 0:
+            return RVClient.TIBRV_INVALID_TRANSPORT, None
+
+        if cmName is None:
+            return RVClient.TIBRV_INVALID_ARG, None
+
+        cm = _c_tibrvcmTransport(0)
+
+        try:
+            tx = _c_tibrvTransport(transport)
+        except:
+            return RVClient.TIBRV_INVALID_TRANSPORT, None
+
+        try:
+            args = (_c_tibrv_u32(workerWeight), _c_tibrv_u32(workerTasks), _c_tibrv_u32(schedulerWeight),
+                    _c_tibrv_f64(schedulerHeartbeat), _c_tibrv_f64(schedulerActivation))
+        except:
+            return RVClient.TIBRV_INVALID_ARG, None
+
+        status = _cmqlib().tibrvcmTransport_CreateDistributedQueueEx(ctypes.byref(cm), tx, _cstr(cmName), *args)
+
+        return status, cm.value
+
+    @staticmethod
+    def tibrvcmTransport_SetWorkerTasks(cmTransport: tibrvcmTransport, workerTasks: int) -> tibrv_status:
+
+        if cmTransport is None or cmTransport == 0:
+            return RVClient.TIBRV_INVALID_TRANSPORT
+
+        try:
+            tasks = _c_tibrv_u32(workerTasks)
+        except:
+            return RVClient.TIBRV_INVALID_ARG
+
+        status = _cmqlib().tibrvcmTransport_SetWorkerTasks(_c_tibrvcmTransport(cmTransport), tasks)
+
+        return status
+
+    @staticmethod
+    def tibrvcmTransport_SetWorkerWeight(cmTransport: tibrvcmTransport, workerWeight: int) -> tibrv_status:
+
+        if cmTransport is None or cmTransport == 0:
+            return RVClient.TIBRV_INVALID_TRANSPORT
+
+        try:
+            weight = _c_tibrv_u32(workerWeight)
+        except:
+            return RVClient.TIBRV_INVALID_ARG
+
+        status = _cmqlib().tibrvcmTransport_SetWorkerWeight(_c_tibrvcmTransport(cmTransport), weight)
+
+        return status
+
+    @staticmethod
+    def tibrvcmTransport_Destroy(cmTransport: tibrvcmTransport) -> tibrv_status:
+
+        if cmTransport is None or cmTransport == 0:
+            return RVClient.TIBRV_INVALID_TRANSPORT
+
+        status = _cmlib().tibrvcmTransport_Destroy(_c_tibrvcmTransport(cmTransport))
+
+        return status
+
+    @staticmethod
+    def tibrvcmTransport_SetDefaultCMTimeLimit(cmTransport: tibrvcmTransport, timeLimit: float) -> tibrv_status:
+
+        if cmTransport is None or cmTransport == 0:
+            return RVClient.TIBRV_INVALID_TRANSPORT
+
+        try:
+            t = _c_tibrv_f64(timeLimit)
+        except:
+            return RVClient.TIBRV_INVALID_ARG
+
+        status = _cmlib().tibrvcmTransport_SetDefaultCMTimeLimit(_c_tibrvcmTransport(cmTransport), t)
+
+        return status
+
+    @staticmethod
+    def tibrvcmTransport_AddListener(cmTransport: tibrvcmTransport, cmName: str, subject: str) -> tibrv_status:
+
+        if cmTransport is None or cmTransport == 0:
+            return RVClient.TIBRV_INVALID_TRANSPORT
+
+        if cmName is None or subject is None:
+            return RVClient.TIBRV_INVALID_ARG
+
+        status = _cmlib().tibrvcmTransport_AddListener(_c_tibrvcmTransport(cmTransport), _cstr(cmName), _cstr(subject))
+
+        return status
+
+    @staticmethod
+    def tibrvcmTransport_SyncLedger(cmTransport: tibrvcmTransport) -> tibrv_status:
+
+        if cmTransport is None or cmTransport == 0:
+            return RVClient.TIBRV_INVALID_TRANSPORT
+
+        status = _cmlib().tibrvcmTransport_SyncLedger(_c_tibrvcmTransport(cmTransport))
+
+        return status
+
+    @staticmethod
+    def tibrvcmTransport_Send(cmTransport: tibrvcmTransport, message: tibrvMsg) -> tibrv_status:
+
+        if cmTransport is None or cmTransport == 0:
+            return RVClient.TIBRV_INVALID_TRANSPORT
+
+        if message is None or message == 0:
+            return RVClient.TIBRV_INVALID_MSG
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVClient.TIBRV_INVALID_MSG
+
+        status = _cmlib().tibrvcmTransport_Send(_c_tibrvcmTransport(cmTransport), msg)
+
+        return status
+
+    @staticmethod
+    def tibrvcmEvent_CreateListener(queue: tibrvQueue, callback: tibrvcmEventCallback, cmTransport: tibrvcmTransport,
+                                    subject: str, closure = None) -> (tibrv_status, tibrvcmEvent):
+
+        if queue is None or queue == 0:
+            return RVClient.TIBRV_INVALID_QUEUE, None
+
+        if callback is None:
+            return RVClient.TIBRV_INVALID_CALLBACK, None
+
+        if cmTransport is None or cmTransport == 0:
+            return RVClient.TIBRV_INVALID_TRANSPORT, None
+
+        if subject is None:
+            return RVClient.TIBRV_INVALID_ARG, None
+
+        ev = _c_tibrvcmEvent(0)
+
+        try:
+            que = _c_tibrvQueue(queue)
+        except:
+            return RVClient.TIBRV_INVALID_QUEUE, None
+
+        try:
+            cb = _c_tibrvcmEventCallback(callback)
+        except:
+            return RVClient.TIBRV_INVALID_CALLBACK, None
+
+        try:
+            subj = _cstr(subject)
+            cz = ctypes.py_object(closure)
+        except:
+            return RVClient.TIBRV_INVALID_ARG, None
+
+        status = _cmlib().tibrvcmEvent_CreateListener(ctypes.byref(ev), que, cb, _c_tibrvcmTransport(cmTransport),
+                                                    subj, cz)
+
+        # save cb to prevent GC
+        if status == RVClient.TIBRV_OK:
+            _reg(ev.value, cb, cz)
+
+        return status, ev.value
+
+    @staticmethod
+    def tibrvcmEvent_SetExplicitConfirm(cmListener: tibrvcmEvent) -> tibrv_status:
+
+        if cmListener is None or cmListener == 0:
+            return RVClient.TIBRV_INVALID_EVENT
+
+        status = _cmlib().tibrvcmEvent_SetExplicitConfirm(_c_tibrvcmEvent(cmListener))
+
+        return status
+
+    @staticmethod
+    def tibrvcmEvent_ConfirmMsg(cmListener: tibrvcmEvent, message: tibrvMsg) -> tibrv_status:
+
+        if cmListener is None or cmListener == 0:
+            return RVClient.TIBRV_INVALID_EVENT
+
+        if message is None or message == 0:
+            return RVClient.TIBRV_INVALID_MSG
+
+        status = _cmlib().tibrvcmEvent_ConfirmMsg(_c_tibrvcmEvent(cmListener), _c_tibrvMsg(message))
+
+        return status
+
+    @staticmethod
+    def tibrvcmEvent_Destroy(cmListener: tibrvcmEvent, cancelAgreements: bool = False) -> tibrv_status:
+
+        if cmListener is None or cmListener == 0:
+            return RVClient.TIBRV_INVALID_EVENT
+
+        status = _cmlib().tibrvcmEvent_Destroy(_c_tibrvcmEvent(cmListener), int(bool(cancelAgreements)))
+
+        if status == RVClient.TIBRV_OK:
+            _unreg(cmListener)
+
+        return status
+
+    @staticmethod
+    def tibrvMsg_GetCMSequence(message: tibrvMsg) -> (tibrv_status, int):
+
+        if message is None or message == 0:
+            return RVClient.TIBRV_INVALID_MSG, None
+
+        seqno = _c_tibrv_u64(0)
+
+        status = _cmlib().tibrvMsg_GetCMSequence(_c_tibrvMsg(message), ctypes.byref(seqno))
+
+        return status, seqno.value
+
+
+    ##########################################################
+
+    # connection states, see connect()
+    DISCONNECTED = "DISCONNECTED"   # no transport
+    TRANSPORT_UP = "TRANSPORT_UP"   # transport, queues and inbox listener created
+    IDENTIFYING = "IDENTIFYING"     # IDENTIFY_MSG sent, waiting for the KIS answer
+    READY = "READY"                 # receiver set, KIS takes DATA_MSG
+
+    def __init__(self, service, network, daemon, trace = True, correlation: str = RequestTable.FIFO):
+        self.service = service
+        self.network = network
+        self.daemon = daemon
+        self.trace = trace
+        self.requests = RequestTable(correlation)   # see request()
+        self.transport = None
+        self.inbox = None
+        self.receiver = ""
+        self.connected = False
+        self.state = RVClient.DISCONNECTED
+        self.ready = _future()      # receiver of the IDENTIFY_MSG answer, see connect()
+        self.session = ""           # receiver of the last READY, KIS messages are sent to it
+        self.stale = set()          # receivers of sessions before a recovery, see retarget()
+        self.outbox = None          # OutboundBuffer of unanswered KIS messages, resent after recovery
+        self.window = None          # AckWindow of KIS DATA_MSG in flight, see flowControl()
+        self.limitPolicy = None     # listener queue (policy, maxEvents, discardAmount), see flowControl()
+        self.metrics = None         # tibrvmetrics.Metrics, see enableMetrics()
+        self.backoff = (0.05, 5.0)  # recovery delay, first and max seconds, jittered
+        self.identifyTimeout = 5.0  # seconds before an unanswered IDENTIFY_MSG is sent again
+        self.recovery = None        # monotonic time of the next recovery attempt, see recover()
+        self.attempts = 0
+        self.recoveries = 0
+        self.resend = False         # replay the outbox on the next READY
+        self.dataHandler = None     # called with RVMessage for every DATA_MSG reply
+        self.journal = None         # tibrvjournal.Journal of sent and received KIS messages
+        self.answerIds = deque()    # journal ids of KIS DATA_MSG answered on the inbox, in send order
+        self.certified = None       # certified transport options, see certify()
+        self.cmTransport = None
+        self.deliveries = DeliveryTable()   # see deliver()
+        self.queue = None           # distributed queue options, see joinQueue()
+        self.queueTransport = None
+        self.queueHandler = None
+        self.dispatcher = None      # background dispatch thread, see startDispatcher
+        self.dispatching = False
+        self.dispatched = threading.Condition()
+
+        # callback routing by send subject
+        self.router = SubjectRouter()
+        self.router.add("_RV.INFO.*.HOST.STATUS.>", self.onHostStatus)
+        self.router.add("_RV.INFO.RVCM.DELIVERY.CONFIRM.>", self.onDeliveryConfirm)
+        self.router.add("_RV.INFO.RVCM.DELIVERY.COMPLETE.>", self.onDeliveryComplete)
+        self.router.add("_RV.ERROR.RVCM.DELIVERY.FAILED.>", self.onDeliveryFailed)
+        self.router.add("_RV.ERROR.RVCM.>", self.onUnknownAdvisory)
+        self.router.add("_RV.INFO.SYSTEM.DAEMON.CONNECTED", self.onDaemonConnected)
+        self.router.add("_RV.INFO.>", self.onAdvisory)
+        self.router.add("_RV.WARN.>", self.onAdvisory)
+        self.router.add("_RV.ERROR.>", self.onError)
+        self.router.add("_RV.>", self.onUnknownAdvisory)
+        self.router.add("_INBOX.>", self.onInbox)
+
+    def create(self, retry: bool = False) -> bool:
+        # Open connection, with retry a missing daemon returns False for recover()
+        print("Connect...")
+
+        # Open TIB/RV
+        status = self.tibrv_Open()
+        if status != self.TIBRV_OK:
+            raise TibrvTransportError('tibrv_Open', status)
+
+        self.version = self.tibrv_Version()
+        print("Version is {}".format(self.version))
+
+
+        # Create network transport
+
+        print("Connect to daemon {}".format(self.daemon))
+        status, self.transport = self.tibrvTransport_Create(self.service, self.network, self.daemon)
+        if status != self.TIBRV_OK:
+            self.transport = None
+            self.tibrv_Close()
+            if retry:
+                return False
+            raise TibrvTransportError('tibrvTransport_Create', status)
+
+        # set desctiption
+        self.tibrvTransport_SetDescription(self.transport, "python_transport")
+
+
+        # Create two queues
+        status, self.listenerQueue =  self.tibrvQueue_Create()
+        if status != self.TIBRV_OK:
+            raise TibrvQueueError('tibrvQueue_Create', status)
+        status, self.timerQueue =  self.tibrvQueue_Create()
+        if status != self.TIBRV_OK:
+            raise TibrvQueueError('tibrvQueue_Create', status)
+
+        # Set queues priority
+        status = self.tibrvQueue_SetPriority(self.listenerQueue, 1)
+        if status != self.TIBRV_OK:
+            raise TibrvQueueError('tibrvQueue_SetPriority', status)
+
+        status = self.tibrvQueue_SetPriority(self.timerQueue, 2)
+        if status != self.TIBRV_OK:
+            raise TibrvQueueError('tibrvQueue_SetPriority', status)
+
+        if self.limitPolicy is not None:
+            status = self.tibrvQueue_SetLimitPolicy(self.listenerQueue, *self.limitPolicy)
+            if status != self.TIBRV_OK:
+                raise TibrvQueueError('tibrvQueue_SetLimitPolicy', status)
+
+        # Create queue group
+        status, self.queueGroup =  self.tibrvQueueGroup_Create()
+        if status != self.TIBRV_OK:
+            raise TibrvQueueError('tibrvQueueGroup_Create', status)
+
+        # Add queues
+        status = self.tibrvQueueGroup_Add(self.queueGroup, self.listenerQueue)
+        if status != self.TIBRV_OK:
+            raise TibrvQueueError('tibrvQueueGroup_Add', status)
+        status = self.tibrvQueueGroup_Add(self.queueGroup, self.timerQueue)
+        if status != self.TIBRV_OK:
+            raise TibrvQueueError('tibrvQueueGroup_Add', status)
+
+        # Create client inbox
+        status, self.inbox = self.tibrvTransport_CreateInbox(self.transport)
+        if status != self.TIBRV_OK:
+            raise TibrvTransportError('tibrvTransport_CreateInbox', status)
+
+        closure={}
+        # Listen
+        status, self.listener = self.tibrvEvent_CreateListener(self.timerQueue , self.callback, self.transport, "_RV.>", closure) 
+        if status != self.TIBRV_OK:
+            raise TibrvTransportError('tibrvEvent_CreateListener', status)
+
+        status, self.listener = self.tibrvEvent_CreateListener(self.listenerQueue , self.callback, self.transport, self.inbox, closure) 
+        if status != self.TIBRV_OK:
+            raise TibrvTransportError('tibrvEvent_CreateListener', status)
+
+        if self.requests.mode == RequestTable.SUBJECT:
+            # answers to request() on per-request reply subjects
+            status, self.replyListener = self.tibrvEvent_CreateListener(self.listenerQueue, self.replyCallback,
+                                                                    self.transport, self.requests.prefix + ".>", closure)
+            if status != self.TIBRV_OK:
+                raise TibrvTransportError('tibrvEvent_CreateListener', status)
+
+        if self.certified is not None:
+            self.createCertified()
+
+        if self.queue is not None:
+            self.createQueue()
+
+
+        print("Listening on: {}".format(self.inbox))
+
+        self.state = RVClient.TRANSPORT_UP
+        return True
+
+
+    def destroy(self):
+        # Close all, a failing call does not stop the cleanup, the first error is raised at the end
+
+        if self.transport is None:
+            return
+
+        if threading.current_thread() is not self.dispatcher:
+            self.stopDispatcher()
+        
+        print("Disconnect...")
+        errors = []
+
+        # Destroy certified transport, the ledger keeps unconfirmed messages
+        if self.cmTransport is not None:
+            status = self.tibrvcmTransport_Destroy(self.cmTransport)
+            if status != self.TIBRV_OK:
+                errors.append(TibrvTransportError('tibrvcmTransport_Destroy', status))
+            self.cmTransport = None
+
+        if self.queueTransport is not None:
+            status = self.tibrvcmTransport_Destroy(self.queueTransport)
+            if status != self.TIBRV_OK:
+                errors.append(TibrvTransportError('tibrvcmTransport_Destroy', status))
+            self.queueTransport = None
+
+        # Destroy queue group
+        status =  self.tibrvQueueGroup_Destroy(self.queueGroup)
+        if status != self.TIBRV_OK:
+            errors.append(TibrvQueueError('tibrvQueueGroup_Destroy', status))
+
+        # Destroy two queues
+        status =  self.tibrvQueue_Destroy(self.listenerQueue)
+        if status != self.TIBRV_OK:
+            errors.append(TibrvQueueError('tibrvQueue_Destroy', status))
+        status =  self.tibrvQueue_Destroy(self.timerQueue)
+        if status != self.TIBRV_OK:
+            errors.append(TibrvQueueError('tibrvQueue_Destroy', status))
+
+
+        if self.transport is not None:
+            # an invalid transport went away with the daemon, see recover()
+            status = self.tibrvTransport_Destroy(self.transport)
+            if status not in (self.TIBRV_OK, self.TIBRV_INVALID_TRANSPORT):
+                errors.append(TibrvTransportError('tibrvTransport_Destroy', status))
+
+        self.transport = None
+        self.state = RVClient.DISCONNECTED
+        self.connected = False
+
+        status = self.tibrv_Close()
+        if status != self.TIBRV_OK:
+            errors.append(TibrvTransportError('tibrv_Close', status))
+
+        if errors:
+            raise errors[0]
+
+    def send(self, msgobj, requestId: int = 0) -> bool:
+        message = msgobj.message
+        if message is None:
+            return False
+
+        # KIS messages go to the outbox even while recover() has no transport
+        kis = self.outbox is not None and bool(msgobj.subject) and msgobj.subject in (self.receiver, self.session)
+        if self.transport is None and not kis:
+            return False
+
+        if self.trace:
+            print("Send to:", msgobj.subject)
+
+        if self.stale and msgobj.subject in self.stale and self.state == RVClient.READY:
+            self.retarget(msgobj, requestId)
+
+        # the answer id is taken before the send, the journal records once the
+        # message is kept by the outbox or sent
+        answerId = 0
+        if self.journal is not None:
+            answerId = self.answered(msgobj, requestId)
+
+        buffered = False
+        if kis:
+            # KIS message, kept until its answer
+            reply = requestId if self.requests.mode == RequestTable.SUBJECT else 0
+            data = msgobj.AsBytes()
+            if not self.outbox.add(data, reply):
+                self.unanswered(answerId)
+                return False
+            buffered = True
+            if self.journal is not None:
+                # the wire bytes of the outbox, not serialised a second time
+                self.journal.append(self.journal.OUT, msgobj.subject, data, answerId or requestId)
+            if self.transport is None or self.state != RVClient.READY:
+                # goes out with the replay after the re-identify
+                return True
+
+        metrics = self.metrics
+        kind = None
+        if ((self.window is not None or metrics is not None) and msgobj.subject
+                and msgobj.subject in (self.receiver, self.session)):
+            status, kind = RVMessage.tibrvMsg_GetI32(message, "Type")
+            if status == self.TIBRV_OK and kind == RVMessage.DATA_MSG:
+                if self.window is not None:
+                    self.waitWindow()
+                    self.window.acquire()
+                if metrics is not None:
+                    metrics.sent(requestId if self.requests.mode == RequestTable.SUBJECT else 0)
+            elif status != self.TIBRV_OK:
+                kind = None
+
+        if metrics is None:
+            status = self.transmit(message)
+        else:
+            start = time.perf_counter_ns()
+            status = self.transmit(message)
+            metrics.record("send", time.perf_counter_ns() - start)
+            metrics.count(metrics.OUT, message, msgobj.subject, kind)
+        if status in (self.TIBRV_DAEMON_NOT_CONNECTED, self.TIBRV_INVALID_TRANSPORT):
+            print('ERROR send', status, self.tibrvStatus_GetText(status))
+            self.lost()
+            if not buffered:
+                self.unanswered(answerId)
+            return buffered
+
+        if status != self.TIBRV_OK:
+            self.unanswered(answerId)
+            raise TibrvTransportError('tibrvTransport_Send', status)
+
+        if self.journal is not None and not buffered:
+            self.journal.record(self.journal.OUT, message, msgobj.subject, answerId or requestId)
+
+        return True
+
+    def answered(self, msgobj, requestId: int) -> int:
+        # journal id of a KIS DATA_MSG answered on the inbox in send order (plain
+        # sends and fifo requests), 0 for everything else. Plain sends take an id
+        # of the request sequence, so journal.find() works for them too.
+        if not msgobj.subject or msgobj.subject not in (self.receiver, self.session):
+            return 0
+        if requestId and self.requests.mode == RequestTable.SUBJECT:
+            return 0
+        status, kind = RVMessage.tibrvMsg_GetI32(msgobj.message, "Type")
+        if status != self.TIBRV_OK or kind != RVMessage.DATA_MSG:
+            return 0
+        answerId = requestId or next(self.requests.ids)
+        self.answerIds.append(answerId)
+        return answerId
+
+    def unanswered(self, answerId: int):
+        # not sent, no answer will come for it
+        if answerId:
+            try:
+                self.answerIds.remove(answerId)
+            except ValueError:
+                pass
+
+    def retarget(self, msgobj, requestId: int = 0):
+        # KIS message built for a session before the recovery, e.g. by a template
+        if msgobj.subject != self.receiver:
+            msgobj.SetSendSubject(self.receiver)
+        if requestId == 0 or self.requests.mode == RequestTable.FIFO:
+            status, inbox = RVMessage.tibrvMsg_GetString(msgobj.message, "Inbox")
+            if status == self.TIBRV_OK and inbox != self.inbox:
+                msgobj.UpdateString("Inbox", self.inbox)
+
+    def flowControl(self, allowance: int, timeout: float = 30.0, policy: int = 0, maxEvents: int = 0,
+                    discardAmount: int = 0):
+        # windowed mode: up to allowance KIS DATA_MSG without an answer, announced
+        # as "Ack Allowance" by the next IDENTIFY_MSG. allowance 0 is the default
+        # synchronous mode. policy bounds the listener queue, TIBRVQUEUE_DISCARD_*
+        self.window = AckWindow(allowance, timeout) if allowance > 0 else None
+        if policy == self.TIBRVQUEUE_DISCARD_NONE:
+            maxEvents = discardAmount = 0
+        self.limitPolicy = (policy, maxEvents, discardAmount)
+        if self.transport is not None:
+            status = self.tibrvQueue_SetLimitPolicy(self.listenerQueue, *self.limitPolicy)
+            if status != self.TIBRV_OK:
+                raise TibrvQueueError('tibrvQueue_SetLimitPolicy', status)
+
+    def enableMetrics(self, metrics = None):
+        # latency histograms and message counters, see tibrvmetrics. rv.metrics = None
+        # turns them off again, the hot paths then only test the attribute
+        if metrics is None:
+            from tibrvmetrics import Metrics
+            metrics = Metrics()
+        metrics.sampler = self.sampleQueues
+        self.metrics = metrics
+        return metrics
+
+    def sampleQueues(self, metrics):
+        for name, queue in (("listener", self.listenerQueue), ("timer", self.timerQueue)):
+            if self.transport is None:
+                break
+            status, count = self.tibrvQueue_GetCount(queue)
+            if status == self.TIBRV_OK:
+                metrics.depth(name, count)
+
+    def timedDispatch(self, timeout: float) -> tibrv_status:
+        # TimedDispatch of the queue group, measured when metrics are on
+        metrics = self.metrics
+        if metrics is None:
+            return self.tibrvQueueGroup_TimedDispatch(self.queueGroup, timeout)
+
+        start = time.perf_counter_ns()
+        status = self.tibrvQueueGroup_TimedDispatch(self.queueGroup, timeout)
+        if status == self.TIBRV_OK:
+            metrics.record("dispatch", time.perf_counter_ns() - start)
+            metrics.dispatched += 1
+            if metrics.dispatched % metrics.sampleEvery == 0:
+                self.sampleQueues(metrics)
+        return status
+
+    def waitWindow(self):
+        # dispatch until the window has a free slot, after window.timeout without
+        # an answer the oldest slot is given up
+        window = self.window
+        if not window.full or threading.current_thread() is self.dispatcher:
+            return
+
+        start = time.perf_counter()
+        deadline = start + window.timeout
+        while window.full:
+            left = deadline - time.perf_counter()
+            if left <= 0:
+                window.expire()
+                break
+            if self.status(min(left, 1.0)) not in (self.TIBRV_OK, self.TIBRV_TIMEOUT):
+                break
+        window.waits += 1
+        window.waited += time.perf_counter() - start
+
+    def transmit(self, message: tibrvMsg) -> tibrv_status:
+        if self.cmTransport is not None:
+            return self.tibrvcmTransport_Send(self.cmTransport, message)
+        return self.tibrvTransport_Send(self.transport, message)
+
+    def certify(self, name: str, ledger: str = None, syncLedger: bool = False, timeLimit: float = 0.0,
+                relayAgent: str = None, requestOld: bool = True):
+        # send through a certified (tibrvcm) transport from now on and after every reconnect.
+        # name is the persistent correspondent name, ledger a file that keeps unconfirmed
+        # messages across restarts, syncLedger writes it on every send.
+        self.certified = (name, ledger, syncLedger, timeLimit, relayAgent, requestOld)
+        if self.transport is not None and self.cmTransport is None:
+            self.createCertified()
+
+    def createCertified(self):
+        name, ledger, syncLedger, timeLimit, relayAgent, requestOld = self.certified
+
+        status, self.cmTransport = self.tibrvcmTransport_Create(self.transport, name, requestOld, ledger,
+                                                                syncLedger, relayAgent)
+        if status != self.TIBRV_OK:
+            raise TibrvTransportError('tibrvcmTransport_Create', status)
+
+        if timeLimit > 0:
+            status = self.tibrvcmTransport_SetDefaultCMTimeLimit(self.cmTransport, timeLimit)
+            if status != self.TIBRV_OK:
+                raise TibrvTransportError('tibrvcmTransport_SetDefaultCMTimeLimit', status)
+
+    def joinQueue(self, name: str, subject: str, handler, workerTasks: int = 1, workerWeight: int = 1,
+                schedulerWeight: int = 1):
+        # join distributed queue name as a worker, also after every reconnect. Of all
+        # workers of the queue listening on subject exactly one gets each message.
+        # handler is called with an RVMessage view, workerTasks messages at a time.
+        self.queue = (name, subject, workerTasks, workerWeight, schedulerWeight)
+        self.queueHandler = handler
+        if self.transport is not None and self.queueTransport is None:
+            self.createQueue()
+
+    def createQueue(self):
+        name, subject, workerTasks, workerWeight, schedulerWeight = self.queue
+
+        status, self.queueTransport = self.tibrvcmTransport_CreateDistributedQueue(self.transport, name, workerWeight,
+                                                                                workerTasks, schedulerWeight)
+        if status != self.TIBRV_OK:
+            raise TibrvTransportError('tibrvcmTransport_CreateDistributedQueueEx', status)
+
+        status, self.queueListener = self.tibrvcmEvent_CreateListener(self.listenerQueue, self.queueCallback,
+                                                                    self.queueTransport, subject, {})
+        if status != self.TIBRV_OK:
+            raise TibrvTransportError('tibrvcmEvent_CreateListener', status)
+
+    def queueCallback(self, event: tibrvcmEvent, message: tibrvMsg, closure):
+        self.queueHandler(RVMessage.view(message))
+
+    def addCertifiedListener(self, name: str, subject: str):
+        # expect certified listener name on subject before it registers, the
+        # ledger keeps its messages while it is away
+        status = self.tibrvcmTransport_AddListener(self.cmTransport, name, subject)
+        if status != self.TIBRV_OK:
+            raise TibrvTransportError('tibrvcmTransport_AddListener', status)
+
+    def deliver(self, msgobj) -> "concurrent.futures.Future":
+        # certified send, the future gets the sequence number once every registered
+        # listener confirmed the message or DeliveryError when its time limit expired
+        if self.cmTransport is None:
+            raise ConnectionError("no certified transport, see certify()")
+
+        if (self.outbox is not None and self.state != RVClient.READY and msgobj.subject
+                and msgobj.subject in (self.receiver, self.session)):
+            # send() would only keep it in the outbox, there is no sequence number to track
+            raise ConnectionError("KIS session not READY, certified message not sent")
+        if not self.send(msgobj):
+            raise ConnectionError("not connected, certified message not sent")
+
+        status, seqno = self.tibrvMsg_GetCMSequence(msgobj.message)
+        if status == self.TIBRV_NOT_FOUND:
+            # the daemon went away during the send, the outbox replays it untracked
+            raise ConnectionError("connection lost, certified message not sent")
+        if status != self.TIBRV_OK:
+            raise TibrvMessageError('tibrvMsg_GetCMSequence', status)
+
+        return self.deliveries.add(msgobj.subject, seqno)
+
+    def request(self, msgobj, timeout: float = 30.0) -> "concurrent.futures.Future":
+        # send msgobj, the future gets a copy of the answer or TimeoutError
+        id, future = self.requests.add(timeout)
+
+        if self.requests.mode == RequestTable.SUBJECT:
+            subject = self.requests.subject(id)
+            msgobj.UpdateString("Inbox", subject)
+            msgobj.SetReplySubject(subject)
+
+        if not self.send(msgobj, id):
+            self.requests.fail(id, ConnectionError("not connected"))
+
+        return future
+
+    def connect(self, host, serv, codifier) -> "concurrent.futures.Future":
+        # create the transport and send IDENTIFY_MSG, the future gets the KIS
+        # receiver inbox as soon as the answer is dispatched, see waitReady()
+        self.codifier = codifier
+        self.host = host
+        self.serv = serv
+
+        return self.reconnect()
+
+    def reconnect(self) -> "concurrent.futures.Future":
+
+        # a pending handshake carries over, its waiters get the new receiver
+        if self.ready.done():
+            self.ready = _future()
+
+        self.recovery = None
+        self.resend = True
+        self.destroy()
+        self.inbox = ""
+        self.receiver = ""
+        self.create()
+        self.requestConnection()
+        return self.ready
+
+    def lost(self):
+        # session gone, recover() takes over outside the dispatch callbacks
+        self.connected = False
+        if self.window is not None:
+            self.window.reset()
+        if self.metrics is not None:
+            self.metrics.lost()
+        if self.outbox is None:
+            # nothing is resent, their answers will not come
+            self.answerIds.clear()
+        if self.state in (RVClient.READY, RVClient.IDENTIFYING):
+            self.state = RVClient.TRANSPORT_UP
+        if self.ready.done():
+            self.ready = _future()
+        self.resend = True
+        if self.recovery is None:
+            self.attempts = 0
+            self.recovery = time.monotonic()
+
+    def recover(self):
+        # re-identify on the surviving transport, or create a new one when it is
+        # gone. Attempts repeat with jittered exponential backoff until READY.
+        now = time.monotonic()
+        if self.recovery is None or now < self.recovery:
+            return
+
+        self.attempts += 1
+        self.recoveries += 1
+        first, most = self.backoff
+        delay = min(most, first * 2 ** min(self.attempts - 1, 16))
+        import random
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        self.recovery = now + delay
+
+        if self.transport is not None:
+            status, inbox = self.tibrvTransport_CreateInbox(self.transport)
+            if status == self.TIBRV_INVALID_TRANSPORT:
+                self.destroy()
+
+        if self.transport is None:
+            # new inbox, messages built for the old one need retarget()
+            if self.session:
+                self.stale.add(self.session)
+            self.inbox = ""
+            if not self.create(retry = True):
+                return
+            self.state = RVClient.TRANSPORT_UP
+
+        self.requestConnection()
+        if self.state == RVClient.IDENTIFYING:
+            # sent, give KIS time to answer before the next IDENTIFY_MSG
+            self.recovery = now + max(delay, self.identifyTimeout)
+
+    def replay(self) -> int:
+        # send the unanswered KIS messages again, to the new receiver and inbox
+        count = 0
+        for data, requestId in self.outbox.pending():
+            msg = RVMessage.FromBytes(data)
+            if requestId == 0:
+                msg.UpdateString("Inbox", self.inbox)
+            msg.SetSendSubject(self.receiver)
+            status = self.transmit(msg.message)
+            msg.close()
+            if status != self.TIBRV_OK:
+                self.lost()
+                break
+            if self.window is not None:
+                self.window.acquire()
+            count += 1
+        self.outbox.replayed += count
+        return count
+
+    def waitReady(self, timeout: float = 30.0) -> str:
+        # dispatch until the IDENTIFY_MSG answer, returns the receiver or "" on
+        # timeout and rejected connection
+        deadline = time.perf_counter() + timeout
+        while not self.ready.done():
+            left = deadline - time.perf_counter()
+            if left <= 0:
+                break
+            if self.status(min(left, 1.0)) not in (self.TIBRV_OK, self.TIBRV_TIMEOUT):
+                break
+        return self.receiver
+
+    def requestConnection(self):
+
+        self.receiver = ""
+        self.state = RVClient.IDENTIFYING
+
+        # Create Connection message
+        msg = RVMessage()
+
+        # Set subject into message
+        msg.SetSendSubject("OKAPI.INBOX_REQUEST." + self.serv  + "." + self.host)
+
+        # Fill the message
+        msg.AddInt("Type", msg.IDENTIFY_MSG)
+        msg.AddString("Inbox", self.inbox)
+        msg.AddInt("Crypting", 0) # not used
+        msg.AddString("Client name", self.codifier) # use codifier as name
+        msg.AddString("Identity", "") # not used
+        msg.AddInt("Identity type", 1) # unknown
+        msg.AddInt("Okapi version", 0) # not used
+        msg.AddString("Kondor+ version", "2.6.3.L2") # Must be defined !!!
+        msg.AddString("Description", "") # not used
+        msg.AddInt("Timeout", 60) # 1MIN ?
+        msg.AddInt("Messages mode", 2) # RENDEZVOUS
+        msg.AddString("Transport name", "okapi_python_transport")
+        allowance = self.window.allowance if self.window is not None else 0
+        msg.AddInt("Synchronous mode", 0 if allowance else 1) # Synchronous unless windowed, see flowControl()
+        msg.AddInt("Ack Allowance", allowance)
+
+        self.send(msg)
+
+        return self.receiver
+
+    def sendPingMessage(self):
+
+        if self.receiver == "":
+            return
+
+        print("Ping...")
+
+        # Create Connection message
+        msg = RVMessage()
+
+        # Set subject into message
+        msg.SetSendSubject(self.receiver)
+        # Fill the message
+        msg.AddInt("Type", msg.PING_MSG)
+        msg.AddString("Inbox", self.inbox)
+
+        self.send(msg)
+
+        return True
+
+    def status(self, timeout: int):
+        self.requests.expire()
+        if self.recovery is not None and self.dispatcher is None:
+            self.recover()
+
+        if self.dispatcher is not None:
+            # the dispatcher thread owns the queue group, wait for its next event
+            with self.dispatched:
+                if self.dispatched.wait(timeout):
+                    return self.TIBRV_OK
+            return self.TIBRV_TIMEOUT
+
+        status = self.timedDispatch(timeout)
+        return status
+
+    def startDispatcher(self, timeout: float = 0.5):
+        # drain the queue group from a background thread, the ctypes call
+        # releases the GIL while it waits in TimedDispatch
+        if self.dispatcher is not None:
+            return
+
+        self.dispatching = True
+        self.dispatcher = threading.Thread(target=self.dispatch, args=(timeout,), name="RVDispatcher", daemon=True)
+        self.dispatcher.start()
+
+    def stopDispatcher(self):
+        if self.dispatcher is None:
+            return
+
+        self.dispatching = False
+        self.dispatcher.join()
+        self.dispatcher = None
+
+    def dispatch(self, timeout: float):
+        while self.dispatching:
+            self.requests.expire()
+            if self.recovery is not None:
+                self.recover()
+            status = self.timedDispatch(timeout)
+            if status == self.TIBRV_OK:
+                with self.dispatched:
+                    self.dispatched.notify_all()
+            elif status != self.TIBRV_TIMEOUT:
+                # queue group is being recreated by reconnect
+                time.sleep(timeout)
+
+    def replyCallback(self, event: tibrvEvent, message: tibrvMsg, closure):
+        status, subject = RVMessage.tibrvMsg_GetSendSubject(message)
+        if status != self.TIBRV_OK:
+            return
+
+        try:
+            id = int(subject[len(self.requests.prefix) + 1:])
+        except ValueError:
+            self.requests.orphans += 1
+            return
+
+        if self.journal is not None:
+            self.journal.record(self.journal.IN, message, subject, id)
+
+        if self.outbox is not None:
+            self.outbox.ack(id)
+        if self.window is not None:
+            self.window.release()
+        if self.metrics is not None:
+            self.metrics.answered(id)
+            self.metrics.count(self.metrics.IN, message, subject)
+
+        self.requests.resolve(id, message)
+
+    def callback(self, event: tibrvcmEvent, message: tibrvMsg, closure):
+        status, subject = RVMessage.tibrvMsg_GetSendSubject(message)
+        if status != self.TIBRV_OK:
+            return
+
+        handler = self.router.route(subject)
+        if handler is None:
+            print("Recieve:", subject)
+            return
+
+        metrics = self.metrics
+        if metrics is None:
+            handler(subject, message)
+            return
+
+        start = time.perf_counter_ns()
+        handler(subject, message)
+        metrics.record("callback", time.perf_counter_ns() - start)
+        metrics.count(metrics.IN, message, subject)
+
+    def onHostStatus(self, subject: str, message: tibrvMsg):
+        #send ping after system ping
+        self.sendPingMessage()
+
+    def onAdvisory(self, subject: str, message: tibrvMsg):
+        # skip info and warn meggage
+        return
+
+    def _deliveryAdvisory(self, subject: str, message: tibrvMsg) -> (str, int):
+        # certified subject and sequence number of an RVCM delivery advisory
+        status, seqno = RVMessage.tibrvMsg_GetU64(message, "seqno")
+        if status != self.TIBRV_OK:
+            return None, None
+        return subject.split(".", 5)[5], seqno
+
+    def onDeliveryConfirm(self, subject: str, message: tibrvMsg):
+        subject, seqno = self._deliveryAdvisory(subject, message)
+        if subject is not None:
+            status, listener = RVMessage.tibrvMsg_GetString(message, "listener")
+            self.deliveries.confirm(subject, seqno, listener)
+
+    def onDeliveryComplete(self, subject: str, message: tibrvMsg):
+        subject, seqno = self._deliveryAdvisory(subject, message)
+        if subject is not None:
+            self.deliveries.complete(subject, seqno)
+
+    def onDeliveryFailed(self, subject: str, message: tibrvMsg):
+        subject, seqno = self._deliveryAdvisory(subject, message)
+        if subject is not None:
+            status, listener = RVMessage.tibrvMsg_GetString(message, "listener")
+            self.deliveries.fail(subject, seqno, listener)
+
+    def onError(self, subject: str, message: tibrvMsg):
+        # no reconnect here, it would destroy the queue this callback runs on
+        self.lost()
+
+    def onDaemonConnected(self, subject: str, message: tibrvMsg):
+        # transport is back, recover at once instead of after the backoff
+        if self.recovery is not None:
+            self.recovery = time.monotonic()
+
+    def onUnknownAdvisory(self, subject: str, message: tibrvMsg):
+        # print other message
+        print("Recieve unknown:", subject)
+
+    def onReady(self, receiver: str):
+        if self.session and self.session != receiver:
+            self.stale.add(self.session)
+        self.receiver = receiver
+        self.session = receiver
+        self.state = RVClient.READY
+        self.connected = True
+        self.recovery = None
+        self.attempts = 0
+        if self.resend and self.outbox is not None:
+            self.replay()
+        self.resend = False
+        if not self.ready.done():
+            self.ready.set_result(receiver)
+
+    def onRejected(self, error_type: int, error_message: str):
+        # KIS refused the session, the transport stays up for a later reconnect
+        self.state = RVClient.TRANSPORT_UP
+        if not self.ready.done():
+            self.ready.set_exception(ConnectionError("IDENTIFY_MSG error {} {}".format(error_type, error_message)))
+
+    def onInbox(self, subject: str, message: tibrvMsg):
+        # User message, the view borrows the callback message
+        msg = RVMessage.view(message)
+        message_type = msg.GetInt("Type")
+
+        if self.journal is not None:
+            answerId = 0
+            if message_type == msg.DATA_MSG and self.answerIds:
+                answerId = self.answerIds.popleft()
+            self.journal.record(self.journal.IN, message, subject, answerId)
+
+        if message_type == msg.IDENTIFY_MSG:
+            error_type = msg.GetInt("ErrorType")
+            error_message = msg.GetString("Reason")
+            if error_type == 0:
+                print(error_message)
+                self.onReady(msg.GetString("Inbox"))
+            elif error_type == 1000:
+                print("Warning " + str(error_type), error_message)
+                self.onReady(msg.GetString("Inbox"))
+            elif error_type == 1001:
+                print("Error " + str(error_type), error_message + " , check import server client " + self.codifier + " in K+")
+                self.onRejected(error_type, error_message)
+            else:
+                print("Error " + str(error_type), error_message)
+                self.onRejected(error_type, error_message)
+        elif message_type == msg.DATA_MSG:
+            if self.outbox is not None:
+                self.outbox.ackNext()
+            if self.window is not None:
+                self.window.release()
+            if self.metrics is not None:
+                self.metrics.answered()
+            if self.dataHandler is not None:
+                self.dataHandler(msg)
+                return
+            self.requests.resolveNext(message)
+        elif message_type == msg.PING_MSG:
+            print("Ping answer")
+        else:
+            print("Unknown message type", message_type)
+
+        # if MessageType == IDENTIFY_MSG:
+        #     status, error_code = tibrvMsg_GetI32(message, "ErrorType")
+        #     status, error_message = tibrvMsg_GetString(message, "Reason")
+        #     if status == TIBRV_OK:
+        #         if error_code == ICC_ERR_SUCCESSFUL:
+        #             status, self.address = tibrvMsg_GetString(message, "Inbox")
+        #             self.connected = True
+        #         elif error_code == ICC_ERR_ALREADY_CONNECTED:
+        #             status, self.address = tibrvMsg_GetString(message, "Inbox")
+        #             self.connected = True
+        #         else:                
+        #             print("Error {} {}".format(error_code, error_message))
+        # elif MessageType == DATA_MSG:
+        #     status, data_type = tibrvMsg_GetI32(message, "Data Type")
+        #     if status == TIBRV_OK:
+        #         if data_type == ICC_DATA_MSG_TABLE_ACK:
+        #             status, self.address = tibrvMsg_GetString(message, "Inbox")
+        #             self.connected = True
+        #             print("Connection_Acknowledgement")
+        #         elif data_type == ICC_DATA_MSG_ERROR:
+        #             print("Error in message")
+        #         else:
+        #             pass
+        #         status, NumFields = tibrvMsg_GetNumFields(message)
+        #         for i in range(NumFields):
+        #             status, field = tibrvMsg_GetFieldByIndex(message, i)
+        #             print(field)
+        #     else:
+        #         print("Unknown Data Type")
+
+
+
+##-----------------------------------------------------------------------------
+# AsyncRVClient class
+##-----------------------------------------------------------------------------
+
+
+class AsyncRVClient(RVClient):
+
+    # RVClient with a background dispatcher, answers resolve asyncio futures
+    # through the request table.
+
+    def __init__(self, service, network, daemon, trace = False, correlation: str = RequestTable.SUBJECT):
+        super().__init__(service, network, daemon, trace, correlation)
+        self.loop = None
+
+    async def connect(self, host, serv, codifier, timeout: float = 30.0) -> str:
+        import asyncio
+        self.loop = asyncio.get_running_loop()
+        ready = await self.loop.run_in_executor(None, RVClient.connect, self, host, serv, codifier)
+        self.startDispatcher()
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(ready, loop = self.loop), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("no IDENTIFY_MSG answer from KIS " + serv + "." + host) from None
+
+    def send_and_wait(self, msgobj, timeout: float = 30.0) -> "asyncio.Future":
+        import asyncio
+        return asyncio.wrap_future(self.request(msgobj, timeout), loop = self.loop)
+
+    async def close(self):
+        await self.loop.run_in_executor(None, self.destroy)
+        self.requests.cancel()
+
+
+##-----------------------------------------------------------------------------
+# QueueWorkerPool class
+##-----------------------------------------------------------------------------
+
+
+def _queueWorker(index: int, service, network, daemon, name: str, subject: str, handler, workerTasks: int,
+                stop, results, handled):
+    # worker body: own transport, queue group and distributed queue membership
+    rv = RVClient(service, network, daemon, trace = False)
+    counts = [0, 0]             # messages, handler errors
+
+    def onMessage(msg: RVMessage):
+        counts[0] += 1
+        try:
+            handler(msg)
+        except Exception:
+            counts[1] += 1
+        with handled.get_lock():
+            handled.value += 1
+
+    rv.create()
+    rv.joinQueue(name, subject, onMessage, workerTasks)
+    results.put(("ready", index, 0, 0))
+
+    while not stop.is_set():
+        rv.status(0.1)
+
+    rv.destroy()
+    results.put(("done", index, counts[0], counts[1]))
+
+
+class QueueWorkerPool():
+
+    # count workers in one distributed queue (tibrvcmq) on subject, every message
+    # is handled by exactly one of them. Workers are processes with their own
+    # RV transport, handler must be a module level function. The in-memory bus
+    # lives in one process, on the memory backend the workers are threads.
+
+    def __init__(self, count: int, name: str, subject: str, handler, service, network, daemon,
+                workerTasks: int = 1, processes: bool = None):
+        if processes is None:
+            processes = tibrvbackend.name() != tibrvbackend.MEMORY
+
+        self.count = count
+        self.name = name
+        self.subject = subject
+        self.handler = handler
+        self.args = (service, network, daemon)
+        self.workerTasks = workerTasks
+        self.processes = processes
+        self.workers = []
+        self.counts = {}            # worker index -> (messages, handler errors)
+
+        import multiprocessing
+        if processes:
+            # spawn, a forked child would share the parent TIBRV library state
+            self.context = multiprocessing.get_context("spawn")
+            self.stopEvent = self.context.Event()
+            self.results = self.context.Queue()
+            self.progress = self.context.Value("q", 0)
+        else:
+            import queue
+            self.context = None
+            self.stopEvent = threading.Event()
+            self.results = queue.Queue()
+            self.progress = multiprocessing.Value("q", 0)
+
+    def start(self, timeout: float = 30.0):
+        # returns when every worker joined the queue
+        for index in range(self.count):
+            args = (index,) + self.args + (self.name, self.subject, self.handler, self.workerTasks,
+                                        self.stopEvent, self.results, self.progress)
+            if self.processes:
+                worker = self.context.Process(target=_queueWorker, args=args, name="QueueWorker-" + str(index),
+                                            daemon=True)
+            else:
+                worker = threading.Thread(target=_queueWorker, args=args, name="QueueWorker-" + str(index),
+                                        daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+        for index in range(self.count):
+            self.results.get(timeout = timeout)
+
+    @property
+    def handled(self) -> int:
+        # messages handled by all workers so far
+        return self.progress.value
+
+    def stop(self, timeout: float = 30.0) -> dict:
+        # stop the workers, returns worker index -> (messages, handler errors)
+        self.stopEvent.set()
+        for index in range(len(self.workers)):
+            state, worker, messages, errors = self.results.get(timeout = timeout)
+            self.counts[worker] = (messages, errors)
+        for worker in self.workers:
+            worker.join(timeout)
+        self.workers = []
+        return self.counts
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.workers:
+            self.stop()
@@ -0,0 +1,1418 @@
+import os
+import time
+import ctypes
+import struct
+import datetime
+import threading
+import functools
+from collections import deque
+
+
+##-----------------------------------------------------------------------------
+# In-memory TIBRV bus
+#
+# MemoryLibrary implements the subset of the TIBRV C API used by tibrvmsglib
+# and tibrvlib with the same function names and arguments, so the ctypes
+# wrappers run unchanged on top of it. Transports created in one process with
+# the same service share one bus: subjects, inboxes, wildcard listeners and
+# queue group dispatch behave like a local rvd.
+##-----------------------------------------------------------------------------
+
+# tibrv/status.h
+TIBRV_OK                        = 0
+TIBRV_INIT_FAILURE              = 1
+TIBRV_INVALID_TRANSPORT         = 2
+TIBRV_INVALID_ARG               = 3
+TIBRV_NOT_INITIALIZED           = 4
+TIBRV_INVALID_SUBJECT           = 20
+TIBRV_DAEMON_NOT_CONNECTED      = 21
+TIBRV_NOT_FOUND                 = 35
+TIBRV_CONVERSION_FAILED         = 38
+TIBRV_INVALID_MSG               = 42
+TIBRV_TIMEOUT                   = 50
+TIBRV_INVALID_EVENT             = 60
+TIBRV_INVALID_CALLBACK          = 61
+TIBRV_INVALID_QUEUE             = 62
+TIBRV_INVALID_QUEUE_GROUP       = 63
+TIBRV_INVALID_FILE              = 72
+TIBRV_IO_FAILED                 = 74
+
+_STATUS_TEXT = {
+    TIBRV_OK:                   b"Success",
+    TIBRV_INIT_FAILURE:         b"Initialization failed",
+    TIBRV_INVALID_TRANSPORT:    b"Invalid transport",
+    TIBRV_INVALID_ARG:          b"Invalid argument",
+    TIBRV_NOT_INITIALIZED:      b"Not initialized",
+    TIBRV_INVALID_SUBJECT:      b"Invalid subject",
+    TIBRV_DAEMON_NOT_CONNECTED: b"Daemon not connected",
+    TIBRV_NOT_FOUND:            b"Not found",
+    TIBRV_CONVERSION_FAILED:    b"Conversion failed",
+    TIBRV_INVALID_MSG:          b"Invalid message",
+    TIBRV_TIMEOUT:              b"Timeout occurred",
+    TIBRV_INVALID_EVENT:        b"Invalid event",
+    TIBRV_INVALID_CALLBACK:     b"Invalid callback",
+    TIBRV_INVALID_QUEUE:        b"Invalid queue",
+    TIBRV_INVALID_QUEUE_GROUP:  b"Invalid queue group",
+    TIBRV_INVALID_FILE:         b"Invalid file",
+    TIBRV_IO_FAILED:            b"I/O failed",
+}
+
+# tibrv/queue.h limit policies
+TIBRVQUEUE_DISCARD_NONE         = 0
+TIBRVQUEUE_DISCARD_NEW          = 1
+TIBRVQUEUE_DISCARD_FIRST        = 2
+TIBRVQUEUE_DISCARD_LAST         = 3
+
+# tibrv/msg.h field types
+TIBRVMSG_MSG                    = 1
+TIBRVMSG_DATETIME               = 3
+TIBRVMSG_OPAQUE                 = 7
+TIBRVMSG_STRING                 = 8
+TIBRVMSG_BOOL                   = 9
+TIBRVMSG_I32                    = 18
+TIBRVMSG_U32                    = 19
+TIBRVMSG_I64                    = 20
+TIBRVMSG_U64                    = 21
+TIBRVMSG_F32                    = 24
+TIBRVMSG_F64                    = 25
+TIBRVMSG_I32ARRAY               = 38
+TIBRVMSG_I64ARRAY               = 40
+TIBRVMSG_F32ARRAY               = 44
+TIBRVMSG_F64ARRAY               = 45
+
+_NUMBERS = (TIBRVMSG_I32, TIBRVMSG_U32, TIBRVMSG_I64, TIBRVMSG_U64, TIBRVMSG_F32, TIBRVMSG_F64)
+
+# tibrvLocalData member and size by scalar field type, see tibrvmsglib._c_tibrvMsgField
+_MEMBERS = {
+    TIBRVMSG_MSG:       "msg",
+    TIBRVMSG_STRING:    "str",
+    TIBRVMSG_BOOL:      "boolean",
+    TIBRVMSG_I32:       "i32",
+    TIBRVMSG_U32:       "u32",
+    TIBRVMSG_I64:       "i64",
+    TIBRVMSG_U64:       "u64",
+    TIBRVMSG_F32:       "f32",
+    TIBRVMSG_F64:       "f64",
+}
+
+_SIZES = {
+    TIBRVMSG_BOOL:      4,
+    TIBRVMSG_I32:       4,
+    TIBRVMSG_U32:       4,
+    TIBRVMSG_I64:       8,
+    TIBRVMSG_U64:       8,
+    TIBRVMSG_F32:       4,
+    TIBRVMSG_F64:       8,
+}
+
+# array field type -> element ctype, values are kept as ctypes arrays
+_ARRAYS = {
+    TIBRVMSG_I32ARRAY:  ctypes.c_int32,
+    TIBRVMSG_I64ARRAY:  ctypes.c_int64,
+    TIBRVMSG_F32ARRAY:  ctypes.c_float,
+    TIBRVMSG_F64ARRAY:  ctypes.c_double,
+}
+
+
+_PLAIN = frozenset((int, float, bytes, str, type(None)))
+
+def _v(arg):
+    # plain value of a ctypes argument
+    if type(arg) in _PLAIN:
+        return arg
+    return getattr(arg, "value", arg)
+
+def _out(ref):
+    # object behind ctypes.byref()/ctypes.pointer() output argument
+    obj = getattr(ref, "_obj", None)
+    if obj is None:
+        obj = ref.contents
+    return obj
+
+def _field(arg):
+    # tibrvMsgField passed by value, byref() or pointer()
+    if isinstance(arg, ctypes._Pointer):
+        return arg.contents
+    if hasattr(arg, "_fields_"):
+        return arg
+    return _out(arg)
+
+def _bytes(address, size: int) -> bytes:
+    # copy of size bytes at a c_void_p/int address
+    address = _v(address)
+    if type(address) is bytes:
+        return address[:size]
+    if not size:
+        return b""
+    return ctypes.string_at(address, size)
+
+def _text(kind: int, value) -> str:
+    # tibrvMsg_ConvertToString like field value
+    if kind == TIBRVMSG_MSG:
+        return value.text()
+    if kind == TIBRVMSG_STRING:
+        return '"' + value.decode(errors="replace") + '"'
+    if kind == TIBRVMSG_BOOL:
+        return "TRUE" if value else "FALSE"
+    if kind == TIBRVMSG_OPAQUE:
+        return "[{} opaque bytes]".format(len(value))
+    if kind == TIBRVMSG_DATETIME:
+        date = datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=value[0])
+        return date.strftime("%Y-%m-%d %H:%M:%S") + ".{:09d}Z".format(value[1])
+    if kind in _ARRAYS:
+        return "[" + " ".join(str(item) for item in value) + "]"
+    return str(value)
+
+# wire format of the bus: size, then (name, type, id, value) per field
+_SCALAR_FORMATS = {
+    TIBRVMSG_BOOL:      struct.Struct(">?"),
+    TIBRVMSG_I32:       struct.Struct(">i"),
+    TIBRVMSG_U32:       struct.Struct(">I"),
+    TIBRVMSG_I64:       struct.Struct(">q"),
+    TIBRVMSG_U64:       struct.Struct(">Q"),
+    TIBRVMSG_F32:       struct.Struct(">f"),
+    TIBRVMSG_F64:       struct.Struct(">d"),
+    TIBRVMSG_DATETIME:  struct.Struct(">qI"),
+}
+_SIZE = struct.Struct(">I")
+_FIELD = struct.Struct(">HBHI")
+
+def _encode(msg) -> bytes:
+    parts = []
+    for name, kind, value, id in msg.fields:
+        if kind == TIBRVMSG_MSG:
+            data = _encode(value)
+        elif kind == TIBRVMSG_STRING:
+            data = value
+        elif kind == TIBRVMSG_DATETIME:
+            data = _SCALAR_FORMATS[kind].pack(*value)
+        elif kind in _SCALAR_FORMATS:
+            data = _SCALAR_FORMATS[kind].pack(value)
+        else:
+            # opaque and arrays, ctypes buffers
+            data = bytes(value)
+        parts.append(_FIELD.pack(len(name), kind, id, len(data)) + name + data)
+    body = b"".join(parts)
+    return _SIZE.pack(_SIZE.size + len(body)) + body
+
+def _decode(data: bytes):
+    msg = _Msg()
+    fields = msg.fields
+    names = msg.names
+    unpack = _FIELD.unpack_from
+    offset = _SIZE.size
+    end = _SIZE.unpack_from(data)[0]
+    while offset < end:
+        length, kind, id, size = unpack(data, offset)
+        offset += _FIELD.size
+        name = data[offset:offset + length]
+        offset += length
+        value = data[offset:offset + size]
+        offset += size
+        if kind == TIBRVMSG_STRING:
+            pass
+        elif kind == TIBRVMSG_MSG:
+            value = _decode(value)
+            msg.nested = True
+        elif kind == TIBRVMSG_DATETIME:
+            value = _SCALAR_FORMATS[kind].unpack(value)
+        elif kind in _SCALAR_FORMATS:
+            value = _SCALAR_FORMATS[kind].unpack(value)[0]
+        elif kind == TIBRVMSG_OPAQUE:
+            value = (ctypes.c_char * size).from_buffer_copy(value)
+        elif kind in _ARRAYS:
+            ctype = _ARRAYS[kind]
+            value = (ctype * (size // ctypes.sizeof(ctype))).from_buffer_copy(value)
+        if name not in names:
+            names[name] = len(fields)
+        fields.append((name, kind, value, id))
+    return msg
+
+def _split(subject: bytes) -> tuple:
+    return tuple(subject.split(b"."))
+
+def _match(pattern: tuple, subject: tuple) -> bool:
+    for i, element in enumerate(pattern):
+        if element == b">":
+            return len(subject) > i
+        if i >= len(subject):
+            return False
+        if element != b"*" and element != subject[i]:
+            return False
+    return len(pattern) == len(subject)
+
+
+##-----------------------------------------------------------------------------
+# Bus objects
+##-----------------------------------------------------------------------------
+
+class _Msg():
+    __slots__ = ("fields", "names", "nested", "subject", "reply", "borrowed", "wire", "cm")
+
+    def __init__(self, subject = None, reply = None):
+        self.fields = []            # [(name, type, value, id)]
+        self.names = {}             # name -> index of the first field with this name
+        self.nested = False
+        self.subject = subject
+        self.reply = reply
+        self.borrowed = None        # field index -> handle of a submessage read by index
+        self.wire = None            # buffer of the last tibrvMsg_GetAsBytes
+        self.cm = None              # (sender name, sequence number) of a certified message
+
+    def copy(self):
+        msg = _Msg(self.subject, self.reply)
+        msg.names = self.names.copy()
+        msg.cm = self.cm
+        if self.nested:
+            msg.fields = [(name, kind, value.copy() if kind == TIBRVMSG_MSG else value, id)
+                        for name, kind, value, id in self.fields]
+            msg.nested = True
+        else:
+            msg.fields = self.fields[:]
+        return msg
+
+    def add(self, name: bytes, kind: int, value, id: int = 0):
+        self.names.setdefault(name, len(self.fields))
+        self.fields.append((name, kind, value, id))
+        if kind == TIBRVMSG_MSG:
+            self.nested = True
+
+    def index(self, name: bytes, id: int = 0) -> int:
+        if not id:
+            return self.names.get(name, -1)
+        for i, field in enumerate(self.fields):
+            if field[3] == id:
+                return i
+        return -1
+
+    def find(self, name: bytes, id: int = 0):
+        i = self.index(name, id)
+        return self.fields[i] if i >= 0 else None
+
+    def text(self) -> str:
+        items = []
+        for name, kind, value, id in self.fields:
+            items.append(name.decode(errors="replace") + "=" + _text(kind, value))
+        return "{" + " ".join(items) + "}"
+
+
+class _Transport():
+
+    def __init__(self, service: bytes, network: bytes, daemon: bytes):
+        self.service = service or b""
+        self.network = network
+        self.daemon = daemon
+        self.description = None
+        self.inboxes = 0
+        self.connected = True       # False while the daemon is away, see MemoryLibrary.disconnect
+
+
+class _Queue():
+
+    def __init__(self):
+        self.events = deque()       # (listener, _Msg)
+        self.priority = 1
+        self.groups = []
+        self.policy = TIBRVQUEUE_DISCARD_NONE
+        self.maxEvents = 0
+        self.discardAmount = 0
+        self.discarded = 0
+
+    def post(self, event) -> bool:
+        # append under the limit policy, False when event itself was discarded
+        if self.policy != TIBRVQUEUE_DISCARD_NONE and len(self.events) >= self.maxEvents:
+            if self.policy == TIBRVQUEUE_DISCARD_NEW:
+                self.discarded += 1
+                return False
+            for i in range(min(self.discardAmount, len(self.events))):
+                if self.policy == TIBRVQUEUE_DISCARD_FIRST:
+                    self.events.popleft()
+                else:
+                    self.events.pop()
+                self.discarded += 1
+        self.events.append(event)
+        return True
+
+
+class _Group():
+
+    def __init__(self):
+        self.queues = []
+
+
+class _Listener():
+
+    def __init__(self, id, queue, callback, transport, subject: bytes, closure):
+        self.id = id
+        self.queue = queue
+        self.callback = callback
+        self.transport = transport
+        self.subject = subject
+        self.pattern = _split(subject)
+        self.wildcard = b"*" in self.pattern or b">" in self.pattern
+        self.closure = closure
+        self.active = True
+        self.cm = None              # _CMTransport of a certified listener
+        self.explicit = False       # certified listener confirms with tibrvcmEvent_ConfirmMsg
+
+
+class _CMTransport():
+
+    # Certified delivery state of one sender: sequence numbers per subject,
+    # registered listener names per subject and the messages they have not
+    # confirmed yet. With a ledger file the state survives the transport.
+    # A distributed queue member shares its name with the other workers of
+    # the queue, every message reaches one of them.
+
+    _RECORD = struct.Struct(">BHQH")    # kind, subject length, sequence number, name count
+
+    def __init__(self, transportId: int, transport: _Transport, name: bytes, ledger: str, sync: bool):
+        self.transportId = transportId
+        self.transport = transport
+        self.name = name
+        self.ledger = ledger
+        self.sync = sync
+        self.timeLimit = 0.0
+        self.sequence = {}          # subject -> last sequence number
+        self.listeners = {}         # subject -> set of registered listener names
+        self.pending = {}           # (subject, seqno) -> [_Msg, set of names to confirm, deadline]
+        self.deadlines = deque()    # (deadline, (subject, seqno)) in send order
+        self.distributed = False    # distributed queue member
+        self.workerWeight = 1
+        self.workerTasks = 1
+        self.active = 0             # messages in the queue or callback of this worker
+
+    def load(self):
+        with open(self.ledger, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset < len(data):
+            kind, length, seqno, count = self._RECORD.unpack_from(data, offset)
+            offset += self._RECORD.size
+            subject = data[offset:offset + length]
+            offset += length
+            names = set()
+            for i in range(count):
+                size = _SIZE.unpack_from(data, offset)[0]
+                names.add(data[offset + _SIZE.size:offset + size])
+                offset += size
+            if kind == 0:
+                self.sequence[subject] = seqno
+                self.listeners[subject] = names
+            else:
+                size = _SIZE.unpack_from(data, offset)[0]
+                msg = _decode(data[offset:offset + size])
+                offset += size
+                msg.subject = subject
+                msg.cm = (self.name, seqno)
+                self.pending[(subject, seqno)] = [msg, names, None]
+
+    def save(self):
+        parts = []
+        for subject, seqno in self.sequence.items():
+            names = self.listeners.get(subject, ())
+            parts.append(self._RECORD.pack(0, len(subject), seqno, len(names)) + subject)
+            parts += [_SIZE.pack(_SIZE.size + len(name)) + name for name in names]
+        for (subject, seqno), (msg, names, deadline) in self.pending.items():
+            parts.append(self._RECORD.pack(1, len(subject), seqno, len(names)) + subject)
+            parts += [_SIZE.pack(_SIZE.size + len(name)) + name for name in names]
+            parts.append(_encode(msg))
+        temp = self.ledger + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(b"".join(parts))
+        os.replace(temp, self.ledger)
+
+
+##-----------------------------------------------------------------------------
+# MemoryLibrary
+##-----------------------------------------------------------------------------
+
+class MemoryLibrary():
+
+    backend = "memory"
+
+    def __init__(self):
+        self.lock = threading.Condition()
+        self.ids = 0
+        self.opened = 0
+        self.msgs = {}              # tibrvMsg -> _Msg
+        self.transports = {}        # tibrvTransport -> _Transport
+        self.queues = {}            # tibrvQueue -> _Queue
+        self.groups = {}            # tibrvQueueGroup -> _Group
+        self.listeners = {}         # tibrvEvent -> _Listener
+        self.backlog = {}           # distributed queue name -> deque of _Msg waiting for a worker
+        self.turn = 0               # round robin between equal distributed queue workers
+        self.cmTransports = {}      # tibrvcmTransport -> _CMTransport
+        self.exact = {}             # subject -> [_Listener]
+        self.wildcards = []         # [_Listener]
+        self.host = "{:08X}".format(os.getpid() & 0xFFFFFFFF)
+
+        # exported functions must accept argtypes/restype like ctypes functions
+        for name in dir(type(self)):
+            if name.startswith("tibrv"):
+                setattr(self, name, functools.partial(getattr(type(self), name), self))
+
+    def _id(self) -> int:
+        with self.lock:
+            self.ids += 1
+            return self.ids
+
+    @property
+    def live_messages(self) -> int:
+        return len(self.msgs)
+
+    ##-------------------------------------------------------------------------
+    # bus
+    ##-------------------------------------------------------------------------
+
+    def publish(self, msg: _Msg, service: bytes = None, transport: _Transport = None):
+        # deliver a copy of msg to every matching listener, service None = all,
+        # transport only to the listeners of one transport (local advisories)
+        subject = _split(msg.subject)
+        with self.lock:
+            targets = list(self.exact.get(msg.subject, ()))
+            targets += [listener for listener in self.wildcards if _match(listener.pattern, subject)]
+            queues = None
+            for listener in targets:
+                if not listener.transport.connected:
+                    continue
+                if service is not None and listener.transport.service != service:
+                    continue
+                if transport is not None and listener.transport is not transport:
+                    continue
+                if listener.cm is not None and listener.cm.distributed:
+                    # one worker per distributed queue, see _schedule
+                    if queues is None:
+                        queues = {}
+                    queues.setdefault(listener.cm.name, []).append(listener)
+                    continue
+                listener.queue.post((listener, msg.copy()))
+            if queues is not None:
+                for name, members in queues.items():
+                    self._schedule(name, members, msg.copy())
+            if targets:
+                self.lock.notify_all()
+
+    def _schedule(self, name: bytes, members: list, msg: _Msg):
+        # distributed queue scheduler: the heaviest worker with a free task gets
+        # the message, without a free task it waits in the backlog of the queue
+        free = [listener for listener in members if listener.cm.active < listener.cm.workerTasks]
+        if not free:
+            self.backlog.setdefault(name, deque()).append(msg)
+            return
+        weight = max(listener.cm.workerWeight for listener in free)
+        free = [listener for listener in free if listener.cm.workerWeight == weight]
+        self.turn += 1
+        listener = free[self.turn % len(free)]
+        if listener.queue.post((listener, msg)):
+            listener.cm.active += 1
+
+    def _done(self, listener: _Listener, msg: _Msg = None):
+        # a distributed queue worker finished a task, hand the next waiting message
+        # to a free worker. msg was not dispatched, its listener is gone.
+        with self.lock:
+            listener.cm.active -= 1
+            if msg is not None:
+                self.backlog.setdefault(listener.cm.name, deque()).appendleft(msg)
+            self._drain(listener.cm.name)
+
+    def _drain(self, name: bytes):
+        with self.lock:
+            backlog = self.backlog.get(name)
+            while backlog:
+                msg = backlog[0]
+                pattern = _split(msg.subject)
+                members = [member for member in self.listeners.values()
+                           if member.cm is not None and member.cm.distributed and member.cm.name == name
+                           and _match(member.pattern, pattern)]
+                if not any(member.cm.active < member.cm.workerTasks for member in members):
+                    break
+                backlog.popleft()
+                self._schedule(name, members, msg)
+                self.lock.notify_all()
+
+    def disconnect(self, transport: int = None, drop: bool = False):
+        # daemon blip for one transport handle, None = all: DAEMON.DISCONNECTED
+        # advisory, then sends fail and messages to its listeners are lost. With
+        # drop the transport handle is gone too, like after a daemon restart.
+        with self.lock:
+            handles = [handle for handle in self.transports if transport is None or handle == transport]
+        for handle in handles:
+            tx = self.transports[handle]
+            self.publish(self._advisoryMsg("_RV.ERROR.SYSTEM.DAEMON.DISCONNECTED"), transport = tx)
+            tx.connected = False
+            if drop:
+                self.transports.pop(handle, None)
+
+    def restore(self, transport: int = None):
+        # daemon back for a disconnected transport, DAEMON.CONNECTED advisory
+        with self.lock:
+            handles = [handle for handle, tx in self.transports.items()
+                       if not tx.connected and (transport is None or handle == transport)]
+        for handle in handles:
+            tx = self.transports[handle]
+            tx.connected = True
+            self.publish(self._advisoryMsg("_RV.INFO.SYSTEM.DAEMON.CONNECTED"), transport = tx)
+
+    def _advisoryMsg(self, subject: str, **fields) -> _Msg:
+        msg = _Msg(subject = subject.encode())
+        for name, value in fields.items():
+            if isinstance(value, int):
+                msg.add(name.encode(), TIBRVMSG_I32, value)
+            elif isinstance(value, float):
+                msg.add(name.encode(), TIBRVMSG_F64, value)
+            else:
+                msg.add(name.encode(), TIBRVMSG_STRING, str(value).encode())
+        return msg
+
+    def advisory(self, subject: str, **fields):
+        # publish a system advisory such as _RV.INFO.SYSTEM.HOST.STATUS.<host>
+        self.publish(self._advisoryMsg(subject, **fields))
+
+    def _targets(self, subject: bytes, service: bytes) -> list:
+        # certified listeners a message on subject reaches
+        pattern = _split(subject)
+        with self.lock:
+            targets = list(self.exact.get(subject, ()))
+            targets += [listener for listener in self.wildcards if _match(listener.pattern, pattern)]
+        return [listener for listener in targets
+                if listener.cm is not None and listener.cm.name and listener.transport.service == service]
+
+    def _cmAdvisory(self, cm: _CMTransport, subject: str, seqno: int, listener: bytes = None):
+        # RVCM delivery advisory, presented on the sender transport only
+        msg = _Msg(subject = subject.encode())
+        msg.add(b"seqno", TIBRVMSG_U64, seqno)
+        if listener is not None:
+            msg.add(b"listener", TIBRVMSG_STRING, listener)
+        self.publish(msg, transport = cm.transport)
+
+    def _confirm(self, listener: _Listener, msg: _Msg):
+        sender, seqno = msg.cm
+        with self.lock:
+            for cm in list(self.cmTransports.values()):
+                if cm.name != sender:
+                    continue
+                entry = cm.pending.get((msg.subject, seqno))
+                if entry is None or listener.cm.name not in entry[1]:
+                    continue
+                entry[1].discard(listener.cm.name)
+                subject = msg.subject.decode()
+                self._cmAdvisory(cm, "_RV.INFO.RVCM.DELIVERY.CONFIRM." + subject, seqno, listener.cm.name)
+                if not entry[1]:
+                    del cm.pending[(msg.subject, seqno)]
+                    self._cmAdvisory(cm, "_RV.INFO.RVCM.DELIVERY.COMPLETE." + subject, seqno)
+                if cm.sync and cm.ledger:
+                    cm.save()
+
+    def _expire(self):
+        # certified messages past their time limit, DELIVERY.FAILED per missing listener
+        now = time.monotonic()
+        with self.lock:
+            for cm in list(self.cmTransports.values()):
+                while cm.deadlines and cm.deadlines[0][0] <= now:
+                    deadline, key = cm.deadlines.popleft()
+                    entry = cm.pending.get(key)
+                    if entry is None or entry[2] != deadline:
+                        continue
+                    del cm.pending[key]
+                    for name in entry[1]:
+                        self._cmAdvisory(cm, "_RV.ERROR.RVCM.DELIVERY.FAILED." + key[0].decode(), key[1], name)
+
+    def _next(self, queues: list, timeout: float, valid):
+        if self.cmTransports:
+            self._expire()
+        deadline = None if timeout < 0 else time.monotonic() + timeout
+        with self.lock:
+            while True:
+                if not valid():
+                    return None
+                ready = [q for q in queues if q.events]
+                if ready:
+                    return max(ready, key = lambda q: q.priority).events.popleft()
+                if deadline is None:
+                    self.lock.wait()
+                    continue
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return None
+                self.lock.wait(left)
+
+    def _dispatch(self, event):
+        listener, msg = event
+        if not listener.active:
+            if listener.cm is not None and listener.cm.distributed:
+                self._done(listener, msg)
+            return
+
+        # message belongs to the event and is destroyed after the callback
+        handle = self._id()
+        self.msgs[handle] = msg
+        try:
+            listener.callback(listener.id, handle, None)
+        finally:
+            self._drop(handle)
+
+        if listener.cm is not None:
+            if msg.cm is not None and not listener.explicit:
+                self._confirm(listener, msg)
+            if listener.cm.distributed:
+                self._done(listener)
+
+    def _drop(self, handle) -> bool:
+        # destroy a message and the submessage handles it lent out
+        msg = self.msgs.pop(handle, None)
+        if msg is None:
+            return False
+        if msg.borrowed is not None:
+            self._release(msg)
+        return True
+
+    def _release(self, msg: _Msg):
+        borrowed, msg.borrowed = msg.borrowed, None
+        for handle in borrowed.values():
+            self._drop(handle)
+
+    ##-------------------------------------------------------------------------
+    # tibrv/status.h, tibrv/tibrv.h
+    ##-------------------------------------------------------------------------
+
+    def tibrvStatus_GetText(self, code) -> bytes:
+        return _STATUS_TEXT.get(_v(code), b"Unknown status")
+
+    def tibrv_Open(self) -> int:
+        self.opened += 1
+        return TIBRV_OK
+
+    def tibrv_Close(self) -> int:
+        if self.opened == 0:
+            return TIBRV_NOT_INITIALIZED
+        self.opened -= 1
+        return TIBRV_OK
+
+    def tibrv_Version(self) -> bytes:
+        return b"8.4.0 memory"
+
+    ##-------------------------------------------------------------------------
+    # tibrv/msg.h
+    ##-------------------------------------------------------------------------
+
+    def tibrvMsg_Create(self, message) -> int:
+        handle = self._id()
+        self.msgs[handle] = _Msg()
+        _out(message).value = handle
+        return TIBRV_OK
+
+    def tibrvMsg_CreateEx(self, message, initialStorage) -> int:
+        return self.tibrvMsg_Create(message)
+
+    def tibrvMsg_CreateCopy(self, message, copy) -> int:
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        handle = self._id()
+        self.msgs[handle] = msg.copy()
+        _out(copy).value = handle
+        return TIBRV_OK
+
+    def tibrvMsg_Destroy(self, message) -> int:
+        if not self._drop(_v(message)):
+            return TIBRV_INVALID_MSG
+        return TIBRV_OK
+
+    def tibrvMsg_Reset(self, message) -> int:
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        if msg.borrowed is not None:
+            self._release(msg)
+        msg.__init__()
+        return TIBRV_OK
+
+    def tibrvMsg_SetSendSubject(self, message, subject) -> int:
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        subject = _v(subject)
+        if not subject:
+            return TIBRV_INVALID_SUBJECT
+        msg.subject = subject
+        return TIBRV_OK
+
+    def tibrvMsg_GetSendSubject(self, message, subject) -> int:
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        if msg.subject is None:
+            return TIBRV_NOT_FOUND
+        _out(subject).value = msg.subject
+        return TIBRV_OK
+
+    def tibrvMsg_SetReplySubject(self, message, subject) -> int:
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        msg.reply = _v(subject)
+        return TIBRV_OK
+
+    def tibrvMsg_GetReplySubject(self, message, subject) -> int:
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        if msg.reply is None:
+            return TIBRV_NOT_FOUND
+        _out(subject).value = msg.reply
+        return TIBRV_OK
+
+    def tibrvMsg_ConvertToString(self, message, string) -> int:
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        _out(string).value = msg.text().encode()
+        return TIBRV_OK
+
+    def _add(self, message, fieldName, kind: int, value, optIdentifier) -> int:
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        name = _v(fieldName)
+        if name is None:
+            return TIBRV_INVALID_ARG
+        msg.add(name, kind, value, _v(optIdentifier) or 0)
+        return TIBRV_OK
+
+    def _update(self, message, fieldName, kind: int, value, optIdentifier) -> int:
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        name = _v(fieldName)
+        id = _v(optIdentifier) or 0
+        if name is None:
+            return TIBRV_INVALID_ARG
+        i = msg.index(name, id)
+        if i < 0:
+            msg.add(name, kind, value, id)
+            return TIBRV_OK
+        field = msg.fields[i]
+        msg.fields[i] = (field[0], kind, value, field[3])
+        if kind == TIBRVMSG_MSG:
+            msg.nested = True
+        return TIBRV_OK
+
+    def _get(self, message, fieldName, optIdentifier):
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG, None
+        field = msg.find(_v(fieldName), _v(optIdentifier) or 0)
+        if field is None:
+            return TIBRV_NOT_FOUND, None
+        return TIBRV_OK, field
+
+    def tibrvMsg_AddStringEx(self, message, fieldName, value, optIdentifier) -> int:
+        return self._add(message, fieldName, TIBRVMSG_STRING, _v(value) or b"", optIdentifier)
+
+    def tibrvMsg_AddI32Ex(self, message, fieldName, value, optIdentifier) -> int:
+        return self._add(message, fieldName, TIBRVMSG_I32, int(_v(value)), optIdentifier)
+
+    def tibrvMsg_AddF64Ex(self, message, fieldName, value, optIdentifier) -> int:
+        return self._add(message, fieldName, TIBRVMSG_F64, float(_v(value)), optIdentifier)
+
+    def tibrvMsg_AddMsgEx(self, message, fieldName, value, optIdentifier) -> int:
+        sub = self.msgs.get(_v(value))
+        if sub is None:
+            return TIBRV_INVALID_MSG
+        # submessage is copied, like tibrvMsg_AddMsg does
+        return self._add(message, fieldName, TIBRVMSG_MSG, sub.copy(), optIdentifier)
+
+    def tibrvMsg_AddI64Ex(self, message, fieldName, value, optIdentifier) -> int:
+        return self._add(message, fieldName, TIBRVMSG_I64, int(_v(value)), optIdentifier)
+
+    def tibrvMsg_AddU32Ex(self, message, fieldName, value, optIdentifier) -> int:
+        return self._add(message, fieldName, TIBRVMSG_U32, int(_v(value)), optIdentifier)
+
+    def tibrvMsg_AddU64Ex(self, message, fieldName, value, optIdentifier) -> int:
+        return self._add(message, fieldName, TIBRVMSG_U64, int(_v(value)), optIdentifier)
+
+    def tibrvMsg_AddF32Ex(self, message, fieldName, value, optIdentifier) -> int:
+        return self._add(message, fieldName, TIBRVMSG_F32, float(_v(value)), optIdentifier)
+
+    def tibrvMsg_AddBoolEx(self, message, fieldName, value, optIdentifier) -> int:
+        return self._add(message, fieldName, TIBRVMSG_BOOL, bool(_v(value)), optIdentifier)
+
+    def tibrvMsg_AddDateTimeEx(self, message, fieldName, value, optIdentifier) -> int:
+        date = _out(value)
+        return self._add(message, fieldName, TIBRVMSG_DATETIME, (date.sec, date.nsec), optIdentifier)
+
+    def tibrvMsg_AddOpaqueEx(self, message, fieldName, value, size, optIdentifier) -> int:
+        # copied into a ctypes buffer, tibrvMsg_GetFieldByIndex hands out its address
+        data = _bytes(value, _v(size))
+        buffer = (ctypes.c_char * len(data)).from_buffer_copy(data)
+        return self._add(message, fieldName, TIBRVMSG_OPAQUE, buffer, optIdentifier)
+
+    def _addArray(self, message, fieldName, kind: int, value, numElements, optIdentifier) -> int:
+        ctype = _ARRAYS[kind]
+        count = _v(numElements)
+        array = (ctype * count).from_buffer_copy(_bytes(value, count * ctypes.sizeof(ctype)))
+        return self._add(message, fieldName, kind, array, optIdentifier)
+
+    def tibrvMsg_AddI32ArrayEx(self, message, fieldName, value, numElements, optIdentifier) -> int:
+        return self._addArray(message, fieldName, TIBRVMSG_I32ARRAY, value, numElements, optIdentifier)
+
+    def tibrvMsg_AddI64ArrayEx(self, message, fieldName, value, numElements, optIdentifier) -> int:
+        return self._addArray(message, fieldName, TIBRVMSG_I64ARRAY, value, numElements, optIdentifier)
+
+    def tibrvMsg_AddF32ArrayEx(self, message, fieldName, value, numElements, optIdentifier) -> int:
+        return self._addArray(message, fieldName, TIBRVMSG_F32ARRAY, value, numElements, optIdentifier)
+
+    def tibrvMsg_AddF64ArrayEx(self, message, fieldName, value, numElements, optIdentifier) -> int:
+        return self._addArray(message, fieldName, TIBRVMSG_F64ARRAY, value, numElements, optIdentifier)
+
+    def tibrvMsg_UpdateStringEx(self, message, fieldName, value, optIdentifier) -> int:
+        return self._update(message, fieldName, TIBRVMSG_STRING, _v(value) or b"", optIdentifier)
+
+    def tibrvMsg_UpdateI32Ex(self, message, fieldName, value, optIdentifier) -> int:
+        return self._update(message, fieldName, TIBRVMSG_I32, int(_v(value)), optIdentifier)
+
+    def tibrvMsg_UpdateF64Ex(self, message, fieldName, value, optIdentifier) -> int:
+        return self._update(message, fieldName, TIBRVMSG_F64, float(_v(value)), optIdentifier)
+
+    def tibrvMsg_UpdateMsgEx(self, message, fieldName, value, optIdentifier) -> int:
+        sub = self.msgs.get(_v(value))
+        if sub is None:
+            return TIBRV_INVALID_MSG
+        return self._update(message, fieldName, TIBRVMSG_MSG, sub.copy(), optIdentifier)
+
+    def _local(self, field, kind: int):
+        member = _MEMBERS.get(kind)
+        if member is None or field.count != 1:
+            return None
+        value = getattr(field.data, member)
+        if kind == TIBRVMSG_MSG:
+            sub = self.msgs.get(value)
+            return sub.copy() if sub is not None else None
+        if kind == TIBRVMSG_STRING:
+            return value or b""
+        if kind == TIBRVMSG_BOOL:
+            return bool(value)
+        return value
+
+    def tibrvMsg_AddField(self, message, field) -> int:
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        field = _field(field)
+        kind = field.type
+        value = self._local(field, kind)
+        name = field.name
+        if value is None or name is None:
+            return TIBRV_INVALID_ARG
+        msg.add(name, kind, value, field.id)
+        return TIBRV_OK
+
+    def tibrvMsg_UpdateField(self, message, field) -> int:
+        field = _field(field)
+        kind = field.type
+        value = self._local(field, kind)
+        if value is None:
+            return TIBRV_INVALID_ARG
+        return self._update(message, field.name, kind, value, field.id)
+
+    def tibrvMsg_GetByteSize(self, message, size) -> int:
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        _out(size).value = len(_encode(msg))
+        return TIBRV_OK
+
+    def tibrvMsg_GetAsBytes(self, message, bytePtr) -> int:
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        # valid until the message changes or is destroyed, like the library buffer
+        data = _encode(msg)
+        msg.wire = (ctypes.c_char * len(data)).from_buffer_copy(data)
+        _out(bytePtr).value = ctypes.addressof(msg.wire)
+        return TIBRV_OK
+
+    def tibrvMsg_CreateFromBytes(self, message, bytes) -> int:
+        address = _v(bytes)
+        if not address:
+            return TIBRV_INVALID_ARG
+        size = _SIZE.unpack(_bytes(address, _SIZE.size))[0]
+        try:
+            msg = _decode(_bytes(address, size))
+        except (struct.error, ValueError):
+            return TIBRV_INVALID_MSG
+        handle = self._id()
+        self.msgs[handle] = msg
+        _out(message).value = handle
+        return TIBRV_OK
+
+    def tibrvMsg_GetNumFields(self, message, numFields) -> int:
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        _out(numFields).value = len(msg.fields)
+        return TIBRV_OK
+
+    def tibrvMsg_GetFieldByIndex(self, message, field, fieldIndex) -> int:
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        index = _v(fieldIndex)
+        if index < 0 or index >= len(msg.fields):
+            return TIBRV_NOT_FOUND
+
+        name, kind, value, id = msg.fields[index]
+        out = _field(field)
+        out.name = name
+        out.type = kind
+        out.id = id
+        out.count = 1
+        if kind == TIBRVMSG_MSG:
+            # submessage handle stays valid while the message lives
+            if msg.borrowed is None:
+                msg.borrowed = {}
+            handle = msg.borrowed.get(index)
+            if handle is None:
+                handle = msg.borrowed[index] = self._id()
+                self.msgs[handle] = value
+            out.data.msg = handle
+            out.size = 0
+        elif kind == TIBRVMSG_STRING:
+            out.data.str = value
+            out.size = len(value) + 1
+        elif kind == TIBRVMSG_OPAQUE:
+            out.data.buf = ctypes.addressof(value)
+            out.size = len(value)
+        elif kind == TIBRVMSG_DATETIME:
+            out.data.date.sec, out.data.date.nsec = value
+            out.size = 16
+        elif kind in _ARRAYS:
+            out.data.array = ctypes.addressof(value)
+            out.count = len(value)
+            out.size = ctypes.sizeof(_ARRAYS[kind])
+        else:
+            setattr(out.data, _MEMBERS[kind], value)
+            out.size = _SIZES[kind]
+        return TIBRV_OK
+
+    def tibrvMsg_GetI32Ex(self, message, fieldName, value, optIdentifier) -> int:
+        status, field = self._get(message, fieldName, optIdentifier)
+        if status != TIBRV_OK:
+            return status
+        if field[1] not in _NUMBERS:
+            return TIBRV_CONVERSION_FAILED
+        _out(value).value = int(field[2])
+        return TIBRV_OK
+
+    def tibrvMsg_GetU64Ex(self, message, fieldName, value, optIdentifier) -> int:
+        status, field = self._get(message, fieldName, optIdentifier)
+        if status != TIBRV_OK:
+            return status
+        if field[1] not in _NUMBERS or field[2] < 0:
+            return TIBRV_CONVERSION_FAILED
+        _out(value).value = int(field[2])
+        return TIBRV_OK
+
+    def tibrvMsg_GetStringEx(self, message, fieldName, value, optIdentifier) -> int:
+        status, field = self._get(message, fieldName, optIdentifier)
+        if status != TIBRV_OK:
+            return status
+        if field[1] == TIBRVMSG_STRING:
+            _out(value).value = field[2]
+        elif field[1] in _NUMBERS:
+            _out(value).value = str(field[2]).encode()
+        else:
+            return TIBRV_CONVERSION_FAILED
+        return TIBRV_OK
+
+    ##-------------------------------------------------------------------------
+    # tibrv/tport.h
+    ##-------------------------------------------------------------------------
+
+    def tibrvTransport_Create(self, transport, service, network, daemon) -> int:
+        if self.opened == 0:
+            return TIBRV_NOT_INITIALIZED
+        handle = self._id()
+        self.transports[handle] = _Transport(_v(service), _v(network), _v(daemon))
+        _out(transport).value = handle
+        return TIBRV_OK
+
+    def tibrvTransport_SetDescription(self, transport, description) -> int:
+        tx = self.transports.get(_v(transport))
+        if tx is None:
+            return TIBRV_INVALID_TRANSPORT
+        tx.description = _v(description)
+        return TIBRV_OK
+
+    def tibrvTransport_CreateInbox(self, transport, subjectString, subjectLimit) -> int:
+        tx = self.transports.get(_v(transport))
+        if tx is None:
+            return TIBRV_INVALID_TRANSPORT
+        tx.inboxes += 1
+        inbox = "_INBOX.{}.{}.{}".format(self.host, _v(transport), tx.inboxes).encode()
+        if len(inbox) >= _v(subjectLimit):
+            return TIBRV_INVALID_ARG
+        subjectString.value = inbox
+        return TIBRV_OK
+
+    def tibrvTransport_Destroy(self, transport) -> int:
+        handle = _v(transport)
+        tx = self.transports.pop(handle, None)
+        if tx is None:
+            return TIBRV_INVALID_TRANSPORT
+        for listener in list(self.listeners.values()):
+            if listener.transport is tx:
+                self.tibrvEvent_Destroy(listener.id)
+        return TIBRV_OK
+
+    def tibrvTransport_Send(self, transport, message) -> int:
+        tx = self.transports.get(_v(transport))
+        if tx is None:
+            return TIBRV_INVALID_TRANSPORT
+        if not tx.connected:
+            return TIBRV_DAEMON_NOT_CONNECTED
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        if not msg.subject:
+            return TIBRV_INVALID_SUBJECT
+        self.publish(msg, tx.service)
+        return TIBRV_OK
+
+    ##-------------------------------------------------------------------------
+    # tibrv/queue.h, tibrv/qgroup.h
+    ##-------------------------------------------------------------------------
+
+    def tibrvQueue_Create(self, eventQueue) -> int:
+        handle = self._id()
+        self.queues[handle] = _Queue()
+        _out(eventQueue).value = handle
+        return TIBRV_OK
+
+    def tibrvQueue_SetPriority(self, eventQueue, priority) -> int:
+        que = self.queues.get(_v(eventQueue))
+        if que is None:
+            return TIBRV_INVALID_QUEUE
+        que.priority = _v(priority)
+        return TIBRV_OK
+
+    def tibrvQueue_SetLimitPolicy(self, eventQueue, policy, maxEvents, discardAmount) -> int:
+        que = self.queues.get(_v(eventQueue))
+        if que is None:
+            return TIBRV_INVALID_QUEUE
+        policy, maxEvents, discardAmount = _v(policy), _v(maxEvents), _v(discardAmount)
+        if policy not in (TIBRVQUEUE_DISCARD_NONE, TIBRVQUEUE_DISCARD_NEW, TIBRVQUEUE_DISCARD_FIRST,
+                          TIBRVQUEUE_DISCARD_LAST):
+            return TIBRV_INVALID_ARG
+        if policy != TIBRVQUEUE_DISCARD_NONE and (maxEvents <= 0 or
+                (policy != TIBRVQUEUE_DISCARD_NEW and not 0 < discardAmount <= maxEvents)):
+            return TIBRV_INVALID_ARG
+        with self.lock:
+            que.policy, que.maxEvents, que.discardAmount = policy, maxEvents, discardAmount
+        return TIBRV_OK
+
+    def tibrvQueue_GetCount(self, eventQueue, numEvents) -> int:
+        que = self.queues.get(_v(eventQueue))
+        if que is None:
+            return TIBRV_INVALID_QUEUE
+        _out(numEvents).value = len(que.events)
+        return TIBRV_OK
+
+    def tibrvQueue_DestroyEx(self, eventQueue, callback, closure) -> int:
+        que = self.queues.pop(_v(eventQueue), None)
+        if que is None:
+            return TIBRV_INVALID_QUEUE
+        for listener in list(self.listeners.values()):
+            if listener.queue is que:
+                self.tibrvEvent_Destroy(listener.id)
+        with self.lock:
+            for group in que.groups:
+                group.queues.remove(que)
+            que.events.clear()
+            self.lock.notify_all()
+        return TIBRV_OK
+
+    def tibrvQueue_TimedDispatch(self, eventQueue, timeout) -> int:
+        que = self.queues.get(_v(eventQueue))
+        if que is None:
+            return TIBRV_INVALID_QUEUE
+        event = self._next([que], _v(timeout), lambda: _v(eventQueue) in self.queues)
+        if event is None:
+            return TIBRV_TIMEOUT if _v(eventQueue) in self.queues else TIBRV_INVALID_QUEUE
+        self._dispatch(event)
+        return TIBRV_OK
+
+    def tibrvQueueGroup_Create(self, eventQueueGroup) -> int:
+        handle = self._id()
+        self.groups[handle] = _Group()
+        _out(eventQueueGroup).value = handle
+        return TIBRV_OK
+
+    def tibrvQueueGroup_Add(self, eventQueueGroup, eventQueue) -> int:
+        group = self.groups.get(_v(eventQueueGroup))
+        if group is None:
+            return TIBRV_INVALID_QUEUE_GROUP
+        que = self.queues.get(_v(eventQueue))
+        if que is None:
+            return TIBRV_INVALID_QUEUE
+        with self.lock:
+            group.queues.append(que)
+            que.groups.append(group)
+        return TIBRV_OK
+
+    def tibrvQueueGroup_Destroy(self, eventQueueGroup) -> int:
+        group = self.groups.pop(_v(eventQueueGroup), None)
+        if group is None:
+            return TIBRV_INVALID_QUEUE_GROUP
+        with self.lock:
+            for que in group.queues:
+                que.groups.remove(group)
+            self.lock.notify_all()
+        return TIBRV_OK
+
+    def tibrvQueueGroup_TimedDispatch(self, eventQueueGroup, timeout) -> int:
+        handle = _v(eventQueueGroup)
+        group = self.groups.get(handle)
+        if group is None:
+            return TIBRV_INVALID_QUEUE_GROUP
+        event = self._next(group.queues, _v(timeout), lambda: handle in self.groups)
+        if event is None:
+            return TIBRV_TIMEOUT if handle in self.groups else TIBRV_INVALID_QUEUE_GROUP
+        self._dispatch(event)
+        return TIBRV_OK
+
+    ##-------------------------------------------------------------------------
+    # tibrv/events.h
+    ##-------------------------------------------------------------------------
+
+    def tibrvEvent_CreateListener(self, event, eventQueue, callback, transport, subject, closure) -> int:
+        que = self.queues.get(_v(eventQueue))
+        if que is None:
+            return TIBRV_INVALID_QUEUE
+        if callback is None:
+            return TIBRV_INVALID_CALLBACK
+        tx = self.transports.get(_v(transport))
+        if tx is None:
+            return TIBRV_INVALID_TRANSPORT
+        subject = _v(subject)
+        if not subject:
+            return TIBRV_INVALID_SUBJECT
+
+        handle = self._id()
+        listener = _Listener(handle, que, callback, tx, subject, closure)
+        with self.lock:
+            self.listeners[handle] = listener
+            if listener.wildcard:
+                self.wildcards.append(listener)
+            else:
+                self.exact.setdefault(subject, []).append(listener)
+        _out(event).value = handle
+        return TIBRV_OK
+
+    def tibrvEvent_Destroy(self, event) -> int:
+        with self.lock:
+            listener = self.listeners.pop(_v(event), None)
+            if listener is None:
+                return TIBRV_INVALID_EVENT
+            listener.active = False
+            if listener.wildcard:
+                self.wildcards.remove(listener)
+            else:
+                self.exact[listener.subject].remove(listener)
+                if not self.exact[listener.subject]:
+                    del self.exact[listener.subject]
+        return TIBRV_OK
+
+    ##-------------------------------------------------------------------------
+    # tibrv/cm.h
+    ##-------------------------------------------------------------------------
+
+    def tibrvcmTransport_Create(self, cmTransport, transport, cmName, requestOld, ledgerName, syncLedger,
+                                relayAgent) -> int:
+        tx = self.transports.get(_v(transport))
+        if tx is None:
+            return TIBRV_INVALID_TRANSPORT
+        name = _v(cmName)
+        ledger = _v(ledgerName)
+        if ledger is not None and not name:
+            return TIBRV_INVALID_ARG
+
+        handle = self._id()
+        cm = _CMTransport(_v(transport), tx, name, ledger.decode() if ledger else None, bool(_v(syncLedger)))
+        if cm.ledger and os.path.exists(cm.ledger):
+            try:
+                cm.load()
+            except (OSError, struct.error):
+                return TIBRV_INVALID_FILE
+        self.cmTransports[handle] = cm
+        _out(cmTransport).value = handle
+
+        # the ledger messages go out again to their listeners
+        for (subject, seqno), entry in list(cm.pending.items()):
+            self.publish(entry[0], tx.service)
+        return TIBRV_OK
+
+    def tibrvcmTransport_CreateDistributedQueueEx(self, cmTransport, transport, cmName, workerWeight, workerTasks,
+                                                    schedulerWeight, schedulerHeartbeat, schedulerActivation) -> int:
+        tx = self.transports.get(_v(transport))
+        if tx is None:
+            return TIBRV_INVALID_TRANSPORT
+        if not _v(cmName):
+            return TIBRV_INVALID_ARG
+
+        handle = self._id()
+        cm = _CMTransport(_v(transport), tx, _v(cmName), None, False)
+        cm.distributed = True
+        cm.workerWeight = _v(workerWeight)
+        cm.workerTasks = _v(workerTasks)
+        self.cmTransports[handle] = cm
+        _out(cmTransport).value = handle
+        return TIBRV_OK
+
+    def tibrvcmTransport_CreateDistributedQueue(self, cmTransport, transport, cmName) -> int:
+        return self.tibrvcmTransport_CreateDistributedQueueEx(cmTransport, transport, cmName, 1, 1, 1, 1.0, 3.5)
+
+    def tibrvcmTransport_SetWorkerTasks(self, cmTransport, workerTasks) -> int:
+        cm = self.cmTransports.get(_v(cmTransport))
+        if cm is None or not cm.distributed:
+            return TIBRV_INVALID_TRANSPORT
+        cm.workerTasks = _v(workerTasks)
+        self._drain(cm.name)
+        return TIBRV_OK
+
+    def tibrvcmTransport_SetWorkerWeight(self, cmTransport, workerWeight) -> int:
+        cm = self.cmTransports.get(_v(cmTransport))
+        if cm is None or not cm.distributed:
+            return TIBRV_INVALID_TRANSPORT
+        cm.workerWeight = _v(workerWeight)
+        return TIBRV_OK
+
+    def tibrvcmTransport_Destroy(self, cmTransport) -> int:
+        cm = self.cmTransports.pop(_v(cmTransport), None)
+        if cm is None:
+            return TIBRV_INVALID_TRANSPORT
+        for listener in list(self.listeners.values()):
+            if listener.cm is cm:
+                self.tibrvEvent_Destroy(listener.id)
+        if cm.ledger:
+            try:
+                with self.lock:
+                    cm.save()
+            except OSError:
+                return TIBRV_IO_FAILED
+        return TIBRV_OK
+
+    def tibrvcmTransport_SetDefaultCMTimeLimit(self, cmTransport, timeLimit) -> int:
+        cm = self.cmTransports.get(_v(cmTransport))
+        if cm is None:
+            return TIBRV_INVALID_TRANSPORT
+        cm.timeLimit = _v(timeLimit)
+        return TIBRV_OK
+
+    def tibrvcmTransport_AddListener(self, cmTransport, cmName, subject) -> int:
+        cm = self.cmTransports.get(_v(cmTransport))
+        if cm is None:
+            return TIBRV_INVALID_TRANSPORT
+        if not _v(cmName) or not _v(subject):
+            return TIBRV_INVALID_ARG
+        cm.listeners.setdefault(_v(subject), set()).add(_v(cmName))
+        return TIBRV_OK
+
+    def tibrvcmTransport_SyncLedger(self, cmTransport) -> int:
+        cm = self.cmTransports.get(_v(cmTransport))
+        if cm is None:
+            return TIBRV_INVALID_TRANSPORT
+        if cm.ledger:
+            try:
+                with self.lock:
+                    cm.save()
+            except OSError:
+                return TIBRV_IO_FAILED
+        return TIBRV_OK
+
+    def tibrvcmTransport_Send(self, cmTransport, message) -> int:
+        cm = self.cmTransports.get(_v(cmTransport))
+        if cm is None:
+            return TIBRV_INVALID_TRANSPORT
+        if not cm.transport.connected:
+            return TIBRV_DAEMON_NOT_CONNECTED
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        if not msg.subject:
+            return TIBRV_INVALID_SUBJECT
+
+        subject = msg.subject
+        with self.lock:
+            seqno = cm.sequence.get(subject, 0) + 1
+            cm.sequence[subject] = seqno
+            msg.cm = (cm.name, seqno)
+
+            if cm.name:
+                # listeners register with the sender on their first certified message
+                names = cm.listeners.setdefault(subject, set())
+                names.update(listener.cm.name for listener in self._targets(subject, cm.transport.service))
+                if names:
+                    deadline = time.monotonic() + cm.timeLimit if cm.timeLimit > 0 else None
+                    cm.pending[(subject, seqno)] = [msg.copy(), set(names), deadline]
+                    if deadline is not None:
+                        cm.deadlines.append((deadline, (subject, seqno)))
+                if cm.sync and cm.ledger:
+                    cm.save()
+
+        self.publish(msg, cm.transport.service)
+        return TIBRV_OK
+
+    def tibrvcmEvent_CreateListener(self, cmListener, eventQueue, callback, cmTransport, subject, closure) -> int:
+        cm = self.cmTransports.get(_v(cmTransport))
+        if cm is None:
+            return TIBRV_INVALID_TRANSPORT
+        status = self.tibrvEvent_CreateListener(cmListener, eventQueue, callback, cm.transportId, subject, closure)
+        if status != TIBRV_OK:
+            return status
+        self.listeners[_out(cmListener).value].cm = cm
+        return TIBRV_OK
+
+    def tibrvcmEvent_SetExplicitConfirm(self, cmListener) -> int:
+        listener = self.listeners.get(_v(cmListener))
+        if listener is None or listener.cm is None:
+            return TIBRV_INVALID_EVENT
+        listener.explicit = True
+        return TIBRV_OK
+
+    def tibrvcmEvent_ConfirmMsg(self, cmListener, message) -> int:
+        listener = self.listeners.get(_v(cmListener))
+        if listener is None or listener.cm is None:
+            return TIBRV_INVALID_EVENT
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        if msg.cm is None:
+            return TIBRV_NOT_FOUND
+        self._confirm(listener, msg)
+        return TIBRV_OK
+
+    def tibrvcmEvent_Destroy(self, cmListener, cancelAgreements) -> int:
+        listener = self.listeners.get(_v(cmListener))
+        if listener is None or listener.cm is None:
+            return TIBRV_INVALID_EVENT
+        return self.tibrvEvent_Destroy(cmListener)
+
+    def tibrvMsg_GetCMSender(self, message, senderName) -> int:
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        if msg.cm is None or not msg.cm[0]:
+            return TIBRV_NOT_FOUND
+        _out(senderName).value = msg.cm[0]
+        return TIBRV_OK
+
+    def tibrvMsg_GetCMSequence(self, message, sequenceNumber) -> int:
+        msg = self.msgs.get(_v(message))
+        if msg is None:
+            return TIBRV_INVALID_MSG
+        if msg.cm is None:
+            return TIBRV_NOT_FOUND
+        _out(sequenceNumber).value = msg.cm[1]
+        return TIBRV_OK
@@ -0,0 +1,281 @@
+import os
+import json
+import time
+from collections import deque
+from tibrvmsglib import RVMessage, tibrvMsg
+
+
+##-----------------------------------------------------------------------------
+# Histogram
+#
+# HDR-style log-linear histogram of nanosecond values: 2**precision linear
+# sub-buckets per power of two, so a recorded value is off by less than
+# 2**-precision of itself (3% with the default 5). Memory is fixed, a record
+# is a bit_length, a shift and a list increment.
+##-----------------------------------------------------------------------------
+
+class Histogram():
+
+    def __init__(self, precision: int = 5):
+        self.precision = precision
+        self.subBuckets = 1 << precision
+        self.counts = [0] * ((65 - precision) << precision)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def index(self, value: int) -> int:
+        if value < self.subBuckets:
+            return value
+        shift = value.bit_length() - self.precision - 1
+        return ((shift + 1) << self.precision) + (value >> shift) - self.subBuckets
+
+    def bounds(self, index: int) -> (int, int):
+        # lowest and highest value of bucket index
+        row, sub = index >> self.precision, index & (self.subBuckets - 1)
+        if row == 0:
+            return sub, sub
+        low = (sub + self.subBuckets) << (row - 1)
+        return low, low + (1 << (row - 1)) - 1
+
+    def record(self, value: int):
+        if value < 0:
+            value = 0
+        self.counts[self.index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "Histogram"):
+        if other.precision != self.precision:
+            raise ValueError("histogram precision {} != {}".format(other.precision, self.precision))
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p: float) -> int:
+        # highest value equivalent to the p-th percentile, 0 when empty
+        if self.count == 0:
+            return 0
+        rank = max(1, -(-self.count * p // 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.bounds(index)[1], self.max)
+        return self.max
+
+    def buckets(self) -> list:
+        # [(highest value, count)] of the non empty buckets
+        return [(self.bounds(index)[1], count) for index, count in enumerate(self.counts) if count]
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def stats(self) -> dict:
+        return {"count": self.count, "min": self.min or 0, "max": self.max, "mean": self.mean,
+                "p50": self.percentile(50), "p90": self.percentile(90), "p99": self.percentile(99),
+                "p99.9": self.percentile(99.9)}
+
+
+##-----------------------------------------------------------------------------
+# Metrics
+#
+# Latency histograms and counters of an RVClient, see RVClient.enableMetrics().
+#   send        tibrvTransport_Send of RVClient.send
+#   dispatch    TimedDispatch calls that dispatched an event, wait included
+#   callback    RVClient.callback, routing and handler
+#   request     KIS DATA_MSG from send to its answer (TABLE_ACK, ERROR, ...)
+# Messages are counted by direction and type (DATA_MSG/TABLE_ACK) and by the
+# first prefixDepth elements of their subject. Queue depths come from
+# tibrvQueue_GetCount every sampleEvery dispatched events and on snapshot().
+# Every counter has a single writer thread: sends on the sender, the rest on
+# the dispatching thread, so no lock is taken on the hot path.
+##-----------------------------------------------------------------------------
+
+class Metrics():
+
+    OUT = "out"
+    IN = "in"
+
+    HISTOGRAMS = ("send", "dispatch", "callback", "request")
+
+    # Prometheus histogram buckets in seconds, derived from the HDR buckets
+    BOUNDS = (1e-6, 2e-6, 5e-6, 1e-5, 2e-5, 5e-5, 1e-4, 2e-4, 5e-4, 1e-3, 2e-3, 5e-3,
+              1e-2, 2e-2, 5e-2, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+    _TYPES = {RVMessage.IDENTIFY_MSG: "IDENTIFY_MSG", RVMessage.DATA_MSG: "DATA_MSG", RVMessage.PING_MSG: "PING_MSG"}
+    _DATA_TYPES = {value: name[len("ICC_DATA_MSG_"):] for name, value in vars(RVMessage).items()
+                   if name.startswith("ICC_DATA_MSG_")}
+
+    def __init__(self, precision: int = 5, prefixDepth: int = 2, maxPrefixes: int = 256, sampleEvery: int = 64):
+        self.histograms = {name: Histogram(precision) for name in Metrics.HISTOGRAMS}
+        self.prefixDepth = prefixDepth
+        self.maxPrefixes = maxPrefixes      # distinct subject prefixes, the rest is counted as "other"
+        self.sampleEvery = sampleEvery
+        self.types = {Metrics.OUT: {}, Metrics.IN: {}}
+        self.subjects = {Metrics.OUT: {}, Metrics.IN: {}}
+        self.prefixes = {}                  # subject -> prefix, bounded
+        self.queues = {}                    # queue name -> [depth, peak]
+        self.inflight = deque()             # send time of KIS DATA_MSG answered on the session inbox
+        self.requests = {}                  # request id -> send time, answers on reply subjects
+        self.dispatched = 0
+        self.sampler = None                 # called with self before a snapshot, see RVClient.sampleQueues
+        self.started = time.time()
+
+    def record(self, name: str, nanoseconds: int):
+        self.histograms[name].record(nanoseconds)
+
+    def count(self, direction: str, message: tibrvMsg, subject: str, kind: int = None):
+        # kind is the Type field when the caller read it already
+        if kind is None:
+            status, kind = RVMessage.tibrvMsg_GetI32(message, "Type")
+            if status != RVMessage.TIBRV_OK:
+                kind = None
+        if kind is None:
+            key = "-"
+        else:
+            key = Metrics._TYPES.get(kind, str(kind))
+            if kind == RVMessage.DATA_MSG:
+                status, data = RVMessage.tibrvMsg_GetI32(message, "Data Type")
+                if status == RVMessage.TIBRV_OK:
+                    key += "/" + Metrics._DATA_TYPES.get(data, str(data))
+        types = self.types[direction]
+        types[key] = types.get(key, 0) + 1
+
+        prefix = self.prefixes.get(subject)
+        if prefix is None:
+            prefix = ".".join(subject.split(".", self.prefixDepth)[:self.prefixDepth]) if subject else "-"
+            if len(self.prefixes) < 4 * self.maxPrefixes:
+                self.prefixes[subject] = prefix
+        subjects = self.subjects[direction]
+        if prefix not in subjects and len(subjects) >= self.maxPrefixes:
+            prefix = "other"
+        subjects[prefix] = subjects.get(prefix, 0) + 1
+
+    def sent(self, requestId: int = 0):
+        # a KIS DATA_MSG went out, requestId for answers on a reply subject
+        if requestId:
+            self.requests[requestId] = time.perf_counter_ns()
+        else:
+            self.inflight.append(time.perf_counter_ns())
+
+    def answered(self, requestId: int = 0):
+        if requestId:
+            start = self.requests.pop(requestId, None)
+        else:
+            start = self.inflight.popleft() if self.inflight else None
+        if start is not None:
+            self.histograms["request"].record(time.perf_counter_ns() - start)
+
+    def lost(self):
+        # session gone, the answers of its messages will not come
+        self.inflight.clear()
+        self.requests.clear()
+
+    def depth(self, name: str, count: int):
+        queue = self.queues.get(name)
+        if queue is None:
+            self.queues[name] = [count, count]
+        else:
+            queue[0] = count
+            if count > queue[1]:
+                queue[1] = count
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+        for counters in (self.types, self.subjects):
+            for direction in counters.values():
+                direction.clear()
+        self.queues.clear()
+        self.dispatched = 0
+        self.started = time.time()
+
+    ##-------------------------------------------------------------------------
+    # export
+    ##-------------------------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        if self.sampler is not None:
+            self.sampler(self)
+        return {
+            "started": self.started,
+            "time": time.time(),
+            "histograms": {name: dict(histogram.stats(), buckets = histogram.buckets())
+                           for name, histogram in self.histograms.items()},
+            "messages": {direction: dict(types) for direction, types in self.types.items()},
+            "subjects": {direction: dict(subjects) for direction, subjects in self.subjects.items()},
+            "queues": {name: {"depth": depth, "peak": peak} for name, (depth, peak) in self.queues.items()},
+        }
+
+    def json(self) -> str:
+        return json.dumps(self.snapshot(), indent = 1, sort_keys = True)
+
+    def prometheus(self, namespace: str = "tibrv") -> str:
+        # text exposition format, histograms in seconds
+        snapshot = self.snapshot()
+        lines = []
+        for name, histogram in self.histograms.items():
+            metric = "{}_{}_seconds".format(namespace, name)
+            lines.append("# TYPE {} histogram".format(metric))
+            cumulative = [0] * len(Metrics.BOUNDS)
+            for high, count in histogram.buckets():
+                for i, bound in enumerate(Metrics.BOUNDS):
+                    if high <= bound * 1e9:
+                        cumulative[i] += count
+            for bound, count in zip(Metrics.BOUNDS, cumulative):
+                lines.append('{}_bucket{{le="{:g}"}} {}'.format(metric, bound, count))
+            lines.append('{}_bucket{{le="+Inf"}} {}'.format(metric, histogram.count))
+            lines.append("{}_sum {:.9f}".format(metric, histogram.total / 1e9))
+            lines.append("{}_count {}".format(metric, histogram.count))
+
+        metric = namespace + "_messages_total"
+        lines.append("# TYPE {} counter".format(metric))
+        for direction, types in snapshot["messages"].items():
+            for kind, count in sorted(types.items()):
+                lines.append('{}{{direction="{}",type="{}"}} {}'.format(metric, direction, kind, count))
+
+        metric = namespace + "_subject_messages_total"
+        lines.append("# TYPE {} counter".format(metric))
+        for direction, subjects in snapshot["subjects"].items():
+            for prefix, count in sorted(subjects.items()):
+                lines.append('{}{{direction="{}",prefix="{}"}} {}'.format(metric, direction, _label(prefix), count))
+
+        for suffix, field in (("depth", "depth"), ("depth_peak", "peak")):
+            metric = "{}_queue_{}".format(namespace, suffix)
+            lines.append("# TYPE {} gauge".format(metric))
+            for name, queue in sorted(snapshot["queues"].items()):
+                lines.append('{}{{queue="{}"}} {}'.format(metric, name, queue[field]))
+
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str):
+        # JSON for *.json, else Prometheus text (node_exporter textfile collector),
+        # written to a temporary file and renamed so readers never see half of it
+        text = self.json() if path.endswith(".json") else self.prometheus()
+        temp = path + ".tmp"
+        with open(temp, "w") as f:
+            f.write(text)
+        os.replace(temp, path)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
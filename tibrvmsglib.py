@@ -1,567 +1,2373 @@
-import sys
-import ctypes
-from platform import architecture
-from typing import NewType, Callable, List, Any
-
-
-# module variables
-_func = None                # ctype func cast, OS dependent
-
-__lib_bit = lambda: '64' if architecture()[0] == '64bit' else ''
-if sys.platform[:5] == "linux" or sys.platform[:3] == "aix":
-    # Unix/Linux
-    _func = ctypes.CFUNCTYPE
-    __lib_name = lambda name: 'lib' + name + __lib_bit() + '.so'
-    _rv = ctypes.CDLL(__lib_name("tibrv"))
-elif sys.platform == 'win32':
-    # Windows
-    _func = ctypes.WINFUNCTYPE
-    __lib_name = lambda name: name
-    _rv = ctypes.CDLL(__lib_name("tibrv"))
-else:
-    raise SystemError(sys.platform + ' is not supported')
-
-
-##-----------------------------------------------------------------------------
-# CTYPES
-# tibrv/types.h
-##-----------------------------------------------------------------------------
-
-_c_tibrv_status         = ctypes.c_int32
-
-_c_tibrv_i8                  = ctypes.c_int8
-_c_tibrv_u8                  = ctypes.c_uint8
-_c_tibrv_i16                 = ctypes.c_int16
-_c_tibrv_u16                 = ctypes.c_uint16
-_c_tibrv_i32                 = ctypes.c_int32
-_c_tibrv_u32                 = ctypes.c_uint32
-_c_tibrv_i64                 = ctypes.c_int64
-_c_tibrv_u64                 = ctypes.c_uint64
-_c_tibrv_f32                 = ctypes.c_float
-_c_tibrv_f64                 = ctypes.c_double
-_c_tibrv_bool                = ctypes.c_int
-_c_tibrv_ipport16            = ctypes.c_uint16
-_c_tibrv_ipaddr32            = ctypes.c_uint32
-_c_tibrv_str                 = ctypes.c_char_p
-
-_c_tibrv_status              = ctypes.c_int32
-_c_tibrvId                   = ctypes.c_uint32
-_c_tibrvMsg                  = ctypes.c_void_p
-_c_tibrvEvent                = _c_tibrvId
-_c_tibrvDispatchable         = _c_tibrvId
-_c_tibrvQueue                = _c_tibrvDispatchable
-_c_tibrvQueueGroup           = _c_tibrvDispatchable
-_c_tibrvTransport            = _c_tibrvId
-_c_tibrvDispatcher           = _c_tibrvId
-_c_tibrvEventType            = ctypes.c_uint32
-_c_tibrvQueueLimitPolicy     = ctypes.c_int32
-_c_tibrvIOType               = ctypes.c_int32
-
-
-##-----------------------------------------------------------------------------
-# TIBRV Data Types for Python
-##-----------------------------------------------------------------------------
-tibrv_status            = NewType('tibrv_status', int)              # int
-tibrvId                 = NewType('tibrvId', int)                   # int
-tibrvMsg                = NewType('tibrvMsg', int)                  # c_void_p
-tibrvEvent              = NewType('tibrvEvent', int)                # tibrvId
-tibrvDispatchable       = NewType('tibrvDispatchable', int)         # tibrvId
-tibrvQueue              = NewType('tibrvQueue', int)                # tibrvId
-tibrvQueueGroup         = NewType('tibrvQueueGroup', int)           # tibrvId
-tibrvTransport          = NewType('tibrvTransport', int)            # tibrvId
-tibrvDispatcher         = NewType('tibrvDispatcher', int)           # tibrvId
-tibrvEventType          = NewType('tibrvEventType', int)            # enum(int)
-tibrvQueueLimitPolicy   = NewType('tibrvQueueLimitPolicy', int)     # enum(int)
-tibrvIOType             = NewType('tibrvIOType', int)               # enum(int)
-
-def _cstr(sz: str, codepage = None) -> str:
-    if sz is None:
-        return None
-
-    if codepage is None:
-        return _c_tibrv_str(str(sz).encode())
-    else:
-        return _c_tibrv_str(str(sz).encode(codepage))
-
-def _ret(param: list, val: object = None, size: int = 1) -> None:
-    while len(param) < size:
-        param.append(None)
-
-    if val is None:
-        param[0] = None
-        return
-
-    # assign val -> param[0]
-    if val is not list:
-        param[0] = val
-        return
-
-    # assign val[] -> param[]
-    for i in range(len(param)):
-        if i < len(val):
-            param[i] = val[i]
-        else:
-            param[i] = None
-
-    return
-
-def _pystr(sz: ctypes.c_char_p, codepage = None) -> str:
-    if sz is None:
-        return None
-
-    if type(sz) is bytes:
-        ss = sz
-    elif sz.value is None:
-        return None
-    else:
-        ss = sz.value
-
-    if codepage is None:
-        return ss.decode()
-    else:
-        return ss.decode(codepage)
-
-
-
-class RVMessage():
-
-    # Message types
-    IDENTIFY_MSG                    = 1
-    DATA_MSG                        = 2
-    PING_MSG                        = 3
-
-    # Error statuses
-    TIBRV_OK                        = 0
-    TIBRV_INVALID_ARG               = 3
-    TIBRV_INVALID_MSG               = 42
-
-
-    # Types of message
-    ICC_DATA_MSG_SIGNON             = 1
-    ICC_DATA_MSG_SIGNOFF            = 2
-    ICC_DATA_MSG_REQUEST            = 3
-    ICC_DATA_MSG_REQUEST_ANSWER     = 4
-    ICC_DATA_MSG_TABLE              = 5
-    ICC_DATA_MSG_TABLE_ACK          = 6
-    ICC_DATA_MSG_READY_ON           = 7
-    ICC_DATA_MSG_READY_OFF          = 8
-    ICC_DATA_MSG_RELOAD_END         = 9
-    ICC_DATA_MSG_ERROR              = 10
-    ICC_DATA_MSG_INFO               = 11
-    ICC_DATA_MSG_TABLE_SEND         = 12
-    ICC_DATA_MSG_TABLE_REQ          = 13
-    ICC_DATA_MSG_EVENT              = 14
-
-
-    ##-----------------------------------------------------------------------------
-    # TIBRV API : tibrv/status.h
-    ##-----------------------------------------------------------------------------
-
-    _rv.tibrvStatus_GetText.argtypes = [_c_tibrv_status]
-    _rv.tibrvStatus_GetText.restype = ctypes.c_char_p
-
-    @staticmethod
-    def tibrvStatus_GetText(code: tibrv_status) -> str:
-
-        if code is None:
-            return None
-
-        c = _c_tibrv_status(code)
-        sz = _rv.tibrvStatus_GetText(c)
-        return _pystr(sz)
-
-    ##-----------------------------------------------------------------------------
-    # TIBRV API : tibrv/msg.h
-    ##-----------------------------------------------------------------------------
-
-    _rv.tibrvMsg_Create.argtypes = [ctypes.POINTER(_c_tibrvMsg)]
-    _rv.tibrvMsg_Create.restype = _c_tibrv_status
-
-    _rv.tibrvMsg_CreateEx.argtypes = [ctypes.POINTER(_c_tibrvMsg), _c_tibrv_u32]
-    _rv.tibrvMsg_CreateEx.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvMsg_Create(initialStorage: int=0) -> (tibrv_status, tibrvMsg):
-
-        msg = _c_tibrvMsg(0)
-
-        if initialStorage == 0:
-            status = _rv.tibrvMsg_Create(ctypes.byref(msg))
-        else:
-            try:
-                n = _c_tibrv_u32(initialStorage)
-            except:
-                return RVMessage.TIBRV_INVALID_ARG, None
-
-            status = _rv.tibrvMsg_CreateEx(ctypes.byref(msg), n)
-
-        return status, msg.value
-
-
-    _rv.tibrvMsg_SetSendSubject.argtypes = [_c_tibrvMsg, _c_tibrv_str]
-    _rv.tibrvMsg_SetSendSubject.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvMsg_SetSendSubject(message: tibrvMsg, subject: str) -> tibrv_status:
-
-        if message is None or message == 0:
-            return RVMessage.TIBRV_INVALID_MSG
-
-        try:
-            msg = _c_tibrvMsg(message)
-        except:
-            return RVMessage.TIBRV_INVALID_MSG
-
-        try:
-            sz = _cstr(subject)
-        except:
-            return RVMessage.TIBRV_INVALID_ARG
-
-        status = _rv.tibrvMsg_SetSendSubject(msg, sz)
-
-        return status
-
-
-    _rv.tibrvMsg_GetSendSubject.argtypes = [_c_tibrvMsg, ctypes.POINTER(_c_tibrv_str)]
-    _rv.tibrvMsg_GetSendSubject.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvMsg_GetSendSubject(message: tibrvMsg) -> (tibrv_status, str):
-
-        if message is None or message == 0:
-            return RVMessage.TIBRV_INVALID_MSG, None
-
-        try:
-            msg = _c_tibrvMsg(message)
-        except:
-            return RVMessage.TIBRV_INVALID_MSG, None
-
-        sz = _c_tibrv_str(0)
-        status = _rv.tibrvMsg_GetSendSubject(msg, ctypes.byref(sz))
-
-        return status, _pystr(sz)
-
-    _rv.tibrvMsg_GetReplySubject.argtypes = [_c_tibrvMsg, ctypes.POINTER(_c_tibrv_str)]
-    _rv.tibrvMsg_GetReplySubject.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvMsg_GetReplySubject(message: tibrvMsg) -> (tibrv_status, str):
-
-        if message is None or message == 0:
-            return RVMessage.TIBRV_INVALID_MSG, None
-
-        try:
-            msg = _c_tibrvMsg(message)
-        except:
-            return RVMessage.TIBRV_INVALID_MSG, None
-
-        sz = _c_tibrv_str()
-        status = _rv.tibrvMsg_GetReplySubject(msg, ctypes.byref(sz))
-
-        return status, _pystr(sz)
-
-
-    _rv.tibrvMsg_ConvertToString.argtypes = [_c_tibrvMsg, ctypes.POINTER(_c_tibrv_str)]
-    _rv.tibrvMsg_ConvertToString.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvMsg_ConvertToString(message: tibrvMsg, codepage: str=None) -> (tibrv_status, str):
-
-        if message is None or message == 0:
-            return RVMessage.TIBRV_INVALID_MSG, None
-
-        try:
-            msg = _c_tibrvMsg(message)
-        except:
-            return RVMessage.TIBRV_INVALID_MSG, None
-
-        sz = _c_tibrv_str()
-        status = _rv.tibrvMsg_ConvertToString(msg, ctypes.byref(sz))
-
-        return status, _pystr(sz, codepage)
-
-    @staticmethod
-    def tibrvMsg_AddString(message: tibrvMsg, fieldName: str, value: str,
-                        optIdentifier: int = 0, codepage: str = None) -> tibrv_status:
-
-        if message is None or message == 0:
-            return RVMessage.TIBRV_INVALID_MSG
-
-        if fieldName is None or optIdentifier is None:
-            return RVMessage.TIBRV_INVALID_ARG
-
-        try:
-            msg = _c_tibrvMsg(message)
-        except:
-            return RVMessage.TIBRV_INVALID_MSG
-
-        try:
-            name = _cstr(fieldName)
-            val = _cstr(value, codepage)
-            id = _c_tibrv_u16(optIdentifier)
-
-        except:
-            return RVMessage.TIBRV_INVALID_ARG
-
-        status = _rv.tibrvMsg_AddStringEx(msg, name, val, id)
-
-        return status
-
-
-    _rv.tibrvMsg_AddI32Ex.argtypes = [_c_tibrvMsg, _c_tibrv_str, _c_tibrv_i32, _c_tibrv_u16]
-    _rv.tibrvMsg_AddI32Ex.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvMsg_AddI32(message:tibrvMsg, fieldName:str, value:int, optIdentifier:int = 0) -> tibrv_status:
-
-        if message is None or message == 0:
-            return RVMessage.TIBRV_INVALID_MSG
-
-        if fieldName is None or optIdentifier is None:
-            return RVMessage.TIBRV_INVALID_ARG
-
-        try:
-            msg = _c_tibrvMsg(message)
-        except:
-            return RVMessage.TIBRV_INVALID_MSG
-
-        try:
-            name = _cstr(fieldName)
-            val = _c_tibrv_i32(value)
-            id = _c_tibrv_u16(optIdentifier)
-        except:
-            return RVMessage.TIBRV_INVALID_ARG
-
-        status = _rv.tibrvMsg_AddI32Ex(msg, name, val, id)
-
-        return status
-
-
-    _rv.tibrvMsg_AddF64Ex.argtypes = [_c_tibrvMsg, _c_tibrv_str, _c_tibrv_f64, _c_tibrv_u16]
-    _rv.tibrvMsg_AddF64Ex.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvMsg_AddF64(message: tibrvMsg, fieldName: str, value: float,
-                        optIdentifier: int = 0) -> tibrv_status:
-
-        if message is None or message == 0:
-            return RVMessage.TIBRV_INVALID_MSG
-
-        if fieldName is None or optIdentifier is None:
-            return RVMessage.TIBRV_INVALID_ARG
-
-        try:
-            msg = _c_tibrvMsg(message)
-        except:
-            return RVMessage.TIBRV_INVALID_MSG
-
-        try:
-            name = _cstr(fieldName)
-            val = _c_tibrv_f64(value)
-            id = _c_tibrv_u16(optIdentifier)
-        except:
-            return RVMessage.TIBRV_INVALID_ARG
-
-        status = _rv.tibrvMsg_AddF64Ex(msg, name, val, id)
-
-        return status
-
-    _rv.tibrvMsg_AddMsgEx.argtypes = [_c_tibrvMsg,
-                                    _c_tibrv_str,
-                                    _c_tibrvMsg,
-                                    _c_tibrv_u16]
-
-    _rv.tibrvMsg_AddMsgEx.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvMsg_AddMsg(message: tibrvMsg, fieldName: str, value: tibrvMsg,
-                        optIdentifier: int = 0) -> tibrv_status:
-
-        if message is None or message == 0:
-            return RVMessage.TIBRV_INVALID_MSG
-
-        if fieldName is None or optIdentifier is None:
-            return RVMessage.TIBRV_INVALID_ARG
-
-        try:
-            msg = _c_tibrvMsg(message)
-        except:
-            return RVMessage.TIBRV_INVALID_MSG
-
-        try:
-            name = _cstr(fieldName)
-            id = _c_tibrv_u16(optIdentifier)
-            val = _c_tibrvMsg(value)
-        except:
-            return RVMessage.TIBRV_INVALID_ARG
-
-        status = _rv.tibrvMsg_AddMsgEx(msg, name, val, id)
-        
-
-        return status
-
-    _rv.tibrvMsg_GetI32Ex.argtypes = [_c_tibrvMsg,
-                                    _c_tibrv_str,
-                                    ctypes.POINTER(_c_tibrv_i32),
-                                    _c_tibrv_u16]
-
-    _rv.tibrvMsg_GetI32Ex.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvMsg_GetI32(message:tibrvMsg, fieldName:str, optIdentifier:int = 0) -> (tibrv_status, int):
-
-        if message is None or message == 0:
-            return RVMessage.TIBRV_INVALID_MSG, None
-
-        if fieldName is None or optIdentifier is None:
-            return RVMessage.TIBRV_INVALID_ARG, None
-
-        try:
-            msg = _c_tibrvMsg(message)
-        except:
-            return RVMessage.TIBRV_INVALID_MSG, None
-
-        ret = None
-
-        try:
-            name = _cstr(fieldName)
-            val = _c_tibrv_i32(0)
-            id = _c_tibrv_u16(optIdentifier)
-        except:
-            return RVMessage.TIBRV_INVALID_ARG, None
-
-        status = _rv.tibrvMsg_GetI32Ex(msg, name, ctypes.byref(val), id)
-
-        if status == RVMessage.TIBRV_OK:
-            ret = val.value
-
-        return status, ret
-
-
-    _rv.tibrvMsg_GetStringEx.argtypes = [_c_tibrvMsg,
-                                        _c_tibrv_str,
-                                        ctypes.POINTER(_c_tibrv_str),
-                                        _c_tibrv_u16]
-
-    _rv.tibrvMsg_GetStringEx.restype = _c_tibrv_status
-
-    @staticmethod
-    def tibrvMsg_GetString(message: tibrvMsg, fieldName: str, optIdentifier: int = 0,
-                        codepage: str = None) -> (tibrv_status, str):
-
-        if message is None or message == 0:
-            return RVMessage.TIBRV_INVALID_MSG, None
-
-        if fieldName is None or optIdentifier is None:
-            return RVMessage.TIBRV_INVALID_ARG, None
-
-        try:
-            msg = _c_tibrvMsg(message)
-        except:
-            return RVMessage.TIBRV_INVALID_MSG, None
-
-        ret = None
-
-        try:
-            name = _cstr(fieldName)
-            val = _c_tibrv_str(0)
-            id = _c_tibrv_u16(optIdentifier)
-        except:
-            return RVMessage.TIBRV_INVALID_ARG, None
-
-        status = _rv.tibrvMsg_GetStringEx(msg, name, ctypes.byref(val), id)
-
-        if status == RVMessage.TIBRV_OK:
-            ret = _pystr(val, codepage)
-
-        return status, ret
-
-    ##########################################################
-
-
-    def __init__(self, dateformat = 'DD/MM/YYYY'):
-        self.subject = ""
-        self.dateformat = dateformat
-        status, self.message = self.tibrvMsg_Create()
-        if status != RVMessage.TIBRV_OK:
-            print('ERROR tibrvMsg_Create', status, RVMessage.TIBRVStatus_GetText(status))
-            sys.exit(-1)
-    
-    def __str__(self):
-        return ("RVMessage object. Subject:{}".format(self.subject))
-
-    @property
-    def text(self):
-        status, txt = RVMessage.tibrvMsg_ConvertToString(self.message)
-        if status != RVMessage.TIBRV_OK:
-            print('ERROR tibrvMsg_ConvertToString', status, RVMessage.TIBRVStatus_GetText(status))
-            sys.exit(-1)
-        return txt
-
-
-    def SetSendSubject(self, send_subject: str):
-        self.subject = send_subject
-        status = RVMessage.tibrvMsg_SetSendSubject(self.message, send_subject)
-        if status != RVMessage.TIBRV_OK:
-            print('ERROR tibrvMsg_SetSendSubject', status, RVMessage.TIBRVStatus_GetText(status))
-            sys.exit(-1)
-
-    def GetSendSubject(self) -> str:
-        status, subj_send = RVMessage.tibrvMsg_GetSendSubject(self.message)
-        if status != RVMessage.TIBRV_OK:
-            print('ERROR tibrvMsg_GetSendSubject', status, RVMessage.TIBRVStatus_GetText(status))
-            sys.exit(-1)
-        self.subject = subj_send
-        return subj_send
-
-    def GetReplySubject(self) -> str:
-        status, subj_reply = RVMessage.tibrvMsg_GetReplySubject(self.message)
-        if status != RVMessage.TIBRV_OK:
-            print('ERROR tibrvMsg_GetReplySubject', status, RVMessage.TIBRVStatus_GetText(status))
-            sys.exit(-1)
-        self.reply = subj_reply
-        return subj_reply
-
-    def AddString(self, fieldName: str, value: str):
-        status = RVMessage.tibrvMsg_AddString(self.message, fieldName, value)
-        if status != RVMessage.TIBRV_OK:
-            print('ERROR tibrvMsg_AddString', status, RVMessage.TIBRVStatus_GetText(status))
-            sys.exit(-1)
-
-    def AddInt(self, fieldName: str, value: int):
-        status = RVMessage.tibrvMsg_AddI32(self.message, fieldName, value)
-        if status != RVMessage.TIBRV_OK:
-            print('ERROR tibrvMsg_AddInt', status, RVMessage.TIBRVStatus_GetText(status))
-            sys.exit(-1)
-
-    def AddFloat(self, fieldName: str, value: float):
-        status = RVMessage.tibrvMsg_AddF64(self.message, fieldName, value)
-        if status != RVMessage.TIBRV_OK:
-            print('ERROR tibrvMsg_AddInt', status, RVMessage.TIBRVStatus_GetText(status))
-            sys.exit(-1)
-
-    def AddDateFromString(self, fieldName: str, value: str):
-        status = RVMessage.tibrvMsg_AddString(self.message, fieldName, value)
-        if status != RVMessage.TIBRV_OK:
-            print('ERROR tibrvMsg_AddInt', status, RVMessage.TIBRVStatus_GetText(status))
-            sys.exit(-1)
-
-    def AddMsg(self, fieldName: str, value: tibrvMsg, optIdentifier: int = 0):
-        status = RVMessage.tibrvMsg_AddMsg(self.message, fieldName, value.message)
-        if status != RVMessage.TIBRV_OK:
-            print('ERROR tibrvMsg_AddMsg', status, RVMessage.TIBRVStatus_GetText(status))
-            sys.exit(-1)
-
-    def GetString(self, fieldName: str) -> str:
-        status, value = RVMessage.tibrvMsg_GetString(self.message, fieldName)
-        if status != RVMessage.TIBRV_OK:
-            print('ERROR tibrvMsg_GetString', status, RVMessage.TIBRVStatus_GetText(status))
-            sys.exit(-1)
-        return value
-
-    def GetInt(self, fieldName: str) -> int:
-        status, value = RVMessage.tibrvMsg_GetI32(self.message, fieldName)
-        if status != RVMessage.TIBRV_OK:
-            print('ERROR tibrvMsg_GetI32', status, RVMessage.TIBRVStatus_GetText(status))
-            sys.exit(-1)
-        return value
+import sys
+import ctypes
+import struct
+import datetime
+import threading
+import functools
+from collections import OrderedDict
+from typing import NewType, Callable, List, Any
+import tibrvbackend
+
+# module variables
+_func = tibrvbackend.functype()     # ctype func cast, OS dependent
+_rv = tibrvbackend.library()        # TIBRV library or in-memory bus, see tibrvbackend
+_numpyModule = False                # numpy or None, imported on first use by _numpy()
+
+
+##-----------------------------------------------------------------------------
+# CTYPES
+# tibrv/types.h
+##-----------------------------------------------------------------------------
+
+_c_tibrv_status         = ctypes.c_int32
+
+_c_tibrv_i8                  = ctypes.c_int8
+_c_tibrv_u8                  = ctypes.c_uint8
+_c_tibrv_i16                 = ctypes.c_int16
+_c_tibrv_u16                 = ctypes.c_uint16
+_c_tibrv_i32                 = ctypes.c_int32
+_c_tibrv_u32                 = ctypes.c_uint32
+_c_tibrv_i64                 = ctypes.c_int64
+_c_tibrv_u64                 = ctypes.c_uint64
+_c_tibrv_f32                 = ctypes.c_float
+_c_tibrv_f64                 = ctypes.c_double
+_c_tibrv_bool                = ctypes.c_int
+_c_tibrv_ipport16            = ctypes.c_uint16
+_c_tibrv_ipaddr32            = ctypes.c_uint32
+_c_tibrv_str                 = ctypes.c_char_p
+
+_c_tibrv_status              = ctypes.c_int32
+_c_tibrvId                   = ctypes.c_uint32
+_c_tibrvMsg                  = ctypes.c_void_p
+_c_tibrvEvent                = _c_tibrvId
+_c_tibrvDispatchable         = _c_tibrvId
+_c_tibrvQueue                = _c_tibrvDispatchable
+_c_tibrvQueueGroup           = _c_tibrvDispatchable
+_c_tibrvTransport            = _c_tibrvId
+_c_tibrvDispatcher           = _c_tibrvId
+_c_tibrvEventType            = ctypes.c_uint32
+_c_tibrvQueueLimitPolicy     = ctypes.c_int32
+_c_tibrvIOType               = ctypes.c_int32
+
+
+##-----------------------------------------------------------------------------
+# tibrv/msg.h
+##-----------------------------------------------------------------------------
+
+class _c_tibrvMsgDateTime(ctypes.Structure):
+    _fields_ = [("sec", _c_tibrv_i64),
+                ("nsec", _c_tibrv_u32)]
+
+class _c_tibrvLocalData(ctypes.Union):
+    _fields_ = [("msg", _c_tibrvMsg),
+                ("str", _c_tibrv_str),
+                ("buf", ctypes.c_void_p),
+                ("array", ctypes.c_void_p),
+                ("boolean", _c_tibrv_bool),
+                ("i8", _c_tibrv_i8),
+                ("u8", _c_tibrv_u8),
+                ("i16", _c_tibrv_i16),
+                ("u16", _c_tibrv_u16),
+                ("i32", _c_tibrv_i32),
+                ("u32", _c_tibrv_u32),
+                ("i64", _c_tibrv_i64),
+                ("u64", _c_tibrv_u64),
+                ("f32", _c_tibrv_f32),
+                ("f64", _c_tibrv_f64),
+                ("ipport16", _c_tibrv_ipport16),
+                ("ipaddr32", _c_tibrv_ipaddr32),
+                ("date", _c_tibrvMsgDateTime)]
+
+class _c_tibrvMsgField(ctypes.Structure):
+    _fields_ = [("name", _c_tibrv_str),
+                ("size", _c_tibrv_u32),
+                ("count", _c_tibrv_u32),
+                ("data", _c_tibrvLocalData),
+                ("id", _c_tibrv_u16),
+                ("type", _c_tibrv_u8)]
+
+
+##-----------------------------------------------------------------------------
+# TIBRV Data Types for Python
+##-----------------------------------------------------------------------------
+tibrv_status            = NewType('tibrv_status', int)              # int
+tibrvId                 = NewType('tibrvId', int)                   # int
+tibrvMsg                = NewType('tibrvMsg', int)                  # c_void_p
+tibrvEvent              = NewType('tibrvEvent', int)                # tibrvId
+tibrvDispatchable       = NewType('tibrvDispatchable', int)         # tibrvId
+tibrvQueue              = NewType('tibrvQueue', int)                # tibrvId
+tibrvQueueGroup         = NewType('tibrvQueueGroup', int)           # tibrvId
+tibrvTransport          = NewType('tibrvTransport', int)            # tibrvId
+tibrvDispatcher         = NewType('tibrvDispatcher', int)           # tibrvId
+tibrvEventType          = NewType('tibrvEventType', int)            # enum(int)
+tibrvQueueLimitPolicy   = NewType('tibrvQueueLimitPolicy', int)     # enum(int)
+tibrvIOType             = NewType('tibrvIOType', int)               # enum(int)
+
+def _cstr(sz: str, codepage = None) -> str:
+    if sz is None:
+        return None
+
+    if codepage is None:
+        return _c_tibrv_str(str(sz).encode())
+    else:
+        return _c_tibrv_str(str(sz).encode(codepage))
+
+def _ret(param: list, val: object = None, size: int = 1) -> None:
+    while len(param) < size:
+        param.append(None)
+
+    if val is None:
+        param[0] = None
+        return
+
+    # assign val -> param[0]
+    if val is not list:
+        param[0] = val
+        return
+
+    # assign val[] -> param[]
+    for i in range(len(param)):
+        if i < len(val):
+            param[i] = val[i]
+        else:
+            param[i] = None
+
+    return
+
+def _pystr(sz: ctypes.c_char_p, codepage = None) -> str:
+    if sz is None:
+        return None
+
+    if type(sz) is bytes:
+        ss = sz
+    elif sz.value is None:
+        return None
+    else:
+        ss = sz.value
+
+    if codepage is None:
+        return ss.decode()
+    else:
+        return ss.decode(codepage)
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+def _datetime(value) -> _c_tibrvMsgDateTime:
+    # datetime (naive = UTC), date, (sec, nsec) or int nanoseconds since epoch
+    if isinstance(value, int):
+        return _c_tibrvMsgDateTime(*divmod(value, 1000000000))
+    if isinstance(value, tuple):
+        return _c_tibrvMsgDateTime(*value)
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    delta = value - _EPOCH
+    return _c_tibrvMsgDateTime(delta.days * 86400 + delta.seconds, delta.microseconds * 1000)
+
+def _numpy():
+    # numpy module or None, imported on the first array decode: it was most of
+    # a cold tibrvmsglib import
+    global _numpyModule
+
+    if _numpyModule is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpyModule = numpy
+    return _numpyModule
+
+def _ndarray(value) -> bool:
+    # a NumPy array can only come from an already imported numpy
+    numpy = sys.modules.get("numpy")
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
+def _buffer(value) -> (ctypes.c_void_p, int, object):
+    # address and size of a bytes-like object, the object itself is not copied
+    # except for read-only buffers other than bytes and NumPy arrays
+    if type(value) is bytes:
+        ref = ctypes.c_char_p(value)
+        return ctypes.cast(ref, ctypes.c_void_p), len(value), ref
+
+    if _ndarray(value):
+        if not value.flags.c_contiguous:
+            value = sys.modules["numpy"].ascontiguousarray(value)
+        return ctypes.c_void_p(value.ctypes.data), value.nbytes, value
+
+    view = memoryview(value)
+    if not view.c_contiguous:
+        raise TypeError("buffer is not contiguous")
+    if view.nbytes == 0:
+        return ctypes.c_void_p(None), 0, None
+    if view.readonly:
+        return _buffer(view.tobytes())
+    array = (ctypes.c_char * view.nbytes).from_buffer(view)
+    return ctypes.cast(array, ctypes.c_void_p), view.nbytes, array
+
+def _kind(format: str) -> str:
+    # struct format character -> f(loat), u(nsigned) or i(nteger)
+    format = format[-1:]
+    if format in "efd":
+        return "f"
+    return "u" if format.isupper() else "i"
+
+def _carray(value, ctype) -> (ctypes.c_void_p, int, object):
+    # address and element count of an array of ctype from a NumPy array,
+    # buffer (array.array, memoryview, bytes) or sequence
+    size = ctypes.sizeof(ctype)
+
+    if _ndarray(value):
+        numpy = sys.modules["numpy"]
+        dtype = numpy.dtype(ctype)
+        if value.dtype != dtype or not value.flags.c_contiguous:
+            # one vectorized conversion, not a per-element copy
+            value = numpy.ascontiguousarray(value, dtype=dtype)
+        return ctypes.c_void_p(value.ctypes.data), value.size, value
+
+    if isinstance(value, (list, tuple)):
+        array = (ctype * len(value))(*value)
+        return ctypes.cast(array, ctypes.c_void_p), len(value), array
+
+    view = memoryview(value)
+    if view.format[-1:] in ("B", "b", "c"):
+        # raw bytes in native layout
+        if view.nbytes % size:
+            raise TypeError("buffer of {} bytes is not a {} array".format(view.nbytes, ctype.__name__))
+    elif view.itemsize != size or _kind(view.format) != _kind(ctype._type_):
+        raise TypeError("buffer of format {} is not a {} array".format(view.format, ctype.__name__))
+
+    address, nbytes, keep = _buffer(value)
+    return address, nbytes // size, keep
+
+
+
+##-----------------------------------------------------------------------------
+# Errors
+#
+# A non-OK tibrv_status of a TIBRV call raises a TibrvError with the call,
+# the status code and its text. The subclasses tell what failed: building or
+# reading a message (TibrvFieldError names the field), the transport or the
+# queues and events. Batch APIs catch them per record and keep going.
+##-----------------------------------------------------------------------------
+
+class TibrvError(Exception):
+
+    def __init__(self, call: str, status: int, field = None):
+        self.call = call
+        self.status = status
+        self.field = field
+        self.text = RVMessage.tibrvStatus_GetText(status)
+        if field is None:
+            super().__init__("{} {} {}".format(call, status, self.text))
+        else:
+            super().__init__("{} {} {} {}".format(call, field, status, self.text))
+
+    def __reduce__(self):
+        # picklable, worker processes report their errors to the parent
+        return (type(self), (self.call, self.status, self.field))
+
+
+class TibrvMessageError(TibrvError):
+    pass
+
+
+class TibrvFieldError(TibrvMessageError):
+    pass
+
+
+class TibrvTransportError(TibrvError):
+    pass
+
+
+class TibrvQueueError(TibrvError):
+    pass
+
+
+class RVMessage():
+
+    # Message types
+    IDENTIFY_MSG                    = 1
+    DATA_MSG                        = 2
+    PING_MSG                        = 3
+
+    # Error statuses
+    TIBRV_OK                        = 0
+    TIBRV_INVALID_ARG               = 3
+    TIBRV_INVALID_MSG               = 42
+
+    # Field types, tibrv/msg.h
+    TIBRVMSG_MSG                    = 1
+    TIBRVMSG_DATETIME               = 3
+    TIBRVMSG_OPAQUE                 = 7
+    TIBRVMSG_STRING                 = 8
+    TIBRVMSG_BOOL                   = 9
+    TIBRVMSG_I8                     = 14
+    TIBRVMSG_U8                     = 15
+    TIBRVMSG_I16                    = 16
+    TIBRVMSG_U16                    = 17
+    TIBRVMSG_I32                    = 18
+    TIBRVMSG_U32                    = 19
+    TIBRVMSG_I64                    = 20
+    TIBRVMSG_U64                    = 21
+    TIBRVMSG_F32                    = 24
+    TIBRVMSG_F64                    = 25
+    TIBRVMSG_IPPORT16               = 26
+    TIBRVMSG_IPADDR32               = 27
+    TIBRVMSG_I8ARRAY                = 34
+    TIBRVMSG_U8ARRAY                = 35
+    TIBRVMSG_I16ARRAY               = 36
+    TIBRVMSG_U16ARRAY               = 37
+    TIBRVMSG_I32ARRAY               = 38
+    TIBRVMSG_U32ARRAY               = 39
+    TIBRVMSG_I64ARRAY               = 40
+    TIBRVMSG_U64ARRAY               = 41
+    TIBRVMSG_F32ARRAY               = 44
+    TIBRVMSG_F64ARRAY               = 45
+
+    # AddFields/UpdateFields kind: (field type, tibrvLocalData member, size)
+    _FIELD_KINDS = {
+        "string":   (TIBRVMSG_STRING, "str", 0),
+        "date":     (TIBRVMSG_STRING, "str", 0),
+        "int":      (TIBRVMSG_I32, "i32", 4),
+        "float":    (TIBRVMSG_F64, "f64", 8),
+        "int64":    (TIBRVMSG_I64, "i64", 8),
+        "uint32":   (TIBRVMSG_U32, "u32", 4),
+        "uint64":   (TIBRVMSG_U64, "u64", 8),
+        "float32":  (TIBRVMSG_F32, "f32", 4),
+        "bool":     (TIBRVMSG_BOOL, "boolean", 4),
+        "msg":      (TIBRVMSG_MSG, "msg", 0),
+    }
+
+    # Types of message
+    ICC_DATA_MSG_SIGNON             = 1
+    ICC_DATA_MSG_SIGNOFF            = 2
+    ICC_DATA_MSG_REQUEST            = 3
+    ICC_DATA_MSG_REQUEST_ANSWER     = 4
+    ICC_DATA_MSG_TABLE              = 5
+    ICC_DATA_MSG_TABLE_ACK          = 6
+    ICC_DATA_MSG_READY_ON           = 7
+    ICC_DATA_MSG_READY_OFF          = 8
+    ICC_DATA_MSG_RELOAD_END         = 9
+    ICC_DATA_MSG_ERROR              = 10
+    ICC_DATA_MSG_INFO               = 11
+    ICC_DATA_MSG_TABLE_SEND         = 12
+    ICC_DATA_MSG_TABLE_REQ          = 13
+    ICC_DATA_MSG_EVENT              = 14
+
+
+    ##-----------------------------------------------------------------------------
+    # TIBRV API : tibrv/status.h
+    ##-----------------------------------------------------------------------------
+
+    _rv.tibrvStatus_GetText.argtypes = [_c_tibrv_status]
+    _rv.tibrvStatus_GetText.restype = ctypes.c_char_p
+
+    @staticmethod
+    def tibrvStatus_GetText(code: tibrv_status) -> str:
+
+        if code is None:
+            return None
+
+        c = _c_tibrv_status(code)
+        sz = _rv.tibrvStatus_GetText(c)
+        return _pystr(sz)
+
+    ##-----------------------------------------------------------------------------
+    # TIBRV API : tibrv/msg.h
+    ##-----------------------------------------------------------------------------
+
+    _rv.tibrvMsg_Create.argtypes = [ctypes.POINTER(_c_tibrvMsg)]
+    _rv.tibrvMsg_Create.restype = _c_tibrv_status
+
+    _rv.tibrvMsg_CreateEx.argtypes = [ctypes.POINTER(_c_tibrvMsg), _c_tibrv_u32]
+    _rv.tibrvMsg_CreateEx.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_Create(initialStorage: int=0) -> (tibrv_status, tibrvMsg):
+
+        msg = _c_tibrvMsg(0)
+
+        if initialStorage == 0:
+            status = _rv.tibrvMsg_Create(ctypes.byref(msg))
+        else:
+            try:
+                n = _c_tibrv_u32(initialStorage)
+            except:
+                return RVMessage.TIBRV_INVALID_ARG, None
+
+            status = _rv.tibrvMsg_CreateEx(ctypes.byref(msg), n)
+
+        return status, msg.value
+
+
+    _rv.tibrvMsg_CreateCopy.argtypes = [_c_tibrvMsg, ctypes.POINTER(_c_tibrvMsg)]
+    _rv.tibrvMsg_CreateCopy.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_CreateCopy(message: tibrvMsg) -> (tibrv_status, tibrvMsg):
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        copy = _c_tibrvMsg(0)
+        status = _rv.tibrvMsg_CreateCopy(msg, ctypes.byref(copy))
+
+        return status, copy.value
+
+
+    _rv.tibrvMsg_Destroy.argtypes = [_c_tibrvMsg]
+    _rv.tibrvMsg_Destroy.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_Destroy(message: tibrvMsg) -> tibrv_status:
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        status = _rv.tibrvMsg_Destroy(msg)
+
+        return status
+
+
+    _rv.tibrvMsg_Reset.argtypes = [_c_tibrvMsg]
+    _rv.tibrvMsg_Reset.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_Reset(message: tibrvMsg) -> tibrv_status:
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        status = _rv.tibrvMsg_Reset(msg)
+
+        return status
+
+
+    _rv.tibrvMsg_SetSendSubject.argtypes = [_c_tibrvMsg, _c_tibrv_str]
+    _rv.tibrvMsg_SetSendSubject.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_SetSendSubject(message: tibrvMsg, subject: str) -> tibrv_status:
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            sz = _cstr(subject)
+        except:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        status = _rv.tibrvMsg_SetSendSubject(msg, sz)
+
+        return status
+
+
+    _rv.tibrvMsg_GetSendSubject.argtypes = [_c_tibrvMsg, ctypes.POINTER(_c_tibrv_str)]
+    _rv.tibrvMsg_GetSendSubject.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_GetSendSubject(message: tibrvMsg) -> (tibrv_status, str):
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        sz = _c_tibrv_str(0)
+        status = _rv.tibrvMsg_GetSendSubject(msg, ctypes.byref(sz))
+
+        return status, _pystr(sz)
+
+    _rv.tibrvMsg_SetReplySubject.argtypes = [_c_tibrvMsg, _c_tibrv_str]
+    _rv.tibrvMsg_SetReplySubject.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_SetReplySubject(message: tibrvMsg, subject: str) -> tibrv_status:
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            sz = _cstr(subject)
+        except:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        status = _rv.tibrvMsg_SetReplySubject(msg, sz)
+
+        return status
+
+    _rv.tibrvMsg_GetReplySubject.argtypes = [_c_tibrvMsg, ctypes.POINTER(_c_tibrv_str)]
+    _rv.tibrvMsg_GetReplySubject.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_GetReplySubject(message: tibrvMsg) -> (tibrv_status, str):
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        sz = _c_tibrv_str()
+        status = _rv.tibrvMsg_GetReplySubject(msg, ctypes.byref(sz))
+
+        return status, _pystr(sz)
+
+
+    _rv.tibrvMsg_ConvertToString.argtypes = [_c_tibrvMsg, ctypes.POINTER(_c_tibrv_str)]
+    _rv.tibrvMsg_ConvertToString.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_ConvertToString(message: tibrvMsg, codepage: str=None) -> (tibrv_status, str):
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        sz = _c_tibrv_str()
+        status = _rv.tibrvMsg_ConvertToString(msg, ctypes.byref(sz))
+
+        return status, _pystr(sz, codepage)
+
+
+    _rv.tibrvMsg_GetByteSize.argtypes = [_c_tibrvMsg, ctypes.POINTER(_c_tibrv_u32)]
+    _rv.tibrvMsg_GetByteSize.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_GetByteSize(message: tibrvMsg) -> (tibrv_status, int):
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        ret = None
+        size = _c_tibrv_u32(0)
+
+        status = _rv.tibrvMsg_GetByteSize(msg, ctypes.byref(size))
+
+        if status == RVMessage.TIBRV_OK:
+            ret = size.value
+
+        return status, ret
+
+
+    _rv.tibrvMsg_GetAsBytes.argtypes = [_c_tibrvMsg, ctypes.POINTER(ctypes.c_void_p)]
+    _rv.tibrvMsg_GetAsBytes.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_GetAsBytes(message: tibrvMsg) -> (tibrv_status, bytes):
+        # copy of the wire format, the send and reply subjects are not part of it
+
+        status, size = RVMessage.tibrvMsg_GetByteSize(message)
+        if status != RVMessage.TIBRV_OK:
+            return status, None
+
+        ret = None
+        ptr = ctypes.c_void_p()
+
+        status = _rv.tibrvMsg_GetAsBytes(_c_tibrvMsg(message), ctypes.byref(ptr))
+
+        if status == RVMessage.TIBRV_OK:
+            ret = ctypes.string_at(ptr.value, size)
+
+        return status, ret
+
+
+    _rv.tibrvMsg_CreateFromBytes.argtypes = [ctypes.POINTER(_c_tibrvMsg), ctypes.c_void_p]
+    _rv.tibrvMsg_CreateFromBytes.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_CreateFromBytes(data: bytes) -> (tibrv_status, tibrvMsg):
+
+        if data is None:
+            return RVMessage.TIBRV_INVALID_ARG, None
+
+        try:
+            address, size, keep = _buffer(data)
+        except:
+            return RVMessage.TIBRV_INVALID_ARG, None
+
+        ret = None
+        msg = _c_tibrvMsg(0)
+
+        status = _rv.tibrvMsg_CreateFromBytes(ctypes.byref(msg), address)
+
+        if status == RVMessage.TIBRV_OK:
+            ret = msg.value
+
+        return status, ret
+
+
+    _rv.tibrvMsg_AddStringEx.argtypes = [_c_tibrvMsg, _c_tibrv_str, _c_tibrv_str, _c_tibrv_u16]
+    _rv.tibrvMsg_AddStringEx.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_AddString(message: tibrvMsg, fieldName: str, value: str,
+                        optIdentifier: int = 0, codepage: str = None) -> tibrv_status:
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        if fieldName is None or optIdentifier is None:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            name = _cstr(fieldName)
+            val = _cstr(value, codepage)
+            id = _c_tibrv_u16(optIdentifier)
+
+        except:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        status = _rv.tibrvMsg_AddStringEx(msg, name, val, id)
+
+        return status
+
+
+    _rv.tibrvMsg_AddI32Ex.argtypes = [_c_tibrvMsg, _c_tibrv_str, _c_tibrv_i32, _c_tibrv_u16]
+    _rv.tibrvMsg_AddI32Ex.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_AddI32(message:tibrvMsg, fieldName:str, value:int, optIdentifier:int = 0) -> tibrv_status:
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        if fieldName is None or optIdentifier is None:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            name = _cstr(fieldName)
+            val = _c_tibrv_i32(value)
+            id = _c_tibrv_u16(optIdentifier)
+        except:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        status = _rv.tibrvMsg_AddI32Ex(msg, name, val, id)
+
+        return status
+
+
+    _rv.tibrvMsg_AddF64Ex.argtypes = [_c_tibrvMsg, _c_tibrv_str, _c_tibrv_f64, _c_tibrv_u16]
+    _rv.tibrvMsg_AddF64Ex.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_AddF64(message: tibrvMsg, fieldName: str, value: float,
+                        optIdentifier: int = 0) -> tibrv_status:
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        if fieldName is None or optIdentifier is None:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            name = _cstr(fieldName)
+            val = _c_tibrv_f64(value)
+            id = _c_tibrv_u16(optIdentifier)
+        except:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        status = _rv.tibrvMsg_AddF64Ex(msg, name, val, id)
+
+        return status
+
+    _rv.tibrvMsg_AddMsgEx.argtypes = [_c_tibrvMsg,
+                                    _c_tibrv_str,
+                                    _c_tibrvMsg,
+                                    _c_tibrv_u16]
+
+    _rv.tibrvMsg_AddMsgEx.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_AddMsg(message: tibrvMsg, fieldName: str, value: tibrvMsg,
+                        optIdentifier: int = 0) -> tibrv_status:
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        if fieldName is None or optIdentifier is None:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            name = _cstr(fieldName)
+            id = _c_tibrv_u16(optIdentifier)
+            val = _c_tibrvMsg(value)
+        except:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        status = _rv.tibrvMsg_AddMsgEx(msg, name, val, id)
+        
+
+        return status
+
+
+    @staticmethod
+    def _tibrvMsg_AddScalar(function, ctype, message: tibrvMsg, fieldName: str, value,
+                        optIdentifier: int = 0) -> tibrv_status:
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        if fieldName is None or optIdentifier is None:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            name = _cstr(fieldName)
+            val = ctype(value)
+            id = _c_tibrv_u16(optIdentifier)
+        except:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        status = function(msg, name, val, id)
+
+        return status
+
+    _rv.tibrvMsg_AddI64Ex.argtypes = [_c_tibrvMsg, _c_tibrv_str, _c_tibrv_i64, _c_tibrv_u16]
+    _rv.tibrvMsg_AddI64Ex.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_AddI64(message: tibrvMsg, fieldName: str, value: int, optIdentifier: int = 0) -> tibrv_status:
+        return RVMessage._tibrvMsg_AddScalar(_rv.tibrvMsg_AddI64Ex, _c_tibrv_i64,
+                                            message, fieldName, value, optIdentifier)
+
+    _rv.tibrvMsg_AddU32Ex.argtypes = [_c_tibrvMsg, _c_tibrv_str, _c_tibrv_u32, _c_tibrv_u16]
+    _rv.tibrvMsg_AddU32Ex.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_AddU32(message: tibrvMsg, fieldName: str, value: int, optIdentifier: int = 0) -> tibrv_status:
+        return RVMessage._tibrvMsg_AddScalar(_rv.tibrvMsg_AddU32Ex, _c_tibrv_u32,
+                                            message, fieldName, value, optIdentifier)
+
+    _rv.tibrvMsg_AddU64Ex.argtypes = [_c_tibrvMsg, _c_tibrv_str, _c_tibrv_u64, _c_tibrv_u16]
+    _rv.tibrvMsg_AddU64Ex.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_AddU64(message: tibrvMsg, fieldName: str, value: int, optIdentifier: int = 0) -> tibrv_status:
+        return RVMessage._tibrvMsg_AddScalar(_rv.tibrvMsg_AddU64Ex, _c_tibrv_u64,
+                                            message, fieldName, value, optIdentifier)
+
+    _rv.tibrvMsg_AddF32Ex.argtypes = [_c_tibrvMsg, _c_tibrv_str, _c_tibrv_f32, _c_tibrv_u16]
+    _rv.tibrvMsg_AddF32Ex.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_AddF32(message: tibrvMsg, fieldName: str, value: float, optIdentifier: int = 0) -> tibrv_status:
+        return RVMessage._tibrvMsg_AddScalar(_rv.tibrvMsg_AddF32Ex, _c_tibrv_f32,
+                                            message, fieldName, value, optIdentifier)
+
+    _rv.tibrvMsg_AddBoolEx.argtypes = [_c_tibrvMsg, _c_tibrv_str, _c_tibrv_bool, _c_tibrv_u16]
+    _rv.tibrvMsg_AddBoolEx.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_AddBool(message: tibrvMsg, fieldName: str, value: bool, optIdentifier: int = 0) -> tibrv_status:
+        return RVMessage._tibrvMsg_AddScalar(_rv.tibrvMsg_AddBoolEx, _c_tibrv_bool,
+                                            message, fieldName, 1 if value else 0, optIdentifier)
+
+    _rv.tibrvMsg_AddDateTimeEx.argtypes = [_c_tibrvMsg, _c_tibrv_str,
+                                        ctypes.POINTER(_c_tibrvMsgDateTime), _c_tibrv_u16]
+    _rv.tibrvMsg_AddDateTimeEx.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_AddDateTime(message: tibrvMsg, fieldName: str, value,
+                        optIdentifier: int = 0) -> tibrv_status:
+        # value: datetime (naive = UTC), date, (sec, nsec) or int nanoseconds since epoch
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        if fieldName is None or optIdentifier is None:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            name = _cstr(fieldName)
+            val = _datetime(value)
+            id = _c_tibrv_u16(optIdentifier)
+        except:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        status = _rv.tibrvMsg_AddDateTimeEx(msg, name, ctypes.byref(val), id)
+
+        return status
+
+    _rv.tibrvMsg_AddOpaqueEx.argtypes = [_c_tibrvMsg, _c_tibrv_str, ctypes.c_void_p,
+                                        _c_tibrv_u32, _c_tibrv_u16]
+    _rv.tibrvMsg_AddOpaqueEx.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_AddOpaque(message: tibrvMsg, fieldName: str, value,
+                        optIdentifier: int = 0) -> tibrv_status:
+        # value: bytes-like object, passed to the library without a copy
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        if fieldName is None or optIdentifier is None:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            name = _cstr(fieldName)
+            address, size, keep = _buffer(value)
+            id = _c_tibrv_u16(optIdentifier)
+        except:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        status = _rv.tibrvMsg_AddOpaqueEx(msg, name, address, size, id)
+
+        return status
+
+    @staticmethod
+    def _tibrvMsg_AddArray(function, ctype, message: tibrvMsg, fieldName: str, value,
+                        optIdentifier: int = 0) -> tibrv_status:
+        # value: NumPy array or buffer passed without a per-element copy, or a sequence
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        if fieldName is None or optIdentifier is None:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            name = _cstr(fieldName)
+            address, count, keep = _carray(value, ctype)
+            id = _c_tibrv_u16(optIdentifier)
+        except:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        status = function(msg, name, address, count, id)
+
+        return status
+
+    _rv.tibrvMsg_AddI32ArrayEx.argtypes = [_c_tibrvMsg, _c_tibrv_str, ctypes.c_void_p, _c_tibrv_u32, _c_tibrv_u16]
+    _rv.tibrvMsg_AddI32ArrayEx.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_AddI32Array(message: tibrvMsg, fieldName: str, value, optIdentifier: int = 0) -> tibrv_status:
+        return RVMessage._tibrvMsg_AddArray(_rv.tibrvMsg_AddI32ArrayEx, _c_tibrv_i32,
+                                            message, fieldName, value, optIdentifier)
+
+    _rv.tibrvMsg_AddI64ArrayEx.argtypes = [_c_tibrvMsg, _c_tibrv_str, ctypes.c_void_p, _c_tibrv_u32, _c_tibrv_u16]
+    _rv.tibrvMsg_AddI64ArrayEx.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_AddI64Array(message: tibrvMsg, fieldName: str, value, optIdentifier: int = 0) -> tibrv_status:
+        return RVMessage._tibrvMsg_AddArray(_rv.tibrvMsg_AddI64ArrayEx, _c_tibrv_i64,
+                                            message, fieldName, value, optIdentifier)
+
+    _rv.tibrvMsg_AddF32ArrayEx.argtypes = [_c_tibrvMsg, _c_tibrv_str, ctypes.c_void_p, _c_tibrv_u32, _c_tibrv_u16]
+    _rv.tibrvMsg_AddF32ArrayEx.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_AddF32Array(message: tibrvMsg, fieldName: str, value, optIdentifier: int = 0) -> tibrv_status:
+        return RVMessage._tibrvMsg_AddArray(_rv.tibrvMsg_AddF32ArrayEx, _c_tibrv_f32,
+                                            message, fieldName, value, optIdentifier)
+
+    _rv.tibrvMsg_AddF64ArrayEx.argtypes = [_c_tibrvMsg, _c_tibrv_str, ctypes.c_void_p, _c_tibrv_u32, _c_tibrv_u16]
+    _rv.tibrvMsg_AddF64ArrayEx.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_AddF64Array(message: tibrvMsg, fieldName: str, value, optIdentifier: int = 0) -> tibrv_status:
+        return RVMessage._tibrvMsg_AddArray(_rv.tibrvMsg_AddF64ArrayEx, _c_tibrv_f64,
+                                            message, fieldName, value, optIdentifier)
+
+
+    _rv.tibrvMsg_UpdateStringEx.argtypes = [_c_tibrvMsg, _c_tibrv_str, _c_tibrv_str, _c_tibrv_u16]
+    _rv.tibrvMsg_UpdateStringEx.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_UpdateString(message: tibrvMsg, fieldName: str, value: str,
+                        optIdentifier: int = 0, codepage: str = None) -> tibrv_status:
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        if fieldName is None or optIdentifier is None:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            name = _cstr(fieldName)
+            val = _cstr(value, codepage)
+            id = _c_tibrv_u16(optIdentifier)
+        except:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        status = _rv.tibrvMsg_UpdateStringEx(msg, name, val, id)
+
+        return status
+
+
+    _rv.tibrvMsg_UpdateI32Ex.argtypes = [_c_tibrvMsg, _c_tibrv_str, _c_tibrv_i32, _c_tibrv_u16]
+    _rv.tibrvMsg_UpdateI32Ex.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_UpdateI32(message: tibrvMsg, fieldName: str, value: int, optIdentifier: int = 0) -> tibrv_status:
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        if fieldName is None or optIdentifier is None:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            name = _cstr(fieldName)
+            val = _c_tibrv_i32(value)
+            id = _c_tibrv_u16(optIdentifier)
+        except:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        status = _rv.tibrvMsg_UpdateI32Ex(msg, name, val, id)
+
+        return status
+
+
+    _rv.tibrvMsg_UpdateF64Ex.argtypes = [_c_tibrvMsg, _c_tibrv_str, _c_tibrv_f64, _c_tibrv_u16]
+    _rv.tibrvMsg_UpdateF64Ex.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_UpdateF64(message: tibrvMsg, fieldName: str, value: float,
+                        optIdentifier: int = 0) -> tibrv_status:
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        if fieldName is None or optIdentifier is None:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG
+
+        try:
+            name = _cstr(fieldName)
+            val = _c_tibrv_f64(value)
+            id = _c_tibrv_u16(optIdentifier)
+        except:
+            return RVMessage.TIBRV_INVALID_ARG
+
+        status = _rv.tibrvMsg_UpdateF64Ex(msg, name, val, id)
+
+        return status
+
+
+    _rv.tibrvMsg_AddField.argtypes = [_c_tibrvMsg, ctypes.POINTER(_c_tibrvMsgField)]
+    _rv.tibrvMsg_AddField.restype = _c_tibrv_status
+
+    _rv.tibrvMsg_UpdateField.argtypes = [_c_tibrvMsg, ctypes.POINTER(_c_tibrvMsgField)]
+    _rv.tibrvMsg_UpdateField.restype = _c_tibrv_status
+
+    _rv.tibrvMsg_UpdateMsgEx.argtypes = [_c_tibrvMsg, _c_tibrv_str, _c_tibrvMsg, _c_tibrv_u16]
+    _rv.tibrvMsg_UpdateMsgEx.restype = _c_tibrv_status
+
+    # prepared field calls by (fieldName, kind) layout, see _FieldArray
+    _layouts = {}
+    _layoutsMax = 256
+
+    @staticmethod
+    def tibrvMsg_SetFields(message: tibrvMsg, fields: list, update: bool = False,
+                        codepage: str = None) -> (tibrv_status, int):
+        # add (or update) [(fieldName, kind, value)] with one tibrvMsg_AddField/
+        # UpdateField call per field, returns status and index of the failed field
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG, 0
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG, 0
+
+        layout = tuple([field[:2] for field in fields])
+        array = RVMessage._layouts.get(layout)
+        if array is None:
+            try:
+                array = _FieldArray(layout)
+            except (ValueError, TypeError, AttributeError):
+                return RVMessage.TIBRV_INVALID_ARG, 0
+            if len(RVMessage._layouts) >= RVMessage._layoutsMax:
+                RVMessage._layouts.clear()
+            RVMessage._layouts[layout] = array
+
+        if not array.lock.acquire(False):
+            # in use by another thread
+            array = _FieldArray(layout)
+            array.lock.acquire()
+        try:
+            return array.set(msg, fields, update, codepage)
+        finally:
+            array.lock.release()
+
+    _rv.tibrvMsg_GetI32Ex.argtypes = [_c_tibrvMsg,
+                                    _c_tibrv_str,
+                                    ctypes.POINTER(_c_tibrv_i32),
+                                    _c_tibrv_u16]
+
+    _rv.tibrvMsg_GetI32Ex.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_GetI32(message:tibrvMsg, fieldName:str, optIdentifier:int = 0) -> (tibrv_status, int):
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        if fieldName is None or optIdentifier is None:
+            return RVMessage.TIBRV_INVALID_ARG, None
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        ret = None
+
+        try:
+            name = _cstr(fieldName)
+            val = _c_tibrv_i32(0)
+            id = _c_tibrv_u16(optIdentifier)
+        except:
+            return RVMessage.TIBRV_INVALID_ARG, None
+
+        status = _rv.tibrvMsg_GetI32Ex(msg, name, ctypes.byref(val), id)
+
+        if status == RVMessage.TIBRV_OK:
+            ret = val.value
+
+        return status, ret
+
+
+    _rv.tibrvMsg_GetU64Ex.argtypes = [_c_tibrvMsg,
+                                    _c_tibrv_str,
+                                    ctypes.POINTER(_c_tibrv_u64),
+                                    _c_tibrv_u16]
+
+    _rv.tibrvMsg_GetU64Ex.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_GetU64(message: tibrvMsg, fieldName: str, optIdentifier: int = 0) -> (tibrv_status, int):
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        if fieldName is None or optIdentifier is None:
+            return RVMessage.TIBRV_INVALID_ARG, None
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        ret = None
+
+        try:
+            name = _cstr(fieldName)
+            val = _c_tibrv_u64(0)
+            id = _c_tibrv_u16(optIdentifier)
+        except:
+            return RVMessage.TIBRV_INVALID_ARG, None
+
+        status = _rv.tibrvMsg_GetU64Ex(msg, name, ctypes.byref(val), id)
+
+        if status == RVMessage.TIBRV_OK:
+            ret = val.value
+
+        return status, ret
+
+
+    _rv.tibrvMsg_GetStringEx.argtypes = [_c_tibrvMsg,
+                                        _c_tibrv_str,
+                                        ctypes.POINTER(_c_tibrv_str),
+                                        _c_tibrv_u16]
+
+    _rv.tibrvMsg_GetStringEx.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_GetString(message: tibrvMsg, fieldName: str, optIdentifier: int = 0,
+                        codepage: str = None) -> (tibrv_status, str):
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        if fieldName is None or optIdentifier is None:
+            return RVMessage.TIBRV_INVALID_ARG, None
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        ret = None
+
+        try:
+            name = _cstr(fieldName)
+            val = _c_tibrv_str(0)
+            id = _c_tibrv_u16(optIdentifier)
+        except:
+            return RVMessage.TIBRV_INVALID_ARG, None
+
+        status = _rv.tibrvMsg_GetStringEx(msg, name, ctypes.byref(val), id)
+
+        if status == RVMessage.TIBRV_OK:
+            ret = _pystr(val, codepage)
+
+        return status, ret
+
+
+    _rv.tibrvMsg_GetNumFields.argtypes = [_c_tibrvMsg, ctypes.POINTER(_c_tibrv_u32)]
+    _rv.tibrvMsg_GetNumFields.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_GetNumFields(message: tibrvMsg) -> (tibrv_status, int):
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        ret = None
+        val = _c_tibrv_u32(0)
+
+        status = _rv.tibrvMsg_GetNumFields(msg, ctypes.byref(val))
+
+        if status == RVMessage.TIBRV_OK:
+            ret = val.value
+
+        return status, ret
+
+
+    _rv.tibrvMsg_GetFieldByIndex.argtypes = [_c_tibrvMsg, ctypes.POINTER(_c_tibrvMsgField), _c_tibrv_u32]
+    _rv.tibrvMsg_GetFieldByIndex.restype = _c_tibrv_status
+
+    @staticmethod
+    def tibrvMsg_GetFieldByIndex(message: tibrvMsg, fieldIndex: int) -> (tibrv_status, _c_tibrvMsgField):
+        # field data points into the message and is valid while the message is
+
+        if message is None or message == 0:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        if fieldIndex is None:
+            return RVMessage.TIBRV_INVALID_ARG, None
+
+        try:
+            msg = _c_tibrvMsg(message)
+        except:
+            return RVMessage.TIBRV_INVALID_MSG, None
+
+        ret = None
+        field = _c_tibrvMsgField()
+
+        status = _rv.tibrvMsg_GetFieldByIndex(msg, ctypes.byref(field), fieldIndex)
+
+        if status == RVMessage.TIBRV_OK:
+            ret = field
+
+        return status, ret
+
+    ##########################################################
+
+
+    # default MessagePool for new messages, None = tibrvMsg_Create/Destroy
+    pool = None
+
+    def __init__(self, dateformat = 'DD/MM/YYYY', message: tibrvMsg = None, pool = None, fast: bool = False):
+        self.subject = ""
+        self.dateformat = dateformat
+        self._owned = None          # native message destroyed by close()
+        self._pool = None
+        if fast and type(self) is RVMessage:
+            # same message, field methods of the fast path, see FastRVMessage
+            self.__class__ = FastRVMessage
+            if not FastRVMessage._bound:
+                FastRVMessage.bind()
+
+        if message is not None:
+            # take ownership of an already created message
+            self.message = self._owned = message
+            return
+
+        if pool is None:
+            pool = RVMessage.pool
+        if pool is not None:
+            self.message = self._owned = pool.acquire()
+            self._pool = pool
+            return
+
+        status, message = self.tibrvMsg_Create()
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvMessageError('tibrvMsg_Create', status)
+        self.message = self._owned = message
+
+    @classmethod
+    def view(cls, message: tibrvMsg, dateformat = 'DD/MM/YYYY'):
+        # borrowed message, e.g. the message of a callback, close() leaves it alone
+        msg = cls.__new__(cls)
+        msg.subject = ""
+        msg.dateformat = dateformat
+        msg.message = message
+        msg._owned = None
+        msg._pool = None
+        return msg
+
+    def close(self):
+        message, self._owned = self._owned, None
+        self.message = None
+        if message is None:
+            return
+
+        if self._pool is not None:
+            self._pool.release(message)
+            self._pool = None
+            return
+
+        status = RVMessage.tibrvMsg_Destroy(message)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvMessageError('tibrvMsg_Destroy', status)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            # interpreter shutdown
+            pass
+    
+    def __str__(self):
+        return ("RVMessage object. Subject:{}".format(self.subject))
+
+    @property
+    def text(self):
+        status, txt = RVMessage.tibrvMsg_ConvertToString(self.message)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvMessageError('tibrvMsg_ConvertToString', status)
+        return txt
+
+
+    @classmethod
+    def FromBytes(cls, data: bytes, dateformat = 'DD/MM/YYYY'):
+        # new owned message from tibrvMsg_GetAsBytes output
+        status, message = RVMessage.tibrvMsg_CreateFromBytes(data)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvMessageError('tibrvMsg_CreateFromBytes', status)
+        return cls(dateformat, message)
+
+    def AsBytes(self) -> bytes:
+        status, data = RVMessage.tibrvMsg_GetAsBytes(self.message)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvMessageError('tibrvMsg_GetAsBytes', status)
+        return data
+
+    def ByteSize(self) -> int:
+        status, size = RVMessage.tibrvMsg_GetByteSize(self.message)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvMessageError('tibrvMsg_GetByteSize', status)
+        return size
+
+    def SetSendSubject(self, send_subject: str):
+        self.subject = send_subject
+        status = RVMessage.tibrvMsg_SetSendSubject(self.message, send_subject)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvMessageError('tibrvMsg_SetSendSubject', status)
+
+    def GetSendSubject(self) -> str:
+        status, subj_send = RVMessage.tibrvMsg_GetSendSubject(self.message)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvMessageError('tibrvMsg_GetSendSubject', status)
+        self.subject = subj_send
+        return subj_send
+
+    def SetReplySubject(self, reply_subject: str):
+        self.reply = reply_subject
+        status = RVMessage.tibrvMsg_SetReplySubject(self.message, reply_subject)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvMessageError('tibrvMsg_SetReplySubject', status)
+
+    def GetReplySubject(self) -> str:
+        status, subj_reply = RVMessage.tibrvMsg_GetReplySubject(self.message)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvMessageError('tibrvMsg_GetReplySubject', status)
+        self.reply = subj_reply
+        return subj_reply
+
+    def AddString(self, fieldName: str, value: str):
+        status = RVMessage.tibrvMsg_AddString(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddString', status, fieldName)
+
+    def AddInt(self, fieldName: str, value: int):
+        status = RVMessage.tibrvMsg_AddI32(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddI32', status, fieldName)
+
+    def AddFloat(self, fieldName: str, value: float):
+        status = RVMessage.tibrvMsg_AddF64(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddF64', status, fieldName)
+
+    def AddDateFromString(self, fieldName: str, value: str):
+        status = RVMessage.tibrvMsg_AddString(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddString', status, fieldName)
+
+    def AddMsg(self, fieldName: str, value: tibrvMsg, optIdentifier: int = 0):
+        status = RVMessage.tibrvMsg_AddMsg(self.message, fieldName, value.message)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddMsg', status, fieldName)
+
+    def AddInt64(self, fieldName: str, value: int):
+        status = RVMessage.tibrvMsg_AddI64(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddI64', status, fieldName)
+
+    def AddUInt32(self, fieldName: str, value: int):
+        status = RVMessage.tibrvMsg_AddU32(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddU32', status, fieldName)
+
+    def AddUInt64(self, fieldName: str, value: int):
+        status = RVMessage.tibrvMsg_AddU64(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddU64', status, fieldName)
+
+    def AddFloat32(self, fieldName: str, value: float):
+        status = RVMessage.tibrvMsg_AddF32(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddF32', status, fieldName)
+
+    def AddBool(self, fieldName: str, value: bool):
+        status = RVMessage.tibrvMsg_AddBool(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddBool', status, fieldName)
+
+    def AddDateTime(self, fieldName: str, value):
+        status = RVMessage.tibrvMsg_AddDateTime(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddDateTime', status, fieldName)
+
+    def AddOpaque(self, fieldName: str, value):
+        status = RVMessage.tibrvMsg_AddOpaque(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddOpaque', status, fieldName)
+
+    def AddIntArray(self, fieldName: str, value):
+        status = RVMessage.tibrvMsg_AddI32Array(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddI32Array', status, fieldName)
+
+    def AddInt64Array(self, fieldName: str, value):
+        status = RVMessage.tibrvMsg_AddI64Array(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddI64Array', status, fieldName)
+
+    def AddFloat32Array(self, fieldName: str, value):
+        status = RVMessage.tibrvMsg_AddF32Array(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddF32Array', status, fieldName)
+
+    def AddFloatArray(self, fieldName: str, value):
+        status = RVMessage.tibrvMsg_AddF64Array(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddF64Array', status, fieldName)
+
+    def UpdateString(self, fieldName: str, value: str):
+        status = RVMessage.tibrvMsg_UpdateString(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_UpdateString', status, fieldName)
+
+    def UpdateInt(self, fieldName: str, value: int):
+        status = RVMessage.tibrvMsg_UpdateI32(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_UpdateI32', status, fieldName)
+
+    def UpdateFloat(self, fieldName: str, value: float):
+        status = RVMessage.tibrvMsg_UpdateF64(self.message, fieldName, value)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_UpdateF64', status, fieldName)
+
+    @classmethod
+    def FromFields(cls, fields: list, dateformat = 'DD/MM/YYYY'):
+        # new message from [(fieldName, kind, value)], kind as in _FIELD_KINDS
+        msg = cls(dateformat)
+        msg.AddFields(fields)
+        return msg
+
+    def AddFields(self, fields: list):
+        status, i = RVMessage.tibrvMsg_SetFields(self.message, fields)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddField', status, fields[i][0] if fields else None)
+
+    def UpdateFields(self, fields: list):
+        status, i = RVMessage.tibrvMsg_SetFields(self.message, fields, update = True)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_UpdateField', status, fields[i][0] if fields else None)
+
+    def GetString(self, fieldName: str) -> str:
+        status, value = RVMessage.tibrvMsg_GetString(self.message, fieldName)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_GetString', status, fieldName)
+        return value
+
+    def GetInt(self, fieldName: str) -> int:
+        status, value = RVMessage.tibrvMsg_GetI32(self.message, fieldName)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_GetI32', status, fieldName)
+        return value
+
+    def ToDict(self, dates = ()) -> dict:
+        return MessageDecoder(self.dateformat, dates).decode(self.message)
+
+
+##-----------------------------------------------------------------------------
+# Fast path
+#
+# RVMessage(fast=True) is a FastRVMessage. Its field methods call the library
+# functions bound once, with field names encoded once and kept in a bounded
+# LRU cache, instead of wrapping handle, name and identifier on every call.
+# Arguments of any other type than the expected one take the RVMessage path,
+# results and errors are the same.
+##-----------------------------------------------------------------------------
+
+_I32_MIN, _I32_MAX = -(1 << 31), (1 << 31) - 1
+
+@functools.lru_cache(maxsize = 4096)
+def _name(fieldName: str) -> bytes:
+    # one bytes object per field name, reused by every call
+    return fieldName.encode()
+
+
+class FastRVMessage(RVMessage):
+
+    # lazy prototypes until bind(), see tibrvbackend.LazyLibrary
+    _addString = _rv.tibrvMsg_AddStringEx
+    _addI32 = _rv.tibrvMsg_AddI32Ex
+    _addF64 = _rv.tibrvMsg_AddF64Ex
+    _updateString = _rv.tibrvMsg_UpdateStringEx
+    _updateI32 = _rv.tibrvMsg_UpdateI32Ex
+    _updateF64 = _rv.tibrvMsg_UpdateF64Ex
+    _getString = _rv.tibrvMsg_GetStringEx
+    _getI32 = _rv.tibrvMsg_GetI32Ex
+    _bound = False
+
+    @classmethod
+    def bind(cls):
+        # library functions in place of the prototypes, on the first fast message
+        if cls._bound:
+            return
+        for attribute in ("_addString", "_addI32", "_addF64", "_updateString", "_updateI32",
+                          "_updateF64", "_getString", "_getI32"):
+            setattr(cls, attribute, _rv.bind(getattr(cls, attribute).name))
+        cls._bound = True
+
+    def AddString(self, fieldName: str, value: str):
+        if not self.message or type(fieldName) is not str or type(value) is not str:
+            return RVMessage.AddString(self, fieldName, value)
+        status = self._addString(self.message, _name(fieldName), value.encode(), 0)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddString', status, fieldName)
+
+    def AddInt(self, fieldName: str, value: int):
+        if not self.message or type(fieldName) is not str or type(value) is not int or not _I32_MIN <= value <= _I32_MAX:
+            return RVMessage.AddInt(self, fieldName, value)
+        status = self._addI32(self.message, _name(fieldName), value, 0)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddI32', status, fieldName)
+
+    def AddFloat(self, fieldName: str, value: float):
+        if not self.message or type(fieldName) is not str or type(value) is not float:
+            return RVMessage.AddFloat(self, fieldName, value)
+        status = self._addF64(self.message, _name(fieldName), value, 0)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddF64', status, fieldName)
+
+    def AddDateFromString(self, fieldName: str, value: str):
+        if not self.message or type(fieldName) is not str or type(value) is not str:
+            return RVMessage.AddDateFromString(self, fieldName, value)
+        status = self._addString(self.message, _name(fieldName), value.encode(), 0)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_AddString', status, fieldName)
+
+    def UpdateString(self, fieldName: str, value: str):
+        if not self.message or type(fieldName) is not str or type(value) is not str:
+            return RVMessage.UpdateString(self, fieldName, value)
+        status = self._updateString(self.message, _name(fieldName), value.encode(), 0)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_UpdateString', status, fieldName)
+
+    def UpdateInt(self, fieldName: str, value: int):
+        if not self.message or type(fieldName) is not str or type(value) is not int or not _I32_MIN <= value <= _I32_MAX:
+            return RVMessage.UpdateInt(self, fieldName, value)
+        status = self._updateI32(self.message, _name(fieldName), value, 0)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_UpdateI32', status, fieldName)
+
+    def UpdateFloat(self, fieldName: str, value: float):
+        if not self.message or type(fieldName) is not str or type(value) is not float:
+            return RVMessage.UpdateFloat(self, fieldName, value)
+        status = self._updateF64(self.message, _name(fieldName), value, 0)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_UpdateF64', status, fieldName)
+
+    def GetString(self, fieldName: str) -> str:
+        if not self.message or type(fieldName) is not str:
+            return RVMessage.GetString(self, fieldName)
+        val = _c_tibrv_str(0)
+        status = self._getString(self.message, _name(fieldName), ctypes.byref(val), 0)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_GetString', status, fieldName)
+        return None if val.value is None else val.value.decode()
+
+    def GetInt(self, fieldName: str) -> int:
+        if not self.message or type(fieldName) is not str:
+            return RVMessage.GetInt(self, fieldName)
+        val = _c_tibrv_i32(0)
+        status = self._getI32(self.message, _name(fieldName), ctypes.byref(val), 0)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvFieldError('tibrvMsg_GetI32', status, fieldName)
+        return val.value
+
+
+##-----------------------------------------------------------------------------
+# _FieldArray
+#
+# Prepared calls for one layout of (fieldName, kind): the typed tibrvMsg_Add*Ex
+# and Update*Ex function and the encoded name of every field, resolved once.
+# set() only converts the values and makes one library call per field. Kinds
+# without a typed update (int64, uint32, uint64, float32, bool) are updated
+# through a tibrvMsgField array built with the names, types and sizes, set()
+# writes the data through views into it and passes the prepared pointers to
+# tibrvMsg_UpdateField.
+##-----------------------------------------------------------------------------
+
+_DATA_TYPES = dict(_c_tibrvLocalData._fields_)
+
+_FIELD_CALLS = {
+    # kind: (add, update function)
+    "string":   ("tibrvMsg_AddStringEx", "tibrvMsg_UpdateStringEx"),
+    "date":     ("tibrvMsg_AddStringEx", "tibrvMsg_UpdateStringEx"),
+    "int":      ("tibrvMsg_AddI32Ex", "tibrvMsg_UpdateI32Ex"),
+    "float":    ("tibrvMsg_AddF64Ex", "tibrvMsg_UpdateF64Ex"),
+    "int64":    ("tibrvMsg_AddI64Ex", None),
+    "uint32":   ("tibrvMsg_AddU32Ex", None),
+    "uint64":   ("tibrvMsg_AddU64Ex", None),
+    "float32":  ("tibrvMsg_AddF32Ex", None),
+    "bool":     ("tibrvMsg_AddBoolEx", None),
+    "msg":      ("tibrvMsg_AddMsgEx", "tibrvMsg_UpdateMsgEx"),
+}
+
+class _FieldArray():
+
+    def __init__(self, layout: tuple):
+        self.lock = threading.Lock()
+        self.adds = []              # (add function, name, string, nested)
+        self.updates = []           # (update function, name, string, nested), None without one
+        self.array = None           # tibrvMsgField array of the updates without typed function
+        self.fields = []            # (pointer, name, data view, size view, nested)
+        self.strings = []           # data views holding a string, cleared after set()
+
+        for fieldName, kind in layout:
+            try:
+                fieldType, member, size = RVMessage._FIELD_KINDS[kind]
+                add, update = _FIELD_CALLS[kind]
+            except KeyError:
+                raise ValueError("unknown field kind {} for {}".format(kind, fieldName)) from None
+
+            name = fieldName if type(fieldName) is bytes else fieldName.encode()
+            string, nested = member == "str", member == "msg"
+            # the library functions, not their lazy prototypes
+            self.adds.append((_rv.bind(add), name, string, nested))
+            if update is None:
+                self.updates = None
+            elif self.updates is not None:
+                self.updates.append((_rv.bind(update), name, string, nested))
+
+        if self.updates is None:
+            self._marshal(layout)
+
+    def _marshal(self, layout: tuple):
+        self.array = array = (_c_tibrvMsgField * len(layout))()
+        base = ctypes.addressof(array)
+        for i, (fieldName, kind) in enumerate(layout):
+            fieldType, member, size = RVMessage._FIELD_KINDS[kind]
+
+            field = array[i]
+            field.name = name = fieldName if type(fieldName) is bytes else fieldName.encode()
+            field.type = fieldType
+            field.count = 1
+            field.size = size
+
+            offset = ctypes.addressof(field) - base
+            data = _DATA_TYPES[member].from_buffer(array, offset + _c_tibrvMsgField.data.offset)
+            sizeView = None
+            if member == "str":
+                sizeView = _c_tibrv_u32.from_buffer(array, offset + _c_tibrvMsgField.size.offset)
+                self.strings.append(data)
+            self.fields.append((ctypes.pointer(field), name, data, sizeView, member == "msg"))
+
+    def set(self, msg: _c_tibrvMsg, fields: list, update: bool, codepage: str) -> (tibrv_status, int):
+        calls = self.updates if update else self.adds
+        if calls is None:
+            return self._updateFields(msg, fields, codepage)
+
+        encoding = codepage or "utf-8"
+        ok = RVMessage.TIBRV_OK
+        i = 0
+        try:
+            for (call, name, string, nested), field in zip(calls, fields):
+                value = field[2]
+                if string:
+                    if type(value) is not bytes:
+                        value = str(value).encode(encoding)
+                elif nested:
+                    value = getattr(value, "message", value)
+                status = call(msg, name, value, 0)
+                if status != ok:
+                    return status, i
+                i += 1
+        except (TypeError, ValueError, ctypes.ArgumentError):
+            return RVMessage.TIBRV_INVALID_ARG, i
+
+        return ok, i
+
+    def _updateFields(self, msg: _c_tibrvMsg, fields: list, codepage: str) -> (tibrv_status, int):
+        setField = _rv.tibrvMsg_UpdateField
+        encoding = codepage or "utf-8"
+        ok = RVMessage.TIBRV_OK
+        i = 0
+        try:
+            for (pointer, name, data, size, nested), field in zip(self.fields, fields):
+                value = field[2]
+                if size is not None:
+                    if type(value) is not bytes:
+                        value = str(value).encode(encoding)
+                    size.value = len(value) + 1
+                    data.value = value
+                    status = setField(msg, pointer)
+                elif nested:
+                    # nested message size is only known to the library
+                    status = _rv.tibrvMsg_UpdateMsgEx(msg, name, getattr(value, "message", value), 0)
+                else:
+                    data.value = value
+                    status = setField(msg, pointer)
+                if status != ok:
+                    return status, i
+                i += 1
+        except (TypeError, ctypes.ArgumentError):
+            return RVMessage.TIBRV_INVALID_ARG, i
+        finally:
+            # no references to the values are kept
+            for data in self.strings:
+                data.value = None
+
+        return ok, i
+
+
+##-----------------------------------------------------------------------------
+# MessagePool
+#
+# Free list of native messages created with tibrvMsg_CreateEx. Released
+# messages are cleared with tibrvMsg_Reset and keep their storage, so a
+# steady send/receive loop stops allocating. Enable for all new messages
+# with RVMessage.pool = MessagePool(...).
+##-----------------------------------------------------------------------------
+
+class MessagePool():
+
+    def __init__(self, size: int = 64, initialStorage: int = 1024, preallocate: bool = True):
+        self.size = size
+        self.initialStorage = initialStorage
+        self.free = []
+        self.lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+        if preallocate:
+            for i in range(size):
+                self.free.append(self._create())
+
+    def _create(self) -> tibrvMsg:
+        status, message = RVMessage.tibrvMsg_Create(self.initialStorage)
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvMessageError('tibrvMsg_CreateEx', status)
+        self.created += 1
+        return message
+
+    def acquire(self) -> tibrvMsg:
+        with self.lock:
+            if self.free:
+                self.reused += 1
+                return self.free.pop()
+        return self._create()
+
+    def release(self, message: tibrvMsg):
+        with self.lock:
+            if len(self.free) < self.size and RVMessage.tibrvMsg_Reset(message) == RVMessage.TIBRV_OK:
+                self.free.append(message)
+                return
+        RVMessage.tibrvMsg_Destroy(message)
+
+    def destroy(self):
+        with self.lock:
+            free, self.free = self.free, []
+        for message in free:
+            RVMessage.tibrvMsg_Destroy(message)
+
+
+##-----------------------------------------------------------------------------
+# MessageTemplate
+#
+# Prototype message built once from a schema, (fieldName, kind, value) with
+# kind in "string", "date", "int", "float" and value None for the fields bound
+# on every build(). build() copies the prototype with tibrvMsg_CreateCopy and
+# updates the bound fields in place with pre-encoded names, the static fields
+# are never marshalled again. The body prototype is updated in place and
+# added to the copy, tibrvMsg_AddMsg copies it anyway. It keeps the values of
+# the last build(), only the fields whose value changed are set again.
+##-----------------------------------------------------------------------------
+
+_UNKNOWN = object()
+_IMMUTABLE = frozenset((str, bytes, int, float))
+
+def _bstr(value) -> bytes:
+    if type(value) is str:
+        return value.encode()
+    return str(value).encode()
+
+class MessageTemplate():
+
+    _KINDS = {
+        # kind: (add, update function, converter, placeholder)
+        "string": (RVMessage.AddString, "tibrvMsg_UpdateStringEx", _bstr, ""),
+        "date":   (RVMessage.AddDateFromString, "tibrvMsg_UpdateStringEx", _bstr, ""),
+        "int":    (RVMessage.AddInt, "tibrvMsg_UpdateI32Ex", int, 0),
+        "float":  (RVMessage.AddFloat, "tibrvMsg_UpdateF64Ex", float, 0.0),
+    }
+
+    def __init__(self, header: list, body: list = None, bodyName: str = "KPLUSFEED",
+                subject: str = None, dateformat: str = 'DD/MM/YYYY'):
+        self.dateformat = dateformat
+        self.subject = subject
+        self.bodyName = _bstr(bodyName)
+        self.schema = (tuple(header), tuple(body or ()), bodyName)
+        self.variables = []         # bound field names, in build() order
+
+        self.header = self._prototype(header)
+        self.headerFields = self._bind(header)
+        self.body = None
+        self.bodyFields = []
+        if body is not None:
+            self.body = self._prototype(body)
+            self.bodyFields = self._bind(body)
+        self._lock = threading.Lock()   # body prototype in use by a build()
+        self._bodyValues = [_UNKNOWN] * len(self.bodyFields)   # values in the body prototype
+
+        if subject is not None:
+            self.header.SetSendSubject(subject)
+        self._subject = _bstr(subject) if subject is not None else None
+
+    def _prototype(self, schema: list) -> RVMessage:
+        msg = RVMessage(self.dateformat)
+        for fieldName, kind, value in schema:
+            if kind not in self._KINDS:
+                raise ValueError("unknown field kind {} for {}".format(kind, fieldName))
+            add, update, convert, placeholder = self._KINDS[kind]
+            add(msg, fieldName, placeholder if value is None else value)
+        return msg
+
+    def _bind(self, schema: list) -> list:
+        names = [fieldName for fieldName, kind, value in schema]
+        fields = []
+        for fieldName, kind, value in schema:
+            if value is not None:
+                continue
+            # update by name changes the first field with this name
+            if names.count(fieldName) > 1:
+                raise ValueError("bound field {} is not unique in template".format(fieldName))
+            if fieldName in self.variables:
+                raise ValueError("bound field {} is used twice in template".format(fieldName))
+            add, update, convert, placeholder = self._KINDS[kind]
+            fields.append((_rv.bind(update), _bstr(fieldName), convert))
+            self.variables.append(fieldName)
+        return fields
+
+    @staticmethod
+    def _copy(prototype: RVMessage) -> _c_tibrvMsg:
+        msg = _c_tibrvMsg(0)
+        status = _rv.tibrvMsg_CreateCopy(prototype.message, ctypes.byref(msg))
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvMessageError('tibrvMsg_CreateCopy', status)
+        return msg
+
+    @staticmethod
+    def _update(msg: _c_tibrvMsg, fields: list, values):
+        ok = RVMessage.TIBRV_OK
+        for (update, name, convert), value in zip(fields, values):
+            status = update(msg, name, convert(value), 0)
+            if status != ok:
+                raise TibrvFieldError('tibrvMsg_Update', status, name.decode())
+
+    @staticmethod
+    def _change(msg: _c_tibrvMsg, fields: list, values, current: list):
+        # _update() of the fields whose value is not the current one. Only
+        # immutable values are remembered, float zeros are always set (0.0 == -0.0).
+        ok = RVMessage.TIBRV_OK
+        i = 0
+        for (update, name, convert), value in zip(fields, values):
+            last = current[i]
+            if type(value) is not type(last) or value != last or (not value and type(value) is float):
+                # unknown until the update succeeds
+                current[i] = _UNKNOWN
+                status = update(msg, name, convert(value), 0)
+                if status != ok:
+                    raise TibrvFieldError('tibrvMsg_Update', status, name.decode())
+                if type(value) in _IMMUTABLE:
+                    current[i] = value
+            i += 1
+
+    def build(self, values = ()) -> RVMessage:
+        # values: sequence in self.variables order or dict by field name
+        if isinstance(values, dict):
+            values = [values[name] for name in self.variables]
+        elif len(values) != len(self.variables):
+            raise ValueError("template expects {} values, got {}".format(len(self.variables), len(values)))
+
+        msg = self._copy(self.header)
+        try:
+            self._fill(msg, values)
+        except Exception:
+            # bad value, the copy is not handed out
+            _rv.tibrvMsg_Destroy(msg)
+            raise
+
+        result = RVMessage(self.dateformat, msg.value)
+        result.subject = self.subject or ""
+        return result
+
+    def _fill(self, msg: _c_tibrvMsg, values):
+        headerFields = self.headerFields
+        if headerFields:
+            self._update(msg, headerFields, values)
+
+        if self._subject is not None:
+            status = _rv.tibrvMsg_SetSendSubject(msg, self._subject)
+            if status != RVMessage.TIBRV_OK:
+                raise TibrvMessageError('tibrvMsg_SetSendSubject', status)
+
+        if self.body is not None:
+            bodyValues = values[len(headerFields):] if headerFields else values
+            if self._lock.acquire(False):
+                try:
+                    body = _c_tibrvMsg(self.body.message)
+                    self._change(body, self.bodyFields, bodyValues, self._bodyValues)
+                    status = _rv.tibrvMsg_AddMsgEx(msg, self.bodyName, body, 0)
+                finally:
+                    self._lock.release()
+            else:
+                # in use by another thread
+                body = self._copy(self.body)
+                try:
+                    self._update(body, self.bodyFields, bodyValues)
+                    status = _rv.tibrvMsg_AddMsgEx(msg, self.bodyName, body, 0)
+                finally:
+                    _rv.tibrvMsg_Destroy(body)
+            if status != RVMessage.TIBRV_OK:
+                raise TibrvMessageError('tibrvMsg_AddMsg', status)
+
+    def destroy(self):
+        for prototype in (self.header, self.body):
+            if prototype is not None:
+                prototype.close()
+
+
+##-----------------------------------------------------------------------------
+# MessageCache
+#
+# Disk-backed cache of MessageTemplate builds in the tibrvMsg_GetAsBytes wire
+# format, keyed by template layout and values. After a restart replay()
+# rehydrates the buffers with tibrvMsg_CreateFromBytes instead of marshalling
+# every field. Session fields ("Inbox" of the client) are left out of the key
+# and updated on load, the send subject is the one of the template. build()
+# only hits the last `keep` filled messages of this session, kept in memory
+# per template session: a tibrvMsg_CreateCopy, without the wire format round
+# trip. A rehydrated message costs more than a template build on the memory
+# backend, so build() does not load them.
+#
+# File: append-only records of template key, values key (sha1 digests),
+# size and wire bytes. A truncated last record is ignored.
+##-----------------------------------------------------------------------------
+
+class MessageCache():
+
+    _RECORD = struct.Struct("<20s20sI")
+
+    def __init__(self, path: str, session = ("Inbox",), keep: int = 1024):
+        self.path = path
+        self.session = frozenset(session)
+        self.entries = {}           # (template key, values key) -> wire bytes, in file order
+        self.keep = keep
+        self.messages = OrderedDict()   # (scope, values key) -> filled RVMessage, least recent first
+        self.hits = 0
+        self.misses = 0
+        self._keys = {}             # id(template) -> (template, key, session fields, scope)
+        self._load()
+        self.file = open(path, "ab")
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+
+        offset = 0
+        size = len(data)
+        while offset + self._RECORD.size <= size:
+            templateKey, valuesKey, length = self._RECORD.unpack_from(data, offset)
+            start = offset + self._RECORD.size
+            if start + length > size:
+                break
+            self.entries[(templateKey, valuesKey)] = data[start:start + length]
+            offset = start + length
+
+        if offset < size:
+            # torn write of the last record
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+
+    def _template(self, template: MessageTemplate) -> tuple:
+        entry = self._keys.get(id(template))
+        if entry is not None and entry[0] is template:
+            return entry
+
+        header, body, bodyName = template.schema
+        masked = ([(name, kind, None if name in self.session else value) for name, kind, value in header],
+                  list(body), bodyName, template.dateformat)
+        import hashlib
+        key = hashlib.sha1(repr(masked).encode()).digest()
+        session = [(name, kind, value) for name, kind, value in header
+                   if name in self.session and value is not None]
+        # filled messages differ by session values and send subject
+        scope = (key, tuple(session), template.subject)
+        entry = self._keys[id(template)] = (template, key, session, scope)
+        return entry
+
+    @staticmethod
+    def _values(template: MessageTemplate, values) -> bytes:
+        if isinstance(values, dict):
+            values = [values[name] for name in template.variables]
+        import hashlib
+        return hashlib.sha1(repr(list(values)).encode()).digest()
+
+    def _message(self, template: MessageTemplate, session: list, data: bytes) -> RVMessage:
+        msg = RVMessage.FromBytes(data, template.dateformat)
+        if session:
+            msg.UpdateFields(session)
+        if template.subject is not None:
+            msg.SetSendSubject(template.subject)
+        return msg
+
+    @staticmethod
+    def _copy(template: MessageTemplate, filled: RVMessage) -> RVMessage:
+        msg = RVMessage(template.dateformat, MessageTemplate._copy(filled).value)
+        if template.subject is not None:
+            msg.SetSendSubject(template.subject)
+        return msg
+
+    def _keep(self, entry: tuple, msg: RVMessage):
+        if self.keep <= 0 or entry in self.messages:
+            return
+        self.messages[entry] = RVMessage(msg.dateformat, MessageTemplate._copy(msg).value)
+        if len(self.messages) > self.keep:
+            self.messages.popitem(last = False)[1].close()
+
+    def _filled(self, template: MessageTemplate, entry: tuple) -> RVMessage:
+        filled = self.messages.get(entry)
+        if filled is None:
+            return None
+        self.messages.move_to_end(entry)
+        return self._copy(template, filled)
+
+    def get(self, template: MessageTemplate, values) -> RVMessage:
+        # kept message or None, the wire buffers on disk are for replay()
+        template, key, session, scope = self._template(template)
+        return self._filled(template, (scope, self._values(template, values)))
+
+    def put(self, template: MessageTemplate, values, msg: RVMessage):
+        template, key, session, scope = self._template(template)
+        entry = (key, self._values(template, values))
+        self._keep((scope, entry[1]), msg)
+        if entry in self.entries:
+            return
+        data = msg.AsBytes()
+        self.entries[entry] = data
+        self.file.write(self._RECORD.pack(key, entry[1], len(data)) + data)
+        self.file.flush()
+
+    def build(self, template: MessageTemplate, values = ()) -> RVMessage:
+        # template.build() through the cache
+        msg = self.get(template, values)
+        if msg is not None:
+            self.hits += 1
+            return msg
+        self.misses += 1
+        msg = template.build(values)
+        self.put(template, values, msg)
+        return msg
+
+    def replay(self, template: MessageTemplate):
+        # every cached message of the template, in the order they were cached
+        template, key, session, scope = self._template(template)
+        for (templateKey, valuesKey), data in list(self.entries.items()):
+            if templateKey == key:
+                msg = self._filled(template, (scope, valuesKey))
+                yield msg if msg is not None else self._message(template, session, data)
+
+    def close(self):
+        for msg in self.messages.values():
+            msg.close()
+        self.messages.clear()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+##-----------------------------------------------------------------------------
+# MessageDecoder
+#
+# Walks every field of a message once with tibrvMsg_GetNumFields and
+# tibrvMsg_GetFieldByIndex. decode() returns a dict tree, submessages become
+# dicts and repeated field names lists. KPLUSFEED bodies are flat: a string
+# "Table" field names a section and the fields up to the next "Table" belong
+# to it (build_deal, MessageTemplate, table answers with one section per
+# row). decode() keeps them as a list of section dicts under "Table",
+# rows()/columns() return the sections, optionally of one table, columns()
+# as one list or NumPy array per column. "Table" submessages are sections too.
+##-----------------------------------------------------------------------------
+
+def _strptime(dateformat: str) -> str:
+    # 'DD/MM/YYYY' -> '%d/%m/%Y'
+    for pattern, directive in (("YYYY", "%Y"), ("YY", "%y"), ("MM", "%m"), ("DD", "%d")):
+        dateformat = dateformat.replace(pattern, directive)
+    return dateformat
+
+class MessageDecoder():
+
+    # scalar field type: tibrvLocalData member
+    _SCALARS = {
+        RVMessage.TIBRVMSG_I8:          "i8",
+        RVMessage.TIBRVMSG_U8:          "u8",
+        RVMessage.TIBRVMSG_I16:         "i16",
+        RVMessage.TIBRVMSG_U16:         "u16",
+        RVMessage.TIBRVMSG_I32:         "i32",
+        RVMessage.TIBRVMSG_U32:         "u32",
+        RVMessage.TIBRVMSG_I64:         "i64",
+        RVMessage.TIBRVMSG_U64:         "u64",
+        RVMessage.TIBRVMSG_F32:         "f32",
+        RVMessage.TIBRVMSG_F64:         "f64",
+        RVMessage.TIBRVMSG_IPPORT16:    "ipport16",
+        RVMessage.TIBRVMSG_IPADDR32:    "ipaddr32",
+    }
+
+    # array field type: element ctype
+    _ARRAYS = {
+        RVMessage.TIBRVMSG_I8ARRAY:     _c_tibrv_i8,
+        RVMessage.TIBRVMSG_U8ARRAY:     _c_tibrv_u8,
+        RVMessage.TIBRVMSG_I16ARRAY:    _c_tibrv_i16,
+        RVMessage.TIBRVMSG_U16ARRAY:    _c_tibrv_u16,
+        RVMessage.TIBRVMSG_I32ARRAY:    _c_tibrv_i32,
+        RVMessage.TIBRVMSG_U32ARRAY:    _c_tibrv_u32,
+        RVMessage.TIBRVMSG_I64ARRAY:    _c_tibrv_i64,
+        RVMessage.TIBRVMSG_U64ARRAY:    _c_tibrv_u64,
+        RVMessage.TIBRVMSG_F32ARRAY:    _c_tibrv_f32,
+        RVMessage.TIBRVMSG_F64ARRAY:    _c_tibrv_f64,
+    }
+
+    def __init__(self, dateformat: str = 'DD/MM/YYYY', dates = (), codepage: str = None,
+                table: str = "Table", body: str = "KPLUSFEED"):
+        self.dateformat = dateformat
+        self.dates = frozenset(dates)           # string fields parsed as dates
+        self.codepage = codepage or "utf-8"
+        self.table = table
+        self.body = body
+        self._format = _strptime(dateformat)
+        self._parsed = {}
+
+    def date(self, value: str):
+        # table columns repeat a few distinct dates, parse each once
+        date = self._parsed.get(value)
+        if date is None:
+            try:
+                date = datetime.datetime.strptime(value, self._format).date()
+            except ValueError:
+                return value
+            if len(self._parsed) >= 4096:
+                self._parsed.clear()
+            self._parsed[value] = date
+        return date
+
+    def fields(self, message: tibrvMsg):
+        # (fieldName, type, value) of every field, submessages as borrowed handles
+        msg = _c_tibrvMsg(message)
+        count = _c_tibrv_u32(0)
+        status = _rv.tibrvMsg_GetNumFields(msg, ctypes.byref(count))
+        if status != RVMessage.TIBRV_OK:
+            raise TibrvMessageError('tibrvMsg_GetNumFields', status)
+
+        field = _c_tibrvMsgField()
+        ref = ctypes.byref(field)
+        getField = _rv.tibrvMsg_GetFieldByIndex
+        for i in range(count.value):
+            status = getField(msg, ref, i)
+            if status != RVMessage.TIBRV_OK:
+                raise TibrvFieldError('tibrvMsg_GetFieldByIndex', status, i)
+            name = field.name.decode(self.codepage) if field.name is not None else ""
+            yield name, field.type, self.value(name, field)
+
+    def value(self, name: str, field: _c_tibrvMsgField):
+        kind = field.type
+        data = field.data
+
+        if kind == RVMessage.TIBRVMSG_STRING:
+            value = data.str.decode(self.codepage) if data.str is not None else ""
+            if name in self.dates:
+                return self.date(value)
+            return value
+
+        member = self._SCALARS.get(kind)
+        if member is not None:
+            return getattr(data, member)
+
+        if kind == RVMessage.TIBRVMSG_MSG:
+            return data.msg
+        if kind == RVMessage.TIBRVMSG_BOOL:
+            return bool(data.boolean)
+        if kind == RVMessage.TIBRVMSG_DATETIME:
+            date = data.date
+            return _EPOCH + datetime.timedelta(seconds=date.sec, microseconds=date.nsec // 1000)
+        if kind == RVMessage.TIBRVMSG_OPAQUE:
+            return ctypes.string_at(data.buf, field.size) if field.size else b""
+
+        ctype = self._ARRAYS.get(kind)
+        if ctype is not None:
+            numpy = _numpy()
+            if field.count == 0:
+                return numpy.zeros(0, dtype=ctype) if numpy is not None else []
+            array = (ctype * field.count).from_address(data.array)
+            if numpy is not None:
+                return numpy.array(array)
+            return array[:]
+
+        # unsupported type, raw field bytes
+        return ctypes.string_at(data.buf, field.size) if field.size else None
+
+    @staticmethod
+    def _add(result: dict, repeated: set, name: str, value):
+        if name not in result:
+            result[name] = value
+        elif name in repeated:
+            result[name].append(value)
+        else:
+            result[name] = [result[name], value]
+            repeated.add(name)
+
+    def decode(self, message: tibrvMsg) -> dict:
+        result = {}
+        target, repeated = result, set()
+        for name, kind, value in self.fields(message):
+            if kind == RVMessage.TIBRVMSG_MSG:
+                value = self.decode(value)
+            elif name == self.table:
+                # section marker, the next fields belong to this section
+                target, repeated = {name: value}, set()
+                result.setdefault(name, []).append(target)
+                continue
+            self._add(target, repeated, name, value)
+        return result
+
+    def _sections(self, message: tibrvMsg, visit):
+        # visit(section name, [(fieldName, type, value)]) of every section, None
+        # names a "Table" submessage
+        section, fields = None, None
+        for name, kind, value in self.fields(message):
+            if name == self.table:
+                if fields is not None:
+                    visit(section, fields)
+                if kind == RVMessage.TIBRVMSG_MSG:
+                    section, fields = None, None
+                    visit(None, list(self.fields(value)))
+                else:
+                    section, fields = value, []
+            elif kind == RVMessage.TIBRVMSG_MSG and name == self.body:
+                if fields is not None:
+                    visit(section, fields)
+                section, fields = None, None
+                self._sections(value, visit)
+            elif fields is not None:
+                fields.append((name, kind, value))
+        if fields is not None:
+            visit(section, fields)
+
+    def rows(self, message: tibrvMsg, table: str = None) -> list:
+        # section dicts, with their name under "Table", of every section or of table
+        rows = []
+
+        def visit(section, fields):
+            if table is not None and section != table:
+                return
+            row, repeated = {}, set()
+            if section is not None:
+                row[self.table] = section
+            for name, kind, value in fields:
+                if kind == RVMessage.TIBRVMSG_MSG:
+                    value = self.decode(value)
+                self._add(row, repeated, name, value)
+            rows.append(row)
+
+        self._sections(message, visit)
+        return rows
+
+    def columns(self, message: tibrvMsg, arrays: bool = None, table: str = None) -> dict:
+        # arrays None = NumPy arrays for numeric columns when NumPy is installed.
+        # Sections of every table have their name in the "Table" column.
+        columns = {}
+        count = [0]
+
+        def visit(section, fields):
+            if table is not None and section != table:
+                return
+            n = count[0]
+            if table is None:
+                fields = [(self.table, RVMessage.TIBRVMSG_STRING, section)] + fields
+            for name, kind, value in fields:
+                if kind == RVMessage.TIBRVMSG_MSG:
+                    value = self.decode(value)
+                column = columns.get(name)
+                if column is None:
+                    column = columns[name] = [None] * n
+                if len(column) == n:
+                    column.append(value)
+            count[0] = n + 1
+            for column in columns.values():
+                if len(column) == n:
+                    column.append(None)
+
+        self._sections(message, visit)
+
+        if arrays is None:
+            arrays = _numpy() is not None
+        if arrays:
+            if _numpy() is None:
+                raise ImportError("numpy is required for columns(arrays=True)")
+            for name, column in columns.items():
+                columns[name] = self._array(column)
+        return columns
+
+    @staticmethod
+    def _array(column: list):
+        numpy = _numpy()
+        kinds = set(map(type, column))
+        if kinds == {int}:
+            return numpy.array(column, dtype=numpy.int64)
+        if kinds <= {int, float, type(None)} and float in kinds:
+            return numpy.array([numpy.nan if value is None else value for value in column],
+                                dtype=numpy.float64)
+        return column